@@ -0,0 +1,554 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import marshal
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from platformdirs import user_cache_dir, user_data_dir
+
+from browser.internal_pages import render_table_page
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+ADBLOCK_PAGE_URL = "about:adblock"
+
+# Bump when the compiled form changes, so old cache files are compiled again.
+CACHE_FORMAT_VERSION = 1
+
+RESOURCE_TYPES: dict[str, int] = {
+    name: 1 << bit
+    for bit, name in enumerate(
+        (
+            "document",
+            "subdocument",
+            "stylesheet",
+            "script",
+            "image",
+            "font",
+            "object",
+            "xmlhttprequest",
+            "ping",
+            "media",
+            "websocket",
+            "other",
+        ),
+    )
+}
+ALL_TYPES: int = sum(RESOURCE_TYPES.values())
+
+# Like Adblock Plus, a rule without type options does not block the page itself.
+DEFAULT_TYPES: int = ALL_TYPES & ~RESOURCE_TYPES["document"]
+
+OPTION_ALIASES: dict[str, str] = {
+    "3p": "third-party",
+    "1p": "first-party",
+    "xhr": "xmlhttprequest",
+    "css": "stylesheet",
+    "frame": "subdocument",
+    "doc": "document",
+}
+
+ANY_PARTY, THIRD_PARTY, FIRST_PARTY = 0, 1, 2
+
+# The same tokens are taken from rules and URLs: runs of characters that a "^" separator can not match.
+TOKEN_RE: re.Pattern[str] = re.compile(r"[a-z0-9%]+")
+HOST_RE: re.Pattern[str] = re.compile(r"[a-z][a-z0-9+.-]*://(?:[^/?#@]*@)?(\[[^\]/?#]*\]|[^/?#:]*)")
+HOST_RULE_RE: re.Pattern[str] = re.compile(r"[a-z0-9.-]+\^")
+SEPARATOR_REGEX = r"(?:[^\w\-.%]|$)"
+HOST_ANCHOR_REGEX = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"
+
+
+class FilterRule(NamedTuple):
+    """A network filter from an EasyList-style list.
+
+    The regex is empty for rules that only name a host, which are matched by the host lookup alone.
+    """
+
+    text: str
+    regex: str
+    exception: bool
+    important: bool
+    match_case: bool
+    types: int
+    party: int
+    include_domains: tuple[str, ...]
+    exclude_domains: tuple[str, ...]
+
+
+# A FilterRule as a plain tuple, which is how the matcher stores it.
+RuleTuple = tuple[str, str, bool, bool, bool, int, int, tuple[str, ...], tuple[str, ...]]
+
+
+class Request(NamedTuple):
+    """What the options and pattern of a rule are checked against."""
+
+    url: str
+    lowered: str
+    host: str
+    source_host: str
+    resource_type: int
+
+
+class ParsedFilter(NamedTuple):
+    """A rule and where it is filed in the matcher."""
+
+    rule: FilterRule
+    host: str | None
+    tokens: list[str]
+
+
+@functools.lru_cache(maxsize=1024)
+def url_host(url: str) -> str:
+    """Return the lowercase host of a URL, or an empty string if it has none."""
+    match: re.Match[str] | None = HOST_RE.match(url.lower())
+    return match.group(1) if match else ""
+
+
+@functools.lru_cache(maxsize=1024)
+def base_domain(host: str) -> str:
+    """Guess the registrable domain of a host.
+
+    Without the public suffix list this takes the last two labels, or three for hosts like example.co.uk.
+    """
+    labels: list[str] = host.rsplit(".", 3)
+    if len(labels) >= 3 and len(labels[-1]) == 2 and len(labels[-2]) <= 3:  # noqa: PLR2004
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def host_suffixes(host: str) -> list[str]:
+    """Return the host and every parent domain of it, like a walk down a domain trie."""
+    suffixes: list[str] = [host]
+    dot: int = host.find(".")
+    while dot != -1:
+        suffixes.append(host[dot + 1 :])
+        dot = host.find(".", dot + 1)
+    return suffixes
+
+
+def pattern_to_regex(pattern: str, *, host_anchored: bool, start_anchored: bool, end_anchored: bool) -> str:
+    """Translate the pattern of a filter to a regular expression.
+
+    Args:
+        pattern (str): The pattern without its anchors and options.
+        host_anchored (bool): The pattern started with "||" and has to match at the start of the host or a subdomain.
+        start_anchored (bool): The pattern started with "|" and has to match at the start of the URL.
+        end_anchored (bool): The pattern ended with "|" and has to match at the end of the URL.
+
+    Returns:
+        str: The regular expression, to be used with re.search.
+    """
+    parts: list[str] = []
+    if host_anchored:
+        parts.append(HOST_ANCHOR_REGEX)
+    elif start_anchored:
+        parts.append("^")
+    for character in pattern:
+        if character == "*":
+            parts.append(".*")
+        elif character == "^":
+            parts.append(SEPARATOR_REGEX)
+        else:
+            parts.append(re.escape(character))
+    if end_anchored:
+        parts.append("$")
+    return "".join(parts)
+
+
+def pattern_tokens(pattern: str, *, start_anchored: bool, end_anchored: bool) -> list[str]:
+    """Return the tokens of a pattern that have to appear as whole tokens in every URL it matches.
+
+    A token next to a "*" or at an unanchored end can be part of a longer token in the URL, so it is left out.
+    """
+    tokens: list[str] = []
+    for match in TOKEN_RE.finditer(pattern):
+        start, end = match.span()
+        if (start == 0 and not start_anchored) or (start > 0 and pattern[start - 1] == "*"):
+            continue
+        if (end == len(pattern) and not end_anchored) or (end < len(pattern) and pattern[end] == "*"):
+            continue
+        tokens.append(match.group())
+    return tokens
+
+
+def parse_filter(line: str) -> ParsedFilter | None:  # noqa: C901, PLR0912, PLR0915
+    """Parse a network filter.
+
+    Args:
+        line (str): A line of a filter list.
+
+    Returns:
+        ParsedFilter | None: The rule, or None for comments, element hiding rules and options we can not honour.
+    """
+    text: str = line.strip()
+    if not text or text.startswith(("!", "[")) or "##" in text or "#@#" in text or "#?#" in text or "#$#" in text:
+        return None
+
+    exception: bool = text.startswith("@@")
+    pattern: str = text[2:] if exception else text
+    options: list[str] = []
+    if "$" in pattern and not (pattern.startswith("/") and pattern.endswith("/")):
+        pattern, _, option_text = pattern.rpartition("$")
+        options = option_text.split(",")
+
+    types: int = 0
+    excluded_types: int = 0
+    party: int = ANY_PARTY
+    important: bool = False
+    match_case: bool = False
+    include_domains: set[str] = set()
+    exclude_domains: set[str] = set()
+    for raw_option in options:
+        option: str = raw_option.strip().lower()
+        negated: bool = option.startswith("~")
+        name: str = OPTION_ALIASES.get(option.lstrip("~"), option.lstrip("~"))
+        if name in RESOURCE_TYPES:
+            if negated:
+                excluded_types |= RESOURCE_TYPES[name]
+            else:
+                types |= RESOURCE_TYPES[name]
+        elif name in {"third-party", "first-party"}:
+            party = THIRD_PARTY if (name == "third-party") != negated else FIRST_PARTY
+        elif name.startswith("domain=") and not negated:
+            for domain in name.removeprefix("domain=").split("|"):
+                if domain.startswith("~"):
+                    exclude_domains.add(domain[1:])
+                elif domain:
+                    include_domains.add(domain)
+        elif name == "important" and not negated:
+            important = True
+        elif name == "match-case" and not negated:
+            match_case = True
+        else:
+            return None  # Like popup, csp or redirect, which a request filter can not do
+    if not types:
+        types = DEFAULT_TYPES
+    types &= ~excluded_types
+    if not types:
+        return None
+
+    host: str | None = None
+    tokens: list[str] = []
+    if pattern.startswith("/") and pattern.endswith("/") and len(pattern) > 2:  # noqa: PLR2004
+        regex: str = pattern[1:-1] if match_case else f"(?i){pattern[1:-1]}"
+        try:
+            re.compile(regex)
+        except re.error:
+            return None
+    else:
+        if not match_case:
+            pattern = pattern.lower()
+        host_anchored: bool = pattern.startswith("||")
+        start_anchored: bool = not host_anchored and pattern.startswith("|")
+        pattern = pattern.removeprefix("||") if host_anchored else pattern.removeprefix("|")
+        end_anchored: bool = pattern.endswith("|")
+        pattern = pattern.removesuffix("|")
+        pattern = pattern.strip("*") if not (host_anchored or start_anchored or end_anchored) else pattern
+        if host_anchored and not match_case and HOST_RULE_RE.fullmatch(pattern):
+            host = pattern[:-1]
+            regex = ""
+        else:
+            regex = pattern_to_regex(
+                pattern,
+                host_anchored=host_anchored,
+                start_anchored=start_anchored,
+                end_anchored=end_anchored,
+            )
+            tokens = pattern_tokens(
+                pattern.lower(),
+                start_anchored=host_anchored or start_anchored,
+                end_anchored=end_anchored,
+            )
+
+    rule = FilterRule(
+        text=text,
+        regex=regex,
+        exception=exception,
+        important=important,
+        match_case=match_case,
+        types=types,
+        party=party,
+        include_domains=tuple(sorted(include_domains)),
+        exclude_domains=tuple(sorted(exclude_domains)),
+    )
+    return ParsedFilter(rule, host, tokens)
+
+
+@dataclass(slots=True)
+class RuleIndex:
+    """Rules filed by host for host rules and by their rarest token for the rest.
+
+    A URL only has to be checked against the rules filed under its host, its parent domains and its tokens.
+    Rules without a usable token are filed under the empty string and checked for every URL.
+
+    The rules are kept as plain tuples in the order of the FilterRule fields, so the index can be
+    loaded by marshal as it is, without building 50k objects at startup.
+    """
+
+    hosts: dict[str, list[RuleTuple]] = field(default_factory=dict)
+    tokens: dict[str, list[RuleTuple]] = field(default_factory=dict)
+    token_set: frozenset[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Collect the tokens, so the tokens of a URL are looked up with one set intersection."""
+        self.token_set = frozenset(self.tokens)
+
+    def __len__(self) -> int:
+        """Return the number of rules."""
+        return sum(map(len, self.hosts.values())) + sum(map(len, self.tokens.values()))
+
+    def dump(self) -> tuple[dict[str, list[RuleTuple]], dict[str, list[RuleTuple]]]:
+        """Return the index for marshal."""
+        return self.hosts, self.tokens
+
+    @classmethod
+    def load(cls, data: tuple[dict[str, list[RuleTuple]], dict[str, list[RuleTuple]]]) -> RuleIndex:
+        """Rebuild an index from dump."""
+        hosts, tokens = data
+        return cls(hosts=hosts, tokens=tokens)
+
+
+@dataclass(slots=True)
+class BlockerStats:
+    """How many requests were checked and blocked."""
+
+    checked: int = 0
+    blocked: int = 0
+    by_host: Counter[str] = field(default_factory=Counter)
+
+
+class FilterMatcher:
+    """Match requests against compiled network filters."""
+
+    def __init__(self, blocking: RuleIndex, exceptions: RuleIndex) -> None:
+        """Initialize the matcher.
+
+        Args:
+            blocking (RuleIndex): The rules that block requests.
+            exceptions (RuleIndex): The "@@" rules that allow requests a blocking rule matched.
+        """
+        self.blocking: RuleIndex = blocking
+        self.exceptions: RuleIndex = exceptions
+        self.regexes: dict[str, re.Pattern[str]] = {}
+        self.stats = BlockerStats()
+
+    @classmethod
+    def compile(cls, lines: Iterable[str]) -> FilterMatcher:
+        """Compile the lines of filter lists.
+
+        Every rule is filed under the token that the fewest other rules have, so URLs meet as few rules as possible.
+
+        Args:
+            lines (Iterable[str]): The lines of the lists.
+
+        Returns:
+            FilterMatcher: The matcher.
+        """
+        parsed: list[ParsedFilter] = [rule for rule in map(parse_filter, lines) if rule is not None]
+        counts: Counter[str] = Counter(token for rule in parsed for token in set(rule.tokens))
+        blocking: dict[str, list[RuleTuple]] = {}
+        blocking_hosts: dict[str, list[RuleTuple]] = {}
+        exceptions: dict[str, list[RuleTuple]] = {}
+        exception_hosts: dict[str, list[RuleTuple]] = {}
+        for rule, host, tokens in parsed:
+            if host is not None:
+                (exception_hosts if rule.exception else blocking_hosts).setdefault(host, []).append(tuple(rule))
+            else:
+                token: str = min(tokens, key=lambda token: (counts[token], -len(token)), default="")
+                (exceptions if rule.exception else blocking).setdefault(token, []).append(tuple(rule))
+        return cls(RuleIndex(blocking_hosts, blocking), RuleIndex(exception_hosts, exceptions))
+
+    def dumps(self) -> bytes:
+        """Serialize the compiled rules."""
+        return marshal.dumps((CACHE_FORMAT_VERSION, self.blocking.dump(), self.exceptions.dump()))
+
+    @classmethod
+    def loads(cls, data: bytes) -> FilterMatcher:
+        """Load rules serialized by dumps.
+
+        Args:
+            data (bytes): The serialized rules.
+
+        Raises:
+            ValueError: If the data is not from this version of dumps.
+
+        Returns:
+            FilterMatcher: The matcher.
+        """
+        try:
+            version, blocking, exceptions = marshal.loads(data)  # noqa: S302
+        except (EOFError, TypeError, ValueError) as e:
+            msg = "Invalid compiled filters"
+            raise ValueError(msg) from e
+        if version != CACHE_FORMAT_VERSION:
+            msg = f"Unsupported compiled filter version {version!r}"
+            raise ValueError(msg)
+        return cls(RuleIndex.load(blocking), RuleIndex.load(exceptions))
+
+    def __len__(self) -> int:
+        """Return the number of rules."""
+        return len(self.blocking) + len(self.exceptions)
+
+    def match(self, url: str, source_url: str = "", resource_type: str = "other") -> FilterRule | None:
+        """Find the rule that blocks a request.
+
+        Args:
+            url (str): The URL of the request.
+            source_url (str): The URL of the page that made the request, empty for a navigation.
+            resource_type (str): What is requested, one of RESOURCE_TYPES.
+
+        Returns:
+            FilterRule | None: The blocking rule, or None if the request is allowed.
+        """
+        lowered: str = url.lower()
+        host_match: re.Match[str] | None = HOST_RE.match(lowered)
+        host: str = host_match.group(1) if host_match else ""
+        request = Request(
+            url=url,
+            lowered=lowered,
+            host=host,
+            source_host=url_host(source_url) if source_url else "",
+            resource_type=RESOURCE_TYPES.get(resource_type, ALL_TYPES),
+        )
+        tokens: set[str] = set(TOKEN_RE.findall(lowered))
+
+        rule: FilterRule | None = self.find(self.blocking, request, tokens)
+        if rule is not None and not rule.important and self.find(self.exceptions, request, tokens) is not None:
+            rule = None
+
+        self.stats.checked += 1
+        if rule is not None:
+            self.stats.blocked += 1
+            self.stats.by_host[host] += 1
+        return rule
+
+    def find(self, index: RuleIndex, request: Request, tokens: set[str]) -> FilterRule | None:
+        """Return the first rule of an index that matches the request."""
+        if index.hosts:
+            for suffix in host_suffixes(request.host):
+                for rule in index.hosts.get(suffix, ()):
+                    if self.applies(rule, request):
+                        return FilterRule._make(rule)
+        for token in (*(tokens & index.token_set), ""):
+            for rule in index.tokens.get(token, ()):
+                if self.applies(rule, request):
+                    return FilterRule._make(rule)
+        return None
+
+    def applies(self, rule: RuleTuple, request: Request) -> bool:
+        """Check the options of a rule, then its pattern."""
+        _, regex, _, _, match_case, types, party, include_domains, exclude_domains = rule
+        if not types & request.resource_type:
+            return False
+        if party:
+            source_host: str = request.source_host
+            third_party: bool = bool(source_host) and base_domain(request.host) != base_domain(source_host)
+            if (party == THIRD_PARTY) != third_party:
+                return False
+        if include_domains or exclude_domains:
+            source_domains: list[str] = host_suffixes(request.source_host)
+            if include_domains and not any(domain in include_domains for domain in source_domains):
+                return False
+            if any(domain in exclude_domains for domain in source_domains):
+                return False
+        if not regex:
+            return True
+        pattern: re.Pattern[str] | None = self.regexes.get(regex)
+        if pattern is None:
+            pattern = self.regexes[regex] = re.compile(regex)
+        return pattern.search(request.url if match_case else request.lowered) is not None
+
+    def render_page(self) -> str:
+        """Render the about:adblock page."""
+        stats: BlockerStats = self.stats
+        rows: list[tuple[str, str]] = [
+            ("Rules", str(len(self))),
+            ("Requests checked", str(stats.checked)),
+            ("Requests blocked", f"{stats.blocked} ({stats.blocked / stats.checked if stats.checked else 0:.0%})"),
+        ]
+        rows += [(f"Blocked from {host}", str(count)) for host, count in stats.by_host.most_common(20)]
+        return render_table_page("Blocked requests", rows)
+
+
+def default_filter_dir() -> Path:
+    """Return the directory the EasyList-style filter lists are read from, one list per .txt file."""
+    return Path(user_data_dir(appname="browser", appauthor="TheLovinator", roaming=True)) / "filters"
+
+
+def default_filter_cache_dir() -> Path:
+    """Return the directory the compiled filter lists are cached in."""
+    return Path(user_cache_dir(appname="browser", appauthor="TheLovinator")) / "filters"
+
+
+def load_filter_lists(paths: Iterable[Path], cache_dir: Path | None = None) -> FilterMatcher:
+    """Load filter lists, from the compiled cache if the lists have not changed.
+
+    The cache file is named after a hash of the lists, so editing or updating a list compiles them again.
+
+    Args:
+        paths (Iterable[Path]): The filter lists.
+        cache_dir (Path | None): Where the compiled lists are cached, or None to always compile them.
+
+    Returns:
+        FilterMatcher: The matcher for every rule of the lists.
+    """
+    start: float = time.perf_counter()
+    texts: list[str] = []
+    for path in sorted(paths):
+        try:
+            texts.append(path.read_text(encoding="utf-8", errors="replace"))
+        except OSError:
+            logger.exception("Failed to read the filter list %s", path)
+
+    digest = hashlib.sha256(f"{CACHE_FORMAT_VERSION}\0".encode())
+    for text in texts:
+        digest.update(text.encode())
+        digest.update(b"\0")
+    cache_path: Path | None = cache_dir / f"{digest.hexdigest()}.marshal" if cache_dir is not None else None
+
+    if cache_path is not None and cache_path.exists():
+        try:
+            matcher: FilterMatcher = FilterMatcher.loads(cache_path.read_bytes())
+        except (OSError, ValueError):
+            logger.exception("Ignoring the compiled filters in %s", cache_path)
+        else:
+            logger.info("Loaded %s compiled filters in %.0f ms", len(matcher), (time.perf_counter() - start) * 1000)
+            return matcher
+
+    matcher = FilterMatcher.compile(line for text in texts for line in text.splitlines())
+    logger.info("Compiled %s filters in %.0f ms", len(matcher), (time.perf_counter() - start) * 1000)
+    if cache_path is not None:
+        try:
+            write_cache(cache_path, matcher.dumps())
+        except OSError:
+            logger.exception("Failed to cache the compiled filters in %s", cache_path)
+    return matcher
+
+
+def write_cache(path: Path, data: bytes) -> None:
+    """Replace the compiled filter cache atomically and remove the caches of older lists."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    temporary_path = Path(temporary_name)
+    try:
+        with os.fdopen(fd, "wb") as temporary_file:
+            temporary_file.write(data)
+        temporary_path.replace(path)
+    except BaseException:
+        temporary_path.unlink(missing_ok=True)
+        raise
+    for old_path in path.parent.glob("*.marshal"):
+        if old_path != path:
+            old_path.unlink(missing_ok=True)
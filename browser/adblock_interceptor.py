@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from PySide6.QtWebEngineCore import QWebEngineUrlRequestInfo, QWebEngineUrlRequestInterceptor
+
+if TYPE_CHECKING:
+    from PySide6.QtCore import QObject
+
+    from browser.adblock import FilterMatcher, FilterRule
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+ResourceType = QWebEngineUrlRequestInfo.ResourceType
+
+RESOURCE_TYPE_NAMES: dict[QWebEngineUrlRequestInfo.ResourceType, str] = {
+    ResourceType.ResourceTypeMainFrame: "document",
+    ResourceType.ResourceTypeSubFrame: "subdocument",
+    ResourceType.ResourceTypeStylesheet: "stylesheet",
+    ResourceType.ResourceTypeScript: "script",
+    ResourceType.ResourceTypeImage: "image",
+    ResourceType.ResourceTypeFontResource: "font",
+    ResourceType.ResourceTypeObject: "object",
+    ResourceType.ResourceTypePluginResource: "object",
+    ResourceType.ResourceTypeXhr: "xmlhttprequest",
+    ResourceType.ResourceTypePing: "ping",
+    ResourceType.ResourceTypeCspReport: "ping",
+    ResourceType.ResourceTypeMedia: "media",
+    ResourceType.ResourceTypeWebSocket: "websocket",
+}
+
+
+class AdBlockInterceptor(QWebEngineUrlRequestInterceptor):
+    """Block the requests of every tab that match the filter lists, before they reach the network."""
+
+    def __init__(self, matcher: FilterMatcher, parent: QObject | None = None) -> None:
+        """Initialize the interceptor.
+
+        Args:
+            matcher (FilterMatcher): The compiled filter lists.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        self.matcher: FilterMatcher = matcher
+
+    def interceptRequest(self, info: QWebEngineUrlRequestInfo) -> None:  # noqa: N802
+        """Block the request if a filter matches it."""
+        url: str = info.requestUrl().toString()
+        if not url.startswith(("http:", "https:", "ws:", "wss:")):
+            return
+        rule: FilterRule | None = self.matcher.match(
+            url,
+            info.firstPartyUrl().toString(),
+            RESOURCE_TYPE_NAMES.get(info.resourceType(), "other"),
+        )
+        if rule is not None:
+            logger.debug("Blocked %s by %s", url, rule.text)
+            info.block(True)  # noqa: FBT003
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from PySide6.QtCore import QObject, QThreadPool, Signal
+
+from browser.internal_pages import render_table_page
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+CACHE_PAGE_URL = "about:cache"
+
+# How many seconds a measured size of the disk cache is shown before it is measured again.
+CACHE_SIZE_TTL: float = 10.0
+
+# Run in the page after it has loaded. Resource Timing reports a transferSize of 0 for responses served from the
+# HTTP cache, and only the headers for responses revalidated with 304 Not Modified.
+RESOURCE_TIMING_SCRIPT = """
+(() => {
+    const navigation = performance.getEntriesByType("navigation")[0];
+    const entries = [navigation, ...performance.getEntriesByType("resource")].filter(Boolean);
+    return {
+        load_ms: navigation ? navigation.loadEventEnd || navigation.duration : null,
+        resources: entries.map((entry) => [entry.transferSize, entry.encodedBodySize]),
+    };
+})()
+"""
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """HTTP cache hits and misses, and page load times with and without help from the cache.
+
+    QtWebEngine does not expose cache counters, so they are counted from the Resource Timing entries of
+    every page that finishes loading. Cross-origin resources without Timing-Allow-Origin report no sizes
+    and are counted as opaque.
+    """
+
+    hits: int = 0
+    revalidations: int = 0
+    misses: int = 0
+    opaque: int = 0
+    bytes_from_network: int = 0
+    bytes_from_cache: int = 0
+    cold_load_ms: list[float] = field(default_factory=list)
+    warm_load_ms: list[float] = field(default_factory=list)
+
+    def record(self, timing: dict[str, Any] | None) -> None:
+        """Count the resources of a page load.
+
+        Args:
+            timing (dict[str, Any] | None): The result of RESOURCE_TIMING_SCRIPT, or None if it failed.
+        """
+        if not timing:
+            return
+
+        page_hits: int = 0
+        for transfer_size, encoded_body_size in timing.get("resources", []):
+            if not transfer_size and not encoded_body_size:
+                self.opaque += 1
+            elif not transfer_size:
+                self.hits += 1
+                page_hits += 1
+                self.bytes_from_cache += int(encoded_body_size)
+            elif transfer_size < encoded_body_size:
+                self.revalidations += 1
+                page_hits += 1
+                self.bytes_from_network += int(transfer_size)
+                self.bytes_from_cache += int(encoded_body_size)
+            else:
+                self.misses += 1
+                self.bytes_from_network += int(transfer_size)
+
+        load_ms: float | None = timing.get("load_ms")
+        if load_ms:
+            (self.warm_load_ms if page_hits else self.cold_load_ms).append(float(load_ms))
+
+    @property
+    def hit_ratio(self) -> float:
+        """The share of resources with a known origin that were served from the cache, revalidated or not."""
+        total: int = self.hits + self.revalidations + self.misses
+        return (self.hits + self.revalidations) / total if total else 0.0
+
+    def summary(self) -> dict[str, int | float | None]:
+        """Return the counters and the median load times.
+
+        Returns:
+            dict[str, int | float | None]: The counters, the hit ratio and the median cold and warm load times.
+        """
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "opaque": self.opaque,
+            "hit_ratio": self.hit_ratio,
+            "bytes_from_network": self.bytes_from_network,
+            "bytes_from_cache": self.bytes_from_cache,
+            "cold_loads": len(self.cold_load_ms),
+            "warm_loads": len(self.warm_load_ms),
+            "median_cold_load_ms": statistics.median(self.cold_load_ms) if self.cold_load_ms else None,
+            "median_warm_load_ms": statistics.median(self.warm_load_ms) if self.warm_load_ms else None,
+        }
+
+
+def directory_size(path: Path) -> int:
+    """Return the size of the files in a directory and its subdirectories, in bytes.
+
+    Args:
+        path (Path): The directory.
+
+    Returns:
+        int: The total size, or 0 if the directory does not exist.
+    """
+    total: int = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += (Path(root) / name).stat().st_size
+            except OSError:
+                continue  # Removed by the cache while we were counting
+    return total
+
+
+class CacheSizeMonitor(QObject):
+    """Measure the size of the cache directory on a worker thread, so about:cache never walks it on the GUI thread.
+
+    The page shows the last measured size, which is reused for `ttl` seconds. When it is older, a new measurement
+    is started and measured is emitted on the GUI thread once it is done, so the page can be filled in again.
+    """
+
+    measured = Signal(object)
+
+    def __init__(
+        self,
+        *,
+        ttl: float = CACHE_SIZE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+        thread_pool: QThreadPool | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        """Initialize the monitor without measuring anything yet.
+
+        Args:
+            ttl (float): How many seconds a measured size is reused.
+            clock (Callable[[], float]): Returns the current time in seconds, replaceable in tests.
+            thread_pool (QThreadPool | None): Where the directory is walked, the global pool if None.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        self.ttl: float = ttl
+        self.clock: Callable[[], float] = clock
+        self.thread_pool: QThreadPool = thread_pool or QThreadPool.globalInstance()
+        self.size: int | None = None
+        self.measured_at: float = -math.inf
+        self.measuring: bool = False
+        self.measured.connect(self.on_measured)
+
+    def current_size(self, path: Path) -> int | None:
+        """Return the last measured size of a directory, and measure it again if that is too old.
+
+        Args:
+            path (Path): The cache directory.
+
+        Returns:
+            int | None: The size in bytes, or None if the first measurement has not finished.
+        """
+        if not self.measuring and self.clock() - self.measured_at >= self.ttl:
+            self.measuring = True
+            self.thread_pool.start(lambda: self.measured.emit(directory_size(path)))
+        return self.size
+
+    def on_measured(self, size: int) -> None:
+        """Keep the size that was just measured."""
+        self.size = size
+        self.measured_at = self.clock()
+        self.measuring = False
+
+
+def render_cache_page(stats: CacheStats, cache_path: Path | None, maximum_size: int, disk_size: int | None) -> str:
+    """Render the about:cache page.
+
+    Args:
+        stats (CacheStats): The counters of this session.
+        cache_path (Path | None): The HTTP cache directory of the profile, None if the cache is in memory.
+        maximum_size (int): The maximum size of the cache in bytes, 0 if Chromium chooses.
+        disk_size (int | None): The size of the cache directory in bytes, None while it is being measured.
+
+    Returns:
+        str: The page as HTML.
+    """
+    mib: int = 1024 * 1024
+    summary: dict[str, int | float | None] = stats.summary()
+    size_on_disk: str = f"{disk_size / mib:.1f} MiB" if disk_size is not None else "Measuring..."
+    rows: list[tuple[str, str]] = [
+        ("Cache directory", str(cache_path) if cache_path is not None else "In memory"),
+        ("Size on disk", size_on_disk if cache_path is not None else "0 MiB"),
+        ("Maximum size", f"{maximum_size / mib:.0f} MiB" if maximum_size else "Chosen by Chromium"),
+        ("Served from the cache", str(summary["hits"])),
+        ("Revalidated (304)", str(summary["revalidations"])),
+        ("Fetched from the network", str(summary["misses"])),
+        ("Unknown (cross-origin)", str(summary["opaque"])),
+        ("Hit ratio", f"{stats.hit_ratio:.0%}"),
+        ("Bytes from the network", f"{stats.bytes_from_network / mib:.2f} MiB"),
+        ("Bytes from the cache", f"{stats.bytes_from_cache / mib:.2f} MiB"),
+    ]
+    for name, key, count_key in (
+        ("Median cold load", "median_cold_load_ms", "cold_loads"),
+        ("Median warm load", "median_warm_load_ms", "warm_loads"),
+    ):
+        value: int | float | None = summary[key]
+        rows.append((name, f"{value:.0f} ms ({summary[count_key]} pages)" if value is not None else "No pages yet"))
+
+    return render_table_page(
+        "HTTP cache",
+        rows,
+        "Counted from the Resource Timing entries of the pages loaded since the browser started. "
+        "A load is warm if at least one of its resources came from the cache.",
+    )
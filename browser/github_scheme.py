@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import html
+import logging
+import threading
+from typing import Any
+from urllib.parse import quote
+
+from PySide6.QtCore import QIODevice, QObject, QUrl, QUrlQuery
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+GITHUB_SCHEME = "github"
+
+# How many entries of a directory one page lists. Larger directories get links to the next and previous pages, so
+# a directory with 100,000 entries does not make the web view lay out 100,000 rows.
+LISTING_PAGE_SIZE = 1000
+
+LISTING_STYLE = (
+    "body{font-family:sans-serif;margin:2em;background:#222;color:white}a{color:#8cf}"
+    "ul{padding:0}li{list-style:none;padding:1px 0}.error{color:red}"
+)
+
+
+def github_url(github_username: str, github_repo: str, path: str = "", start: int = 0) -> str:
+    """Return the github:// URL of a directory of a repository.
+
+    Args:
+        github_username (str): The username of the repository owner.
+        github_repo (str): The name of the repository.
+        path (str): The path of the directory, or an empty string for the root.
+        start (int): The index of the first entry listed, for directories with more than one page.
+
+    Returns:
+        str: The URL, like github://user/repo/src/ or github://user/repo/src/?start=1000.
+    """
+    directory: str = f"{quote(path)}/" if path else ""
+    query: str = f"?start={start}" if start else ""
+    return f"{GITHUB_SCHEME}://{quote(github_username)}/{quote(github_repo)}/{directory}{query}"
+
+
+def github_url_from_text(text: str) -> str | None:
+    """Turn "GitHub/user/repo" typed in the URL bar into a github:// URL.
+
+    Args:
+        text (str): The text of the URL bar.
+
+    Returns:
+        str | None: The URL, or None if the text is not a GitHub path. A GitHub path without a repository
+            still gets a URL, so the page can explain the expected format.
+    """
+    if not text.startswith("GitHub/"):
+        return None
+    return f"{GITHUB_SCHEME}://{text.removeprefix('GitHub/').strip('/')}/"
+
+
+def parse_github_url(url: QUrl) -> tuple[str, str, str]:
+    """Split a github:// URL into the owner, the repository and the directory.
+
+    Args:
+        url (QUrl): The URL.
+
+    Raises:
+        ValueError: If the URL does not name a repository.
+
+    Returns:
+        tuple[str, str, str]: The username of the owner, the name of the repository and the path of the directory.
+    """
+    github_username: str = url.host()
+    github_repo, _, path = url.path(QUrl.ComponentFormattingOption.FullyDecoded).strip("/").partition("/")
+    if url.scheme() != GITHUB_SCHEME or not github_username or not github_repo:
+        msg: str = f"Invalid GitHub URL {url.toString()!r}, expected format: GitHub/username/repo"
+        raise ValueError(msg)
+    return github_username, github_repo, path.strip("/")
+
+
+def parse_listing_start(url: QUrl) -> int:
+    """Return the index of the first entry a github:// URL lists, 0 unless a valid start is in the query."""
+    start: str = QUrlQuery(url).queryItemValue("start")
+    return int(start) if start.isdigit() else 0
+
+
+def render_listing_head(github_username: str, github_repo: str, path: str) -> str:
+    """Render the start of the page of a directory, up to where the entries go."""
+    title: str = html.escape(f"GitHub/{github_username}/{github_repo}/{path}".rstrip("/"))
+    parent: str = (
+        f"<li><a href='{html.escape(github_url(github_username, github_repo, path.rpartition('/')[0]))}'>..</a></li>"
+        if path
+        else ""
+    )
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title><style>{LISTING_STYLE}</style>"
+        f"</head><body><h1>{title}</h1><ul>{parent}"
+    )
+
+
+def render_listing_rows(github_username: str, github_repo: str, entries: list[dict[str, Any]]) -> str:
+    """Render entries of a directory, with links into the subdirectories."""
+    rows: list[str] = []
+    for entry in entries:
+        text: str = html.escape(format_github_item(entry))
+        if entry["type"] == "dir":
+            href: str = html.escape(github_url(github_username, github_repo, entry["path"]))
+            rows.append(f"<li><a href='{href}'>{text}</a></li>")
+        else:
+            rows.append(f"<li>{text}</li>")
+    return "".join(rows)
+
+
+def render_listing_pager(github_username: str, github_repo: str, path: str, start: int, count: int) -> str:
+    """Render which entries of a large directory a page lists, with links to the pages before and after it.
+
+    Returns:
+        str: The pager, or an empty string if the whole directory fits on one page.
+    """
+    if start == 0 and count <= LISTING_PAGE_SIZE:
+        return ""
+    end: int = min(start + LISTING_PAGE_SIZE, count)
+    links: list[str] = [f"Entries {start + 1 if end else 0}-{end}"]
+    if start > 0:
+        href: str = html.escape(github_url(github_username, github_repo, path, max(start - LISTING_PAGE_SIZE, 0)))
+        links.append(f"<a href='{href}'>Previous</a>")
+    if end < count:
+        href = html.escape(github_url(github_username, github_repo, path, end))
+        links.append(f"<a href='{href}'>Next</a>")
+    return f"<p>{' '.join(links)}</p>"
+
+
+def render_listing_tail(count: int, error: str | None = None, pager: str = "") -> str:
+    """Render the end of the page of a directory, with the pager of a directory with more than one page."""
+    status: str = f"<p class='error'>{html.escape(error)}</p>" if error else f"<p>{count} entries</p>"
+    return f"</ul>{pager}{status}</body></html>"
+
+
+class HtmlStream(QIODevice):
+    """A read-only sequential device that a page is written into while it is being read.
+
+    QtWebEngine reads the reply of a scheme handler as data arrives, so the top of a listing is shown while
+    the rest of the tree is still being fetched. The reading may happen on another thread than the writing.
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        """Open the stream."""
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self.buffer = bytearray()
+        self.finished: bool = False
+        self.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered)
+
+    def write_text(self, text: str) -> None:
+        """Append to the page."""
+        if self.finished or not text:
+            return
+        with self.lock:
+            self.buffer += text.encode()
+        self.readyRead.emit()
+
+    def finish(self, text: str = "") -> None:
+        """Append the end of the page and tell the reader that nothing more is coming."""
+        self.write_text(text)
+        if self.finished:
+            return
+        with self.lock:
+            self.finished = True
+        self.readyRead.emit()
+        self.readChannelFinished.emit()
+
+    def isSequential(self) -> bool:  # noqa: N802
+        """The stream can only be read from the start to the end."""
+        return True
+
+    def bytesAvailable(self) -> int:  # noqa: N802
+        """Return how much has been written and not read yet."""
+        with self.lock:
+            return len(self.buffer)
+
+    def atEnd(self) -> bool:  # noqa: N802
+        """Return True once everything has been read and nothing more is coming."""
+        with self.lock:
+            return self.finished and not self.buffer
+
+    def readData(self, maxlen: int) -> bytes:  # noqa: N802
+        """Read what has been written so far, up to maxlen bytes."""
+        with self.lock:
+            data = bytes(self.buffer[:maxlen])
+            del self.buffer[:maxlen]
+        return data
+
+    def writeData(self, data: bytes, length: int) -> int:  # noqa: ARG002, N802
+        """Refuse writes through the QIODevice API. Use write_text."""
+        return -1
+
+
+def format_github_item(item: dict[str, Any]) -> str:
+    """Format a GitHub item for the listing.
+
+    Args:
+        item (dict[str, Any]): The item as returned by the API.
+
+    Returns:
+        str: The text shown in the list.
+    """
+    if item["type"] == "dir":
+        return f"{item['name']}/ ({item['sha']})"
+    size_info: str = f" ({item['size']} bytes)" if int(item["size"]) > 0 else ""
+    return f"{item['name']}{size_info} ({item['sha']})"
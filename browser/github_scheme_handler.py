@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from PySide6.QtWebEngineCore import QWebEngineUrlRequestJob, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler
+
+from browser.github_scheme import GITHUB_SCHEME
+from browser.github_trees import open_listing
+
+if TYPE_CHECKING:
+    from PySide6.QtCore import QObject
+
+    from browser.github_scheme import HtmlStream
+    from browser.github_trees import GitHubTreeStore
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def register_github_scheme() -> None:
+    """Register the github:// scheme with QtWebEngine. Must be called before the first profile is created."""
+    if QWebEngineUrlScheme.schemeByName(GITHUB_SCHEME.encode()).name():
+        return
+    scheme = QWebEngineUrlScheme(GITHUB_SCHEME.encode())
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(QWebEngineUrlScheme.Flag.SecureScheme)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+class GitHubSchemeHandler(QWebEngineUrlSchemeHandler):
+    """Answer github://user/repo/path with the listing of the directory, streamed into the web view.
+
+    Navigating a repository stays inside one web view, so back and forward work and the renderer is kept.
+    """
+
+    def __init__(self, store: GitHubTreeStore, parent: QObject | None = None) -> None:
+        """Initialize the handler.
+
+        Args:
+            store (GitHubTreeStore): Where the trees of the repositories come from.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        self.store: GitHubTreeStore = store
+
+    def requestStarted(self, job: QWebEngineUrlRequestJob) -> None:  # noqa: N802
+        """Reply with the page of the directory, which keeps being written as the tree arrives."""
+        if job.requestMethod().data() != b"GET":
+            job.fail(QWebEngineUrlRequestJob.Error.RequestDenied)
+            return
+        page: HtmlStream = open_listing(self.store, job.requestUrl())
+        job.destroyed.connect(page.deleteLater)
+        job.reply(b"text/html", page)
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from PySide6.QtCore import QObject, QUrl, Signal
+from PySide6.QtNetwork import QNetworkReply, QNetworkRequest
+
+from browser.github_scheme import (
+    LISTING_PAGE_SIZE,
+    HtmlStream,
+    parse_github_url,
+    parse_listing_start,
+    render_listing_head,
+    render_listing_pager,
+    render_listing_rows,
+    render_listing_tail,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from PySide6.QtNetwork import QNetworkAccessManager
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+API_BASE_URL = "http://localhost:8000/api/github/"
+
+# How long a fetched tree is reused for navigating around a repository before it is revalidated, and how many
+# trees are kept.
+TREE_TTL: float = 300.0
+MAX_TREES = 32
+
+# How many finished fetches are kept for about:performance.
+MAX_FETCH_TIMINGS = 200
+
+
+@dataclass(slots=True)
+class FetchTiming:
+    """One fetch of a tree, in time.perf_counter seconds."""
+
+    key: str
+    started_at: float
+    finished_at: float
+    received: int
+    outcome: str
+
+
+@dataclass(slots=True)
+class RepoTree:
+    """The tree of a repository as far as it has arrived, grouped by directory.
+
+    While an expired tree is revalidated its old children are kept, and only replaced if the API answers with a
+    new tree instead of 304 Not Modified.
+    """
+
+    children: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    reply: QNetworkReply | None = None
+    buffer: bytearray = field(default_factory=bytearray)
+    error: str | None = None
+    fetched_at: float = 0.0
+    etag: str | None = None
+    revalidating: bool = False
+    requested_at: float = 0.0
+    received: int = 0
+
+    @property
+    def loading(self) -> bool:
+        """The tree is still being streamed."""
+        return self.reply is not None
+
+
+class GitHubTreeStore(QObject):
+    """Fetch the trees of repositories once and share them between the pages that list their directories.
+
+    The whole recursive tree is streamed from the API as NDJSON, so after the first page of a repository every
+    directory of it is listed without another request until the tree expires. An expired tree is revalidated
+    with its ETag, so if the repository did not change it costs an empty 304.
+
+    The pages listing a repository hold its tree, and a tree that is still loading when its last page is closed
+    stops being fetched.
+    """
+
+    changed = Signal(str)
+
+    def __init__(
+        self,
+        network_manager: QNetworkAccessManager,
+        api_base_url: str = API_BASE_URL,
+        *,
+        ttl: float = TREE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+        parent: QObject | None = None,
+    ) -> None:
+        """Initialize the store.
+
+        Args:
+            network_manager (QNetworkAccessManager): The shared network access manager.
+            api_base_url (str): The base URL of the GitHub API router.
+            ttl (float): How many seconds a fetched tree is reused.
+            clock (Callable[[], float]): Returns the current time in seconds, replaceable in tests.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        self.network_manager: QNetworkAccessManager = network_manager
+        self.api_base_url: str = api_base_url
+        self.ttl: float = ttl
+        self.clock: Callable[[], float] = clock
+        self.trees: OrderedDict[str, RepoTree] = OrderedDict()
+        self.requests: int = 0
+        self.not_modified: int = 0
+        self.bytes_received: int = 0
+        self.fetch_timings: deque[FetchTiming] = deque(maxlen=MAX_FETCH_TIMINGS)
+        self.listings: dict[str, int] = {}
+
+    @staticmethod
+    def key(github_username: str, github_repo: str) -> str:
+        """Return the key of a repository, which like GitHub ignores case."""
+        return f"{github_username}/{github_repo}".lower()
+
+    def tree(self, github_username: str, github_repo: str, reply: QNetworkReply | None = None) -> RepoTree:
+        """Return the tree of a repository, fetching it unless a fresh or loading one is stored.
+
+        An expired tree with an ETag is returned as it is and revalidated, and keeps its children until a new tree
+        arrives.
+
+        Emits changed with the key of the repository whenever entries arrive and when the fetch ends.
+
+        Args:
+            github_username (str): The username of the repository owner.
+            github_repo (str): The name of the repository.
+            reply (QNetworkReply | None): A request for the tree that was already sent, for example by the
+                URL bar while the user was typing. The store owns it from now on.
+
+        Returns:
+            RepoTree: The tree, which may still be loading.
+        """
+        key: str = self.key(github_username, github_repo)
+        tree: RepoTree | None = self.trees.get(key)
+        if tree is not None and (tree.loading or (tree.error is None and self.clock() - tree.fetched_at < self.ttl)):
+            self.trees.move_to_end(key)
+            if reply is not None:
+                reply.abort()
+                reply.deleteLater()
+            return tree
+
+        if tree is not None and tree.error is None and tree.etag is not None:
+            tree.revalidating = True
+            tree.buffer.clear()
+            self.trees.move_to_end(key)
+        else:
+            tree = RepoTree()
+            self.trees[key] = tree
+            while len(self.trees) > MAX_TREES:
+                _, evicted = self.trees.popitem(last=False)
+                if evicted.reply is not None:
+                    evicted.reply.abort()
+
+        if reply is None:
+            request: QNetworkRequest = make_tree_request(self.api_base_url, github_username, github_repo)
+            if tree.revalidating and tree.etag is not None:
+                request.setRawHeader(b"If-None-Match", tree.etag.encode())
+            logger.info("Fetching %s", request.url().toString())
+            reply = self.network_manager.get(request)
+            self.requests += 1
+        tree.reply = reply
+        tree.requested_at = time.perf_counter()
+        tree.received = 0
+        reply.setParent(self)
+        reply.readyRead.connect(lambda: self.on_ready_read(key, reply))
+        reply.finished.connect(lambda: self.on_reply_finished(key, reply))
+        if reply.isFinished():
+            self.on_reply_finished(key, reply)
+        elif reply.bytesAvailable():
+            self.on_ready_read(key, reply)
+        return tree
+
+    def hold(self, key: str) -> None:
+        """Count a page that lists the tree of a repository."""
+        self.listings[key] = self.listings.get(key, 0) + 1
+
+    def release(self, key: str) -> None:
+        """Stop counting a page that listed the tree of a repository, and cancel the fetch if it was the last one."""
+        self.listings[key] -= 1
+        if self.listings[key] > 0:
+            return
+        del self.listings[key]
+        tree: RepoTree | None = self.trees.get(key)
+        if tree is None or tree.reply is None:
+            return
+        logger.info("Cancelling the fetch of %s, no page lists it any more", key)
+        reply: QNetworkReply = tree.reply
+        self.record_fetch(key, tree, "cancelled")
+        del self.trees[key]
+        tree.reply = None
+        reply.abort()
+
+    def current(self, key: str, reply: QNetworkReply) -> RepoTree | None:
+        """Return the tree that is being fetched by the reply, or None if the reply is stale."""
+        tree: RepoTree | None = self.trees.get(key)
+        return tree if tree is not None and tree.reply is reply else None
+
+    def on_ready_read(self, key: str, reply: QNetworkReply) -> None:
+        """Add the complete lines received so far to the tree."""
+        tree: RepoTree | None = self.current(key, reply)
+        # The body of an error response is not NDJSON, so it is left for on_reply_finished to report, and a 304
+        # has no body and keeps the old children
+        status: int | None = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if (
+            tree is not None
+            and (status or HTTPStatus.OK) < HTTPStatus.BAD_REQUEST
+            and status != HTTPStatus.NOT_MODIFIED
+        ):
+            self.read(tree, reply)
+            self.parse(key, tree)
+
+    def on_reply_finished(self, key: str, reply: QNetworkReply) -> None:
+        """Add the rest of the stream to the tree, or record why it failed."""
+        tree: RepoTree | None = self.current(key, reply)
+        reply.deleteLater()
+        if tree is None:
+            return
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            self.fail(key, tree, f"Failed to fetch data from the API: {reply.errorString()}")
+            return
+        status: int | None = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if status == HTTPStatus.NOT_MODIFIED and tree.revalidating:
+            logger.debug("Tree of %s is not modified", key)
+            self.not_modified += 1
+            tree.revalidating = False
+            tree.reply = None
+            tree.fetched_at = self.clock()
+            self.record_fetch(key, tree, "not modified")
+            self.changed.emit(key)
+            return
+        self.read(tree, reply)
+        if self.parse(key, tree, final=True):
+            tree.reply = None
+            tree.fetched_at = self.clock()
+            self.record_fetch(key, tree, "fetched")
+            self.changed.emit(key)
+
+    def read(self, tree: RepoTree, reply: QNetworkReply) -> None:
+        """Move what the reply received into the buffer of the tree.
+
+        The first data of a new tree replaces the children that were kept while the old one was revalidated.
+        """
+        data: bytes = reply.readAll().data()
+        self.bytes_received += len(data)
+        tree.received += len(data)
+        if tree.revalidating:
+            tree.revalidating = False
+            tree.children.clear()
+            tree.etag = None
+        if tree.etag is None:
+            tree.etag = reply.rawHeader("ETag").data().decode() or None
+        tree.buffer += data
+
+    def record_fetch(self, key: str, tree: RepoTree, outcome: str) -> None:
+        """Remember how long a fetch took and how it ended, for about:performance."""
+        self.fetch_timings.append(FetchTiming(key, tree.requested_at, time.perf_counter(), tree.received, outcome))
+
+    def parse(self, key: str, tree: RepoTree, *, final: bool = False) -> bool:
+        """Parse the complete NDJSON lines of the buffer into the tree.
+
+        Returns:
+            bool: False if the stream was invalid and the tree failed.
+        """
+        try:
+            entries: list[dict[str, Any]] = take_ndjson_lines(tree.buffer, final=final)
+            for entry in entries:
+                tree.children.setdefault(entry["path"].rpartition("/")[0], []).append(entry)
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            logger.exception("Invalid NDJSON for %s", key)
+            self.fail(key, tree, "Failed to fetch data from the API.")
+            return False
+        if entries and not final:
+            self.changed.emit(key)
+        return True
+
+    def fail(self, key: str, tree: RepoTree, error: str) -> None:
+        """Stop fetching a tree and keep the error until the tree is asked for again."""
+        logger.error("GitHub/%s: %s", key, error)
+        reply: QNetworkReply | None = tree.reply
+        if reply is not None:
+            self.record_fetch(key, tree, "failed")
+        tree.reply = None
+        tree.revalidating = False
+        tree.error = error
+        if reply is not None and not reply.isFinished():
+            reply.abort()
+        self.changed.emit(key)
+
+
+def make_tree_request(api_base_url: str, github_username: str, github_repo: str) -> QNetworkRequest:
+    """Create the request that streams the tree of a repository.
+
+    Args:
+        api_base_url (str): The base URL of the GitHub API router.
+        github_username (str): The username of the repository owner.
+        github_repo (str): The name of the repository.
+
+    Returns:
+        QNetworkRequest: The request.
+    """
+    url = QUrl(f"{api_base_url}repos/{github_username}/{github_repo}/tree/")
+    url.setQuery("stream=true")
+    request = QNetworkRequest(url)
+    request.setTransferTimeout(5000)
+    return request
+
+
+def take_ndjson_lines(buffer: bytearray, *, final: bool = False) -> list[dict[str, Any]]:
+    """Remove the complete NDJSON lines from a stream buffer and parse them.
+
+    Args:
+        buffer (bytearray): What has been received and not parsed yet. The parsed lines are removed from it.
+        final (bool): The stream has ended, so the last line does not need a trailing newline.
+
+    Returns:
+        list[dict[str, Any]]: The parsed lines.
+
+    Raises:
+        json.JSONDecodeError: If a line is not JSON.
+    """
+    end: int = len(buffer) if final else buffer.rfind(b"\n") + 1
+    lines: list[bytes] = buffer[:end].splitlines()
+    del buffer[:end]
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+class DirectoryListing(HtmlStream):
+    """The page of a directory of a repository, written as the entries of the tree arrive.
+
+    A page lists at most LISTING_PAGE_SIZE entries from start on, and links to the rest of a larger directory.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        store: GitHubTreeStore,
+        github_username: str,
+        github_repo: str,
+        path: str,
+        parent: QObject | None = None,
+        *,
+        start: int = 0,
+    ) -> None:
+        """Start writing the page.
+
+        Args:
+            store (GitHubTreeStore): Where the tree of the repository comes from.
+            github_username (str): The username of the repository owner.
+            github_repo (str): The name of the repository.
+            path (str): The path of the directory, or an empty string for the root.
+            parent (QObject | None): The parent object.
+            start (int): The index of the first entry listed.
+        """
+        super().__init__(parent)
+        self.store: GitHubTreeStore = store
+        self.github_username: str = github_username
+        self.github_repo: str = github_repo
+        self.path: str = path
+        self.key: str = store.key(github_username, github_repo)
+        self.start: int = start
+        self.written: int = start
+
+        self.write_text(render_listing_head(github_username, github_repo, path))
+        key: str = self.key
+        store.hold(key)
+        self.destroyed.connect(lambda: store.release(key))  # When the tab is closed or navigates away
+        store.changed.connect(self.on_tree_changed)
+        store.tree(github_username, github_repo)
+        self.on_tree_changed(self.key)
+
+    def on_tree_changed(self, key: str) -> None:
+        """Write the new entries of the page since the last call, and the end of the page once the tree is done.
+
+        The count at the end is of the whole directory, also the entries listed on other pages.
+        """
+        tree: RepoTree | None = self.store.trees.get(self.key)
+        if key != self.key or self.finished or tree is None or tree.revalidating:
+            return
+
+        entries: list[dict[str, Any]] = tree.children.get(self.path, [])
+        end: int = min(len(entries), self.start + LISTING_PAGE_SIZE)
+        if end > self.written:
+            rows: list[dict[str, Any]] = entries[self.written : end]
+            self.write_text(render_listing_rows(self.github_username, self.github_repo, rows))
+            self.written = end
+
+        pager: str = render_listing_pager(self.github_username, self.github_repo, self.path, self.start, len(entries))
+        if tree.error is not None:
+            self.finish(render_listing_tail(len(entries), tree.error, pager))
+        elif not tree.loading:
+            missing: str | None = f"There is no directory {self.path}." if self.path and not entries else None
+            self.finish(render_listing_tail(len(entries), missing, pager))
+        if self.finished:
+            self.store.changed.disconnect(self.on_tree_changed)
+
+
+def open_listing(store: GitHubTreeStore, url: QUrl, parent: QObject | None = None) -> HtmlStream:
+    """Open the page for a github:// URL.
+
+    Args:
+        store (GitHubTreeStore): Where the trees of the repositories come from.
+        url (QUrl): The URL, with the index of the first entry listed in its start query item.
+        parent (QObject | None): The parent object.
+
+    Returns:
+        HtmlStream: The page, which may still be being written.
+    """
+    try:
+        github_username, github_repo, path = parse_github_url(url)
+    except ValueError as e:
+        page = HtmlStream(parent)
+        page.finish(render_listing_head(url.host(), "", "") + render_listing_tail(0, str(e)))
+        return page
+    return DirectoryListing(store, github_username, github_repo, path, parent, start=parse_listing_start(url))
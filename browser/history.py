@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import logging
+import math
+import queue
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from platformdirs import user_data_dir
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPersistentModelIndex, Qt
+from PySide6.QtWidgets import QCompleter
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from PySide6.QtCore import QObject
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Frecency is the sum of exp(DECAY * (visit time - FRECENCY_EPOCH)) over the visits of a URL, stored as a logarithm.
+# Measuring every visit against a fixed epoch keeps the order of the scores right as time passes, so they never
+# have to be recomputed: a visit counts for half as much after FRECENCY_HALF_LIFE seconds.
+FRECENCY_HALF_LIFE: float = 30 * 24 * 60 * 60
+FRECENCY_DECAY: float = math.log(2) / FRECENCY_HALF_LIFE
+FRECENCY_EPOCH: float = 1_700_000_000.0
+
+# Visits are written by a background thread, in one transaction per batch.
+WRITE_BATCH_SIZE = 500
+WRITE_DELAY: float = 1.0
+
+SUGGESTION_LIMIT = 8
+
+# Above this many full-text matches the query is so common that the best matches are found sooner by
+# walking the URLs in frecency order than by sorting every match.
+FTS_CANDIDATE_LIMIT = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    last_visit REAL NOT NULL,
+    frecency REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_frecency ON urls (frecency DESC);
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    url_id INTEGER NOT NULL REFERENCES urls (id),
+    visited_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_url_id ON visits (url_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS urls_fts USING fts5(
+    url, title, content='urls', content_rowid='id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS urls_fts_insert AFTER INSERT ON urls BEGIN
+    INSERT INTO urls_fts (rowid, url, title) VALUES (new.id, new.url, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS urls_fts_update AFTER UPDATE OF title ON urls WHEN old.title IS NOT new.title BEGIN
+    INSERT INTO urls_fts (urls_fts, rowid, url, title) VALUES ('delete', old.id, old.url, old.title);
+    INSERT INTO urls_fts (rowid, url, title) VALUES (new.id, new.url, new.title);
+END;
+"""
+
+UPSERT_URL = """
+INSERT INTO urls (url, title, visit_count, last_visit, frecency) VALUES (?, ?, 1, ?, ?)
+ON CONFLICT (url) DO UPDATE SET
+    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE title END,
+    visit_count = visit_count + 1,
+    last_visit = max(last_visit, excluded.last_visit),
+    frecency = logaddexp(frecency, excluded.frecency)
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Visit:
+    """A page that was loaded."""
+
+    url: str
+    title: str
+    visited_at: float
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    """A URL from the history that matches what is typed in the URL bar."""
+
+    url: str
+    title: str
+
+
+def default_history_path() -> Path:
+    """Return where the history of the browser is stored."""
+    data_dir = Path(user_data_dir(appname="browser", appauthor="TheLovinator", roaming=True, ensure_exists=True))
+    return data_dir / "history.sqlite3"
+
+
+def visit_score(visited_at: float) -> float:
+    """Return the logarithm of the frecency a single visit adds."""
+    return FRECENCY_DECAY * (visited_at - FRECENCY_EPOCH)
+
+
+def logaddexp(a: float, b: float) -> float:
+    """Return log(exp(a) + exp(b)) without overflowing."""
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+def open_database(path: Path | str) -> sqlite3.Connection:
+    """Open the history database and create the tables if they do not exist.
+
+    Args:
+        path (Path | str): The database file.
+
+    Returns:
+        sqlite3.Connection: The connection, in WAL mode so reading never waits for the writer.
+    """
+    connection: sqlite3.Connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.create_function("logaddexp", 2, logaddexp, deterministic=True)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def write_visits(connection: sqlite3.Connection, visits: Iterable[Visit]) -> None:
+    """Record visits in one transaction.
+
+    Args:
+        connection (sqlite3.Connection): A connection from open_database.
+        visits (Iterable[Visit]): The visits, oldest first.
+    """
+    with connection:
+        for visit in visits:
+            url_id: int = connection.execute(
+                f"{UPSERT_URL} RETURNING id",
+                (visit.url, visit.title, visit.visited_at, visit_score(visit.visited_at)),
+            ).fetchone()[0]
+            connection.execute("INSERT INTO visits (url_id, visited_at) VALUES (?, ?)", (url_id, visit.visited_at))
+
+
+def match_expression(text: str) -> tuple[str, list[str]]:
+    """Turn what is typed in the URL bar into an FTS5 query where every word is a prefix.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        tuple[str, list[str]]: The FTS5 query and the words, or an empty query if there are no words.
+    """
+    words: list[str] = re.findall(r"\w+", text.casefold())
+    return " ".join(f'"{word}"*' for word in words), words
+
+
+class HistoryStore:
+    """The visited pages, in SQLite, with full-text search ranked by frecency.
+
+    Visits are queued by the GUI thread and written in batches by a background thread with its own
+    connection, so loading a page never waits for the disk. Suggestions are read on the calling thread.
+    """
+
+    def __init__(self, path: Path | str, write_delay: float = WRITE_DELAY) -> None:
+        """Open the history and start the writer thread.
+
+        Args:
+            path (Path | str): The database file.
+            write_delay (float): How long to collect visits before writing them, in seconds.
+        """
+        self.path: Path = Path(path)
+        self.write_delay: float = write_delay
+        self.reader: sqlite3.Connection = open_database(self.path)
+        self.pending: queue.SimpleQueue[Visit | threading.Event | None] = queue.SimpleQueue()
+        self.batches: int = 0
+        self.writer = threading.Thread(target=self.write_pending, name="history-writer", daemon=True)
+        self.writer.start()
+
+    def record_visit(self, url: str, title: str = "", visited_at: float | None = None) -> None:
+        """Queue a visit to be written.
+
+        Args:
+            url (str): The URL of the page.
+            title (str): The title of the page, if it has one yet.
+            visited_at (float | None): The Unix time of the visit, now if None.
+        """
+        self.pending.put(Visit(url, title, time.time() if visited_at is None else visited_at))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every visit queued so far is written.
+
+        Args:
+            timeout (float | None): The longest to wait, in seconds.
+
+        Returns:
+            bool: False if the visits were not written in time.
+        """
+        written = threading.Event()
+        self.pending.put(written)
+        return written.wait(timeout)
+
+    def close(self) -> None:
+        """Write the queued visits and stop the writer thread."""
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+        self.reader.close()
+
+    def write_pending(self) -> None:
+        """Write queued visits in batches until close is called. Runs on the writer thread."""
+        connection: sqlite3.Connection = open_database(self.path)
+        running: bool = True
+        while running:
+            item: Visit | threading.Event | None = self.pending.get()
+            batch: list[Visit] = []
+            flushed: list[threading.Event] = []
+            deadline: float = time.monotonic() + self.write_delay
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    flushed.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    break
+                try:
+                    item = self.pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    write_visits(connection, batch)
+                    self.batches += 1
+                except sqlite3.Error:
+                    logger.exception("Failed to write %s visits to the history", len(batch))
+            for event in flushed:
+                event.set()
+        connection.close()
+
+    def suggest(self, text: str, limit: int = SUGGESTION_LIMIT) -> list[Suggestion]:
+        """Return the URLs with every word of the text in their URL or title, by frecency.
+
+        Args:
+            text (str): What is typed in the URL bar.
+            limit (int): The most suggestions to return.
+
+        Returns:
+            list[Suggestion]: The suggestions, best first.
+        """
+        expression, words = match_expression(text)
+        if not expression:
+            return []
+
+        candidates: list[int] = [
+            row[0]
+            for row in self.reader.execute(
+                "SELECT rowid FROM urls_fts WHERE urls_fts MATCH ? LIMIT ?",
+                (expression, FTS_CANDIDATE_LIMIT + 1),
+            )
+        ]
+        if len(candidates) <= FTS_CANDIDATE_LIMIT:
+            placeholders: str = ",".join("?" * len(candidates))
+            rows: list[tuple[str, str]] = self.reader.execute(
+                f"SELECT url, title FROM urls WHERE id IN ({placeholders}) ORDER BY frecency DESC LIMIT ?",  # noqa: S608
+                (*candidates, limit),
+            ).fetchall()
+        else:
+            conditions: str = " AND ".join("(url LIKE ? ESCAPE '\\' OR title LIKE ? ESCAPE '\\')" for _ in words)
+            patterns: list[str] = []
+            for word in words:
+                escaped: str = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                patterns += [f"%{escaped}%", f"%{escaped}%"]
+            rows = self.reader.execute(
+                f"SELECT url, title FROM urls WHERE {conditions} ORDER BY frecency DESC LIMIT ?",  # noqa: S608
+                (*patterns, limit),
+            ).fetchall()
+        return [Suggestion(url, title) for url, title in rows]
+
+
+class HistoryCompletionModel(QAbstractListModel):
+    """The suggestions for the URL bar. Shows the title and URL, and completes to the URL."""
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        """Initialize the model without suggestions."""
+        super().__init__(parent)
+        self.suggestions: list[Suggestion] = []
+
+    def set_suggestions(self, suggestions: list[Suggestion]) -> None:
+        """Replace the suggestions."""
+        self.beginResetModel()
+        self.suggestions = suggestions
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:  # noqa: B008, N802
+        """Return the number of suggestions."""
+        return 0 if parent.isValid() else len(self.suggestions)
+
+    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> str | None:
+        """Return the title and URL for the popup, and the URL for the URL bar."""
+        if not index.isValid():
+            return None
+        suggestion: Suggestion = self.suggestions[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{suggestion.title} — {suggestion.url}" if suggestion.title else suggestion.url
+        if role == Qt.ItemDataRole.EditRole:
+            return suggestion.url
+        return None
+
+
+class HistoryCompleter(QCompleter):
+    """Complete the URL bar from the history.
+
+    The suggestions are already filtered and ranked by the HistoryStore, so the completer shows them as they are.
+    """
+
+    def __init__(self, history: HistoryStore, parent: QObject | None = None) -> None:
+        """Initialize the completer.
+
+        Args:
+            history (HistoryStore): Where the suggestions come from.
+            parent (QObject | None): The parent object.
+        """
+        self.suggestion_model = HistoryCompletionModel()
+        super().__init__(self.suggestion_model, parent)
+        self.suggestion_model.setParent(self)
+        self.history: HistoryStore = history
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setMaxVisibleItems(SUGGESTION_LIMIT)
+
+    def update_suggestions(self, text: str) -> None:
+        """Show the suggestions for the text in the URL bar."""
+        suggestions: list[Suggestion] = self.history.suggest(text)
+        self.suggestion_model.set_suggestions(suggestions)
+        if self.widget() is None:
+            return
+        if suggestions:
+            self.complete()
+        else:
+            self.popup().hide()
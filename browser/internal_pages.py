@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import html
+
+STYLE = "body{font-family:sans-serif;margin:2em}th{text-align:left;padding-right:2em}"
+
+
+def render_table_page(title: str, rows: list[tuple[str, str]], note: str = "") -> str:
+    """Render an internal page with a table of names and values.
+
+    Args:
+        title (str): The title and heading of the page.
+        rows (list[tuple[str, str]]): The names and values, in order.
+        note (str): A paragraph below the table explaining where the numbers come from.
+
+    Returns:
+        str: The page as HTML.
+    """
+    table: str = "".join(f"<tr><th>{html.escape(name)}</th><td>{html.escape(value)}</td></tr>" for name, value in rows)
+    paragraph: str = f"<p>{html.escape(note)}</p>" if note else ""
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+        f"<style>{STYLE}</style></head><body><h1>{html.escape(title)}</h1><table>{table}</table>{paragraph}"
+        "</body></html>"
+    )
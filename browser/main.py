@@ -1,60 +1,199 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING, cast
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeGuard
 
-import requests
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QCoreApplication, QSignalBlocker, Qt, QTimer, QUrl
 from PySide6.QtGui import QKeySequence, QShortcut
-from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWidgets import (
     QApplication,
-    QLabel,
-    QLayout,
     QLineEdit,
-    QListWidget,
-    QListWidgetItem,
     QMainWindow,
     QMenu,
     QTabWidget,
     QToolBar,
     QToolButton,
-    QVBoxLayout,
     QWidget,
 )
 
+from browser.adblock import default_filter_cache_dir, default_filter_dir
+from browser.cache_stats import (
+    CACHE_PAGE_URL,
+    RESOURCE_TIMING_SCRIPT,
+    CacheSizeMonitor,
+    CacheStats,
+    render_cache_page,
+)
+from browser.github_scheme import GITHUB_SCHEME, github_url_from_text, parse_github_url
+from browser.history import HistoryCompleter, HistoryStore, default_history_path
+from browser.profile import ProfileSettings
+from browser.session import SAVE_DELAY_MS, SessionState, SessionStore, TabPlaceholder, TabState, default_session_path
+
+# QtWebEngine, QtNetwork and the GitHub tree store are imported with the first tab, after the window is shown.
 if TYPE_CHECKING:
-    from PySide6.QtCore import QPoint, QSize, QUrl
+    from collections.abc import Callable, Sequence
+
+    from PySide6.QtCore import QPoint, QSize
+    from PySide6.QtGui import QCloseEvent
+    from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply
+    from PySide6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile
+    from PySide6.QtWebEngineWidgets import QWebEngineView
+
+    from browser.adblock_interceptor import AdBlockInterceptor
+    from browser.github_scheme_handler import GitHubSchemeHandler
+    from browser.github_trees import GitHubTreeStore
+    from browser.performance import PerformanceMonitor
+    from browser.speculation import SpeculativeLoader
+    from browser.tab_lifecycle import TabLifecycleManager
 
 logging.basicConfig(level=logging.INFO)
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def is_web_view(widget: object) -> TypeGuard[QWebEngineView]:
+    """Check if a widget is a web view, without importing QtWebEngine when no web view was ever created."""
+    module = sys.modules.get("PySide6.QtWebEngineWidgets")
+    return module is not None and isinstance(widget, module.QWebEngineView)
 
 
 class Browser(QMainWindow):
     """Main window of the browser."""
 
-    def __init__(self) -> None:
-        """Initialize the browser."""
+    def __init__(
+        self,
+        session_store: SessionStore | None = None,
+        profile_settings: ProfileSettings | None = None,
+        history: HistoryStore | None = None,
+        filter_lists: Sequence[Path] = (),
+    ) -> None:
+        """Initialize the browser.
+
+        Only the window itself is built here. The tabs are created by finish_startup once the event loop
+        has painted the window, because creating the first web view starts QtWebEngine and its renderer.
+
+        Args:
+            session_store (SessionStore | None): Where the open tabs are saved and restored from.
+                Without one the browser starts with a blank tab and forgets its tabs on exit.
+            profile_settings (ProfileSettings | None): Where the tabs keep their HTTP cache and cookies.
+                Without settings the tabs share an off-the-record profile.
+            history (HistoryStore | None): Where visited pages are recorded and the URL bar suggestions come from.
+                Without one nothing is recorded and the URL bar has no suggestions.
+            filter_lists (Sequence[Path]): EasyList-style lists of the requests to block in every tab.
+        """
         super().__init__()
         self.resize_and_maximize_window()
 
+        self.session_store: SessionStore | None = session_store
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(SAVE_DELAY_MS)
+        self.session_timer.timeout.connect(self.save_session)
+
+        self.profile_settings: ProfileSettings | None = profile_settings
+        self.profile: QWebEngineProfile | None = None
+        self.filter_lists: Sequence[Path] = filter_lists
+        self.adblock: AdBlockInterceptor | None = None
+        self.github_trees: GitHubTreeStore | None = None
+        self.github_scheme: GitHubSchemeHandler | None = None
+        self.cache_stats = CacheStats()
+        self.cache_disk_size = CacheSizeMonitor(parent=self)
+        self.cache_disk_size.measured.connect(self.refresh_cache_pages)
+
+        self._network_manager: QNetworkAccessManager | None = None
+        self.tab_lifecycle: TabLifecycleManager | None = None
+        self.speculation: SpeculativeLoader | None = None
+        self.preconnect_page: QWebEnginePage | None = None
+        self.performance: PerformanceMonitor | None = None
+        self.internal_pages: dict[str, Callable[[], str]] = {CACHE_PAGE_URL: self.render_cache_page}
+
         self.tabs = QTabWidget()
         self.tabs.setDocumentMode(True)
         self.tabs.tabCloseRequested.disconnect()
         self.tabs.currentChanged.connect(self.update_window_title)
         self.tabs.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tabs.customContextMenuRequested.connect(self.show_context_menu)
+        self.tabs.currentChanged.connect(self.load_placeholder_tab)
+        self.tabs.currentChanged.connect(self.schedule_session_save)
+        self.tabs.tabBar().tabMoved.connect(self.schedule_session_save)
 
         self.setCentralWidget(self.tabs)
 
         self.url_bar = QLineEdit()
         self.url_bar.returnPressed.connect(self.navigate_to_url)
+        self.url_bar.textEdited.connect(self.on_url_bar_edited)
 
-        self.create_toolbar()
-        self.add_new_tab("about:blank", "Blank")
+        self.history: HistoryStore | None = history
+        self.history_completer: HistoryCompleter | None = None
+        if history is not None:
+            self.history_completer = HistoryCompleter(history, self)
+            self.history_completer.activated.connect(self.navigate_to_url)
+            self.url_bar.setCompleter(self.history_completer)
 
+        self.create_toolbar()
         self.create_shortcuts()
         self.add_new_tab_button()
 
+        QTimer.singleShot(0, self, self.finish_startup)
+
+    def finish_startup(self) -> None:
+        """Create the tabs, restoring the last session if there is one. Does nothing if already done."""
+        if self.tab_lifecycle is not None:
+            return
+
+        from browser.github_scheme_handler import GitHubSchemeHandler, register_github_scheme  # noqa: PLC0415
+        from browser.github_trees import GitHubTreeStore  # noqa: PLC0415
+        from browser.performance import (  # noqa: PLC0415
+            PERFORMANCE_EXPORT_URL,
+            PERFORMANCE_PAGE_URL,
+            PERFORMANCE_TRACE_URL,
+            STALL_CHECK_MS,
+            PerformanceMonitor,
+        )
+        from browser.profile import create_profile  # noqa: PLC0415
+        from browser.speculation import SPECULATION_PAGE_URL, SpeculativeLoader  # noqa: PLC0415
+        from browser.tab_lifecycle import TabLifecycleManager  # noqa: PLC0415
+
+        register_github_scheme()
+        # Created before the first page and after the tabs, so it is destroyed after every page that uses it.
+        self.profile = create_profile(self.profile_settings, self)
+        self.github_trees = GitHubTreeStore(self.network_manager, parent=self)
+        self.github_scheme = GitHubSchemeHandler(self.github_trees, self)
+        self.profile.installUrlSchemeHandler(GITHUB_SCHEME.encode(), self.github_scheme)
+        if self.filter_lists:
+            from browser.adblock import ADBLOCK_PAGE_URL, load_filter_lists  # noqa: PLC0415
+            from browser.adblock_interceptor import AdBlockInterceptor  # noqa: PLC0415
+
+            self.adblock = AdBlockInterceptor(load_filter_lists(self.filter_lists, default_filter_cache_dir()), self)
+            self.profile.setUrlRequestInterceptor(self.adblock)
+            self.internal_pages[ADBLOCK_PAGE_URL] = self.adblock.matcher.render_page
+        self.tab_lifecycle = TabLifecycleManager.from_env(self.tabs, parent=self)
+        self.speculation = SpeculativeLoader(self.network_manager, self.preconnect, parent=self)
+        self.internal_pages[SPECULATION_PAGE_URL] = self.speculation.render_page
+        self.performance = PerformanceMonitor(
+            self.tabs,
+            tree_store=self.github_trees,
+            tab_lifecycle=self.tab_lifecycle,
+            check_interval_ms=int(os.getenv("BROWSER_STALL_CHECK_MS", default=str(STALL_CHECK_MS))),
+            parent=self,
+        )
+        self.internal_pages[PERFORMANCE_PAGE_URL] = self.performance.render_page
+        self.internal_pages[PERFORMANCE_TRACE_URL] = self.performance.render_trace_page
+        self.internal_pages[PERFORMANCE_EXPORT_URL] = self.performance.render_export_page
+        if not self.restore_session():
+            self.add_new_tab("about:blank", "Blank")
+
+    @property
+    def network_manager(self) -> QNetworkAccessManager:
+        """The network access manager for the GitHub pages, created on first use."""
+        if self._network_manager is None:
+            from PySide6.QtNetwork import QNetworkAccessManager  # noqa: PLC0415
+
+            self._network_manager = QNetworkAccessManager(self)
+        return self._network_manager
+
     def resize_and_maximize_window(self) -> None:
         """Resize the window to 80% of the screen size and maximize it."""
         screensize: QSize = self.screen().size() * self.screen().devicePixelRatio()
@@ -63,52 +202,184 @@ class Browser(QMainWindow):
 
     def add_new_tab(self, url: str, label: str) -> None:
         """Add a new tab with the given URL and label."""
-        view = QWebEngineView()
-        view.setUrl(url)
-        # view.urlChanged.connect(self.update_url_bar)
-        view.titleChanged.connect(lambda title: self.update_tab_and_window_title(view, title))
-
+        view: QWebEngineView = self.create_web_view(url)
         tab_index: int = self.tabs.addTab(view, label)
         self.tabs.setCurrentIndex(tab_index)
 
-    def build_github_data_display_page(self, github_username: str, github_repo: str) -> QWidget:
-        """Create a custom page to display GitHub data."""
-        custom_page = QWidget()
-        layout = QVBoxLayout()
+    def create_web_view(self, url: str) -> QWebEngineView:
+        """Create a web view for a tab and start loading the URL."""
+        from PySide6.QtWebEngineWidgets import QWebEngineView  # noqa: PLC0415
 
-        try:
-            self.build_github_repo_contents_display(github_username, github_repo, layout)
-        except requests.RequestException:
-            error_label = self._create_error_label("Failed to fetch data", "Failed to fetch data from the API.")
-            layout.addWidget(error_label)
-
-        custom_page.setLayout(layout)
-        custom_page.setStyleSheet("background-color: #222; color: white;")
-        return custom_page
-
-    def build_github_repo_contents_display(self, github_username: str, github_repo: str, layout: QVBoxLayout) -> None:
-        """Build the display for the contents of a GitHub repository."""
-        response: requests.Response = requests.get(
-            url=f"http://localhost:8000/api/github/repos/{github_username}/{github_repo}/contents/",
-            timeout=5,
+        self.finish_startup()
+        view = QWebEngineView(self.profile)
+        if self.performance is not None:
+            self.performance.track(view)
+        self.open_url(view, url)
+        # view.urlChanged.connect(self.update_url_bar)
+        view.urlChanged.connect(self.schedule_session_save)
+        view.loadFinished.connect(lambda ok: self.collect_cache_stats(view, ok))
+        view.loadFinished.connect(lambda ok: self.record_visit(view, ok))
+        view.titleChanged.connect(lambda title: self.update_tab_and_window_title(view, title))
+        if self.tab_lifecycle is not None:
+            self.tab_lifecycle.track(view)
+        return view
+
+    def open_url(self, view: QWebEngineView, url: str) -> None:
+        """Load a URL in a web view, rendering the internal pages ourselves."""
+        render_page: Callable[[], str] | None = self.internal_pages.get(url)
+        if render_page is not None:
+            view.setHtml(render_page(), QUrl(url))
+        else:
+            view.setUrl(url)
+
+    def render_cache_page(self) -> str:
+        """Render the about:cache page for the profile of the tabs, with the last measured size of the cache."""
+        if self.profile is None or self.profile.isOffTheRecord():
+            return render_cache_page(self.cache_stats, None, 0, 0)
+        cache_path: Path = Path(self.profile.cachePath())
+        return render_cache_page(
+            self.cache_stats,
+            cache_path,
+            self.profile.httpCacheMaximumSize(),
+            self.cache_disk_size.current_size(cache_path),
         )
-        response.raise_for_status()
-        data = response.json()
 
-        # Add GitHub/username/repo on top of the page
-        title_label = QLabel(f"<h1>GitHub/{github_username}/{github_repo}</h1>")
-        layout.addWidget(title_label)
+    def refresh_cache_pages(self) -> None:
+        """Render the about:cache tabs again, with the size of the cache that was just measured."""
+        for index in range(self.tabs.count()):
+            widget: QWidget = self.tabs.widget(index)
+            if is_web_view(widget) and widget.url().toString() == CACHE_PAGE_URL:
+                self.open_url(widget, CACHE_PAGE_URL)
+
+    def preconnect(self, origin: str) -> None:
+        """Have the web engine resolve and connect to an origin the URL bar is about to navigate to.
+
+        The connection is opened from a hidden page of the profile of the tabs, so it is pooled for the
+        navigation and the page in the current tab never sees where the user is going.
+        """
+        from PySide6.QtWebEngineCore import QWebEnginePage  # noqa: PLC0415
 
-        list_widget = QListWidget()
-        for item in data:
-            self.add_github_item_display(list_widget, item)
-        layout.addWidget(list_widget)
+        from browser.speculation import preconnect_html  # noqa: PLC0415
+
+        if self.profile is None:
+            return
+        if self.preconnect_page is None:
+            # A child of the tab widget, so it is destroyed before the profile like the pages of the tabs.
+            self.preconnect_page = QWebEnginePage(self.profile, self.tabs)
+        self.preconnect_page.setHtml(preconnect_html(origin))
+
+    def on_url_bar_edited(self, text: str) -> None:
+        """Suggest pages from the history and start speculating on where the URL bar is going."""
+        if self.history_completer is not None:
+            self.history_completer.update_suggestions(text)
+        if self.speculation is not None:
+            self.speculation.text_edited(text)
+
+    @staticmethod
+    def application_world() -> int:
+        """The JavaScript world that keeps our scripts away from the page's own JavaScript."""
+        from PySide6.QtWebEngineCore import QWebEngineScript  # noqa: PLC0415
+
+        return QWebEngineScript.ScriptWorldId.ApplicationWorld.value
+
+    def collect_cache_stats(self, view: QWebEngineView, ok: bool) -> None:  # noqa: FBT001
+        """Count which resources of a loaded page came from the HTTP cache."""
+        if ok and view.url().scheme() in {"http", "https"}:
+            view.page().runJavaScript(RESOURCE_TIMING_SCRIPT, self.application_world(), self.cache_stats.record)
+
+    def record_visit(self, view: QWebEngineView, ok: bool) -> None:  # noqa: FBT001
+        """Add a loaded web page to the history."""
+        url: QUrl = view.url()
+        if self.history is not None and ok and url.scheme() in {"http", "https", GITHUB_SCHEME}:
+            self.history.record_visit(url.toString(), view.title())
+
+    def create_tab_widget(self, url: str) -> QWidget:
+        """Create the web view for a restored tab, moving tabs saved as GitHub/user/repo to github:// URLs."""
+        return self.create_web_view(github_url_from_text(url) or url)
+
+    def replace_tab(self, index: int, widget: QWidget, label: str) -> None:
+        """Put another widget in a tab and select it, with one currentChanged for the whole swap."""
+        with QSignalBlocker(self.tabs):
+            self.tabs.removeTab(index)
+            self.tabs.insertTab(index, widget, label)
+            self.tabs.setCurrentIndex(index)
+        self.tabs.currentChanged.emit(index)
+
+    def restore_session(self) -> bool:
+        """Restore the tabs of the last session.
+
+        Only the selected tab is loaded. The others get a placeholder that is swapped for the page
+        when the tab is selected, so restoring many tabs is about as fast as opening one.
+
+        Returns:
+            bool: False if there was no session to restore.
+        """
+        if self.session_store is None:
+            return False
+        state: SessionState | None = self.session_store.load()
+        if state is None or not state.tabs:
+            return False
+
+        logger.info("Restoring %s tabs", len(state.tabs))
+        with QSignalBlocker(self.tabs):  # Selecting the tabs as they are added would load them
+            for index, tab in enumerate(state.tabs):
+                widget: QWidget = (
+                    self.create_tab_widget(tab.url)
+                    if index == state.active_index
+                    else TabPlaceholder(tab.url, tab.title)
+                )
+                self.tabs.addTab(widget, tab.title)
+            self.tabs.setCurrentIndex(state.active_index)
+
+        self.tabs.currentChanged.emit(state.active_index)
+        return True
+
+    def load_placeholder_tab(self, index: int) -> None:
+        """Load the page of a restored tab the first time it is selected."""
+        placeholder: QWidget = self.tabs.widget(index)
+        if not isinstance(placeholder, TabPlaceholder):
+            return
+
+        logger.debug("Loading restored tab %s", placeholder.url)
+        widget: QWidget = self.create_tab_widget(placeholder.url)
+        self.replace_tab(index, widget, placeholder.title)
+        placeholder.deleteLater()
+
+    def session_state(self) -> SessionState:
+        """Return the open tabs as a session."""
+        tabs: list[TabState] = []
+        for index in range(self.tabs.count()):
+            widget: QWidget = self.tabs.widget(index)
+            if isinstance(widget, TabPlaceholder):
+                url: str = widget.url
+            elif is_web_view(widget):
+                url = widget.url().toString()
+            else:
+                url = "about:blank"
+            tabs.append(TabState(url=url, title=self.tabs.tabText(index)))
+        return SessionState(tabs=tabs, active_index=max(0, self.tabs.currentIndex()))
+
+    def schedule_session_save(self, *_: object) -> None:
+        """Save the session soon, so a burst of tab changes is written once."""
+        if self.session_store is not None:
+            self.session_timer.start()
+
+    def save_session(self) -> None:
+        """Save the open tabs now."""
+        self.session_timer.stop()
+        if self.session_store is None:
+            return
+        try:
+            self.session_store.save(self.session_state())
+        except OSError:
+            logger.exception("Failed to save the session")
 
-    def add_github_item_display(self, list_widget: QListWidget, item: dict[str, str]) -> None:
-        """Add a label to the layout with information about a GitHub item."""
-        size_info: str = f" ({item['size']} bytes)" if int(item["size"]) > 0 else ""
-        list_item = QListWidgetItem(f"{item['name']}{size_info} ({item['sha']})")
-        list_widget.addItem(list_item)
+    def closeEvent(self, event: QCloseEvent) -> None:  # noqa: N802
+        """Save the session and the history before the window closes."""
+        self.save_session()
+        if self.history is not None:
+            self.history.close()
+        super().closeEvent(event)
 
     def close_current_tab(self, index: int) -> None:
         """Close the tab at the given index."""
@@ -116,12 +387,19 @@ class Browser(QMainWindow):
         if self.tabs.count() < min_tabs:
             return
 
+        widget: QWidget = self.tabs.widget(index)
         self.tabs.removeTab(index)
+        self.schedule_session_save()
+        if is_web_view(widget) and self.tab_lifecycle is not None:
+            self.tab_lifecycle.forget(widget)
+        if is_web_view(widget) and self.performance is not None:
+            self.performance.forget(widget)
+        widget.deleteLater()
 
     def update_window_title(self, index: int) -> None:
         """Update the window title based on the current tab."""
         current_browser: QWidget = self.tabs.widget(index)
-        if isinstance(current_browser, QWebEngineView):
+        if is_web_view(current_browser):
             self.setWindowTitle(current_browser.page().title())
         else:
             self.setWindowTitle(self.tabs.tabText(index))
@@ -133,6 +411,7 @@ class Browser(QMainWindow):
             self.tabs.setTabText(index, title)
             if self.tabs.currentWidget() == view:
                 self.setWindowTitle(title)
+            self.schedule_session_save()
 
     def create_shortcuts(self) -> None:
         """Create keyboard shortcuts for various actions."""
@@ -146,11 +425,15 @@ class Browser(QMainWindow):
         close_browser_shortcut.activated.connect(self.close)
 
         reload_shortcut = QShortcut(QKeySequence("Ctrl+R"), self)
-        reload_shortcut.activated.connect(
-            lambda: cast(QWebEngineView, self.tabs.currentWidget()).reload()
-            if isinstance(self.tabs.currentWidget(), QWebEngineView)
-            else None
-        )
+        reload_shortcut.activated.connect(self.reload_current_tab)
+
+    def reload_current_tab(self) -> None:
+        """Reload the page in the current tab."""
+        current_browser: QWidget = self.tabs.currentWidget()
+        if is_web_view(current_browser) and current_browser.url().toString() in self.internal_pages:
+            self.open_url(current_browser, current_browser.url().toString())
+        elif is_web_view(current_browser):
+            current_browser.reload()
 
     def add_new_tab_button(self) -> None:
         """Add a new tab button to the right of the tabs."""
@@ -172,49 +455,26 @@ class Browser(QMainWindow):
         toolbar.addWidget(self.url_bar)
 
     def navigate_to_url(self) -> None:
-        """Navigate to the URL entered in the URL bar."""
+        """Navigate to the URL entered in the URL bar, in the current tab.
+
+        GitHub/user/repo opens github://user/repo/, which lists the repository in the same web view, using the
+        tree the URL bar prefetched if it guessed right.
+        """
+        url: str = self.url_bar.text()
+        prefetched: QNetworkReply | None = self.speculation.take(url) if self.speculation is not None else None
         current_browser: QWidget = self.tabs.currentWidget()
-        if isinstance(current_browser, QWebEngineView):
-            url: str = self.url_bar.text()
-            self.load_github_repo_page(url)
-            current_browser.setUrl(url)
-
-    def load_github_repo_page(self, url: str) -> None:
-        """Load a custom page for a GitHub repository if the URL matches the expected format."""
-        if not url.startswith("GitHub/"):
-            return
-        try:
-            self._create_github_repo_tab(url)
-        except ValueError:
-            error_label = self._create_error_label(
-                "Invalid GitHub URL format",
-                "Invalid GitHub URL format. Expected format: GitHub/username/repo",
-            )
-            current_layout: QLayout | None = self.tabs.currentWidget().layout()
-            if current_layout is not None:
-                current_layout.addWidget(error_label)
-            else:
-                logging.exception("Current widget has no layout to add the error label.")
-
-    def _create_error_label(self, exception_message: str, error_message: str) -> QLabel:
-        logging.exception(exception_message)
-        result = QLabel(error_message)
-        result.setStyleSheet("color: red;")
-        return result
-
-    def _create_github_repo_tab(self, url: str) -> None:
-        """Create a new tab for the GitHub repository and set the URL bar."""
-        _, github_username, github_repo = url.split("/", 2)
-        custom_page: QWidget = self.build_github_data_display_page(
-            github_username=github_username,
-            github_repo=github_repo,
-        )
-        current_index: int = self.tabs.currentIndex()
-        self.tabs.removeTab(current_index)
-        self.tabs.insertTab(current_index, custom_page, f"GitHub/{github_username}/{github_repo}")
-        self.tabs.setCurrentIndex(current_index)
-        self.setWindowTitle(f"GitHub/{github_username}/{github_repo}")
-        self.url_bar.setText(f"GitHub/{github_username}/{github_repo}")
+        repo_url: str | None = github_url_from_text(url)
+        if is_web_view(current_browser) and repo_url is not None:
+            if prefetched is not None and self.github_trees is not None:
+                github_username, github_repo, _ = parse_github_url(QUrl(repo_url))
+                self.github_trees.tree(github_username, github_repo, prefetched)
+                prefetched = None
+            self.open_url(current_browser, repo_url)
+        elif is_web_view(current_browser):
+            self.open_url(current_browser, url)
+        if prefetched is not None:
+            prefetched.abort()
+            prefetched.deleteLater()
 
     def update_url_bar(self, url: QUrl) -> None:
         """Update the URL bar with the current URL."""
@@ -230,9 +490,16 @@ class Browser(QMainWindow):
 
 def main() -> None:
     """Run the browser."""
+    # Needed because QtWebEngine is imported after the QApplication is created.
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication([])
 
-    window = Browser()
+    window = Browser(
+        session_store=SessionStore(default_session_path()),
+        profile_settings=ProfileSettings.from_env(),
+        history=HistoryStore(default_history_path()),
+        filter_lists=sorted(default_filter_dir().glob("*.txt")),
+    )
     window.show()
 
     app.exec()
@@ -0,0 +1,494 @@
+from __future__ import annotations
+
+import ctypes
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from platformdirs import user_data_dir
+from PySide6.QtCore import QObject, Qt, QTimer
+
+from browser.internal_pages import render_table_page
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from PySide6.QtWebEngineWidgets import QWebEngineView
+    from PySide6.QtWidgets import QTabWidget, QWidget
+
+    from browser.github_trees import FetchTiming, GitHubTreeStore
+    from browser.tab_lifecycle import TabLifecycleManager
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+PERFORMANCE_PAGE_URL = "about:performance"
+PERFORMANCE_TRACE_URL = "about:performance-trace"
+PERFORMANCE_EXPORT_URL = "about:performance-trace-export"
+
+# The event loop is checked this often, and a check that comes more than STALL_THRESHOLD_MS late is a stall.
+# BROWSER_STALL_CHECK_MS changes how often, and 0 stops checking.
+STALL_CHECK_MS = 50
+STALL_THRESHOLD_MS = 50
+
+# How many finished page loads and stalls are kept for the page and the trace.
+MAX_EVENTS = 1000
+
+# The thread IDs of the tracks in the Chrome trace. Every tab gets its own track after these.
+EVENT_LOOP_TRACK = 1
+GITHUB_API_TRACK = 2
+FIRST_TAB_TRACK = 10
+
+# For reading the memory of a process on Windows and macOS.
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+PROC_PIDTASKINFO = 4
+
+
+def process_memory(pid: int) -> int:
+    """Return the resident memory of a process in bytes.
+
+    Reads /proc on Linux, and asks the kernel on Windows and macOS. This is 0 on other platforms, and for
+    processes that have exited or can not be inspected.
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        int: The resident set size in bytes.
+    """
+    if not pid:
+        return 0
+    if sys.platform == "win32":
+        return windows_process_memory(pid)
+    if sys.platform == "darwin":
+        return macos_process_memory(pid)
+    try:
+        with open(f"/proc/{pid}/statm", encoding="ascii") as statm:  # noqa: PTH123
+            resident_pages: int = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def can_measure_process_memory() -> bool:
+    """Return True if process_memory works on this platform, checked on the browser process itself."""
+    return process_memory(os.getpid()) > 0
+
+
+class ProcessMemoryCounters(ctypes.Structure):
+    """PROCESS_MEMORY_COUNTERS of the Windows process status API."""
+
+    _fields_ = (
+        ("cb", ctypes.c_ulong),
+        ("PageFaultCount", ctypes.c_ulong),
+        ("PeakWorkingSetSize", ctypes.c_size_t),
+        ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t),
+        ("PeakPagefileUsage", ctypes.c_size_t),
+    )
+
+
+def windows_process_memory(pid: int) -> int:
+    """Return the working set of a process with GetProcessMemoryInfo, or 0 if it can not be opened."""
+    kernel32 = ctypes.WinDLL("kernel32")
+    kernel32.OpenProcess.restype = ctypes.c_void_p
+    kernel32.K32GetProcessMemoryInfo.argtypes = (ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong)
+    kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+    handle: int | None = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)  # noqa: FBT003
+    if not handle:
+        return 0
+    try:
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if not kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return 0
+        return counters.WorkingSetSize
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def macos_process_memory(pid: int) -> int:
+    """Return the resident size of a process from proc_pidinfo, or 0 if it can not be inspected."""
+    libproc = ctypes.CDLL("/usr/lib/libproc.dylib")
+    # struct proc_taskinfo starts with the virtual and the resident size as uint64, and is 96 bytes long
+    task_info = (ctypes.c_uint64 * 12)()
+    size: int = ctypes.sizeof(task_info)
+    if libproc.proc_pidinfo(pid, PROC_PIDTASKINFO, ctypes.c_uint64(0), task_info, size) != size:
+        return 0
+    return task_info[1]
+
+
+def default_trace_dir() -> Path:
+    """Return the directory the exported traces are written to."""
+    return Path(user_data_dir(appname="browser", appauthor="TheLovinator", roaming=True)) / "traces"
+
+
+@dataclass(slots=True)
+class PageLoad:
+    """One load of a page in a tab, in time.perf_counter seconds."""
+
+    track: int
+    url: str
+    started_at: float
+    first_progress_at: float | None = None
+    finished_at: float | None = None
+    ok: bool = False
+
+    @property
+    def duration_ms(self) -> float | None:
+        """Milliseconds from loadStarted to loadFinished, or None while loading."""
+        return (self.finished_at - self.started_at) * 1000 if self.finished_at is not None else None
+
+
+@dataclass(slots=True)
+class Stall:
+    """A time the event loop did not get to run, in time.perf_counter seconds."""
+
+    started_at: float
+    duration: float
+
+
+class PerformanceMonitor(QObject):
+    """Measure page loads per tab, stalls of the GUI event loop and the GitHub API fetches.
+
+    Loads are timed from loadStarted to loadFinished, with loadProgress marking when the first bytes were
+    shown. Stalls are found by a coarse timer that should fire every STALL_CHECK_MS: when it fires late, the
+    event loop was busy for the difference. Everything can be exported as a Chrome trace, which chrome://tracing
+    and Perfetto open.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        tabs: QTabWidget,
+        *,
+        tree_store: GitHubTreeStore | None = None,
+        tab_lifecycle: TabLifecycleManager | None = None,
+        trace_dir: Path | None = None,
+        check_interval_ms: int = STALL_CHECK_MS,
+        stall_threshold_ms: int = STALL_THRESHOLD_MS,
+        clock: Callable[[], float] = time.perf_counter,
+        parent: QObject | None = None,
+    ) -> None:
+        """Initialize the monitor and start watching the event loop.
+
+        Args:
+            tabs (QTabWidget): The tab widget with the views to report on.
+            tree_store (GitHubTreeStore | None): Where the GitHub pages get their trees, for the API timings.
+            tab_lifecycle (TabLifecycleManager | None): What freezes and discards the tabs, for the memory they
+                gave back.
+            trace_dir (Path | None): Where exported traces are written, default_trace_dir() if None.
+            check_interval_ms (int): How often the event loop is checked, or 0 to not look for stalls.
+            stall_threshold_ms (int): How late a check has to be to count as a stall.
+            clock (Callable[[], float]): Returns the current time in seconds, replaceable in tests.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        self.tabs: QTabWidget = tabs
+        self.tree_store: GitHubTreeStore | None = tree_store
+        self.tab_lifecycle: TabLifecycleManager | None = tab_lifecycle
+        self.trace_dir: Path = trace_dir or default_trace_dir()
+        self.stall_threshold: float = stall_threshold_ms / 1000
+        self.clock: Callable[[], float] = clock
+        self.started_at: float = clock()
+
+        self.tracks: dict[QWebEngineView, int] = {}
+        # Never reused, so the loads of a closed tab stay apart from those of later tabs in the trace.
+        self.track_ids: itertools.count[int] = itertools.count(FIRST_TAB_TRACK)
+        self.current_loads: dict[QWebEngineView, PageLoad] = {}
+        self.last_loads: dict[QWebEngineView, PageLoad] = {}
+        self.loads: deque[PageLoad] = deque(maxlen=MAX_EVENTS)
+        self.stalls: deque[Stall] = deque(maxlen=MAX_EVENTS)
+        self.stall_seconds: float = 0.0
+
+        self.interval: float = check_interval_ms / 1000
+        self.last_check: float = self.started_at
+        self.timer = QTimer(self)
+        # A coarse timer may be up to 5% late, far below the threshold, and lets the OS batch its wakeups
+        self.timer.setTimerType(Qt.TimerType.CoarseTimer)
+        self.timer.setInterval(check_interval_ms)
+        self.timer.timeout.connect(self.check_event_loop)
+        if check_interval_ms > 0:
+            self.timer.start()
+
+    def track(self, view: QWebEngineView) -> None:
+        """Start timing the loads of a tab.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+        """
+        self.tracks[view] = next(self.track_ids)
+        view.loadStarted.connect(lambda: self.load_started(view))
+        view.loadProgress.connect(lambda progress: self.load_progress(view, progress))
+        view.loadFinished.connect(lambda ok: self.load_finished(view, ok))
+
+    def forget(self, view: QWebEngineView) -> None:
+        """Stop reporting on a tab, e.g. because it was closed. Its finished loads stay in the trace.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+        """
+        self.tracks.pop(view, None)
+        self.current_loads.pop(view, None)
+        self.last_loads.pop(view, None)
+
+    def load_started(self, view: QWebEngineView) -> None:
+        """Start timing a load."""
+        if view in self.tracks:
+            self.current_loads[view] = PageLoad(self.tracks[view], view.url().toString(), self.clock())
+
+    def load_progress(self, view: QWebEngineView, progress: int) -> None:
+        """Remember when a load first made progress."""
+        load: PageLoad | None = self.current_loads.get(view)
+        if load is not None and load.first_progress_at is None and progress > 0:
+            load.first_progress_at = self.clock()
+
+    def load_finished(self, view: QWebEngineView, ok: bool) -> None:  # noqa: FBT001
+        """Finish timing a load."""
+        load: PageLoad | None = self.current_loads.pop(view, None)
+        if load is None:
+            return
+        load.finished_at = self.clock()
+        load.ok = ok
+        load.url = view.url().toString() or load.url
+        self.last_loads[view] = load
+        self.loads.append(load)
+
+    def check_event_loop(self) -> None:
+        """Record a stall if the timer fired later than it should have."""
+        now: float = self.clock()
+        late: float = now - self.last_check - self.interval
+        if late > self.stall_threshold:
+            self.stalls.append(Stall(started_at=self.last_check + self.interval, duration=late))
+            self.stall_seconds += late
+        self.last_check = now
+
+    def fetch_timings(self) -> list[FetchTiming]:
+        """Return the finished GitHub API fetches, oldest first."""
+        return list(self.tree_store.fetch_timings) if self.tree_store is not None else []
+
+    def tab_report(self) -> list[dict[str, Any]]:
+        """Return the last load and the renderer of every tab.
+
+        Returns:
+            list[dict[str, Any]]: One dictionary per tracked tab, in tab order, with the title, URL, renderer
+            PID and resident memory, and the load time and time to first progress in milliseconds.
+        """
+        report: list[dict[str, Any]] = []
+        for index in range(self.tabs.count()):
+            view: QWidget = self.tabs.widget(index)
+            if view not in self.tracks:
+                continue
+            load: PageLoad | None = self.last_loads.get(view)
+            pid: int = view.page().renderProcessPid()
+            report.append(
+                {
+                    "title": view.title(),
+                    "url": view.url().toString(),
+                    "pid": pid,
+                    "memory_bytes": process_memory(pid),
+                    "loading": view in self.current_loads,
+                    "load_ms": load.duration_ms if load is not None else None,
+                    "first_progress_ms": (
+                        (load.first_progress_at - load.started_at) * 1000
+                        if load is not None and load.first_progress_at is not None
+                        else None
+                    ),
+                },
+            )
+        return report
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        """Return the loads, stalls and API fetches in the Chrome Trace Event Format.
+
+        Every kind of event gets its own track, and every tab its own track of loads. Times are in
+        microseconds since the monitor started.
+
+        Returns:
+            list[dict[str, Any]]: The events, starting with the names of the tracks.
+        """
+        pid: int = os.getpid()
+
+        def microseconds(seconds: float) -> float:
+            return round((seconds - self.started_at) * 1e6, 1)
+
+        names: dict[int, str] = {EVENT_LOOP_TRACK: "GUI event loop", GITHUB_API_TRACK: "GitHub API"}
+        for index in range(self.tabs.count()):
+            view: QWidget = self.tabs.widget(index)
+            if view in self.tracks:
+                names[self.tracks[view]] = f"Tab {index + 1}"
+        events: list[dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": track, "args": {"name": name}}
+            for track, name in names.items()
+        ]
+        for load in self.loads:
+            events.append(
+                {
+                    "name": load.url,
+                    "cat": "load",
+                    "ph": "X",
+                    "ts": microseconds(load.started_at),
+                    "dur": round((load.duration_ms or 0.0) * 1000, 1),
+                    "pid": pid,
+                    "tid": load.track,
+                    "args": {"ok": load.ok},
+                }
+            )
+            if load.first_progress_at is not None:
+                events.append(
+                    {
+                        "name": "first progress",
+                        "cat": "load",
+                        "ph": "i",
+                        "s": "t",
+                        "ts": microseconds(load.first_progress_at),
+                        "pid": pid,
+                        "tid": load.track,
+                    }
+                )
+        events.extend(
+            {
+                "name": "stall",
+                "cat": "event loop",
+                "ph": "X",
+                "ts": microseconds(stall.started_at),
+                "dur": round(stall.duration * 1e6, 1),
+                "pid": pid,
+                "tid": EVENT_LOOP_TRACK,
+            }
+            for stall in self.stalls
+        )
+        events.extend(
+            {
+                "name": fetch.key,
+                "cat": "github",
+                "ph": "X",
+                "ts": microseconds(fetch.started_at),
+                "dur": round((fetch.finished_at - fetch.started_at) * 1e6, 1),
+                "pid": pid,
+                "tid": GITHUB_API_TRACK,
+                "args": {"outcome": fetch.outcome, "bytes": fetch.received},
+            }
+            for fetch in self.fetch_timings()
+        )
+        return events
+
+    def export_trace(self, path: Path | None = None, events: list[dict[str, Any]] | None = None) -> Path:
+        """Write the trace to a JSON file.
+
+        Args:
+            path (Path | None): Where to write it, or None for a new file in the trace directory.
+            events (list[dict[str, Any]] | None): The events from trace_events(), or None to collect them now.
+
+        Returns:
+            Path: The file.
+        """
+        if path is None:
+            path = self.trace_dir / f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        if events is None:
+            events = self.trace_events()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+        logger.info("Exported performance trace to %s", path)
+        return path
+
+    def render_page(self) -> str:
+        """Render the about:performance page."""
+        mib: int = 1024 * 1024
+        rows: list[tuple[str, str]] = []
+        for index, tab in enumerate(self.tab_report(), start=1):
+            load: str = "Loading" if tab["loading"] else "-"
+            if tab["load_ms"] is not None and not tab["loading"]:
+                load = f"{tab['load_ms']:.0f} ms"
+                if tab["first_progress_ms"] is not None:
+                    load += f", first progress after {tab['first_progress_ms']:.0f} ms"
+            renderer: str = (
+                f"renderer {tab['pid']}, {tab['memory_bytes'] / mib:.0f} MiB" if tab["pid"] else "no renderer"
+            )
+            rows.append((f"Tab {index}: {tab['title'] or tab['url']}", f"{load}; {renderer}"))
+
+        if self.tab_lifecycle is not None:
+            lifecycle: list[dict[str, str | int]] = self.tab_lifecycle.memory_report()
+            budget: int = self.tab_lifecycle.memory_budget
+            reclaimed: int = sum(int(record["reclaimed_bytes"]) for record in lifecycle)
+            discards: int = sum(int(record["discards"]) for record in lifecycle)
+            rows += [
+                ("Memory budget", f"{budget / mib:.0f} MiB" if budget else "Off"),
+                ("Reclaimed by discarding tabs", f"{reclaimed / mib:.0f} MiB in {discards} discards"),
+            ]
+            for record in lifecycle:
+                tab_reclaimed: str = (
+                    f"{int(record['reclaimed_bytes']) / mib:.0f} MiB reclaimed in {record['discards']} discards"
+                )
+                rows.append(
+                    (
+                        f"{record['title'] or record['url']} ({record['state']})",
+                        f"idle {record['idle_seconds']} s, {tab_reclaimed}",
+                    )
+                )
+
+        longest: float = max((stall.duration for stall in self.stalls), default=0.0)
+        if self.timer.isActive():
+            rows += [
+                ("Event loop stalls", str(len(self.stalls))),
+                ("Time stalled", f"{self.stall_seconds * 1000:.0f} ms"),
+                ("Longest stall", f"{longest * 1000:.0f} ms"),
+            ]
+        else:
+            rows.append(("Event loop stalls", "Not checked"))
+
+        fetches: list[FetchTiming] = self.fetch_timings()
+        durations: list[float] = [(fetch.finished_at - fetch.started_at) * 1000 for fetch in fetches]
+        rows += [
+            ("GitHub API fetches", str(len(fetches))),
+            ("Median GitHub API fetch", f"{statistics.median(durations):.0f} ms" if durations else "-"),
+        ]
+        rows += [
+            (f"{fetch.key} ({fetch.outcome})", f"{duration:.0f} ms, {fetch.received:,} bytes")
+            for fetch, duration in list(zip(fetches, durations, strict=True))[-10:]
+        ]
+        return render_table_page(
+            "Performance",
+            rows,
+            f"Stalls are times the GUI event loop was busy for more than {self.stall_threshold * 1000:.0f} ms. "
+            f"Enter {PERFORMANCE_EXPORT_URL} in the URL bar to export a Chrome trace of the loads, stalls and "
+            "fetches, which chrome://tracing and ui.perfetto.dev open.",
+        )
+
+    def render_trace_page(self) -> str:
+        """Render the about:performance-trace page, which says what an export would contain without writing it."""
+        return render_table_page(
+            "Performance trace",
+            [
+                ("Events", str(len(self.trace_events()))),
+                ("Page loads", str(len(self.loads))),
+                ("Event loop stalls", str(len(self.stalls))),
+                ("GitHub API fetches", str(len(self.fetch_timings()))),
+                ("Directory", str(self.trace_dir)),
+            ],
+            f"Enter {PERFORMANCE_EXPORT_URL} in the URL bar to write the trace to a new file in the directory.",
+        )
+
+    def render_export_page(self) -> str:
+        """Export the trace and render the about:performance-trace-export page that says where it went."""
+        events: list[dict[str, Any]] = self.trace_events()
+        try:
+            path: Path = self.export_trace(events=events)
+        except OSError as e:
+            logger.exception("Failed to export the performance trace")
+            return render_table_page("Performance trace", [("Error", str(e))])
+        return render_table_page(
+            "Performance trace",
+            [("File", str(path)), ("Events", str(len(events)))],
+            "Open the file in chrome://tracing or ui.perfetto.dev.",
+        )
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from platformdirs import user_cache_dir, user_data_dir
+
+# QtWebEngine is imported by create_profile, so the settings can be read before the window is shown.
+if TYPE_CHECKING:
+    from PySide6.QtCore import QObject
+    from PySide6.QtWebEngineCore import QWebEngineProfile
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# A named profile keeps its cache and cookies on disk. The default profile in Qt 6 is off-the-record.
+PROFILE_NAME = "browser"
+
+CACHE_TYPES: tuple[str, ...] = ("disk", "memory", "none")
+COOKIE_POLICIES: tuple[str, ...] = ("session", "persistent", "force")
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileSettings:
+    """Where the profile is stored and how it caches.
+
+    Attributes:
+        storage_path (Path): Cookies, local storage and the other persistent data.
+        cache_path (Path): The HTTP disk cache.
+        cache_size (int): The maximum size of the HTTP cache in bytes. 0 lets Chromium choose.
+        cache_type (str): "disk", "memory" or "none".
+        cookie_policy (str): "session", "persistent" or "force". "force" also keeps session cookies.
+    """
+
+    storage_path: Path
+    cache_path: Path
+    cache_size: int = 512 * 1024 * 1024
+    cache_type: str = "disk"
+    cookie_policy: str = "persistent"
+
+    def __post_init__(self) -> None:
+        """Check the settings.
+
+        Raises:
+            ValueError: If a setting has a value we do not know.
+        """
+        if self.cache_type not in CACHE_TYPES:
+            msg: str = f"Unknown cache type {self.cache_type!r}, expected one of {', '.join(CACHE_TYPES)}"
+            raise ValueError(msg)
+        if self.cookie_policy not in COOKIE_POLICIES:
+            msg = f"Unknown cookie policy {self.cookie_policy!r}, expected one of {', '.join(COOKIE_POLICIES)}"
+            raise ValueError(msg)
+        if self.cache_size < 0:
+            msg = f"The cache size can not be negative, got {self.cache_size}"
+            raise ValueError(msg)
+
+    @classmethod
+    def from_env(cls) -> ProfileSettings:
+        """Read the settings from BROWSER_CACHE_SIZE_MB, BROWSER_CACHE_TYPE and BROWSER_COOKIE_POLICY.
+
+        Returns:
+            ProfileSettings: The settings, stored in the data and cache directories of the browser.
+        """
+        data_dir = Path(user_data_dir(appname="browser", appauthor="TheLovinator", roaming=True))
+        cache_dir = Path(user_cache_dir(appname="browser", appauthor="TheLovinator"))
+        return cls(
+            storage_path=data_dir / "profile",
+            cache_path=cache_dir / "profile",
+            cache_size=int(os.getenv("BROWSER_CACHE_SIZE_MB", default="512")) * 1024 * 1024,
+            cache_type=os.getenv("BROWSER_CACHE_TYPE", default="disk"),
+            cookie_policy=os.getenv("BROWSER_COOKIE_POLICY", default="persistent"),
+        )
+
+
+def create_profile(settings: ProfileSettings | None, parent: QObject | None = None) -> QWebEngineProfile:
+    """Create the profile that all tabs share.
+
+    Args:
+        settings (ProfileSettings | None): Where to store the profile and how to cache.
+            Without settings the profile is off-the-record and keeps nothing on disk.
+        parent (QObject | None): The owner of the profile. It must outlive every page that uses it.
+
+    Returns:
+        QWebEngineProfile: The profile.
+    """
+    from PySide6.QtWebEngineCore import QWebEngineProfile  # noqa: PLC0415
+
+    if settings is None:
+        return QWebEngineProfile(parent)
+
+    cache_types: dict[str, QWebEngineProfile.HttpCacheType] = {
+        "disk": QWebEngineProfile.HttpCacheType.DiskHttpCache,
+        "memory": QWebEngineProfile.HttpCacheType.MemoryHttpCache,
+        "none": QWebEngineProfile.HttpCacheType.NoCache,
+    }
+    cookie_policies: dict[str, QWebEngineProfile.PersistentCookiesPolicy] = {
+        "session": QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies,
+        "persistent": QWebEngineProfile.PersistentCookiesPolicy.AllowPersistentCookies,
+        "force": QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies,
+    }
+
+    profile = QWebEngineProfile(PROFILE_NAME, parent)
+    profile.setPersistentStoragePath(str(settings.storage_path))
+    profile.setCachePath(str(settings.cache_path))
+    profile.setHttpCacheType(cache_types[settings.cache_type])
+    profile.setHttpCacheMaximumSize(settings.cache_size)
+    profile.setPersistentCookiesPolicy(cookie_policies[settings.cookie_policy])
+    logger.info(
+        "Using a %s HTTP cache of at most %s MiB in %s",
+        settings.cache_type,
+        settings.cache_size // (1024 * 1024),
+        profile.cachePath(),
+    )
+    return profile
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from platformdirs import user_data_dir
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QLabel, QVBoxLayout, QWidget
+
+if TYPE_CHECKING:
+    from PySide6.QtCore import QObject
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+SESSION_VERSION = 1
+
+# How long to wait after a tab changes before writing the session, so a burst of changes is one write.
+SAVE_DELAY_MS = 500
+
+
+@dataclass(slots=True)
+class TabState:
+    """A tab as it is stored in the session."""
+
+    url: str
+    title: str
+
+
+@dataclass(slots=True)
+class SessionState:
+    """The open tabs, in order, and which one is selected."""
+
+    tabs: list[TabState] = field(default_factory=list)
+    active_index: int = 0
+
+    def to_json(self) -> str:
+        """Serialize the session."""
+        return json.dumps({"version": SESSION_VERSION, **asdict(self)}, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def from_json(cls, data: str) -> SessionState:
+        """Parse a session written by to_json.
+
+        Args:
+            data (str): The JSON.
+
+        Raises:
+            ValueError: If the JSON is not a session we can read.
+
+        Returns:
+            SessionState: The session.
+        """
+        try:
+            raw: dict[str, Any] = json.loads(data)
+            version: object = raw.get("version")
+            tabs: list[TabState] = [TabState(url=str(tab["url"]), title=str(tab["title"])) for tab in raw["tabs"]]
+            active_index: int = int(raw["active_index"])
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            msg = "Invalid session file"
+            raise ValueError(msg) from e
+
+        if version != SESSION_VERSION:
+            msg = f"Unsupported session version {version!r}"
+            raise ValueError(msg)
+        return cls(tabs=tabs, active_index=max(0, min(active_index, len(tabs) - 1)))
+
+
+def default_session_path() -> Path:
+    """Return where the session of the browser is stored."""
+    data_dir = Path(user_data_dir(appname="browser", appauthor="TheLovinator", roaming=True, ensure_exists=True))
+    return data_dir / "session.json"
+
+
+class SessionStore:
+    """Read and write the session file.
+
+    Writes go to a temporary file that replaces the session file, so a crash halfway through a write
+    leaves the previous session intact. Saving a session that has not changed since the last save
+    does not touch the disk.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the store.
+
+        Args:
+            path (Path): The session file.
+        """
+        self.path: Path = path
+        self.last_saved: str | None = None
+        self.writes: int = 0
+
+    def load(self) -> SessionState | None:
+        """Load the session.
+
+        Returns:
+            SessionState | None: The session, or None if there is none or it could not be read.
+        """
+        try:
+            data: str = self.path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.exception("Failed to read the session from %s", self.path)
+            return None
+
+        try:
+            state: SessionState = SessionState.from_json(data)
+        except ValueError:
+            logger.exception("Ignoring the session in %s", self.path)
+            return None
+        self.last_saved = data
+        return state
+
+    def save(self, state: SessionState) -> bool:
+        """Save the session atomically, unless it is the same as the last one saved.
+
+        Args:
+            state (SessionState): The session.
+
+        Returns:
+            bool: True if the file was written.
+        """
+        data: str = state.to_json()
+        if data == self.last_saved:
+            return False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary_name = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        temporary_path = Path(temporary_name)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as temporary_file:
+                temporary_file.write(data)
+                temporary_file.flush()
+                os.fsync(temporary_file.fileno())
+            temporary_path.replace(self.path)
+        except BaseException:
+            temporary_path.unlink(missing_ok=True)
+            raise
+
+        self.last_saved = data
+        self.writes += 1
+        logger.debug("Saved %s tabs to %s", len(state.tabs), self.path)
+        return True
+
+
+class TabPlaceholder(QWidget):
+    """A restored tab that has not been loaded yet.
+
+    Costs a label instead of a web view with a renderer. The browser swaps it for the real page
+    the first time the tab is selected.
+    """
+
+    def __init__(self, url: str, title: str, parent: QObject | None = None) -> None:
+        """Initialize the placeholder.
+
+        Args:
+            url (str): The URL to load when the tab is selected.
+            title (str): The title the page had when the session was saved.
+            parent (QObject | None): The parent widget.
+        """
+        super().__init__(parent)
+        self.url: str = url
+        self.title: str = title
+
+        layout = QVBoxLayout()
+        label = QLabel(url)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(label)
+        self.setLayout(layout)
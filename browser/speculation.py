@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import html
+import logging
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from PySide6.QtCore import QObject, QTimer, QUrl
+from PySide6.QtNetwork import QNetworkReply, QNetworkRequest
+
+from browser.github_trees import API_BASE_URL, make_tree_request
+from browser.internal_pages import render_table_page
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from PySide6.QtNetwork import QNetworkAccessManager
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+SPECULATION_PAGE_URL = "about:speculation"
+
+# How long the URL bar has to be left alone before we guess where it is going.
+SPECULATION_DELAY_MS = 200
+
+# Loaded in a hidden page of the profile to make Chromium resolve the host and open a connection to it.
+PRECONNECT_HTML = '<!DOCTYPE html><link rel="preconnect" href="%s">'
+
+
+def predict_url(text: str) -> str | None:
+    """Guess what the URL bar will navigate to.
+
+    Args:
+        text (str): What has been typed so far.
+
+    Returns:
+        str | None: "GitHub/user/repo" for a complete GitHub repository, the origin of a web URL,
+            or None if the text does not look like either yet.
+    """
+    text = text.strip()
+    if text.startswith("GitHub/"):
+        parts: list[str] = text.split("/")
+        return text if len(parts) == 3 and all(parts[1:]) else None  # noqa: PLR2004
+    if not text or " " in text or ("." not in text and "://" not in text):
+        return None
+
+    url: QUrl = QUrl.fromUserInput(text)
+    if not url.isValid() or url.scheme() not in {"http", "https"} or not url.host():
+        return None
+    port: str = f":{url.port()}" if url.port() != -1 else ""
+    return f"{url.scheme()}://{url.host(QUrl.ComponentFormattingOption.FullyEncoded)}{port}"
+
+
+@dataclass(slots=True)
+class SpeculationStats:
+    """How often the URL bar guessed right and how much time it won.
+
+    A hit is a navigation to the repository that was prefetched or the origin that was preconnected.
+    For a prefetch the time saved is how long the request had been running when the user pressed Enter,
+    up to when it finished. For a preconnect it is the head start the connection got, which saves up to
+    the DNS, TCP and TLS time of the navigation.
+    """
+
+    prefetches: int = 0
+    preconnects: int = 0
+    cancelled: int = 0
+    navigations: int = 0
+    hits: int = 0
+    prefetch_saved_ms: list[float] = field(default_factory=list)
+    preconnect_head_start_ms: list[float] = field(default_factory=list)
+
+    @property
+    def precision(self) -> float:
+        """The share of speculations that the user navigated to."""
+        speculations: int = self.prefetches + self.preconnects
+        return self.hits / speculations if speculations else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of navigations that had been speculated."""
+        return self.hits / self.navigations if self.navigations else 0.0
+
+    def summary(self) -> dict[str, int | float | None]:
+        """Return the counters and the median time saved.
+
+        Returns:
+            dict[str, int | float | None]: The counters, the rates and the median time saved per kind of speculation.
+        """
+        return {
+            "prefetches": self.prefetches,
+            "preconnects": self.preconnects,
+            "cancelled": self.cancelled,
+            "navigations": self.navigations,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate,
+            "precision": self.precision,
+            "median_prefetch_saved_ms": statistics.median(self.prefetch_saved_ms) if self.prefetch_saved_ms else None,
+            "median_preconnect_head_start_ms": (
+                statistics.median(self.preconnect_head_start_ms) if self.preconnect_head_start_ms else None
+            ),
+        }
+
+
+class SpeculativeLoader(QObject):
+    """Start loading what the URL bar is likely to navigate to while the user is still typing.
+
+    Once the text has not changed for a moment it is passed to predict_url. A GitHub repository gets
+    a low-priority request for its tree, which the page takes over when the user presses Enter and which
+    is aborted as soon as the text points somewhere else. A web URL gets a preconnect to its origin.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        network_manager: QNetworkAccessManager,
+        preconnect: Callable[[str], None],
+        *,
+        api_base_url: str = API_BASE_URL,
+        delay_ms: int = SPECULATION_DELAY_MS,
+        clock: Callable[[], float] = time.perf_counter,
+        parent: QObject | None = None,
+    ) -> None:
+        """Initialize the loader.
+
+        Args:
+            network_manager (QNetworkAccessManager): The network access manager of the GitHub pages.
+            preconnect (Callable[[str], None]): Opens a connection to an origin in the web engine.
+            api_base_url (str): The base URL of the GitHub API router.
+            delay_ms (int): How long the text has to stay the same before we speculate.
+            clock (Callable[[], float]): Returns the current time in seconds, replaceable in tests.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        self.network_manager: QNetworkAccessManager = network_manager
+        self.preconnect: Callable[[str], None] = preconnect
+        self.api_base_url: str = api_base_url
+        self.clock: Callable[[], float] = clock
+        self.stats = SpeculationStats()
+
+        self.text: str = ""
+        self.target: str | None = None
+        self.started_at: float = 0.0
+        self.finished_at: float | None = None
+        self.prefetch: QNetworkReply | None = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.speculate)
+
+    def text_edited(self, text: str) -> None:
+        """Speculate on the text once the user stops typing for a moment."""
+        self.text = text
+        self.timer.start()
+
+    def speculate(self) -> None:
+        """Prefetch or preconnect the predicted target, dropping the previous one if it changed."""
+        target: str | None = predict_url(self.text)
+        if target == self.target:
+            return
+        self.discard()
+        if target is None:
+            return
+
+        self.target = target
+        self.started_at = self.clock()
+        if target.startswith("GitHub/"):
+            _, github_username, github_repo = target.split("/")
+            request: QNetworkRequest = make_tree_request(self.api_base_url, github_username, github_repo)
+            request.setPriority(QNetworkRequest.Priority.LowPriority)
+            logger.debug("Prefetching %s", request.url().toString())
+            self.prefetch = self.network_manager.get(request)
+            self.prefetch.setParent(self)
+            self.prefetch.finished.connect(self.on_prefetch_finished)
+            self.stats.prefetches += 1
+        else:
+            logger.debug("Preconnecting to %s", target)
+            self.preconnect(target)
+            self.stats.preconnects += 1
+
+    def on_prefetch_finished(self) -> None:
+        """Remember when the prefetch finished, so waiting longer than that is not counted as saved time."""
+        if self.finished_at is None:
+            self.finished_at = self.clock()
+
+    def discard(self) -> None:
+        """Forget the current speculation and abort its prefetch."""
+        if self.target is not None and self.target != predict_url(self.text):
+            self.stats.cancelled += 1
+        self.target = None
+        self.finished_at = None
+        if self.prefetch is not None:
+            prefetch: QNetworkReply = self.prefetch
+            self.prefetch = None
+            prefetch.finished.disconnect(self.on_prefetch_finished)
+            prefetch.abort()
+            prefetch.deleteLater()
+
+    def take(self, text: str) -> QNetworkReply | None:
+        """Record a navigation and hand over the prefetched tree if the speculation was right.
+
+        Args:
+            text (str): The text in the URL bar when Enter was pressed.
+
+        Returns:
+            QNetworkReply | None: The prefetch of the tree of the repository, finished or still running.
+                The caller owns it from now on.
+        """
+        self.timer.stop()
+        self.text = text
+        self.stats.navigations += 1
+        if self.target is None or self.target != predict_url(text):
+            self.discard()
+            return None
+
+        now: float = self.clock()
+        self.stats.hits += 1
+        reply: QNetworkReply | None = self.prefetch
+        if reply is None:
+            self.stats.preconnect_head_start_ms.append((now - self.started_at) * 1000)
+        else:
+            done: float = now if self.finished_at is None else min(now, self.finished_at)
+            self.stats.prefetch_saved_ms.append((done - self.started_at) * 1000)
+            reply.finished.disconnect(self.on_prefetch_finished)
+            reply.setParent(None)
+            self.prefetch = None
+        self.target = None
+        self.finished_at = None
+        return reply
+
+    def render_page(self) -> str:
+        """Render the about:speculation page."""
+        summary: dict[str, int | float | None] = self.stats.summary()
+        prefetch_saved: int | float | None = summary["median_prefetch_saved_ms"]
+        head_start: int | float | None = summary["median_preconnect_head_start_ms"]
+        rows: list[tuple[str, str]] = [
+            ("Navigations", str(summary["navigations"])),
+            ("Speculated navigations", f"{summary['hits']} ({self.stats.hit_rate:.0%})"),
+            ("GitHub prefetches", str(summary["prefetches"])),
+            ("Preconnects", str(summary["preconnects"])),
+            ("Cancelled", str(summary["cancelled"])),
+            ("Speculations used", f"{self.stats.precision:.0%}"),
+            ("Median time saved by a prefetch", f"{prefetch_saved:.0f} ms" if prefetch_saved is not None else "-"),
+            ("Median preconnect head start", f"{head_start:.0f} ms" if head_start is not None else "-"),
+        ]
+        return render_table_page(
+            "URL bar speculation",
+            rows,
+            "A prefetch saves the time its request had already been running when Enter was pressed. "
+            "A preconnect saves up to the DNS, TCP and TLS time of the navigation.",
+        )
+
+
+def preconnect_html(origin: str) -> str:
+    """Return a page that preconnects to an origin.
+
+    Args:
+        origin (str): The origin, like https://example.com.
+
+    Returns:
+        str: The HTML.
+    """
+    return PRECONNECT_HTML % html.escape(origin)
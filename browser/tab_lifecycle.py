@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtWebEngineCore import QWebEnginePage
+from PySide6.QtWebEngineWidgets import QWebEngineView
+
+from browser.performance import can_measure_process_memory, process_memory
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from PySide6.QtWidgets import QTabWidget
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+LifecycleState = QWebEnginePage.LifecycleState
+
+# Background tabs are frozen after this many seconds without being looked at, and discarded later.
+FREEZE_AFTER = 5 * 60
+DISCARD_AFTER = 30 * 60
+
+# When the renderers of the tabs that are not discarded use more than this, the least recently used ones are discarded.
+MEMORY_BUDGET = 2 * 1024**3
+
+CHECK_INTERVAL_MS = 30_000
+
+# How long to wait after discarding a tab before measuring what the renderer gave back.
+MEASURE_DELAY_MS = 2000
+
+# How far each state is from Active, so states can be compared.
+LIFECYCLE_ORDER: dict[LifecycleState, int] = {
+    LifecycleState.Active: 0,
+    LifecycleState.Frozen: 1,
+    LifecycleState.Discarded: 2,
+}
+
+
+@dataclass(slots=True)
+class TabRecord:
+    """What the manager knows about a tab."""
+
+    last_active: float
+    reclaimed_bytes: int = 0
+    discards: int = 0
+
+
+class TabLifecycleManager(QObject):
+    """Freeze and discard background tabs to keep the memory of the browser bounded.
+
+    Tabs that have not been selected for `freeze_after` seconds are frozen, which stops their JavaScript and
+    timers. After `discard_after` seconds they are discarded, which drops the page and lets the renderer free
+    its memory. If the renderers use more than `memory_budget` bytes, background tabs are discarded earlier,
+    least recently used first, unless the memory of processes can not be measured on this platform. A tab
+    never goes further than QWebEnginePage.recommendedState allows, so tabs playing audio or with unsent form
+    input are kept. Selecting a frozen or discarded tab makes it Active again, and Qt reloads discarded pages
+    on its own.
+    """
+
+    state_changed = Signal(QWebEngineView, LifecycleState)
+    memory_reclaimed = Signal(QWebEngineView, int)
+
+    def __init__(  # noqa: PLR0913
+        self,
+        tabs: QTabWidget,
+        *,
+        freeze_after: float = FREEZE_AFTER,
+        discard_after: float = DISCARD_AFTER,
+        memory_budget: int = MEMORY_BUDGET,
+        check_interval_ms: int = CHECK_INTERVAL_MS,
+        clock: Callable[[], float] = time.monotonic,
+        parent: QObject | None = None,
+    ) -> None:
+        """Initialize the manager and start checking the tabs.
+
+        Args:
+            tabs (QTabWidget): The tab widget with the views to manage.
+            freeze_after (float): Seconds in the background before a tab is frozen.
+            discard_after (float): Seconds in the background before a tab is discarded.
+            memory_budget (int): Bytes the renderers may use before background tabs are discarded early, or 0
+                for no budget.
+            check_interval_ms (int): How often the tabs are checked, in milliseconds.
+            clock (Callable[[], float]): Returns the current time in seconds, replaceable in tests.
+            parent (QObject | None): The parent object.
+        """
+        super().__init__(parent)
+        if memory_budget and not can_measure_process_memory():
+            logger.warning("Can not measure the memory of processes on %s, so there is no memory budget", sys.platform)
+            memory_budget = 0
+        self.tabs: QTabWidget = tabs
+        self.freeze_after: float = freeze_after
+        self.discard_after: float = discard_after
+        self.memory_budget: int = memory_budget
+        self.clock: Callable[[], float] = clock
+        self.records: dict[QWebEngineView, TabRecord] = {}
+        self.current_view: QWebEngineView | None = None
+
+        self.tabs.currentChanged.connect(self.on_current_changed)
+
+        self.check_timer = QTimer(self)
+        self.check_timer.setInterval(check_interval_ms)
+        self.check_timer.timeout.connect(self.check_tabs)
+        self.check_timer.start()
+
+    @classmethod
+    def from_env(cls, tabs: QTabWidget, parent: QObject | None = None) -> TabLifecycleManager:
+        """Create a manager with the settings from the environment.
+
+        BROWSER_FREEZE_AFTER and BROWSER_DISCARD_AFTER are in seconds, and BROWSER_MEMORY_BUDGET_MB of 0 disables
+        the memory budget.
+
+        Args:
+            tabs (QTabWidget): The tab widget with the views to manage.
+            parent (QObject | None): The parent object.
+
+        Returns:
+            TabLifecycleManager: The manager.
+        """
+        return cls(
+            tabs,
+            freeze_after=float(os.getenv("BROWSER_FREEZE_AFTER", default=str(FREEZE_AFTER))),
+            discard_after=float(os.getenv("BROWSER_DISCARD_AFTER", default=str(DISCARD_AFTER))),
+            memory_budget=int(os.getenv("BROWSER_MEMORY_BUDGET_MB", default=str(MEMORY_BUDGET // 2**20))) * 2**20,
+            parent=parent,
+        )
+
+    def track(self, view: QWebEngineView) -> None:
+        """Start managing a tab.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+        """
+        self.records[view] = TabRecord(last_active=self.clock())
+
+    def forget(self, view: QWebEngineView) -> None:
+        """Stop managing a tab, e.g. because it was closed.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+        """
+        self.records.pop(view, None)
+        if self.current_view is view:
+            self.current_view = None
+
+    def on_current_changed(self, index: int) -> None:
+        """Mark the tab we leave and the tab we enter as used now, and wake up the new tab."""
+        now: float = self.clock()
+        if self.current_view is not None and self.current_view in self.records:
+            self.records[self.current_view].last_active = now
+
+        widget = self.tabs.widget(index)
+        self.current_view = widget if isinstance(widget, QWebEngineView) else None
+        if self.current_view is None or self.current_view not in self.records:
+            return
+
+        self.records[self.current_view].last_active = now
+        if self.current_view.page().lifecycleState() != LifecycleState.Active:
+            self.set_state(self.current_view, LifecycleState.Active)
+
+    def background_views(self) -> list[QWebEngineView]:
+        """Return the tabs that are not selected, least recently used first."""
+        views: list[QWebEngineView] = [view for view in self.records if view is not self.current_view]
+        return sorted(views, key=lambda view: self.records[view].last_active)
+
+    def check_tabs(self) -> None:
+        """Freeze and discard background tabs that have been idle for too long or that break the memory budget."""
+        now: float = self.clock()
+        for view in self.background_views():
+            idle: float = now - self.records[view].last_active
+            if idle >= self.discard_after:
+                self.move_towards(view, LifecycleState.Discarded)
+            elif idle >= self.freeze_after:
+                self.move_towards(view, LifecycleState.Frozen)
+
+        self.enforce_memory_budget()
+
+    def enforce_memory_budget(self) -> None:
+        """Discard background tabs, least recently used first, until the renderers fit in the memory budget."""
+        if not self.memory_budget:
+            return
+        used: int = self.renderer_memory()
+        if used <= self.memory_budget:
+            return
+
+        logger.info("Tabs use %s MiB, more than the budget of %s MiB", used // 2**20, self.memory_budget // 2**20)
+        for view in self.background_views():
+            if used <= self.memory_budget:
+                break
+            if view.page().lifecycleState() == LifecycleState.Discarded:
+                continue
+            estimate: int = self.estimate_view_memory(view)
+            if self.move_towards(view, LifecycleState.Discarded):
+                used -= estimate
+
+    def move_towards(self, view: QWebEngineView, state: LifecycleState) -> bool:
+        """Move a tab to a state, or as close to it as its recommended state allows.
+
+        Tabs are only ever moved away from Active here, never back.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+            state (LifecycleState): The state we would like the tab to be in.
+
+        Returns:
+            bool: True if the state of the tab changed.
+        """
+        page: QWebEnginePage = view.page()
+        recommended: LifecycleState = page.recommendedState()
+        if LIFECYCLE_ORDER[recommended] < LIFECYCLE_ORDER[state]:
+            state = recommended
+        if LIFECYCLE_ORDER[state] <= LIFECYCLE_ORDER[page.lifecycleState()]:
+            return False
+        self.set_state(view, state)
+        return True
+
+    def set_state(self, view: QWebEngineView, state: LifecycleState) -> None:
+        """Set the lifecycle state of a tab and measure what discarding it gave back.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+            state (LifecycleState): The new state.
+        """
+        page: QWebEnginePage = view.page()
+        logger.debug("Tab %r: %s -> %s", page.title(), page.lifecycleState().name, state.name)
+
+        pid: int = page.renderProcessPid()
+        memory_before: int = process_memory(pid)
+        page.setLifecycleState(state)
+        self.state_changed.emit(view, state)
+
+        if state != LifecycleState.Discarded:
+            return
+        self.records[view].discards += 1
+        if pid:
+            QTimer.singleShot(MEASURE_DELAY_MS, self, lambda: self.record_reclaimed(view, pid, memory_before))
+
+    def record_reclaimed(self, view: QWebEngineView, pid: int, memory_before: int) -> None:
+        """Record how much the renderer of a discarded tab shrank.
+
+        Args:
+            view (QWebEngineView): The view of the tab.
+            pid (int): The renderer process the tab used.
+            memory_before (int): The resident memory of the renderer before the tab was discarded.
+        """
+        record: TabRecord | None = self.records.get(view)
+        if record is None:
+            return
+        reclaimed: int = max(0, memory_before - process_memory(pid))
+        record.reclaimed_bytes += reclaimed
+        logger.info("Discarding %r gave back %s MiB", view.page().title(), reclaimed // 2**20)
+        self.memory_reclaimed.emit(view, reclaimed)
+
+    def renderer_memory(self) -> int:
+        """Return the resident memory of the renderer processes of all tabs, counting shared processes once."""
+        pids: set[int] = {view.page().renderProcessPid() for view in self.records}
+        return sum(process_memory(pid) for pid in pids if pid)
+
+    def estimate_view_memory(self, view: QWebEngineView) -> int:
+        """Estimate the memory of one tab, splitting a shared renderer evenly between its tabs."""
+        pid: int = view.page().renderProcessPid()
+        if not pid:
+            return 0
+        sharing: int = sum(1 for other in self.records if other.page().renderProcessPid() == pid)
+        return process_memory(pid) // max(1, sharing)
+
+    def memory_report(self) -> list[dict[str, str | int]]:
+        """Return the state and memory of every tab.
+
+        Returns:
+            list[dict[str, str | int]]: One dictionary per tab, in tab order, with the title, URL, state,
+            renderer PID, the estimated memory in use and the bytes given back by discarding it.
+        """
+        now: float = self.clock()
+        report: list[dict[str, str | int]] = []
+        for index in range(self.tabs.count()):
+            view = self.tabs.widget(index)
+            if not isinstance(view, QWebEngineView) or view not in self.records:
+                continue
+            record: TabRecord = self.records[view]
+            page: QWebEnginePage = view.page()
+            report.append(
+                {
+                    "title": page.title(),
+                    "url": page.url().toString(),
+                    "state": page.lifecycleState().name,
+                    "pid": page.renderProcessPid(),
+                    "memory_bytes": self.estimate_view_memory(view),
+                    "reclaimed_bytes": record.reclaimed_bytes,
+                    "discards": record.discards,
+                    "idle_seconds": int(now - record.last_active) if view is not self.current_view else 0,
+                }
+            )
+        return report
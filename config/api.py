@@ -1,9 +1,41 @@
 from __future__ import annotations
 
+import math
+from typing import TYPE_CHECKING, Any
+
+import orjson
 from ninja import NinjaAPI
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
 
 from core.api import router as core_router
+from core.github_client import RateLimitExhaustedError
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest, HttpResponse
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Render responses with orjson, which is several times faster than json for large listings.
+
+    Anything orjson does not know, like pydantic models, is converted the same way as the default renderer does.
+    """
 
-api = NinjaAPI()
+    media_type = "application/json"
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> bytes:  # noqa: ANN401, ARG002
+        """Serialize the data as compact JSON."""
+        return orjson.dumps(data, default=NinjaJSONEncoder().default)
+
+
+api = NinjaAPI(renderer=ORJSONRenderer())
 
 api.add_router("/", core_router)
+
+
+@api.exception_handler(RateLimitExhaustedError)
+def rate_limit_exhausted(request: HttpRequest, exc: RateLimitExhaustedError) -> HttpResponse:
+    """Tell the client to come back when the GitHub rate limit has reset."""
+    response: HttpResponse = api.create_response(request, {"detail": str(exc)}, status=503)
+    response["Retry-After"] = str(math.ceil(exc.retry_after))
+    return response
@@ -3,7 +3,7 @@ from __future__ import annotations
 import logging
 import os
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 from dotenv import load_dotenv
 from platformdirs import user_data_dir
@@ -17,8 +17,32 @@ if not GITHUB_ACCESS_TOKEN:
     msg = "GITHUB_ACCESS_TOKEN not set"
     raise ValueError(msg)
 
+# The GitHub API, the connections kept open per worker thread, and how close to the rate limit we let ourselves get.
+GITHUB_API_URL: str = os.getenv("GITHUB_API_URL", default="https://api.github.com")
+GITHUB_POOL_SIZE: int = int(os.getenv("GITHUB_POOL_SIZE", default="10"))
+GITHUB_RATE_LIMIT_RESERVE: int = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", default="50"))
+GITHUB_RATE_LIMIT_MAX_WAIT: float = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", default="10"))
+
+# How many repositories are kept in the GitHub contents cache, and for how many seconds they are fresh.
+GITHUB_CACHE_MAX_ENTRIES: int = int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", default="512"))
+GITHUB_CACHE_TTL: int = int(os.getenv("GITHUB_CACHE_TTL", default="300"))
+
+# Sync expired repository trees by fetching only the directories whose tree SHA changed.
+GITHUB_INCREMENTAL_SYNC: bool = os.getenv("GITHUB_INCREMENTAL_SYNC", default="True").lower() == "true"
+
+# How many repositories of batch requests are fetched at the same time.
+GITHUB_BATCH_WORKERS: int = int(os.getenv("GITHUB_BATCH_WORKERS", default="8"))
+
+# Repository snapshots in the database older than this many seconds are served, then refreshed in the background.
+GITHUB_SNAPSHOT_MAX_AGE: int = int(os.getenv("GITHUB_SNAPSHOT_MAX_AGE", default="3600"))
+GITHUB_SNAPSHOT_REFRESH_WORKERS: int = int(os.getenv("GITHUB_SNAPSHOT_REFRESH_WORKERS", default="2"))
+
 BASE_DIR: Path = Path(__file__).resolve().parent.parent
 DATA_DIR: Path = Path(user_data_dir(appname="browser_api", appauthor="TheLovinator", roaming=True, ensure_exists=True))
+
+# File contents fetched from GitHub, stored once per git blob SHA.
+GITHUB_BLOB_DIR: Path = Path(os.getenv("GITHUB_BLOB_DIR", default=str(DATA_DIR / "blobs")))
+
 SECRET_KEY: str = os.getenv("DJANGO_SECRET_KEY", default="")
 if not SECRET_KEY:
     msg = "DJANGO_SECRET_KEY not set"
@@ -46,6 +70,7 @@ INSTALLED_APPS: list[str] = [
 ]
 
 MIDDLEWARE: list[str] = [
+    "core.middleware.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,6 +78,7 @@ MIDDLEWARE: list[str] = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.upstream_call_counter_middleware",
 ]
 
 
@@ -90,23 +116,44 @@ AUTH_PASSWORD_VALIDATORS: list[dict[str, str]] = [
     },
 ]
 
-LOGGING: dict[str, int | bool | dict[str, dict[str, str | list[str] | bool]]] = {
+# Keep one in this many of the INFO and DEBUG records of loggers that write on every request. Warnings are always kept.
+LOG_SAMPLE_RATES: dict[str, int] = {
+    "core.api": int(os.getenv("LOG_SAMPLE_RATE_API", default="10")),
+    "django.db.backends": 100,
+    "urllib3.connectionpool": 10,
+}
+
+# Records are put on a queue and written as JSON lines by a background thread, so requests never wait for the console.
+LOGGING: dict[str, Any] = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "sample": {"()": "core.log.SamplingFilter", "rates": LOG_SAMPLE_RATES},
+        "redact": {"()": "core.log.RedactingFilter", "secrets": [GITHUB_ACCESS_TOKEN, SECRET_KEY]},
+    },
+    "formatters": {
+        "json": {"()": "core.log.JsonFormatter"},
+    },
     "handlers": {
         "console": {
             "level": "DEBUG",
             "class": "logging.StreamHandler",
+            "formatter": "json",
+            "filters": ["redact"],
+        },
+        "queue": {
+            "()": "core.log.QueueLogHandler",
+            "handler": "cfg://handlers.console",  # Configured first, handlers are set up in alphabetical order
+            "filters": ["sample"],
         },
     },
     "loggers": {
         "": {
-            "handlers": ["console"],
-            "level": "DEBUG",
+            "handlers": ["queue"],
+            "level": "DEBUG" if DEBUG else "INFO",
             "propagate": True,
         },
         "django.utils.autoreload": {  # Remove spam
-            "handlers": ["console"],
             "level": "INFO",
             "propagate": True,
         },
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from django.contrib import admin
 
-from core.models import User
+from core.models import ContentEntry, Repository, User
 
 admin.site.register(User)
+admin.site.register(Repository)
+admin.site.register(ContentEntry)
@@ -1,63 +1,644 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import bisect
+import hashlib
 import logging
-from typing import TYPE_CHECKING
+from collections.abc import AsyncIterable
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Any
 
+import orjson
+from django.core.handlers.asgi import ASGIRequest  # noqa: TC002
 from django.core.handlers.wsgi import WSGIRequest  # noqa: TC002
-from ninja import Router
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from ninja import Query, Router
+from ninja.errors import HttpError
 
-from core.sites_github import get_repo_contents
+from core import sites_github
+from core.batch import aiter_batch_contents, iter_batch_contents
+from core.blobs import BLOB_SHA_RE, BlobReader, RangeNotSatisfiableError, parse_range
+from core.metrics import PROMETHEUS_CONTENT_TYPE, registry
+from core.sites_github import aget_repo_tree, get_blob, get_repo_tree, repo_contents_cache
+from core.snapshots import (
+    aget_snapshot_contents,
+    aiter_snapshot_contents,
+    get_snapshot_contents,
+    iter_snapshot_contents,
+)
 
 if TYPE_CHECKING:
-    from github.ContentFile import ContentFile
+    from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+    from pathlib import Path
+
+    from django.http.response import HttpResponseBase
 
 logger: logging.Logger = logging.getLogger(__name__)
 
 router = Router()
 github_router = Router()
 
+async_github_router = Router()
+
 router.add_router("/github/", github_router)
+router.add_router("/github/async/", async_github_router)
+
+MAX_TREE_PAGE_SIZE = 10_000
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# How many NDJSON lines are sent per chunk of a streaming response.
+STREAM_BATCH_SIZE = 500
+
+# How many repositories one batch request may ask for.
+MAX_BATCH_REPOSITORIES = 100
+
+BLOB_CONTENT_TYPE = "application/octet-stream"
+
+# A blob is addressed by its content, so the response for a SHA never changes.
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
+# Listings may be stored by clients, but must be revalidated, which costs a 304 when nothing changed.
+LISTING_CACHE_CONTROL = "no-cache"
 
-def convert_content_file_to_json(content_file: ContentFile) -> dict[str, str | int]:
-    """Convert a ContentFile object to a dictionary.
+
+def strong_etag(*parts: str) -> str:
+    """Return a strong ETag for a representation that is fully determined by the parts.
+
+    The parts are SHAs and paths of what is listed, so the ETag is known without serializing the body.
 
     Args:
-        content_file (ContentFile): The ContentFile object.
+        *parts (str): What the representation is built from.
 
     Returns:
-        dict[str, str]: The ContentFile object as a dictionary.
+        str: The quoted ETag.
     """
-    return {
-        "name": content_file.name,
-        "path": content_file.path,
-        "type": content_file.type,
-        "download_url": content_file.download_url,
-        "html_url": content_file.html_url,
-        "size": content_file.size,
-        "sha": content_file.sha,
-    }
+    digest = hashlib.sha256(usedforsecurity=False)
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:40]}"'
+
+
+def contents_etag(contents: list[dict[str, str | int]] | dict[str, str | int]) -> str:
+    """Return the ETag of a contents response, from every field of every entry.
+
+    Args:
+        contents (list[dict[str, str | int]] | dict[str, str | int]): The contents.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    entries: list[dict[str, str | int]] = contents if isinstance(contents, list) else [contents]
+    return strong_etag("contents", *(str(value) for entry in entries for value in entry.values()))
+
+
+def is_not_modified(request: WSGIRequest | ASGIRequest, etag: str) -> bool:
+    """Return True if the If-None-Match header of the request matches the ETag.
+
+    If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+
+    Args:
+        request (WSGIRequest | ASGIRequest): The request.
+        etag (str): The quoted ETag of the current representation.
+
+    Returns:
+        bool: True if the client already has the representation.
+    """
+    header: str | None = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags: list[str] = parse_etags(header)
+    return "*" in etags or etag in (tag.removeprefix("W/") for tag in etags)
+
+
+def not_modified_response(etag: str, cache_control: str) -> HttpResponse:
+    """Return a 304 Not Modified with the validators the full response would have had.
+
+    Args:
+        etag (str): The quoted ETag.
+        cache_control (str): The Cache-Control of the full response.
+
+    Returns:
+        HttpResponse: The empty response.
+    """
+    response = HttpResponse(status=304)
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def set_validators(response: HttpResponseBase, etag: str) -> HttpResponseBase:
+    """Add the ETag and the Cache-Control of a listing to a response.
+
+    Args:
+        response (HttpResponseBase): The response.
+        etag (str): The quoted ETag.
+
+    Returns:
+        HttpResponseBase: The response.
+    """
+    response["ETag"] = etag
+    response["Cache-Control"] = LISTING_CACHE_CONTROL
+    return response
+
+
+def encode_ndjson(entries: list[dict[str, Any]]) -> bytes:
+    """Serialize entries as newline-delimited JSON.
+
+    Args:
+        entries (list[dict[str, Any]]): The entries to serialize.
+
+    Returns:
+        bytes: One compact JSON object per line.
+    """
+    return b"".join(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE) for entry in entries)
+
+
+def iter_ndjson(entries: Iterable[dict[str, Any]]) -> Iterator[bytes]:
+    """Serialize entries as newline-delimited JSON, a batch of lines at a time.
+
+    Args:
+        entries (Iterable[dict[str, Any]]): The entries to serialize.
+
+    Yields:
+        bytes: Chunks of NDJSON lines.
+    """
+    iterator: Iterator[dict[str, Any]] = iter(entries)
+    while batch := list(islice(iterator, STREAM_BATCH_SIZE)):
+        yield encode_ndjson(batch)
+
+
+async def aiter_ndjson(entries: Iterable[dict[str, Any]] | AsyncIterable[dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Async version of iter_ndjson, so ASGI servers can stream without a thread.
+
+    Args:
+        entries (Iterable[dict[str, Any]] | AsyncIterable[dict[str, Any]]): The entries to serialize.
+
+    Yields:
+        bytes: Chunks of NDJSON lines.
+    """
+    if not isinstance(entries, AsyncIterable):
+        for chunk in iter_ndjson(entries):
+            yield chunk
+        return
+
+    batch: list[dict[str, Any]] = []
+    async for entry in entries:
+        batch.append(entry)
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield encode_ndjson(batch)
+            batch = []
+    if batch:
+        yield encode_ndjson(batch)
+
+
+def ndjson_response(entries: Iterable[dict[str, Any]]) -> StreamingHttpResponse:
+    """Stream entries to the client as they are produced instead of building the whole body first.
+
+    Args:
+        entries (Iterable[dict[str, Any]]): The entries to stream.
+
+    Returns:
+        StreamingHttpResponse: The NDJSON response.
+    """
+    return StreamingHttpResponse(iter_ndjson(entries), content_type=NDJSON_CONTENT_TYPE)
+
+
+def async_ndjson_response(entries: Iterable[dict[str, Any]] | AsyncIterable[dict[str, Any]]) -> StreamingHttpResponse:
+    """Like ndjson_response, but with an async iterator for async views.
+
+    Args:
+        entries (Iterable[dict[str, Any]] | AsyncIterable[dict[str, Any]]): The entries to stream.
+
+    Returns:
+        StreamingHttpResponse: The NDJSON response.
+    """
+    return StreamingHttpResponse(aiter_ndjson(entries), content_type=NDJSON_CONTENT_TYPE)
+
+
+def encode_cursor(path: str) -> str:
+    """Encode the path of the last entry of a page as an opaque cursor.
+
+    Args:
+        path (str): The path of the last entry on the page.
+
+    Returns:
+        str: The cursor for the next page.
+    """
+    return base64.urlsafe_b64encode(path.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a cursor made by encode_cursor.
+
+    Args:
+        cursor (str): The cursor.
+
+    Raises:
+        HttpError: If the cursor is not valid.
+
+    Returns:
+        str: The path of the last entry of the previous page.
+    """
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise HttpError(400, "Invalid cursor") from e
 
 
 @github_router.get("repos/{username}/{repo_name}/contents/")
 def api_get_repo_contents(
-    request: WSGIRequest,  # noqa: ARG001
+    request: WSGIRequest,
+    response: HttpResponse,
     username: str,
     repo_name: str,
-) -> list[dict[str, str | int]] | dict[str, str | int]:
+    stream: bool = False,  # noqa: FBT001, FBT002
+) -> list[dict[str, str | int]] | dict[str, str | int] | HttpResponseBase:
     """Get all of the contents of the root directory of the repository.
 
+    The contents are served from the snapshot in the database, and refreshed in the background when it is stale.
+    The JSON list has an ETag, and a request with a matching If-None-Match gets a 304 without a body.
+
     Args:
         request (WSGIRequest): The request object.
+        response (HttpResponse): The response the returned contents are rendered into, for the headers.
         username (str): The username of the repository owner.
         repo_name (str): The name of the repository.
+        stream (bool): Stream the entries as NDJSON, one object per line, instead of a JSON list.
 
     Returns:
         list[dict[str, str]]: The contents of the root directory
     """
     logger.info("Getting contents of %s/%s", username, repo_name)
-    contents: list[ContentFile] | ContentFile = get_repo_contents(username, repo_name)
+    if stream:
+        return ndjson_response(iter_snapshot_contents(username, repo_name))
+    contents: list[dict[str, str | int]] | dict[str, str | int] = get_snapshot_contents(username, repo_name)
+    return contents_response(request, response, contents)
+
+
+def check_batch_size(repositories: list[str]) -> None:
+    """Refuse batches larger than MAX_BATCH_REPOSITORIES.
+
+    Raises:
+        HttpError: If the batch is too large.
+    """
+    if len(repositories) > MAX_BATCH_REPOSITORIES:
+        raise HttpError(400, f"At most {MAX_BATCH_REPOSITORIES} repositories can be fetched at once")
+
+
+@github_router.get("batch/contents/")
+def api_get_batch_contents(
+    request: WSGIRequest,  # noqa: ARG001
+    repo: list[str] = Query(...),  # noqa: B008
+) -> StreamingHttpResponse:
+    """Get the contents of the root directories of many repositories with one request.
+
+    The repositories are fetched concurrently by a bounded pool of workers, and each result is streamed as an
+    NDJSON line as soon as it is ready, so one slow repository does not hold back the others. A repository
+    that fails gets a line with its status and error instead of failing the batch.
+
+    Args:
+        request (WSGIRequest): The request object.
+        repo (list[str]): The repositories as username/repo, one ?repo= per repository.
+
+    Returns:
+        StreamingHttpResponse: One {"repo", "status", "contents"} or {"repo", "status", "error"} line per repository.
+    """
+    check_batch_size(repo)
+    logger.info("Getting contents of %s repositories", len(repo))
+    # Wait for the first result here, so every fetch starts in the context of this request and the calls made
+    # until then are in X-Upstream-Calls. The client could not have read anything sooner.
+    results: Iterator[dict[str, Any]] = iter_batch_contents(repo)
+    first: dict[str, Any] | None = next(results, None)
+    return StreamingHttpResponse(
+        (encode_ndjson([result]) for result in chain([] if first is None else [first], results)),
+        content_type=NDJSON_CONTENT_TYPE,
+    )
+
+
+@router.get("metrics/")
+def api_get_metrics(request: WSGIRequest) -> HttpResponse:  # noqa: ARG001
+    """Get the request latencies, upstream timings, cache counters and rate limit in the Prometheus text format.
+
+    Args:
+        request (WSGIRequest): The request object.
+
+    Returns:
+        HttpResponse: The metrics, for Prometheus to scrape.
+    """
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 
-    if isinstance(contents, list):
-        return [convert_content_file_to_json(content_file) for content_file in contents]
-    return convert_content_file_to_json(contents)
+@github_router.get("cache/stats/")
+def api_get_cache_stats(request: WSGIRequest) -> dict[str, int | float]:  # noqa: ARG001
+    """Get the hit, miss and eviction counters of the GitHub contents cache.
+
+    Args:
+        request (WSGIRequest): The request object.
+
+    Returns:
+        dict[str, int | float]: The cache counters.
+    """
+    return repo_contents_cache.stats()
+
+
+@github_router.get("rate-limit/")
+def api_get_rate_limit(request: WSGIRequest) -> dict[str, int | float | None]:  # noqa: ARG001
+    """Get the GitHub rate limit budget as seen by the upstream scheduler.
+
+    Args:
+        request (WSGIRequest): The request object.
+
+    Returns:
+        dict[str, int | float | None]: The limit, remaining requests, reset time and current wait.
+    """
+    return sites_github.github_client.scheduler.budget()
+
+
+@github_router.get("repos/{username}/{repo_name}/tree/")
+def api_get_repo_tree(  # noqa: PLR0913, PLR0917
+    request: WSGIRequest,
+    response: HttpResponse,
+    username: str,
+    repo_name: str,
+    cursor: str | None = None,
+    limit: int = 1000,
+    stream: bool = False,  # noqa: FBT001, FBT002
+) -> dict[str, Any] | StreamingHttpResponse:
+    """Get every file and directory of the repository, one page at a time or as one NDJSON stream.
+
+    The whole tree is fetched from GitHub with one request and cached, so paging through it is free.
+    The cursor is the path of the last entry of the previous page, which keeps pages stable even if the tree changes.
+    The ETag is derived from the tree SHA, so a request with a matching If-None-Match gets a 304 without a body.
+
+    Args:
+        request (WSGIRequest): The request object.
+        response (HttpResponse): The response a returned page is rendered into, for the headers.
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+        cursor (str | None): The next_cursor of the previous page.
+        limit (int): How many entries to return.
+        stream (bool): Stream every entry as NDJSON, one object per line, ignoring cursor and limit.
+
+    Returns:
+        dict[str, Any]: The entries of the page and the cursor for the next page.
+    """
+    logger.info("Getting tree of %s/%s", username, repo_name)
+    tree: dict[str, Any] = get_repo_tree(username, repo_name)
+    return tree_response(request, response, tree, cursor, limit, stream=stream)
+
+
+@github_router.get("repos/{username}/{repo_name}/blobs/{sha}/")
+def api_get_blob(
+    request: WSGIRequest,
+    username: str,
+    repo_name: str,
+    sha: str,
+) -> HttpResponseBase:
+    """Get the content of a file by its git blob SHA, the sha of a file entry of the tree.
+
+    The blob is fetched from GitHub the first time any repository asks for it and served from disk after that.
+    Range requests are answered with 206 Partial Content, so large files can be read a piece at a time.
+
+    Args:
+        request (WSGIRequest): The request object.
+        username (str): The username of the owner of a repository that has the blob.
+        repo_name (str): The name of the repository.
+        sha (str): The git blob SHA.
+
+    Raises:
+        HttpError: If the SHA is not valid or the repository does not have the blob.
+
+    Returns:
+        HttpResponseBase: The content, or the requested range of it.
+    """
+    if not BLOB_SHA_RE.fullmatch(sha):
+        raise HttpError(400, "Invalid blob SHA")
+
+    etag: str = f'"{sha}"'
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, BLOB_CACHE_CONTROL)
+
+    path: Path | None = get_blob(username, repo_name, sha)
+    if path is None:
+        raise HttpError(404, "Blob not found")
+
+    # A range is only valid for the representation the client already has part of.
+    range_header: str | None = request.headers.get("Range")
+    if request.headers.get("If-Range", etag) != etag:
+        range_header = None
+    return blob_response(path, etag, range_header)
+
+
+def blob_response(path: Path, etag: str, range_header: str | None) -> HttpResponseBase:
+    """Serve a stored blob, or one range of it.
+
+    Whole blobs are sent with FileResponse, which servers with wsgi.file_wrapper send with sendfile. Ranges are
+    read through a memory map, so only the pages of the range are touched.
+
+    Args:
+        path (Path): Where the blob is stored.
+        etag (str): The ETag of the blob.
+        range_header (str | None): The Range header of the request.
+
+    Returns:
+        HttpResponseBase: The response.
+    """
+    size: int = path.stat().st_size
+    try:
+        byte_range: tuple[int, int] | None = parse_range(range_header, size)
+    except RangeNotSatisfiableError:
+        unsatisfiable = HttpResponse(status=416)
+        unsatisfiable["Content-Range"] = f"bytes */{size}"
+        return unsatisfiable
+
+    response: HttpResponseBase
+    if byte_range is None:
+        response = FileResponse(path.open("rb"), content_type=BLOB_CONTENT_TYPE)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(BlobReader(path, first, last + 1), status=206, content_type=BLOB_CONTENT_TYPE)
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = str(last - first + 1)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Cache-Control"] = BLOB_CACHE_CONTROL
+    return response
+
+
+def contents_response(
+    request: WSGIRequest | ASGIRequest,
+    response: HttpResponse,
+    contents: list[dict[str, str | int]] | dict[str, str | int],
+) -> list[dict[str, str | int]] | dict[str, str | int] | HttpResponse:
+    """Return the contents with their validators, or a 304 if the client already has them.
+
+    Args:
+        request (WSGIRequest | ASGIRequest): The request.
+        response (HttpResponse): The response the contents are rendered into.
+        contents (list[dict[str, str | int]] | dict[str, str | int]): The contents.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int] | HttpResponse: The contents, or the 304.
+    """
+    etag: str = contents_etag(contents)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, LISTING_CACHE_CONTROL)
+    set_validators(response, etag)
+    return contents
+
+
+def tree_response(  # noqa: PLR0913
+    request: WSGIRequest | ASGIRequest,
+    response: HttpResponse,
+    tree: dict[str, Any],
+    cursor: str | None,
+    limit: int,
+    *,
+    stream: bool,
+    streaming: Callable[[list[dict[str, Any]]], StreamingHttpResponse] = ndjson_response,
+) -> dict[str, Any] | HttpResponseBase:
+    """Return a page or the stream of a tree with its validators, or a 304 if the client already has it.
+
+    Args:
+        request (WSGIRequest | ASGIRequest): The request.
+        response (HttpResponse): The response a page is rendered into.
+        tree (dict[str, Any]): The tree as returned by get_repo_tree.
+        cursor (str | None): The next_cursor of the previous page.
+        limit (int): How many entries to return.
+        stream (bool): Stream every entry instead of returning a page.
+        streaming (Callable[[list[dict[str, Any]]], StreamingHttpResponse]): Makes the streaming response.
+
+    Returns:
+        dict[str, Any] | HttpResponseBase: The page, the stream or the 304.
+    """
+    if not tree["sha"]:  # The repository does not exist or is empty, so there is nothing to validate
+        return streaming(tree["entries"]) if stream else paginate_tree(tree, cursor, limit)
+
+    etag: str = strong_etag("tree", tree["sha"], "stream" if stream else f"{cursor or ''}:{limit}")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, LISTING_CACHE_CONTROL)
+    if stream:
+        return set_validators(streaming(tree["entries"]), etag)
+    set_validators(response, etag)
+    return paginate_tree(tree, cursor, limit)
+
+
+def paginate_tree(tree: dict[str, Any], cursor: str | None, limit: int) -> dict[str, Any]:
+    """Return one page of a tree.
+
+    Args:
+        tree (dict[str, Any]): The tree as returned by get_repo_tree.
+        cursor (str | None): The next_cursor of the previous page.
+        limit (int): How many entries to return.
+
+    Returns:
+        dict[str, Any]: The entries of the page and the cursor for the next page.
+    """
+    entries: list[dict[str, str | int]] = tree["entries"]
+    limit = max(1, min(limit, MAX_TREE_PAGE_SIZE))
+
+    start: int = 0
+    if cursor:
+        start = bisect.bisect_right(entries, decode_cursor(cursor), key=lambda entry: entry["path"])
+
+    page: list[dict[str, str | int]] = entries[start : start + limit]
+    has_more: bool = start + limit < len(entries)
+    return {
+        "sha": tree["sha"],
+        "truncated": tree["truncated"],
+        "entries": page,
+        "next_cursor": encode_cursor(str(page[-1]["path"])) if has_more and page else None,
+    }
+
+
+@async_github_router.get("repos/{username}/{repo_name}/contents/")
+async def api_aget_repo_contents(
+    request: ASGIRequest,
+    response: HttpResponse,
+    username: str,
+    repo_name: str,
+    stream: bool = False,  # noqa: FBT001, FBT002
+) -> list[dict[str, str | int]] | dict[str, str | int] | HttpResponseBase:
+    """Async version of api_get_repo_contents, for ASGI servers.
+
+    Concurrent requests for a repository that is not in the database share one upstream request.
+
+    Args:
+        request (ASGIRequest): The request object.
+        response (HttpResponse): The response the returned contents are rendered into, for the headers.
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+        stream (bool): Stream the entries as NDJSON, one object per line, instead of a JSON list.
+
+    Returns:
+        list[dict[str, str]]: The contents of the root directory
+    """
+    logger.info("Getting contents of %s/%s", username, repo_name)
+    if stream:
+        return async_ndjson_response(aiter_snapshot_contents(username, repo_name))
+    contents: list[dict[str, str | int]] | dict[str, str | int] = await aget_snapshot_contents(username, repo_name)
+    return contents_response(request, response, contents)
+
+
+@async_github_router.get("batch/contents/")
+async def api_aget_batch_contents(
+    request: ASGIRequest,  # noqa: ARG001
+    repo: list[str] = Query(...),  # noqa: B008
+) -> StreamingHttpResponse:
+    """Async version of api_get_batch_contents, for ASGI servers.
+
+    Args:
+        request (ASGIRequest): The request object.
+        repo (list[str]): The repositories as username/repo, one ?repo= per repository.
+
+    Returns:
+        StreamingHttpResponse: One {"repo", "status", "contents"} or {"repo", "status", "error"} line per repository.
+    """
+    check_batch_size(repo)
+    logger.info("Getting contents of %s repositories", len(repo))
+
+    results: AsyncIterator[dict[str, Any]] = aiter_batch_contents(repo)
+    first: dict[str, Any] | None = await anext(results, None)  # Like the sync view, see there
+
+    async def lines() -> AsyncIterator[bytes]:
+        if first is not None:
+            yield encode_ndjson([first])
+        async for result in results:
+            yield encode_ndjson([result])
+
+    return StreamingHttpResponse(lines(), content_type=NDJSON_CONTENT_TYPE)
+
+
+@async_github_router.get("repos/{username}/{repo_name}/tree/")
+async def api_aget_repo_tree(  # noqa: PLR0913, PLR0917
+    request: ASGIRequest,
+    response: HttpResponse,
+    username: str,
+    repo_name: str,
+    cursor: str | None = None,
+    limit: int = 1000,
+    stream: bool = False,  # noqa: FBT001, FBT002
+) -> dict[str, Any] | StreamingHttpResponse:
+    """Async version of api_get_repo_tree, for ASGI servers.
+
+    Concurrent requests for the same repository share one upstream request.
+
+    Args:
+        request (ASGIRequest): The request object.
+        response (HttpResponse): The response a returned page is rendered into, for the headers.
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+        cursor (str | None): The next_cursor of the previous page.
+        limit (int): How many entries to return.
+        stream (bool): Stream every entry as NDJSON, one object per line, ignoring cursor and limit.
+
+    Returns:
+        dict[str, Any]: The entries of the page and the cursor for the next page.
+    """
+    logger.info("Getting tree of %s/%s", username, repo_name)
+    tree: dict[str, Any] = await aget_repo_tree(username, repo_name)
+    return tree_response(request, response, tree, cursor, limit, stream=stream, streaming=async_ndjson_response)
@@ -1,6 +1,20 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, Any
+
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from core.metrics import time_query
+
+if TYPE_CHECKING:
+    from django.db.backends.base.base import BaseDatabaseWrapper
+
+
+def install_query_timer(sender: Any, connection: BaseDatabaseWrapper, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Time the queries of every new database connection for the metrics of the request that runs them."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
 
 
 class CoreConfig(AppConfig):
@@ -8,3 +22,7 @@ class CoreConfig(AppConfig):
 
     default_auto_field: str = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self) -> None:
+        """Connect the query timer."""
+        connection_created.connect(install_query_timer, dispatch_uid="core.install_query_timer")
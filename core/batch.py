@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.db import close_old_connections
+from github import GithubException
+
+from core.github_client import RateLimitExhaustedError
+from core.snapshots import aget_snapshot_contents, get_snapshot_contents
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator
+    from concurrent.futures import Future
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Shared by every batch request, so a burst of batches can not open more than this many upstream requests.
+batch_executor = ThreadPoolExecutor(max_workers=settings.GITHUB_BATCH_WORKERS, thread_name_prefix="batch")
+
+
+def parse_repository(full_name: str) -> tuple[str, str]:
+    """Split owner/name into the username of the owner and the name of the repository.
+
+    Args:
+        full_name (str): The repository, like TheLovinator1/browser.
+
+    Raises:
+        ValueError: If the name is not owner/name.
+
+    Returns:
+        tuple[str, str]: The username and the repository name.
+    """
+    username, _, repo_name = full_name.partition("/")
+    if not username or not repo_name or "/" in repo_name:
+        msg: str = f"Invalid repository {full_name!r}, expected format: username/repo"
+        raise ValueError(msg)
+    return username, repo_name
+
+
+def batch_error(full_name: str, error: Exception) -> dict[str, Any]:
+    """Describe why the contents of one repository of a batch could not be fetched.
+
+    Args:
+        full_name (str): The repository.
+        error (Exception): What went wrong.
+
+    Returns:
+        dict[str, Any]: The repository, an HTTP status like the single-repository endpoint would return and a message.
+    """
+    if isinstance(error, ValueError):
+        return {"repo": full_name, "status": HTTPStatus.BAD_REQUEST, "error": str(error)}
+    if isinstance(error, RateLimitExhaustedError):
+        return {
+            "repo": full_name,
+            "status": HTTPStatus.SERVICE_UNAVAILABLE,
+            "error": str(error),
+            "retry_after": error.retry_after,
+        }
+    if isinstance(error, GithubException):
+        return {"repo": full_name, "status": error.status, "error": str(error.data)}
+
+    logger.error("Getting contents of %s failed", full_name, exc_info=error)
+    return {"repo": full_name, "status": HTTPStatus.INTERNAL_SERVER_ERROR, "error": "Internal server error"}
+
+
+def get_batch_result(full_name: str) -> dict[str, Any]:
+    """Get the contents of one repository of a batch, in a worker thread.
+
+    Args:
+        full_name (str): The repository.
+
+    Returns:
+        dict[str, Any]: The repository and its contents, or the error.
+    """
+    try:
+        return {
+            "repo": full_name,
+            "status": HTTPStatus.OK,
+            "contents": get_snapshot_contents(*parse_repository(full_name)),
+        }
+    except Exception as e:  # noqa: BLE001
+        return batch_error(full_name, e)
+    finally:
+        close_old_connections()
+
+
+def iter_batch_contents(repositories: list[str]) -> Iterator[dict[str, Any]]:
+    """Get the contents of many repositories at once, yielding each as soon as it is ready.
+
+    Every repository goes through the same snapshots, caches and rate limit scheduler as a single request, on
+    the shared batch_executor.
+
+    Args:
+        repositories (list[str]): The repositories as owner/name. Repeated names are fetched once.
+
+    Yields:
+        dict[str, Any]: The result of a repository, in the order they finish.
+    """
+    # Each worker runs in a copy of the caller's context, so its upstream calls and queries count against the
+    # API request being served.
+    futures: list[Future[dict[str, Any]]] = [
+        batch_executor.submit(contextvars.copy_context().run, get_batch_result, full_name)
+        for full_name in dict.fromkeys(repositories)
+    ]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # The client went away, so do not start the repositories that are still queued.
+        for future in futures:
+            future.cancel()
+
+
+async def aiter_batch_contents(
+    repositories: list[str],
+    concurrency: int = settings.GITHUB_BATCH_WORKERS,
+) -> AsyncIterator[dict[str, Any]]:
+    """Async version of iter_batch_contents, with at most concurrency repositories in flight per batch.
+
+    Args:
+        repositories (list[str]): The repositories as owner/name. Repeated names are fetched once.
+        concurrency (int): How many repositories are fetched at the same time.
+
+    Yields:
+        dict[str, Any]: The result of a repository, in the order they finish.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get_result(full_name: str) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                username, repo_name = parse_repository(full_name)
+                contents: list[dict[str, str | int]] | dict[str, str | int] = await aget_snapshot_contents(
+                    username, repo_name
+                )
+            except Exception as e:  # noqa: BLE001
+                return batch_error(full_name, e)
+            return {"repo": full_name, "status": HTTPStatus.OK, "contents": contents}
+
+    tasks: list[asyncio.Task[dict[str, Any]]] = [
+        asyncio.create_task(get_result(full_name)) for full_name in dict.fromkeys(repositories)
+    ]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Git object IDs are SHA-1, or SHA-256 in repositories that use the newer object format.
+BLOB_SHA_RE: re.Pattern[str] = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+# How many bytes of a blob are handed to the server at a time.
+BLOB_CHUNK_SIZE = 256 * 1024
+
+RANGE_RE: re.Pattern[str] = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class RangeNotSatisfiableError(Exception):
+    """The requested byte range starts after the end of the blob."""
+
+
+def git_blob_sha(data: bytes, algorithm: str = "sha1") -> str:
+    """Return the object ID git gives a file with this content.
+
+    Args:
+        data (bytes): The content of the file.
+        algorithm (str): sha1, or sha256 for repositories with the SHA-256 object format.
+
+    Returns:
+        str: The hex object ID.
+    """
+    digest = hashlib.new(algorithm, f"blob {len(data)}\0".encode(), usedforsecurity=False)
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a Range header into the first and last byte to send.
+
+    Only single ranges are supported. Anything else, including a header we do not understand, means the whole
+    blob is sent, which RFC 9110 allows.
+
+    Args:
+        header (str | None): The value of the Range header.
+        size (int): The size of the blob.
+
+    Raises:
+        RangeNotSatisfiableError: If the range starts after the end of the blob.
+
+    Returns:
+        tuple[int, int] | None: The first and last byte, inclusive, or None to send everything.
+    """
+    match: re.Match[str] | None = RANGE_RE.fullmatch(header.strip()) if header else None
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.groups()
+    if not first:  # bytes=-500 is the last 500 bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiableError
+        return max(size - int(last), 0), size - 1
+    if int(first) >= size:
+        raise RangeNotSatisfiableError
+    if last and int(last) < int(first):
+        return None
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+
+class BlobReader:
+    """An open blob, read through a memory map so ranges cost no more than the pages they touch.
+
+    Iterating yields the selected range in chunks. The file is closed when the iteration ends or when
+    close() is called, which Django does for streaming responses once they are sent.
+    """
+
+    def __init__(self, path: Path, start: int = 0, end: int | None = None) -> None:
+        """Open and map a stored blob.
+
+        Args:
+            path (Path): Where the blob is stored.
+            start (int): The first byte to read.
+            end (int | None): One past the last byte to read, or None for the end of the blob.
+        """
+        self.file = path.open("rb")
+        self.size: int = os.fstat(self.file.fileno()).st_size
+        # Empty files can not be mapped.
+        self.map: mmap.mmap | None = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.start: int = start
+        self.end: int = self.size if end is None else min(end, self.size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the selected range a chunk at a time.
+
+        Yields:
+            bytes: The next chunk.
+        """
+        try:
+            for offset in range(self.start, self.end, BLOB_CHUNK_SIZE):
+                if self.map is None:
+                    return
+                yield self.map[offset : min(offset + BLOB_CHUNK_SIZE, self.end)]
+        finally:
+            self.close()
+
+    def read(self) -> bytes:
+        """Return the whole selected range.
+
+        Returns:
+            bytes: The bytes from start to end.
+        """
+        return self.map[self.start : self.end] if self.map is not None else b""
+
+    def close(self) -> None:
+        """Unmap and close the file."""
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+class BlobStore:
+    """Content-addressed storage of file contents, keyed by their git blob SHA.
+
+    A file that is identical in many repositories or branches has the same SHA everywhere, so it is fetched
+    and stored once. Blobs never change once written, so readers need no locks, and writes go to a temporary
+    file that is renamed into place.
+    """
+
+    def __init__(self, root: Path) -> None:
+        """Initialize the store.
+
+        Args:
+            root (Path): The directory the blobs are stored in.
+        """
+        self.root: Path = root
+        self._lock = threading.Lock()
+        self.writes: int = 0
+        self.duplicates: int = 0
+
+    def path(self, sha: str) -> Path:
+        """Return where a blob is stored, fanned out over 256 directories like .git/objects.
+
+        Args:
+            sha (str): The git blob SHA.
+
+        Raises:
+            ValueError: If the SHA is not a hex object ID.
+
+        Returns:
+            Path: The path of the blob, which may not exist.
+        """
+        if not BLOB_SHA_RE.fullmatch(sha):
+            msg: str = f"Invalid blob SHA {sha!r}"
+            raise ValueError(msg)
+        return self.root / sha[:2] / sha[2:]
+
+    def __contains__(self, sha: str) -> bool:
+        """Return True if the blob is stored."""
+        return self.path(sha).is_file()
+
+    def put(self, sha: str, data: bytes) -> Path:
+        """Store a blob unless it is already stored.
+
+        Args:
+            sha (str): The git blob SHA the data should have.
+            data (bytes): The content.
+
+        Raises:
+            ValueError: If the data does not hash to the SHA.
+
+        Returns:
+            Path: Where the blob is stored.
+        """
+        path: Path = self.path(sha)
+        if path.is_file():
+            with self._lock:
+                self.duplicates += 1
+            return path
+
+        actual: str = git_blob_sha(data, "sha1" if len(sha) == 40 else "sha256")  # noqa: PLR2004
+        if actual != sha:
+            msg: str = f"Blob content hashes to {actual}, not {sha}"
+            raise ValueError(msg)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".tmp-", delete=False) as temporary_file:
+            temporary_file.write(data)
+        Path(temporary_file.name).replace(path)
+        with self._lock:
+            self.writes += 1
+        logger.debug("Stored blob %s (%s bytes)", sha, len(data))
+        return path
+
+    def stats(self) -> dict[str, int]:
+        """Return how many blobs were written and how many writes were skipped because the blob was stored.
+
+        Returns:
+            dict[str, int]: The counters.
+        """
+        with self._lock:
+            return {"writes": self.writes, "duplicates": self.duplicates}
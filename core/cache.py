@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    """A cached value together with its validator and expiry time."""
+
+    value: Any
+    etag: str | None
+    expires_at: float
+
+    def is_fresh(self, now: float) -> bool:
+        """Return True if the entry has not expired yet."""
+        return now < self.expires_at
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache where every entry has a time to live.
+
+    Expired entries are kept (until evicted) so that callers can revalidate them with their ETag
+    instead of fetching everything again.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the cache.
+
+        Args:
+            maxsize (int): The maximum number of entries before the least recently used one is evicted.
+            ttl (float): How many seconds an entry is fresh.
+            clock (Callable[[], float]): The clock used for expiry, replaceable in tests.
+        """
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.clock: Callable[[], float] = clock
+
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.revalidations: int = 0
+
+    def __len__(self) -> int:
+        """Return the number of entries in the cache."""
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> CacheEntry | None:
+        """Get an entry, fresh or expired.
+
+        A fresh entry counts as a hit. An expired or missing entry counts as a miss.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            CacheEntry | None: The entry, or None if there is nothing cached for the key.
+        """
+        with self._lock:
+            entry: CacheEntry | None = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.is_fresh(self.clock()):
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def set(self, key: Hashable, value: Any, etag: str | None = None) -> None:  # noqa: ANN401
+        """Store a value and evict the least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store. Should be plain data, not live API objects.
+            etag (str | None): The ETag the value was served with, used for revalidation.
+        """
+        with self._lock:
+            self._entries[key] = CacheEntry(value=value, etag=etag, expires_at=self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logger.debug("Evicted %s from cache", evicted_key)
+
+    def touch(self, key: Hashable) -> None:
+        """Mark an expired entry as fresh again after the upstream confirmed it is unchanged.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        with self._lock:
+            entry: CacheEntry | None = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = self.clock() + self.ttl
+                self.revalidations += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Remove an entry if it exists."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.revalidations = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """Return the counters of the cache.
+
+        Returns:
+            dict[str, int | float]: The size, limits and hit/miss/eviction counters.
+        """
+        with self._lock:
+            lookups: int = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "revalidations": self.revalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import weakref
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+import httpx
+from github import Github
+from urllib3.util.retry import Retry
+
+from core.metrics import upstream_request_duration
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+    from github.Auth import Auth
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Transient server errors are retried by urllib3. Rate limits are handled by the RateLimitScheduler instead,
+# because PyGithub's default retry would park a worker thread until the limit resets.
+TRANSIENT_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT),
+    allowed_methods=frozenset({"GET", "HEAD"}),
+)
+
+RATE_LIMITED_STATUSES: frozenset[int] = frozenset({HTTPStatus.FORBIDDEN, HTTPStatus.TOO_MANY_REQUESTS})
+
+
+class UpstreamCallCounter:
+    """Counts the requests sent to GitHub while one API request is served."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self._lock = threading.Lock()
+        self.calls: int = 0
+
+    def add(self) -> None:
+        """Count one upstream request."""
+        with self._lock:
+            self.calls += 1
+
+
+# The counter of the API request being served, set by core.middleware.upstream_call_counter_middleware.
+upstream_call_counter: contextvars.ContextVar[UpstreamCallCounter | None] = contextvars.ContextVar(
+    "upstream_call_counter",
+    default=None,
+)
+
+
+def count_upstream_call() -> None:
+    """Count an upstream request against the API request being served, if any."""
+    counter: UpstreamCallCounter | None = upstream_call_counter.get()
+    if counter is not None:
+        counter.add()
+
+
+class RateLimitExhaustedError(Exception):
+    """Raised when the GitHub rate limit will not reset soon enough to wait for it."""
+
+    def __init__(self, retry_after: float) -> None:
+        """Initialize the error.
+
+        Args:
+            retry_after (float): Seconds until GitHub accepts requests again.
+        """
+        super().__init__(f"GitHub rate limit exhausted, retry in {retry_after:.0f} seconds")
+        self.retry_after: float = retry_after
+
+
+class RateLimitScheduler:
+    """Keep track of the GitHub rate limit and hold back requests before we run out.
+
+    The budget is read from the X-RateLimit-* headers of every response. When fewer than `reserve`
+    requests are left, or GitHub asked us to back off with Retry-After, callers wait until the limit
+    resets. If that is more than `max_wait` seconds away they get a RateLimitExhaustedError instead.
+    """
+
+    def __init__(
+        self,
+        reserve: int,
+        max_wait: float,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            reserve (int): How many requests to keep unused, so we never actually hit the limit.
+            max_wait (float): The longest a request is queued before giving up, in seconds.
+            clock (Callable[[], float]): Returns the current Unix time, replaceable in tests.
+            sleep (Callable[[float], None]): Sleeps for the given number of seconds, replaceable in tests.
+        """
+        self.reserve: int = reserve
+        self.max_wait: float = max_wait
+        self.clock: Callable[[], float] = clock
+        self.sleep: Callable[[float], None] = sleep
+
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at: float | None = None
+        self.blocked_until: float = 0.0
+        self.waits: int = 0
+        self._lock = threading.Lock()
+
+    def update(self, headers: Mapping[str, Any], status: int = HTTPStatus.OK) -> None:
+        """Update the budget from the headers of a GitHub response.
+
+        Args:
+            headers (Mapping[str, Any]): The response headers, with lowercase names.
+            status (int): The response status.
+        """
+        reset_at: float | None = float(headers["x-ratelimit-reset"]) if "x-ratelimit-reset" in headers else None
+        with self._lock:
+            # Concurrent responses can arrive out of order. Within a window the remaining budget only goes down,
+            # so a larger number is from an older response and is ignored, as is a response from an earlier window.
+            new_window: bool = reset_at is not None and (self.reset_at is None or reset_at > self.reset_at)
+            stale_window: bool = reset_at is not None and self.reset_at is not None and reset_at < self.reset_at
+            if "x-ratelimit-remaining" in headers and not stale_window:
+                remaining: int = int(float(headers["x-ratelimit-remaining"]))
+                if new_window or self.remaining is None or remaining < self.remaining:
+                    self.remaining = remaining
+            if "x-ratelimit-limit" in headers:
+                self.limit = int(float(headers["x-ratelimit-limit"]))
+            if new_window:
+                self.reset_at = reset_at
+
+            if status in RATE_LIMITED_STATUSES:
+                if "retry-after" in headers:
+                    self.blocked_until = max(self.blocked_until, self.clock() + float(headers["retry-after"]))
+                elif self.remaining == 0 and self.reset_at is not None:
+                    self.blocked_until = max(self.blocked_until, self.reset_at)
+
+    def wait_time(self) -> float:
+        """Return how many seconds the next request has to wait."""
+        with self._lock:
+            now: float = self.clock()
+            wait: float = max(0.0, self.blocked_until - now)
+            if self.remaining is not None and self.remaining <= self.reserve and self.reset_at is not None:
+                wait = max(wait, self.reset_at - now)
+            return wait
+
+    def claim(self) -> float:
+        """Claim a request from the budget.
+
+        Raises:
+            RateLimitExhaustedError: If the wait would be longer than max_wait.
+
+        Returns:
+            float: How many seconds to wait before sending the request.
+        """
+        wait: float = self.wait_time()
+        if wait <= 0:
+            with self._lock:
+                if self.remaining is not None:
+                    self.remaining -= 1  # Claim the request until the response tells us the real number
+            return 0.0
+
+        if wait > self.max_wait:
+            raise RateLimitExhaustedError(wait)
+
+        logger.warning("GitHub rate limit almost used up, waiting %.1f seconds", wait)
+        with self._lock:
+            self.waits += 1
+            if self.reset_at is not None and self.clock() + wait >= self.reset_at and self.limit is not None:
+                self.remaining = self.limit  # The window resets while we sleep
+        return wait
+
+    def acquire(self) -> None:
+        """Wait until a request can be sent.
+
+        Raises:
+            RateLimitExhaustedError: If the wait would be longer than max_wait.
+        """
+        wait: float = self.claim()
+        if wait > 0:
+            self.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait until a request can be sent, without blocking the event loop.
+
+        Raises:
+            RateLimitExhaustedError: If the wait would be longer than max_wait.
+        """
+        wait: float = self.claim()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def budget(self) -> dict[str, int | float | None]:
+        """Return the current rate limit budget.
+
+        Returns:
+            dict[str, int | float | None]: The limit, the remaining requests, when it resets and how long requests wait.
+        """
+        wait: float = self.wait_time()
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+                "reserve": self.reserve,
+                "wait": wait,
+                "waits": self.waits,
+            }
+
+
+class GitHubClient:
+    """Long-lived GitHub client shared by every request.
+
+    PyGithub connections are not safe to share between threads, so each worker thread keeps its own
+    Github instance with a keep-alive connection pool, and all of them report to one RateLimitScheduler.
+    """
+
+    def __init__(self, auth: Auth | None, base_url: str, pool_size: int, scheduler: RateLimitScheduler) -> None:
+        """Initialize the client.
+
+        Args:
+            auth (Auth | None): The GitHub credentials.
+            base_url (str): The GitHub API URL, so tests can point it at a local server.
+            pool_size (int): How many connections each thread keeps open.
+            scheduler (RateLimitScheduler): The scheduler that keeps us inside the rate limit.
+        """
+        self.auth: Auth | None = auth
+        self.base_url: str = base_url
+        self.pool_size: int = pool_size
+        self.scheduler: RateLimitScheduler = scheduler
+        self._local = threading.local()
+
+    @property
+    def github(self) -> Github:
+        """The Github instance of the current thread, created on first use."""
+        github: Github | None = getattr(self._local, "github", None)
+        if github is None:
+            github = Github(
+                auth=self.auth,
+                base_url=self.base_url,
+                pool_size=self.pool_size,
+                retry=TRANSIENT_RETRY,
+                seconds_between_requests=None,  # The scheduler decides when to hold back
+            )
+            self._local.github = github
+        return github
+
+    def request_json(
+        self,
+        url: str,
+        parameters: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, Any], str]:
+        """Send a GET request without raising for error statuses.
+
+        If GitHub answers with a rate limit error and a Retry-After we can afford, the request is sent again.
+
+        Args:
+            url (str): The URL, relative to the base URL.
+            parameters (dict[str, Any] | None): The query parameters.
+            headers (dict[str, str] | None): Extra request headers.
+
+        Returns:
+            tuple[int, dict[str, Any], str]: The status, the lowercase response headers and the body.
+        """
+        status, response_headers, body = self._send(url, parameters, headers)
+        if status in RATE_LIMITED_STATUSES and "retry-after" in response_headers:
+            status, response_headers, body = self._send(url, parameters, headers)
+        return status, response_headers, body
+
+    def _send(
+        self,
+        url: str,
+        parameters: dict[str, Any] | None,
+        headers: dict[str, str] | None,
+    ) -> tuple[int, dict[str, Any], str]:
+        self.scheduler.acquire()
+        count_upstream_call()
+        start: float = time.perf_counter()
+        status, response_headers, body = self.github.requester.requestJson("GET", url, parameters, headers)
+        upstream_request_duration.observe(time.perf_counter() - start, str(status))
+        self.scheduler.update(response_headers, status)
+        return status, response_headers, body
+
+    def close(self) -> None:
+        """Close the connections of the current thread."""
+        github: Github | None = getattr(self._local, "github", None)
+        if github is not None:
+            github.close()
+            self._local.github = None
+
+
+class AsyncGitHubClient:
+    """GitHub client for async views, sharing the RateLimitScheduler of the threaded GitHubClient.
+
+    httpx connection pools belong to the event loop that opened them, so there is one AsyncClient per loop.
+    """
+
+    def __init__(self, auth: Auth | None, base_url: str, pool_size: int, scheduler: RateLimitScheduler) -> None:
+        """Initialize the client.
+
+        Args:
+            auth (Auth | None): The GitHub credentials.
+            base_url (str): The GitHub API URL, so tests can point it at a local server.
+            pool_size (int): How many connections each event loop keeps open.
+            scheduler (RateLimitScheduler): The scheduler that keeps us inside the rate limit.
+        """
+        self.auth: Auth | None = auth
+        self.base_url: str = base_url
+        self.pool_size: int = pool_size
+        self.scheduler: RateLimitScheduler = scheduler
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The AsyncClient of the running event loop, created on first use."""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        client: httpx.AsyncClient | None = self._clients.get(loop)
+        if client is None:
+            headers: dict[str, str] = {"Accept": "application/vnd.github+json"}
+            if self.auth is not None:
+                self.auth.authentication(headers)
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                transport=httpx.AsyncHTTPTransport(retries=1),  # Retries failed connects, not responses
+                timeout=15,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def request_json(
+        self,
+        url: str,
+        parameters: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, Any], str]:
+        """Send a GET request without raising for error statuses, like GitHubClient.request_json.
+
+        Args:
+            url (str): The URL, relative to the base URL.
+            parameters (dict[str, Any] | None): The query parameters.
+            headers (dict[str, str] | None): Extra request headers.
+
+        Returns:
+            tuple[int, dict[str, Any], str]: The status, the lowercase response headers and the body.
+        """
+        status, response_headers, body = await self._send(url, parameters, headers)
+        if status in RATE_LIMITED_STATUSES and "retry-after" in response_headers:
+            status, response_headers, body = await self._send(url, parameters, headers)
+        return status, response_headers, body
+
+    async def _send(
+        self,
+        url: str,
+        parameters: dict[str, Any] | None,
+        headers: dict[str, str] | None,
+    ) -> tuple[int, dict[str, Any], str]:
+        await self.scheduler.acquire_async()
+        count_upstream_call()
+        start: float = time.perf_counter()
+        response: httpx.Response = await self.http.get(url, params=parameters, headers=headers)
+        upstream_request_duration.observe(time.perf_counter() - start, str(response.status_code))
+        response_headers: dict[str, Any] = {name.lower(): value for name, value in response.headers.items()}
+        self.scheduler.update(response_headers, response.status_code)
+        return response.status_code, response_headers, response.text
+
+    async def aclose(self) -> None:
+        """Close the connections of the running event loop."""
+        client: httpx.AsyncClient | None = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
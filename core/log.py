@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import collections
+import copy
+import logging
+import queue
+import re
+import threading
+import time
+import weakref
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from core.metrics import CallbackMetric, registry
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# The attributes every LogRecord has. Anything else on a record was passed with extra= and is written as a field.
+RECORD_ATTRIBUTES: frozenset[str] = frozenset(
+    {*logging.makeLogRecord({}).__dict__, "message", "asctime", "taskName"},
+)
+
+# Arguments of these types can not change between the log call and the listener thread formatting the message.
+IMMUTABLE_TYPES: frozenset[type] = frozenset({str, int, float, bool, bytes, type(None)})
+
+REDACTED = "[REDACTED]"
+
+# Shorter secrets can not be told apart from ordinary words, and are not redacted.
+MIN_SECRET_LENGTH = 8
+
+# GitHub tokens, and the credentials of Authorization headers.
+SECRET_PATTERNS: tuple[re.Pattern[str], ...] = (
+    re.compile(r"\b(?:gh[pousr]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,})\b"),
+    re.compile(r"(?i)(?<=\bbearer )[A-Za-z0-9._~+/=-]{16,}|(?<=\btoken )[A-Za-z0-9._~+/=-]{16,}"),
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one line of JSON, with the fields passed with extra= next to the message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the record.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            str: A JSON object without a newline.
+        """
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, tz=UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "file": record.filename,
+            "line": record.lineno,
+        }
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in every so many of the INFO and DEBUG records of high-volume loggers.
+
+    Records are counted per logger and message, so a rare message is not drowned out by a frequent one of the
+    same logger. The first record is always kept. Kept records get a sample_rate attribute, so counts can be
+    scaled back up. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates: dict[str, int]) -> None:
+        """Initialize the filter.
+
+        Args:
+            rates (dict[str, int]): Keep one in this many records, per logger name. Child loggers are sampled
+                like their parent.
+        """
+        super().__init__()
+        self.rates: dict[str, int] = dict(rates)
+        self.counts: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, name: str) -> int:
+        """Return the sample rate of a logger, from the logger or its closest configured parent."""
+        while True:
+            rate: int | None = self.rates.get(name)
+            if rate is not None:
+                return rate
+            if "." not in name:
+                return 1
+            name = name.rpartition(".")[0]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return whether the record is kept."""
+        if record.levelno >= logging.WARNING:
+            return True
+        rate: int = self.rate(record.name)
+        if rate <= 1:
+            return True
+        key: tuple[str, str] = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg).__name__)
+        with self._lock:
+            count: int = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        if count % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+def redact(text: str, secrets: Iterable[str] = ()) -> str:
+    """Replace tokens, credentials and the given secrets in a text.
+
+    Args:
+        text (str): The text.
+        secrets (Iterable[str]): Values that must never be written, like the GitHub token from the settings.
+            Values shorter than MIN_SECRET_LENGTH are ignored.
+
+    Returns:
+        str: The text with every secret replaced by [REDACTED].
+    """
+    for secret in secrets:
+        if len(secret) >= MIN_SECRET_LENGTH and secret in text:
+            text = text.replace(secret, REDACTED)
+    for pattern in SECRET_PATTERNS:
+        text = pattern.sub(REDACTED, text)
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    """Redact secrets from the message, the traceback and the string fields of a record before it is written."""
+
+    def __init__(self, secrets: Iterable[str] = ()) -> None:
+        """Initialize the filter.
+
+        Args:
+            secrets (Iterable[str]): Values that must never be written, on top of anything that looks like a token.
+        """
+        super().__init__()
+        self.secrets: tuple[str, ...] = tuple(secret for secret in secrets if len(secret) >= MIN_SECRET_LENGTH)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Redact the record. It is always kept."""
+        record.msg = redact(record.getMessage(), self.secrets)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.exc_text:
+            record.exc_text = redact(record.exc_text, self.secrets)
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES and isinstance(value, str):
+                setattr(record, key, redact(value, self.secrets))
+        return True
+
+
+class LogListener(QueueListener):
+    """A QueueListener that writes the records in batches.
+
+    After the first record of a batch it waits for flush_interval and then takes every record that is queued.
+    Waking up once per batch instead of once per record keeps the listener from competing for the GIL with
+    the threads that serve requests.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.Queue[Any],
+        *handlers: logging.Handler,
+        respect_handler_level: bool = False,
+        flush_interval: float = 0.05,
+    ) -> None:
+        """Initialize the listener.
+
+        Args:
+            log_queue (queue.Queue[Any]): The queue the records are put on.
+            *handlers (logging.Handler): Format and write the records.
+            respect_handler_level (bool): Whether records below the level of a handler are skipped.
+            flush_interval (float): How many seconds records are collected before they are written.
+        """
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval: float = flush_interval
+        self.batch: collections.deque[Any] = collections.deque()
+
+    def dequeue(self, block: bool) -> Any:  # noqa: ANN401, FBT001
+        """Return the next record of the batch, waiting for a new batch when it is empty.
+
+        Args:
+            block (bool): Whether to wait for a record.
+
+        Returns:
+            Any: The record, or the stop marker.
+        """
+        if not self.batch:
+            self.batch.append(self.queue.get(block=block))
+            time.sleep(self.flush_interval)
+            try:
+                while True:
+                    self.batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+        return self.batch.popleft()
+
+    def enqueue_sentinel(self) -> None:
+        """Put the stop marker after the records that are still queued, waiting for room on a full queue."""
+        self.queue.put(self._sentinel)
+
+
+class QueueLogHandler(QueueHandler):
+    """Hand records to a background thread that formats and writes them, so logging never waits for I/O.
+
+    The message is formatted in the logging thread only if one of its arguments could change before the
+    listener gets to it. When the queue is full, records are dropped instead of blocking, and counted in
+    browser_log_records_dropped_total.
+    """
+
+    def __init__(self, handler: logging.Handler, maxsize: int = 10_000) -> None:
+        """Start the listener thread.
+
+        Args:
+            handler (logging.Handler): Formats and writes the records, in the listener thread.
+            maxsize (int): How many records can wait for the listener.
+        """
+        super().__init__(queue.Queue(maxsize))
+        self.dropped: int = 0
+        queue_handlers.add(self)
+        self.listener = LogListener(self.queue, handler, respect_handler_level=True)
+        self.listener.start()
+        self._listening: bool = True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return a copy of the record that is safe to format in another thread.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            logging.LogRecord: The copy, with the message merged only if that can not wait, and the traceback
+                formatted.
+        """
+        record = copy.copy(record)
+        args: Any = record.args
+        if type(record.msg) is not str or (
+            args and not (isinstance(args, tuple) and all(type(arg) in IMMUTABLE_TYPES for arg in args))
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put the record on the queue, or drop it if the listener is too far behind."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Write the records that are still queued and stop the listener thread."""
+        with self.lock:
+            listening: bool = self._listening
+            self._listening = False
+        if listening:
+            self.listener.stop()
+        super().close()
+
+
+# Every QueueLogHandler, for the metric of the records they dropped.
+queue_handlers: weakref.WeakSet[QueueLogHandler] = weakref.WeakSet()
+
+registry.register(
+    CallbackMetric(
+        "browser_log_records_dropped_total",
+        "Log records dropped because the queue to the log writer was full.",
+        "counter",
+        lambda: {(): sum(handler.dropped for handler in list(queue_handlers))},
+    ),
+)
@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import abc
+import bisect
+import contextvars
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The default buckets of the Prometheus client libraries, in seconds.
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# SQLite answers most queries in well under a millisecond.
+QUERY_BUCKETS: tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def format_value(value: float) -> str:
+    """Format a sample value like the Prometheus client libraries do.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        str: The value, with +Inf, -Inf and NaN spelled the Prometheus way.
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def escape_label(value: str) -> str:
+    """Escape a label value for the text format.
+
+    Args:
+        value (str): The label value.
+
+    Returns:
+        str: The value with backslashes, double quotes and newlines escaped.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labelnames: tuple[str, ...], labels: tuple[str, ...], extra: str = "") -> str:
+    """Format the labels of a sample.
+
+    Args:
+        labelnames (tuple[str, ...]): The names of the labels.
+        labels (tuple[str, ...]): The values of the labels, in the same order.
+        extra (str): An already formatted label to add, like the le of a histogram bucket.
+
+    Returns:
+        str: The labels in braces, or an empty string if there are none.
+    """
+    pairs: list[str] = [f'{name}="{escape_label(value)}"' for name, value in zip(labelnames, labels, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(abc.ABC):
+    """A metric family, rendered in the Prometheus text format."""
+
+    kind: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize the metric.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): What the metric measures, for the HELP line.
+            labelnames (tuple[str, ...]): The names of the labels every sample has.
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple[str, ...] = labelnames
+        self._lock = threading.Lock()
+
+    def render(self) -> Iterator[str]:
+        """Yield the HELP and TYPE lines and the samples.
+
+        Yields:
+            str: A line without the newline.
+        """
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Yield the sample lines."""
+
+
+class Counter(Metric):
+    """A value that only goes up, per combination of labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize the counter.
+
+        Args:
+            name (str): The name of the metric, ending in _total.
+            documentation (str): What the metric counts.
+            labelnames (tuple[str, ...]): The names of the labels every sample has.
+        """
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add to the counter of the labels.
+
+        Args:
+            *labels (str): The values of the labels.
+            amount (float): How much to add.
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Return the counter of the labels."""
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        """Yield a line per combination of labels."""
+        with self._lock:
+            values: list[tuple[tuple[str, ...], float]] = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+@dataclass(slots=True)
+class HistogramValue:
+    """The observations of a histogram for one combination of labels."""
+
+    buckets: list[int]
+    total: float = 0.0
+    count: int = 0
+
+
+class Histogram(Metric):
+    """The distribution of observed values, per combination of labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        """Initialize the histogram.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): What the metric measures.
+            labelnames (tuple[str, ...]): The names of the labels every sample has.
+            buckets (tuple[float, ...]): The sorted upper bounds of the buckets. +Inf is added.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets: tuple[float, ...] = buckets
+        self._values: dict[tuple[str, ...], HistogramValue] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record an observation.
+
+        Only the bucket the value falls in is counted here. The cumulative counts are added up when rendering.
+
+        Args:
+            value (float): The observed value.
+            *labels (str): The values of the labels.
+        """
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram: HistogramValue | None = self._values.get(labels)
+            if histogram is None:
+                histogram = self._values[labels] = HistogramValue(buckets=[0] * (len(self.buckets) + 1))
+            histogram.buckets[index] += 1
+            histogram.total += value
+            histogram.count += 1
+
+    def count(self, *labels: str) -> int:
+        """Return how many values were observed for the labels."""
+        histogram: HistogramValue | None = self._values.get(labels)
+        return histogram.count if histogram is not None else 0
+
+    def samples(self) -> Iterator[str]:
+        """Yield the cumulative buckets, the sum and the count per combination of labels."""
+        with self._lock:
+            values: list[tuple[tuple[str, ...], list[int], float, int]] = [
+                (labels, list(histogram.buckets), histogram.total, histogram.count)
+                for labels, histogram in self._values.items()
+            ]
+        for labels, buckets, total, count in values:
+            cumulative: int = 0
+            for bound, bucket in zip((*self.buckets, math.inf), buckets, strict=True):
+                cumulative += bucket
+                le: str = f'le="{format_value(bound)}"'
+                yield f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(total)}"
+            yield f"{self.name}_count{format_labels(self.labelnames, labels)} {count}"
+
+
+class CallbackMetric(Metric):
+    """A metric whose values are read when it is scraped, for state that is already counted elsewhere.
+
+    This costs nothing until the metrics are scraped, which is why the cache counters and the rate limit use it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], dict[tuple[str, ...], float | None]],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        """Initialize the metric.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): What the metric measures.
+            kind (str): counter or gauge.
+            callback (Callable[[], dict[tuple[str, ...], float | None]]): Returns the value per combination of
+                labels. None values are left out.
+            labelnames (tuple[str, ...]): The names of the labels every sample has.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback: Callable[[], dict[tuple[str, ...], float | None]] = callback
+
+    def samples(self) -> Iterator[str]:
+        """Yield a line per combination of labels the callback returned."""
+        for labels, value in self.callback().items():
+            if value is not None:
+                yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+class MetricsRegistry:
+    """The metrics that are served by the metrics endpoint."""
+
+    def __init__(self) -> None:
+        """Start without metrics."""
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, *metrics: Metric) -> None:
+        """Add metrics, replacing any with the same name.
+
+        Args:
+            *metrics (Metric): The metrics.
+        """
+        for metric in metrics:
+            self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format.
+
+        Returns:
+            str: The exposition, ending in a newline.
+        """
+        lines: list[str] = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Failed to collect %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = Histogram(
+    "browser_http_request_duration_seconds",
+    "Time from the request reaching Django to the response leaving the view, per route.",
+    ("route", "method", "status"),
+)
+http_request_db_duration = Histogram(
+    "browser_http_request_db_duration_seconds",
+    "Time spent in database queries while serving one request, per route.",
+    ("route",),
+    QUERY_BUCKETS,
+)
+db_queries = Counter("browser_db_queries_total", "Database queries, per route.", ("route",))
+upstream_request_duration = Histogram(
+    "browser_github_request_duration_seconds",
+    "Time of each request sent to GitHub, per response status. The count is the number of upstream calls.",
+    ("status",),
+)
+registry.register(http_request_duration, http_request_db_duration, db_queries, upstream_request_duration)
+
+
+@dataclass(slots=True)
+class RequestMetrics:
+    """What the API request being served spent in the database.
+
+    Worker threads that run in a copy of the request's context, like those of a batch, add to it concurrently.
+    """
+
+    queries: int = 0
+    db_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add_query(self, seconds: float) -> None:
+        """Count one query that took the given number of seconds."""
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+
+
+# The metrics of the API request being served, set by core.middleware.metrics_middleware.
+request_metrics: contextvars.ContextVar[RequestMetrics | None] = contextvars.ContextVar(
+    "request_metrics",
+    default=None,
+)
+
+
+def time_query(
+    execute: Callable[..., Any],
+    sql: str,
+    params: Any,  # noqa: ANN401
+    many: bool,  # noqa: FBT001
+    context: dict[str, Any],
+) -> Any:  # noqa: ANN401
+    """Time a database query against the API request being served, if any.
+
+    Installed as an execute wrapper on every database connection by core.apps.CoreConfig.
+
+    Args:
+        execute (Callable[..., Any]): Runs the query.
+        sql (str): The SQL.
+        params (Any): The parameters.
+        many (bool): Whether this is executemany.
+        context (dict[str, Any]): The connection and cursor.
+
+    Returns:
+        Any: What the query returned.
+    """
+    metrics: RequestMetrics | None = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start: float = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - start)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from asgiref.sync import iscoroutinefunction
+from django.http import StreamingHttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+from core.github_client import UpstreamCallCounter, upstream_call_counter
+from core.metrics import RequestMetrics, db_queries, http_request_db_duration, http_request_duration, request_metrics
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterator
+
+    from django.http import HttpRequest
+    from django.http.response import HttpResponseBase
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+UPSTREAM_CALLS_HEADER = "X-Upstream-Calls"
+
+
+def finish_counting(request: HttpRequest, response: HttpResponseBase, counter: UpstreamCallCounter) -> HttpResponseBase:
+    """Tell the client how many GitHub requests its request cost.
+
+    Streaming responses send their headers before the body is produced, so only the requests made before
+    the view returned are counted for them.
+
+    Args:
+        request (HttpRequest): The request.
+        response (HttpResponseBase): The response.
+        counter (UpstreamCallCounter): The counter of the request.
+
+    Returns:
+        HttpResponseBase: The response, with the X-Upstream-Calls header.
+    """
+    response[UPSTREAM_CALLS_HEADER] = str(counter.calls)
+    if counter.calls:
+        logger.debug("%s %s made %s upstream calls", request.method, request.path, counter.calls)
+    return response
+
+
+@sync_and_async_middleware
+def upstream_call_counter_middleware(get_response: Callable[[HttpRequest], Any]) -> Callable[[HttpRequest], Any]:
+    """Count the requests sent to GitHub while each request is served.
+
+    Args:
+        get_response (Callable): The next middleware or the view.
+
+    Returns:
+        Callable: The middleware, async if get_response is.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request: HttpRequest) -> HttpResponseBase:
+            counter = UpstreamCallCounter()
+            token = upstream_call_counter.set(counter)
+            try:
+                response: HttpResponseBase = await get_response(request)
+            finally:
+                upstream_call_counter.reset(token)
+            return finish_counting(request, response, counter)
+
+        return async_middleware
+
+    def middleware(request: HttpRequest) -> HttpResponseBase:
+        counter = UpstreamCallCounter()
+        token = upstream_call_counter.set(counter)
+        try:
+            response: HttpResponseBase = get_response(request)
+        finally:
+            upstream_call_counter.reset(token)
+        return finish_counting(request, response, counter)
+
+    return middleware
+
+
+def record_request_metrics(
+    request: HttpRequest,
+    response: HttpResponseBase,
+    metrics: RequestMetrics,
+    start: float,
+) -> HttpResponseBase:
+    """Record the latency and the database time of a request under its route.
+
+    The route is the URL pattern, not the path, so every repository shares the same samples. Streamed responses
+    are recorded when their last chunk has been sent, so the work done while streaming is included.
+
+    Args:
+        request (HttpRequest): The request.
+        response (HttpResponseBase): The response.
+        metrics (RequestMetrics): What the request spent in the database.
+        start (float): When the request reached the middleware, from time.perf_counter.
+
+    Returns:
+        HttpResponseBase: The response.
+    """
+    elapsed: float = time.perf_counter() - start
+    route: str = request.resolver_match.route if request.resolver_match is not None else "unmatched"
+    http_request_duration.observe(elapsed, route, request.method or "", str(response.status_code))
+    if metrics.queries:
+        http_request_db_duration.observe(metrics.db_seconds, route)
+        db_queries.inc(route, amount=metrics.queries)
+    return response
+
+
+def after_stream(response: HttpResponseBase, finish: Callable[[], object]) -> HttpResponseBase:
+    """Call finish once the response has been sent, after its last chunk if it is streamed.
+
+    Args:
+        response (HttpResponseBase): The response.
+        finish (Callable[[], object]): Called when the response is done.
+
+    Returns:
+        HttpResponseBase: The response, with its streamed content wrapped.
+    """
+    if not isinstance(response, StreamingHttpResponse):
+        finish()
+        return response
+
+    content: Any = response.streaming_content
+    if response.is_async:
+
+        async def async_content() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in content:
+                    yield chunk
+            finally:
+                finish()
+
+        response.streaming_content = async_content()
+    else:
+
+        def sync_content() -> Iterator[bytes]:
+            try:
+                yield from content
+            finally:
+                finish()
+
+        response.streaming_content = sync_content()
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response: Callable[[HttpRequest], Any]) -> Callable[[HttpRequest], Any]:
+    """Measure how long each request takes and how much of it is spent in the database.
+
+    Args:
+        get_response (Callable): The next middleware or the view.
+
+    Returns:
+        Callable: The middleware, async if get_response is.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request: HttpRequest) -> HttpResponseBase:
+            start: float = time.perf_counter()
+            metrics = RequestMetrics()
+            token = request_metrics.set(metrics)
+            try:
+                response: HttpResponseBase = await get_response(request)
+            finally:
+                request_metrics.reset(token)
+            return after_stream(response, lambda: record_request_metrics(request, response, metrics, start))
+
+        return async_middleware
+
+    def middleware(request: HttpRequest) -> HttpResponseBase:
+        start: float = time.perf_counter()
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response: HttpResponseBase = get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return after_stream(response, lambda: record_request_metrics(request, response, metrics, start))
+
+    return middleware
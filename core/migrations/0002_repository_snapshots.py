@@ -0,0 +1,56 @@
+# type: ignore
+# Generated by Django 5.2.18 on 2026-10-17 04:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Repository",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("owner", models.CharField(max_length=100)),
+                ("name", models.CharField(max_length=100)),
+                ("fetched_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "repositories",
+                "indexes": [models.Index(fields=["fetched_at"], name="repository_fetched_at_idx")],
+                "constraints": [models.UniqueConstraint(fields=("owner", "name"), name="unique_repository_owner_name")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ContentEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("position", models.PositiveIntegerField(help_text="Position in the listing returned by GitHub.")),
+                ("name", models.CharField(max_length=255)),
+                ("path", models.CharField(max_length=1024)),
+                ("type", models.CharField(max_length=20)),
+                ("download_url", models.URLField(blank=True, max_length=2048, null=True)),
+                ("html_url", models.URLField(blank=True, max_length=2048, null=True)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("sha", models.CharField(max_length=40)),
+                (
+                    "repository",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="entries", to="core.repository"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "content entries",
+                "ordering": ["repository", "position"],
+                "indexes": [models.Index(fields=["repository", "position"], name="content_entry_position_idx")],
+                "constraints": [
+                    models.UniqueConstraint(fields=("repository", "path"), name="unique_content_entry_path")
+                ],
+            },
+        ),
+    ]
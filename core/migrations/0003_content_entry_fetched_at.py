@@ -0,0 +1,21 @@
+# type: ignore
+# Generated by Django 5.2.18 on 2026-10-17 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_repository_snapshots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contententry",
+            name="fetched_at",
+            field=models.DateTimeField(
+                help_text="When the snapshot the entry was last saved with was fetched. Older entries are removed.",
+                null=True,
+            ),
+        ),
+    ]
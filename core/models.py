@@ -1,11 +1,85 @@
 from __future__ import annotations
 
 import logging
+from typing import TYPE_CHECKING
 
 from django.contrib.auth.models import AbstractUser
+from django.db import models
+
+if TYPE_CHECKING:
+    from datetime import datetime
 
 logger: logging.Logger = logging.getLogger(__name__)
 
 
 class User(AbstractUser):
     """Custom User model."""
+
+
+class Repository(models.Model):
+    """Snapshot of a GitHub repository, kept between restarts of the API."""
+
+    owner = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [  # noqa: RUF012
+            models.UniqueConstraint(fields=["owner", "name"], name="unique_repository_owner_name"),
+        ]
+        indexes: list[models.Index] = [  # noqa: RUF012
+            models.Index(fields=["fetched_at"], name="repository_fetched_at_idx"),
+        ]
+        verbose_name_plural = "repositories"
+
+    def __str__(self) -> str:
+        """Return the repository as owner/name."""
+        return f"{self.owner}/{self.name}"
+
+    def is_stale(self, now: datetime, max_age: float) -> bool:
+        """Return True if the snapshot is older than max_age seconds."""
+        return (now - self.fetched_at).total_seconds() > max_age
+
+
+class ContentEntry(models.Model):
+    """A file or directory in the root directory of a repository snapshot."""
+
+    repository = models.ForeignKey(Repository, on_delete=models.CASCADE, related_name="entries")
+    position = models.PositiveIntegerField(help_text="Position in the listing returned by GitHub.")
+    name = models.CharField(max_length=255)
+    path = models.CharField(max_length=1024)
+    type = models.CharField(max_length=20)
+    download_url = models.URLField(max_length=2048, blank=True, null=True)  # noqa: DJ001
+    html_url = models.URLField(max_length=2048, blank=True, null=True)  # noqa: DJ001
+    size = models.PositiveBigIntegerField(default=0)
+    sha = models.CharField(max_length=40)
+    fetched_at = models.DateTimeField(
+        null=True,
+        help_text="When the snapshot the entry was last saved with was fetched. Older entries are removed.",
+    )
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [  # noqa: RUF012
+            models.UniqueConstraint(fields=["repository", "path"], name="unique_content_entry_path"),
+        ]
+        indexes: list[models.Index] = [  # noqa: RUF012
+            models.Index(fields=["repository", "position"], name="content_entry_position_idx"),
+        ]
+        ordering: list[str] = ["repository", "position"]  # noqa: RUF012
+        verbose_name_plural = "content entries"
+
+    def __str__(self) -> str:
+        """Return the path of the entry."""
+        return f"{self.repository}/{self.path}"
+
+    def as_dict(self) -> dict[str, str | int | None]:
+        """Return the entry in the same format as convert_content_json."""
+        return {
+            "name": self.name,
+            "path": self.path,
+            "type": self.type,
+            "download_url": self.download_url,
+            "html_url": self.html_url,
+            "size": self.size,
+            "sha": self.sha,
+        }
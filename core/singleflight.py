@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine, Hashable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one call.
+
+    The first caller for a key starts the work as a task, and everyone who asks for the same key while
+    it is running awaits that task instead of starting their own. The result is not kept afterwards;
+    caching is up to the caller.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with nothing in flight."""
+        # Tasks belong to the loop that created them, so the loop is part of the key.
+        self._flights: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task[Any]] = {}
+        self.calls: int = 0
+        self.coalesced: int = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """Run func, or wait for the run already in flight for the same key.
+
+        A caller that is cancelled, for example because its client disconnected, does not cancel the
+        shared task, since the other callers are still waiting for it.
+
+        Args:
+            key (Hashable): What is being fetched, e.g. the username and repository name.
+            func (Callable[[], Coroutine[Any, Any, T]]): Starts the work.
+
+        Returns:
+            T: The result of the shared call. Exceptions are raised to every caller.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        flight_key: tuple[asyncio.AbstractEventLoop, Hashable] = (loop, key)
+        task: asyncio.Task[T] | None = self._flights.get(flight_key)
+        if task is None:
+            self.calls += 1
+            task = loop.create_task(func())
+            self._flights[flight_key] = task
+            task.add_done_callback(lambda _: self._flights.pop(flight_key, None))
+        else:
+            self.coalesced += 1
+            logger.debug("Joining the request in flight for %s", key)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Return how many calls are running."""
+        return len(self._flights)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of calls made and the number of callers that joined one in flight.
+
+        Returns:
+            dict[str, int]: The counters.
+        """
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": self.in_flight()}
@@ -1,42 +1,498 @@
 from __future__ import annotations
 
+import base64
+import json
 import logging
-from functools import cache
-from typing import TYPE_CHECKING
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
 
 from django.conf import settings
-from github import Auth, Github, UnknownObjectException
+from github import Auth, GithubException
+
+from core.blobs import BlobStore
+from core.cache import CacheEntry, TTLCache
+from core.github_client import AsyncGitHubClient, GitHubClient, RateLimitScheduler
+from core.metrics import CallbackMetric, registry
+from core.singleflight import SingleFlight
+from core.tree_sync import TreeSync, TreeSyncError, can_sync, convert_tree_json
 
 if TYPE_CHECKING:
-    from github.ContentFile import ContentFile
-    from github.Repository import Repository
+    from pathlib import Path
+
+    from core.tree_sync import TreeSyncSteps, UpstreamRequest
 
 logger: logging.Logger = logging.getLogger(__name__)
 
 auth = Auth.Token(settings.GITHUB_ACCESS_TOKEN)
-logger.info("Github auth token set %s", auth)
 
+github_client = GitHubClient(
+    auth=auth,
+    base_url=settings.GITHUB_API_URL,
+    pool_size=settings.GITHUB_POOL_SIZE,
+    scheduler=RateLimitScheduler(
+        reserve=settings.GITHUB_RATE_LIMIT_RESERVE,
+        max_wait=settings.GITHUB_RATE_LIMIT_MAX_WAIT,
+    ),
+)
+
+# Async views use their own connections, but share the rate limit budget with the threaded client.
+async_github_client = AsyncGitHubClient(
+    auth=auth,
+    base_url=settings.GITHUB_API_URL,
+    pool_size=settings.GITHUB_POOL_SIZE,
+    scheduler=github_client.scheduler,
+)
+
+# Concurrent async requests for the same repository share one upstream request.
+upstream_requests = SingleFlight()
+
+# Plain dictionaries keyed by (username, repo_name), never live PyGithub objects.
+repo_contents_cache = TTLCache(maxsize=settings.GITHUB_CACHE_MAX_ENTRIES, ttl=settings.GITHUB_CACHE_TTL)
+repo_tree_cache = TTLCache(maxsize=settings.GITHUB_CACHE_MAX_ENTRIES, ttl=settings.GITHUB_CACHE_TTL)
+
+# The fields of a contents entry we serve, and the types GitHub sends them as. Directories have no download_url.
+CONTENT_SCHEMA: dict[str, type | tuple[type, ...]] = {
+    "name": str,
+    "path": str,
+    "type": str,
+    "download_url": (str, type(None)),
+    "html_url": (str, type(None)),
+    "size": int,
+    "sha": str,
+}
+
+# File contents, shared by every repository and branch that has the same file.
+blob_store = BlobStore(settings.GITHUB_BLOB_DIR)
+
+
+def cache_stat(name: str) -> dict[tuple[str, ...], float | None]:
+    """Return one counter of the contents and tree caches, for the metrics endpoint.
+
+    Args:
+        name (str): The key in TTLCache.stats().
+
+    Returns:
+        dict[tuple[str, ...], float | None]: The counter per cache.
+    """
+    return {("contents",): repo_contents_cache.stats()[name], ("tree",): repo_tree_cache.stats()[name]}
+
+
+# Read from the caches and the scheduler when the metrics are scraped, so serving requests costs nothing extra.
+registry.register(
+    *(
+        CallbackMetric(
+            f"browser_github_cache_{name}_total",
+            documentation,
+            "counter",
+            lambda name=name: cache_stat(name),
+            ("cache",),
+        )
+        for name, documentation in (
+            ("hits", "Lookups that found a fresh entry."),
+            ("misses", "Lookups that found nothing or an expired entry."),
+            ("evictions", "Entries removed to make room for new ones."),
+            ("revalidations", "Expired entries GitHub confirmed unchanged with a 304."),
+        )
+    ),
+    CallbackMetric(
+        "browser_github_cache_entries", "Entries in the cache.", "gauge", lambda: cache_stat("size"), ("cache",)
+    ),
+    CallbackMetric(
+        "browser_github_rate_limit_remaining",
+        "Requests left in the GitHub rate limit window, as last reported by GitHub.",
+        "gauge",
+        lambda: {(): github_client.scheduler.budget()["remaining"]},
+    ),
+    CallbackMetric(
+        "browser_github_rate_limit_reset_timestamp_seconds",
+        "When the GitHub rate limit window resets, as a Unix timestamp.",
+        "gauge",
+        lambda: {(): github_client.scheduler.budget()["reset_at"]},
+    ),
+)
+
+
+def convert_content_json(item: dict[str, Any]) -> dict[str, str | int]:
+    """Convert an item of a contents response to the dictionary we cache and serve.
+
+    The fields are checked against CONTENT_SCHEMA, so a response we do not understand fails here instead of
+    being cached.
+
+    Args:
+        item (dict[str, Any]): One entry of the JSON returned by the contents API.
+
+    Raises:
+        TypeError: If a field is missing or has the wrong type.
+
+    Returns:
+        dict[str, str | int]: The entry as a dictionary.
+    """
+    entry: dict[str, Any] = {field: item.get(field) for field in CONTENT_SCHEMA}
+    for field, types in CONTENT_SCHEMA.items():
+        if not isinstance(entry[field], types):
+            msg: str = f"Invalid {field} {entry[field]!r} in contents entry {item.get('path')!r}"
+            raise TypeError(msg)
+    return entry
+
+
+def store_repo_contents_response(
+    cache_key: tuple[str, str],
+    entry: CacheEntry | None,
+    status: int,
+    headers: dict[str, Any],
+    body: str,
+) -> list[dict[str, str | int]] | dict[str, str | int]:
+    """Cache the response of a request for the contents of a repository.
+
+    Args:
+        cache_key (tuple[str, str]): The username and repository name.
+        entry (CacheEntry | None): The cache entry the request was conditional on, if any.
+        status (int): The response status.
+        headers (dict[str, Any]): The lowercase response headers.
+        body (str): The response body.
+
+    Raises:
+        GithubException: If GitHub returned an error other than not found, or contents we do not understand.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int]: The contents, or an empty list if the repository
+            does not exist.
+    """
+    repository_identifier: str = "/".join(cache_key)
+    if status == HTTPStatus.NOT_MODIFIED and entry is not None:
+        logger.debug("Contents of %s not modified", repository_identifier)
+        repo_contents_cache.touch(cache_key)
+        return entry.value
+
+    if status == HTTPStatus.NOT_FOUND:
+        logger.warning("Repository %s not found", repository_identifier)
+        repo_contents_cache.delete(cache_key)
+        return []
+
+    if status != HTTPStatus.OK:
+        raise GithubException(status, body, headers)
 
-@cache
-def get_repo_contents(username: str, repo_name: str) -> list[ContentFile] | ContentFile:
+    data: list[dict[str, Any]] | dict[str, Any] = json.loads(body)
+    try:
+        contents: list[dict[str, str | int]] | dict[str, str | int] = (
+            [convert_content_json(item) for item in data] if isinstance(data, list) else convert_content_json(data)
+        )
+    except TypeError as e:
+        logger.exception("Unexpected contents of %s", repository_identifier)
+        raise GithubException(HTTPStatus.BAD_GATEWAY, str(e), headers) from e
+
+    repo_contents_cache.set(cache_key, contents, etag=headers.get("etag"))
+    return contents
+
+
+def get_repo_contents(username: str, repo_name: str) -> list[dict[str, str | int]] | dict[str, str | int]:
     """Get all of the contents of the root directory of the repository.
 
+    This is one request to the contents API, read as plain JSON. PyGithub objects would cost a request for
+    the repository first, and every entry would be built as an object only to be turned into a dictionary.
+    Fresh results are served from the cache, expired ones are revalidated with their ETag.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int]: The contents of the root directory.
+    """
+    cache_key: tuple[str, str] = (username, repo_name)
+    entry: CacheEntry | None = repo_contents_cache.get(cache_key)
+    if entry is not None and entry.is_fresh(repo_contents_cache.clock()):
+        return entry.value
+
+    repository_identifier: str = f"{username}/{repo_name}"
+    headers: dict[str, str] = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+
+    logger.info("Getting contents of %s", repository_identifier)
+    status, response_headers, body = github_client.request_json(
+        f"/repos/{repository_identifier}/contents/",
+        headers=headers,
+    )
+    return store_repo_contents_response(cache_key, entry, status, response_headers, body)
+
+
+def repo_contents_found(username: str, repo_name: str) -> bool:
+    """Return whether GitHub found the repository the last time its contents were requested.
+
+    A 404 removes the contents from the cache and any other answer stores them, so this tells a repository that
+    is gone apart from one with an empty root directory, which both give an empty list.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        bool: Whether the contents are cached.
+    """
+    return repo_contents_cache.get((username, repo_name)) is not None
+
+
+def get_repo_tree(username: str, repo_name: str) -> dict[str, Any]:
+    """Get every file and directory of the repository with one upstream request.
+
+    Uses the recursive Git Trees API on the default branch. An expired tree is brought up to date with the
+    HEAD commit by fetching only the directories that changed, see TreeSync, or is revalidated with its ETag
+    like get_repo_contents if it can not be synced.
+
     Args:
         username (str): The username of the repository owner.
         repo_name (str): The name of the repository.
 
     Returns:
-        list[ContentFile] | ContentFile: The contents of the root directory.
+        dict[str, Any]: The tree SHA, whether GitHub truncated the tree and the entries sorted by path.
     """
-    with Github(auth=auth) as g:
-        repository_identifier: str = f"{username}/{repo_name}"
-        logger.info("Getting contents of %s", repository_identifier)
+    cache_key: tuple[str, str] = (username, repo_name)
+    entry: CacheEntry | None = repo_tree_cache.get(cache_key)
+    if entry is not None and entry.is_fresh(repo_tree_cache.clock()):
+        return entry.value
 
+    if entry is not None and settings.GITHUB_INCREMENTAL_SYNC and can_sync(entry.value):
+        sync = TreeSync(f"{username}/{repo_name}", entry.value)
+        steps: TreeSyncSteps = sync.run(sync_etag(entry))
         try:
-            repo: Repository = g.get_repo(repository_identifier)
-        except UnknownObjectException:
-            logger.exception("Repository not found")
-            return []
+            request: UpstreamRequest = next(steps)
+            while True:
+                request = steps.send(github_client.request_json(*request))
+        except StopIteration as stop:
+            return store_synced_tree(cache_key, sync, *stop.value)
+        except TreeSyncError as e:
+            logger.info("Fetching the whole tree of %s/%s instead of syncing it: %s", username, repo_name, e)
+
+    repository_identifier: str = f"{username}/{repo_name}"
+    headers: dict[str, str] = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+
+    logger.info("Getting tree of %s", repository_identifier)
+    status, response_headers, body = github_client.request_json(
+        f"/repos/{repository_identifier}/git/trees/HEAD",
+        parameters={"recursive": "1"},
+        headers=headers,
+    )
+
+    return store_repo_tree_response(cache_key, entry, status, response_headers, body)
+
+
+def store_repo_tree_response(
+    cache_key: tuple[str, str],
+    entry: CacheEntry | None,
+    status: int,
+    headers: dict[str, Any],
+    body: str,
+) -> dict[str, Any]:
+    """Cache the response of a request for the recursive tree of a repository.
+
+    Args:
+        cache_key (tuple[str, str]): The username and repository name.
+        entry (CacheEntry | None): The cache entry the request was conditional on, if any.
+        status (int): The response status.
+        headers (dict[str, Any]): The lowercase response headers.
+        body (str): The response body.
+
+    Raises:
+        GithubException: If GitHub returned an error other than not found.
+
+    Returns:
+        dict[str, Any]: The tree SHA, whether GitHub truncated the tree and the entries sorted by path.
+    """
+    repository_identifier: str = "/".join(cache_key)
+    if status == HTTPStatus.NOT_MODIFIED and entry is not None:
+        repo_tree_cache.touch(cache_key)
+        return entry.value
+
+    if status in {HTTPStatus.NOT_FOUND, HTTPStatus.CONFLICT}:  # 409 is returned for empty repositories
+        logger.warning("Tree of %s not found (%s)", repository_identifier, status)
+        repo_tree_cache.delete(cache_key)
+        return {"sha": "", "truncated": False, "entries": []}
+
+    if status != HTTPStatus.OK:
+        raise GithubException(status, body, headers)
+
+    data: dict[str, Any] = json.loads(body)
+    if data.get("truncated"):
+        logger.warning("Tree of %s was truncated by GitHub", repository_identifier)
+
+    tree: dict[str, Any] = {
+        "sha": data["sha"],
+        "truncated": bool(data.get("truncated")),
+        "entries": sorted((convert_tree_json(item) for item in data["tree"]), key=lambda item: item["path"]),
+    }
+    repo_tree_cache.set(cache_key, tree, etag=headers.get("etag"))
+    return tree
+
+
+def sync_etag(entry: CacheEntry) -> str | None:
+    """Return the ETag of the HEAD commit a cached tree was synced with.
+
+    A tree that was fetched whole is cached with the ETag of the tree response, which GitHub would never
+    match against a commit.
+    """
+    return entry.etag if "commit" in entry.value else None
+
+
+def store_synced_tree(
+    cache_key: tuple[str, str],
+    sync: TreeSync,
+    tree: dict[str, Any],
+    etag: str | None,
+) -> dict[str, Any]:
+    """Cache the result of a TreeSync.
+
+    Args:
+        cache_key (tuple[str, str]): The username and repository name.
+        sync (TreeSync): The finished sync.
+        tree (dict[str, Any]): The synced tree.
+        etag (str | None): The ETag of the HEAD commit.
+
+    Returns:
+        dict[str, Any]: The tree.
+    """
+    if tree is sync.tree:
+        repo_tree_cache.touch(cache_key)
+        return tree
+    delta = sync.delta
+    logger.info(
+        "Synced tree of %s with %s requests: %s added, %s modified, %s removed",
+        "/".join(cache_key),
+        delta.requests,
+        delta.added,
+        delta.modified,
+        delta.removed,
+    )
+    repo_tree_cache.set(cache_key, tree, etag=etag)
+    return tree
+
+
+async def aget_repo_tree(username: str, repo_name: str) -> dict[str, Any]:
+    """Async version of get_repo_tree.
+
+    Concurrent calls for the same repository share one upstream request.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        dict[str, Any]: The tree SHA, whether GitHub truncated the tree and the entries sorted by path.
+    """
+    cache_key: tuple[str, str] = (username, repo_name)
+    entry: CacheEntry | None = repo_tree_cache.get(cache_key)
+    if entry is not None and entry.is_fresh(repo_tree_cache.clock()):
+        return entry.value
+    return await upstream_requests.do(("tree", *cache_key), lambda: fetch_repo_tree(cache_key, entry))
+
+
+async def fetch_repo_tree(cache_key: tuple[str, str], entry: CacheEntry | None) -> dict[str, Any]:
+    """Fetch the recursive tree of a repository with the async client.
+
+    Args:
+        cache_key (tuple[str, str]): The username and repository name.
+        entry (CacheEntry | None): The expired cache entry, if any, to sync or revalidate with its ETag.
+
+    Returns:
+        dict[str, Any]: The tree SHA, whether GitHub truncated the tree and the entries sorted by path.
+    """
+    repository_identifier: str = "/".join(cache_key)
+    if entry is not None and settings.GITHUB_INCREMENTAL_SYNC and can_sync(entry.value):
+        sync = TreeSync(repository_identifier, entry.value)
+        steps: TreeSyncSteps = sync.run(sync_etag(entry))
+        try:
+            request: UpstreamRequest = next(steps)
+            while True:
+                request = steps.send(await async_github_client.request_json(*request))
+        except StopIteration as stop:
+            return store_synced_tree(cache_key, sync, *stop.value)
+        except TreeSyncError as e:
+            logger.info("Fetching the whole tree of %s instead of syncing it: %s", repository_identifier, e)
+
+    headers: dict[str, str] = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+
+    logger.info("Getting tree of %s", repository_identifier)
+    status, response_headers, body = await async_github_client.request_json(
+        f"/repos/{repository_identifier}/git/trees/HEAD",
+        parameters={"recursive": "1"},
+        headers=headers,
+    )
+    return store_repo_tree_response(cache_key, entry, status, response_headers, body)
+
+
+async def aget_repo_contents(username: str, repo_name: str) -> list[dict[str, str | int]] | dict[str, str | int]:
+    """Async version of get_repo_contents.
+
+    Concurrent calls for the same repository share one upstream request.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int]: The contents of the root directory.
+    """
+    cache_key: tuple[str, str] = (username, repo_name)
+    entry: CacheEntry | None = repo_contents_cache.get(cache_key)
+    if entry is not None and entry.is_fresh(repo_contents_cache.clock()):
+        return entry.value
+    return await upstream_requests.do(("contents", *cache_key), lambda: fetch_repo_contents(cache_key, entry))
+
+
+async def fetch_repo_contents(
+    cache_key: tuple[str, str],
+    entry: CacheEntry | None,
+) -> list[dict[str, str | int]] | dict[str, str | int]:
+    """Fetch the contents of the root directory of a repository with the async client.
+
+    Args:
+        cache_key (tuple[str, str]): The username and repository name.
+        entry (CacheEntry | None): The expired cache entry, if any, to revalidate with its ETag.
+
+    Raises:
+        GithubException: If GitHub returned an error other than not found.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int]: The contents of the root directory.
+    """
+    repository_identifier: str = "/".join(cache_key)
+    headers: dict[str, str] = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+
+    logger.info("Getting contents of %s", repository_identifier)
+    status, response_headers, body = await async_github_client.request_json(
+        f"/repos/{repository_identifier}/contents/",
+        headers=headers,
+    )
+    return store_repo_contents_response(cache_key, entry, status, response_headers, body)
+
+
+def get_blob(username: str, repo_name: str, sha: str) -> Path | None:
+    """Get the path of a stored blob, fetching it from the repository with the Git Blobs API if it is not stored.
+
+    A blob is found by its SHA alone, so once any repository has asked for it no repository fetches it again.
+
+    Args:
+        username (str): The username of the owner of a repository that has the blob.
+        repo_name (str): The name of the repository.
+        sha (str): The git blob SHA.
+
+    Raises:
+        GithubException: If GitHub returned an error other than not found.
+
+    Returns:
+        Path | None: Where the blob is stored, or None if the repository does not have it.
+    """
+    path: Path = blob_store.path(sha)
+    if path.is_file():
+        return path
+
+    repository_identifier: str = f"{username}/{repo_name}"
+    logger.info("Getting blob %s of %s", sha, repository_identifier)
+    status, headers, body = github_client.request_json(f"/repos/{repository_identifier}/git/blobs/{sha}")
+    if status in {HTTPStatus.NOT_FOUND, HTTPStatus.UNPROCESSABLE_ENTITY}:  # 422 is returned for malformed SHAs
+        logger.warning("Blob %s of %s not found (%s)", sha, repository_identifier, status)
+        return None
+    if status != HTTPStatus.OK:
+        raise GithubException(status, body, headers)
 
-        contents: list[ContentFile] | ContentFile = repo.get_contents("")
-        return contents
+    data: dict[str, Any] = json.loads(body)
+    content: bytes = base64.b64decode(data["content"]) if data.get("encoding") == "base64" else data["content"].encode()
+    return blob_store.put(sha, content)
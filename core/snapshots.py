@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import ContentEntry, Repository
+from core.sites_github import aget_repo_contents, get_repo_contents, repo_contents_found, upstream_requests
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator
+    from concurrent.futures import Future
+    from datetime import datetime
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+refresh_executor = ThreadPoolExecutor(
+    max_workers=settings.GITHUB_SNAPSHOT_REFRESH_WORKERS,
+    thread_name_prefix="snapshot-refresh",
+)
+
+# Repositories with a refresh queued or running, so a burst of requests only queues one refresh.
+_refreshing: set[tuple[str, str]] = set()
+_refreshing_lock = threading.Lock()
+
+CONTENT_ENTRY_FIELDS: tuple[str, ...] = ("name", "path", "type", "download_url", "html_url", "size", "sha")
+
+
+def load_snapshot(username: str, repo_name: str) -> Repository | None:
+    """Load the snapshot of a repository together with its entries.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        Repository | None: The snapshot, or None if the repository has never been fetched.
+    """
+    return Repository.objects.filter(owner=username, name=repo_name).prefetch_related("entries").first()
+
+
+@transaction.atomic
+def save_snapshot(
+    username: str,
+    repo_name: str,
+    contents: list[dict[str, str | int]],
+) -> Repository:
+    """Store the contents of a repository, updating the existing snapshot in place.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+        contents (list[dict[str, str | int]]): The contents as returned by get_repo_contents.
+
+    Returns:
+        Repository: The saved snapshot.
+    """
+    fetched_at: datetime = timezone.now()
+    repository, _ = Repository.objects.update_or_create(
+        owner=username,
+        name=repo_name,
+        defaults={"fetched_at": fetched_at},
+    )
+
+    entries: list[ContentEntry] = [
+        ContentEntry(
+            repository=repository,
+            position=position,
+            name=item["name"],
+            path=item["path"],
+            type=item["type"],
+            download_url=item["download_url"],
+            html_url=item["html_url"],
+            size=item["size"],
+            sha=item["sha"],
+            fetched_at=fetched_at,
+        )
+        for position, item in enumerate(contents)
+    ]
+    ContentEntry.objects.bulk_create(
+        entries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["repository", "path"],
+        update_fields=["position", "name", "type", "download_url", "html_url", "size", "sha", "fetched_at"],
+    )
+    # Entries that are no longer in the listing still have the time of an older snapshot. Comparing that instead
+    # of listing the paths that are left keeps the query to one parameter, however large the directory.
+    repository.entries.exclude(fetched_at=fetched_at).delete()
+
+    logger.info("Saved snapshot of %s with %s entries", repository, len(entries))
+    return repository
+
+
+def store_snapshot(
+    username: str,
+    repo_name: str,
+    contents: list[dict[str, str | int]] | dict[str, str | int],
+) -> None:
+    """Save contents fetched from GitHub as the snapshot, or delete the snapshot of a repository that is gone.
+
+    An empty root directory is saved too, so its snapshot counts as fresh and is not refreshed on every request.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+        contents (list[dict[str, str | int]] | dict[str, str | int]): The contents as returned by get_repo_contents.
+    """
+    if not isinstance(contents, list):
+        return
+    if contents or repo_contents_found(username, repo_name):
+        save_snapshot(username, repo_name, contents)
+        return
+    deleted, _ = Repository.objects.filter(owner=username, name=repo_name).delete()
+    if deleted:
+        logger.info("Deleted snapshot of %s/%s, the repository was not found", username, repo_name)
+
+
+def refresh_snapshot(username: str, repo_name: str) -> None:
+    """Fetch the contents of a repository from GitHub and save them as a snapshot.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+    """
+    try:
+        store_snapshot(username, repo_name, get_repo_contents(username, repo_name))
+    except Exception:
+        logger.exception("Failed to refresh snapshot of %s/%s", username, repo_name)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard((username, repo_name))
+        close_old_connections()
+
+
+def queue_snapshot_refresh(username: str, repo_name: str) -> Future[None] | None:
+    """Refresh a snapshot in the background unless a refresh is already queued.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        Future[None] | None: The queued refresh, or None if one was already queued.
+    """
+    with _refreshing_lock:
+        if (username, repo_name) in _refreshing:
+            return None
+        _refreshing.add((username, repo_name))
+
+    logger.info("Queueing refresh of %s/%s", username, repo_name)
+    return refresh_executor.submit(contextvars.copy_context().run, refresh_snapshot, username, repo_name)
+
+
+def load_snapshot_contents(username: str, repo_name: str) -> list[dict[str, str | int]] | None:
+    """Get the contents of a repository from its snapshot, queueing a refresh if the snapshot is stale.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        list[dict[str, str | int]] | None: The contents of the root directory, or None if there is no snapshot.
+    """
+    repository: Repository | None = load_snapshot(username, repo_name)
+    if repository is None:
+        return None
+    if repository.is_stale(timezone.now(), settings.GITHUB_SNAPSHOT_MAX_AGE):
+        queue_snapshot_refresh(username, repo_name)
+    return [entry.as_dict() for entry in repository.entries.all()]
+
+
+def get_snapshot_contents(username: str, repo_name: str) -> list[dict[str, str | int]] | dict[str, str | int]:
+    """Get the contents of a repository, served from the snapshot when there is one.
+
+    Stale snapshots are still served, and refreshed in the background (stale-while-revalidate).
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int]: The contents of the root directory.
+    """
+    snapshot: list[dict[str, str | int]] | None = load_snapshot_contents(username, repo_name)
+    if snapshot is not None:
+        return snapshot
+
+    contents: list[dict[str, str | int]] | dict[str, str | int] = get_repo_contents(username, repo_name)
+    store_snapshot(username, repo_name, contents)
+    return contents
+
+
+async def aget_snapshot_contents(username: str, repo_name: str) -> list[dict[str, str | int]] | dict[str, str | int]:
+    """Async version of get_snapshot_contents.
+
+    The database is used from a worker thread, GitHub with the async client. Concurrent requests for a
+    repository without a snapshot share one upstream request and one save.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        list[dict[str, str | int]] | dict[str, str | int]: The contents of the root directory.
+    """
+    snapshot: list[dict[str, str | int]] | None = await sync_to_async(load_snapshot_contents)(username, repo_name)
+    if snapshot is not None:
+        return snapshot
+
+    async def fetch_and_save() -> list[dict[str, str | int]] | dict[str, str | int]:
+        contents: list[dict[str, str | int]] | dict[str, str | int] = await aget_repo_contents(username, repo_name)
+        await sync_to_async(store_snapshot)(username, repo_name, contents)
+        return contents
+
+    return await upstream_requests.do(("snapshot", username, repo_name), fetch_and_save)
+
+
+def iter_snapshot_contents(username: str, repo_name: str) -> Iterator[dict[str, str | int]]:
+    """Yield the contents of a repository one entry at a time, without loading the whole snapshot.
+
+    Behaves like get_snapshot_contents, but reads the snapshot in chunks so memory use does not grow
+    with the size of the repository.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Yields:
+        dict[str, str | int]: The entries of the root directory.
+    """
+    repository: Repository | None = Repository.objects.filter(owner=username, name=repo_name).first()
+    if repository is None:
+        contents: list[dict[str, str | int]] | dict[str, str | int] = get_snapshot_contents(username, repo_name)
+        yield from contents if isinstance(contents, list) else [contents]
+        return
+
+    if repository.is_stale(timezone.now(), settings.GITHUB_SNAPSHOT_MAX_AGE):
+        queue_snapshot_refresh(username, repo_name)
+    yield from (
+        ContentEntry.objects.filter(repository=repository)
+        .order_by("position")
+        .values(*CONTENT_ENTRY_FIELDS)
+        .iterator(chunk_size=2000)
+    )
+
+
+async def aiter_snapshot_contents(username: str, repo_name: str) -> AsyncIterator[dict[str, str | int]]:
+    """Async version of iter_snapshot_contents.
+
+    Args:
+        username (str): The username of the repository owner.
+        repo_name (str): The name of the repository.
+
+    Yields:
+        dict[str, str | int]: The entries of the root directory.
+    """
+    repository: Repository | None = await Repository.objects.filter(owner=username, name=repo_name).afirst()
+    if repository is None:
+        contents: list[dict[str, str | int]] | dict[str, str | int] = await aget_snapshot_contents(username, repo_name)
+        for entry in contents if isinstance(contents, list) else [contents]:
+            yield entry
+        return
+
+    if repository.is_stale(timezone.now(), settings.GITHUB_SNAPSHOT_MAX_AGE):
+        queue_snapshot_refresh(username, repo_name)
+    async for entry in (
+        ContentEntry.objects.filter(repository=repository)
+        .order_by("position")
+        .values(*CONTENT_ENTRY_FIELDS)
+        .aiterator(chunk_size=2000)
+    ):
+        yield entry
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+from collections.abc import Generator
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The Git Trees API calls these blob, tree and commit; the contents API calls them file, dir and submodule.
+TREE_ENTRY_TYPES: dict[str, str] = {"blob": "file", "tree": "dir", "commit": "submodule"}
+
+# A sync that would need more upstream requests than this gives up, because one full fetch is cheaper.
+MAX_SYNC_REQUESTS = 32
+
+# What a sync asks the GitHub client to GET: the URL relative to the API, the query parameters and the headers.
+UpstreamRequest = tuple[str, dict[str, Any] | None, dict[str, str]]
+
+# What the client answers: the status, the lowercase response headers and the body.
+UpstreamResponse = tuple[int, dict[str, Any], str]
+
+# A running sync, which returns the synced tree and the ETag of the HEAD commit.
+TreeSyncSteps = Generator[UpstreamRequest, UpstreamResponse, tuple[dict[str, Any], str | None]]
+
+
+def convert_tree_json(item: dict[str, Any], prefix: str = "") -> dict[str, str | int]:
+    """Convert an item of a Git Trees API response to a dictionary.
+
+    Args:
+        item (dict[str, Any]): One entry of the JSON returned by the Git Trees API.
+        prefix (str): The path of the directory the tree belongs to, with a trailing slash, or "" for the root.
+
+    Returns:
+        dict[str, str | int]: The entry as a dictionary.
+    """
+    path: str = prefix + item["path"]
+    return {
+        "name": path.rsplit("/", 1)[-1],
+        "path": path,
+        "type": TREE_ENTRY_TYPES.get(item["type"], item["type"]),
+        "size": item.get("size", 0),
+        "sha": item["sha"],
+    }
+
+
+class TreeSyncError(Exception):
+    """The tree can not be synced incrementally and has to be fetched whole."""
+
+
+@dataclass(slots=True)
+class TreeDelta:
+    """What a sync changed, counted in entries, and what it cost upstream."""
+
+    added: int = 0
+    removed: int = 0
+    modified: int = 0
+    requests: int = 0
+
+
+def can_sync(tree: dict[str, Any]) -> bool:
+    """Return True if a cached tree is complete, so the directories that did not change can be reused."""
+    return bool(tree["sha"]) and not tree["truncated"]
+
+
+class TreeSync:
+    """Bring a cached recursive tree up to date by fetching only the directories whose tree SHA changed.
+
+    Git trees are Merkle trees: a directory with the same SHA has exactly the same contents, so its cached
+    entries are reused, and a change deep in the repository costs one request per directory on its path.
+    The sync is a generator that yields the upstream requests it needs and is sent their responses, so the
+    threaded and async GitHub clients drive the same code.
+    """
+
+    def __init__(self, repository_identifier: str, tree: dict[str, Any], max_requests: int = MAX_SYNC_REQUESTS) -> None:
+        """Prepare to sync a tree.
+
+        Args:
+            repository_identifier (str): The repository as owner/name.
+            tree (dict[str, Any]): The cached tree, as returned by get_repo_tree.
+            max_requests (int): How many upstream requests the sync may send before giving up.
+        """
+        self.repository_identifier: str = repository_identifier
+        self.tree: dict[str, Any] = tree
+        self.paths: list[str] = [entry["path"] for entry in tree["entries"]]
+        self.max_requests: int = max_requests
+        self.delta = TreeDelta()
+
+    def request(
+        self, url: str, parameters: dict[str, Any] | None = None, headers: dict[str, str] | None = None
+    ) -> UpstreamRequest:
+        """Count and build a request, giving up if the sync has become more expensive than a full fetch.
+
+        Raises:
+            TreeSyncError: If the sync already sent max_requests requests.
+
+        Returns:
+            UpstreamRequest: The request.
+        """
+        if self.delta.requests >= self.max_requests:
+            msg: str = f"the sync needs more than {self.max_requests} requests"
+            raise TreeSyncError(msg)
+        self.delta.requests += 1
+        return f"/repos/{self.repository_identifier}/{url}", parameters, headers or {}
+
+    def run(self, etag: str | None) -> TreeSyncSteps:
+        """Sync the tree with the HEAD commit.
+
+        Args:
+            etag (str | None): The ETag of the HEAD commit the tree was synced with, if it was synced before.
+
+        Raises:
+            TreeSyncError: If GitHub answered with an error.
+
+        Yields:
+            UpstreamRequest: The next request to send.
+
+        Returns:
+            tuple[dict[str, Any], str | None]: The tree, which is the cached tree itself if the commit was not
+                modified, and the ETag of the HEAD commit.
+        """
+        status, headers, body = yield self.request("commits/HEAD", headers={"If-None-Match": etag} if etag else None)
+        if status == HTTPStatus.NOT_MODIFIED:
+            return self.tree, etag
+        if status != HTTPStatus.OK:
+            msg: str = f"getting the HEAD commit returned {status}"
+            raise TreeSyncError(msg)
+
+        commit: dict[str, Any] = json.loads(body)
+        root: str = commit["commit"]["tree"]["sha"]
+        if root == self.tree["sha"]:
+            return {**self.tree, "commit": commit["sha"]}, headers.get("etag")
+
+        entries: list[dict[str, str | int]] = yield from self.sync_directory("", root)
+        entries.sort(key=lambda entry: entry["path"])
+        return {"sha": root, "truncated": False, "commit": commit["sha"], "entries": entries}, headers.get("etag")
+
+    def subtree(self, path: str) -> list[dict[str, str | int]]:
+        """Return every cached entry below a directory, or every entry for the root.
+
+        Paths with a common prefix are next to each other in the sorted entries, so this is two binary searches.
+        """
+        if not path:
+            return self.tree["entries"]
+        start: int = bisect.bisect_left(self.paths, f"{path}/")
+        end: int = bisect.bisect_left(self.paths, f"{path}0")  # "0" sorts right after "/"
+        return self.tree["entries"][start:end]
+
+    def fetch_tree(
+        self, sha: str, *, recursive: bool
+    ) -> Generator[UpstreamRequest, UpstreamResponse, list[dict[str, Any]]]:
+        """Fetch one tree object.
+
+        Raises:
+            TreeSyncError: If GitHub answered with an error or truncated the tree.
+
+        Yields:
+            UpstreamRequest: The request for the tree.
+
+        Returns:
+            list[dict[str, Any]]: The items of the tree, with paths relative to it.
+        """
+        parameters: dict[str, Any] | None = {"recursive": "1"} if recursive else None
+        status, _, body = yield self.request(f"git/trees/{sha}", parameters)
+        if status != HTTPStatus.OK:
+            msg: str = f"getting tree {sha} returned {status}"
+            raise TreeSyncError(msg)
+        data: dict[str, Any] = json.loads(body)
+        if data.get("truncated"):
+            msg = f"tree {sha} was truncated"
+            raise TreeSyncError(msg)
+        return data["tree"]
+
+    def sync_directory(
+        self, path: str, sha: str
+    ) -> Generator[UpstreamRequest, UpstreamResponse, list[dict[str, str | int]]]:
+        """Fetch a changed directory and return every entry below it, reusing the subdirectories that did not change.
+
+        Args:
+            path (str): The path of the directory, or "" for the root.
+            sha (str): Its new tree SHA.
+
+        Yields:
+            UpstreamRequest: The requests for the changed trees.
+
+        Returns:
+            list[dict[str, str | int]]: The entries below the directory, not sorted.
+        """
+        prefix: str = f"{path}/" if path else ""
+        previous_children: dict[str, dict[str, str | int]] = {
+            str(entry["path"]): entry for entry in self.subtree(path) if "/" not in str(entry["path"])[len(prefix) :]
+        }
+
+        entries: list[dict[str, str | int]] = []
+        for item in (yield from self.fetch_tree(sha, recursive=False)):
+            entry: dict[str, str | int] = convert_tree_json(item, prefix)
+            entries.append(entry)
+            previous: dict[str, str | int] | None = previous_children.pop(str(entry["path"]), None)
+            if previous is None:
+                self.delta.added += 1
+            elif previous["sha"] != entry["sha"] or previous["type"] != entry["type"]:
+                self.delta.modified += 1
+            if entry["type"] != "dir":
+                continue
+
+            if previous is None or previous["type"] != "dir":
+                # Everything below a new directory is new, so one recursive request gets all of it.
+                items: list[dict[str, Any]] = yield from self.fetch_tree(str(entry["sha"]), recursive=True)
+                entries += [convert_tree_json(item, f"{entry['path']}/") for item in items]
+                self.delta.added += len(items)
+            elif previous["sha"] == entry["sha"]:
+                entries += self.subtree(str(entry["path"]))
+            else:
+                entries += yield from self.sync_directory(str(entry["path"]), str(entry["sha"]))
+
+        for removed in previous_children.values():
+            self.delta.removed += 1 + (len(self.subtree(str(removed["path"]))) if removed["type"] == "dir" else 0)
+        return entries
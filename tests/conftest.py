@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from django.db import connections
+from PySide6.QtWidgets import QApplication
+
+from core import sites_github
+from core.blobs import BlobStore
+from core.cache import TTLCache
+from core.github_client import AsyncGitHubClient, GitHubClient, RateLimitScheduler
+from tests.fake_github import FakeGitHub
+from tests.replay_github import FIXTURES, ReplayGitHub
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+    from pathlib import Path
+
+    from PySide6.QtCore import QCoreApplication
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(tmp_path_factory: pytest.TempPathFactory) -> None:
+    """Keep the test database in a file like the real one.
+
+    SQLite fails at once with "database table is locked" when threads write to a shared in-memory database,
+    instead of waiting for the lock like it does for a file.
+    """
+    connections["default"].settings_dict["TEST"]["NAME"] = str(tmp_path_factory.mktemp("database") / "test.sqlite3")
+
+
+@pytest.fixture
+def app() -> QApplication | QCoreApplication:
+    """Fixture for creating the QApplication instance."""
+    app: QCoreApplication | None = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+def use_github(monkeypatch: pytest.MonkeyPatch, url: str, blobs: Path) -> GitHubClient:
+    """Point core.sites_github at a local GitHub, with empty caches and blob store, and return the sync client."""
+    client = GitHubClient(
+        auth=None,
+        base_url=url,
+        pool_size=4,
+        scheduler=RateLimitScheduler(reserve=0, max_wait=2),
+    )
+    monkeypatch.setattr(sites_github, "github_client", client)
+    monkeypatch.setattr(
+        sites_github,
+        "async_github_client",
+        AsyncGitHubClient(auth=None, base_url=url, pool_size=4, scheduler=client.scheduler),
+    )
+    monkeypatch.setattr(sites_github, "repo_contents_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(sites_github, "repo_tree_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(sites_github, "blob_store", BlobStore(blobs))
+    return client
+
+
+@pytest.fixture
+def fake_github(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Generator[FakeGitHub]:
+    """Run a local fake GitHub and point core.sites_github at it, with empty caches and blob store."""
+    server = FakeGitHub()
+    server.start()
+    client: GitHubClient = use_github(monkeypatch, server.url, tmp_path / "blobs")
+
+    yield server
+
+    client.close()
+    server.stop()
+
+
+@pytest.fixture
+def offline(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Unplug the network: connecting anywhere but localhost fails."""
+    connect: Callable[[socket.socket, Any], None] = socket.socket.connect
+
+    def connect_locally(sock: socket.socket, address: Any) -> None:  # noqa: ANN401
+        if isinstance(address, tuple) and address[0] not in {"127.0.0.1", "::1", "localhost"}:
+            msg: str = f"The network is unplugged, not connecting to {address[0]}"
+            raise OSError(msg)
+        connect(sock, address)
+
+    monkeypatch.setattr(socket.socket, "connect", connect_locally)
+
+
+@pytest.fixture
+def replay_github(offline: None, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Generator[ReplayGitHub]:
+    """Replay the recorded responses of TheLovinator1/browser and point core.sites_github at them, offline."""
+    server = ReplayGitHub(FIXTURES / "thelovinator1_browser.json")
+    server.start()
+    client: GitHubClient = use_github(monkeypatch, server.url, tmp_path / "blobs")
+
+    yield server
+
+    client.close()
+    server.stop()
+
+
+STUB_TREE: list[dict[str, Any]] = [
+    {"name": "README.md", "path": "README.md", "type": "file", "size": 5, "sha": "a" * 40},
+    {"name": "src", "path": "src", "type": "dir", "size": 0, "sha": "b" * 40},
+    {"name": "main.py", "path": "src/main.py", "type": "file", "size": 10, "sha": "c" * 40},
+]
+
+
+class TreeStubHandler(BaseHTTPRequestHandler):
+    """Serve the tree of any repository as NDJSON, or a 404 for the repository called missing.
+
+    Like the API, the tree has an ETag and a request with a matching If-None-Match gets an empty 304.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive with a Content-Length, so Qt never has to resend a request
+    request_count: int = 0
+    tree: list[dict[str, Any]] = STUB_TREE
+
+    def do_GET(self) -> None:
+        """Write the tree."""
+        type(self).request_count += 1
+        if "/missing/" in self.path:
+            self.send_error(404)
+            return
+        body: bytes = b"\n".join(json.dumps(entry).encode() for entry in self.tree)
+        etag: str = f'"{hashlib.sha256(body).hexdigest()[:40]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the test output quiet."""
+
+
+@pytest.fixture
+def tree_backend() -> Generator[str]:
+    """Run a stub of the API router that serves a small tree for any repository, and yield its base URL."""
+    TreeStubHandler.request_count = 0
+    TreeStubHandler.tree = STUB_TREE
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TreeStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/github/"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,267 @@
+"""A local stand-in for the GitHub REST API, good enough for the endpoints we use."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+
+def make_file(path: str, size: int = 1) -> dict[str, Any]:
+    """Create a file entry as returned by the contents API."""
+    sha: str = hashlib.sha1(path.encode(), usedforsecurity=False).hexdigest()
+    return {
+        "name": path.rsplit("/", 1)[-1],
+        "path": path,
+        "type": "file",
+        "size": size,
+        "sha": sha,
+        "download_url": f"https://raw.githubusercontent.com/user/repo/main/{path}",
+        "html_url": f"https://github.com/user/repo/blob/main/{path}",
+    }
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """Answer GitHub API requests from the state of the FakeGitHub server."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    server: FakeGitHub
+
+    def do_GET(self) -> None:
+        """Route the request."""
+        fake: FakeGitHub = self.server
+        url = urlparse(self.path)
+        path: str = url.path.rstrip("/")
+        if not self.begin(path):
+            return
+
+        parts: list[str] = path.strip("/").split("/")
+        if len(parts) < 3 or parts[0] != "repos" or f"{parts[1]}/{parts[2]}" not in fake.repos:
+            self.send_json({"message": "Not Found"}, HTTPStatus.NOT_FOUND)
+            return
+
+        full_name: str = f"{parts[1]}/{parts[2]}"
+        contents: list[dict[str, Any]] = fake.repos[full_name]
+        match parts[3:]:
+            case []:
+                self.send_json(fake.repo_json(full_name))
+            case ["contents"]:
+                self.send_conditional(contents)
+            case ["commits", "HEAD"]:
+                self.send_conditional(fake.commit_json(full_name))
+            case ["git", "trees", sha] if tree := fake.tree_json(
+                full_name, sha, recursive=sha == "HEAD" or "recursive" in parse_qs(url.query)
+            ):
+                self.send_conditional(tree)
+            case ["git", "blobs", sha] if sha in fake.blobs:
+                self.send_json(fake.blob_json(sha))
+            case _:
+                self.send_json({"message": "Not Found"}, HTTPStatus.NOT_FOUND)
+
+    def begin(self, path: str) -> bool:
+        """Count the request, wait for the injected latency and send the rate limit error if one is due.
+
+        Returns:
+            bool: Whether the request still has to be answered.
+        """
+        fake: FakeGitHub = self.server
+        with fake.lock:
+            fake.requests.append(path)
+            fake.connections.add(self.client_address)
+        if fake.delay:
+            time.sleep(fake.delay)
+
+        if fake.retry_after_responses > 0:
+            with fake.lock:
+                fake.retry_after_responses -= 1
+            self.send_json(
+                {"message": "You have exceeded a secondary rate limit."}, HTTPStatus.FORBIDDEN, {"Retry-After": "1"}
+            )
+            return False
+
+        if fake.remaining <= 0:
+            self.send_json({"message": "API rate limit exceeded"}, HTTPStatus.FORBIDDEN)
+            return False
+        return True
+
+    def send_conditional(self, data: Any) -> None:  # noqa: ANN401
+        """Send data with an ETag, or 304 Not Modified if the client already has it."""
+        body: bytes = json.dumps(data).encode()
+        etag: str = f'"{hashlib.sha256(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_rate_limit_headers(charge=False)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_json(data, headers={"ETag": etag})
+
+    def send_json(self, data: Any, status: int = HTTPStatus.OK, headers: dict[str, str] | None = None) -> None:  # noqa: ANN401
+        """Send a JSON response with rate limit headers."""
+        body: bytes = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_rate_limit_headers(charge=True)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def send_rate_limit_headers(self, *, charge: bool) -> None:
+        """Send the X-RateLimit-* headers. Conditional requests answered with 304 are free."""
+        fake: FakeGitHub = self.server
+        with fake.lock:
+            if charge and fake.remaining > 0:
+                fake.remaining -= 1
+            remaining: int = fake.remaining
+        self.send_header("X-RateLimit-Limit", str(fake.limit))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset", str(int(fake.reset_at)))
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the test output quiet."""
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """A GitHub API server on localhost with scriptable repositories and rate limits."""
+
+    daemon_threads = True
+    request_queue_size = 1024  # Load tests open hundreds of connections at once
+
+    def __init__(self, limit: int = 5000, handler: type[FakeGitHubHandler] = FakeGitHubHandler) -> None:
+        """Start listening on a random port.
+
+        Args:
+            limit (int): The rate limit per window.
+            handler (type[FakeGitHubHandler]): Answers the requests.
+        """
+        super().__init__(("127.0.0.1", 0), handler)
+        self.lock = threading.Lock()
+        self.repos: dict[str, list[dict[str, Any]]] = {}
+        self.blobs: dict[str, bytes] = {}
+        self.history: dict[str, list[str]] = {}
+        self.bytes_sent: int = 0
+        self.requests: list[str] = []
+        self.connections: set[tuple[str, int]] = set()
+        self.limit: int = limit
+        self.remaining: int = limit
+        self.reset_at: float = time.time() + 3600
+        self.retry_after_responses: int = 0
+        self.delay: float = 0.0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+    def repo_json(self, full_name: str) -> dict[str, Any]:
+        """Return the repository object."""
+        return {
+            "full_name": full_name,
+            "name": full_name.split("/")[1],
+            "url": f"{self.url}/repos/{full_name}",
+            "default_branch": "main",
+        }
+
+    def git_trees(self, full_name: str) -> tuple[str, dict[str, list[dict[str, Any]]]]:
+        """Build the git tree objects of the files of a repository.
+
+        Returns:
+            tuple[str, dict[str, list[dict[str, Any]]]]: The SHA of the root tree, and the entries of every tree
+                by its SHA, with paths relative to the tree like the Git Trees API.
+        """
+        children: dict[str, list[dict[str, Any]]] = {"": []}
+
+        def add_directory(directory: str) -> None:
+            if directory in children:
+                return
+            grandparent, _, name = directory.rpartition("/")
+            add_directory(grandparent)
+            children[directory] = []
+            children[grandparent].append({"path": name, "mode": "040000", "type": "tree"})
+
+        for entry in self.repos[full_name]:
+            parent, _, name = entry["path"].rpartition("/")
+            add_directory(parent)
+            children[parent].append(
+                {"path": name, "mode": "100644", "type": "blob", "sha": entry["sha"], "size": entry["size"]},
+            )
+
+        trees: dict[str, list[dict[str, Any]]] = {}
+
+        def tree_sha(directory: str) -> str:
+            entries: list[dict[str, Any]] = sorted(children[directory], key=lambda entry: entry["path"])
+            for entry in entries:
+                if entry["type"] == "tree":
+                    entry["sha"] = tree_sha(f"{directory}/{entry['path']}".lstrip("/"))
+            listing: str = "".join(f"{entry['mode']} {entry['path']} {entry['sha']}\n" for entry in entries)
+            sha: str = hashlib.sha1(listing.encode(), usedforsecurity=False).hexdigest()
+            trees[sha] = entries
+            return sha
+
+        return tree_sha(""), trees
+
+    def tree_json(self, full_name: str, sha: str = "HEAD", *, recursive: bool = True) -> dict[str, Any] | None:
+        """Return a tree of the repository, the root tree for HEAD, or None if there is no tree with the SHA."""
+        root, trees = self.git_trees(full_name)
+        sha = root if sha == "HEAD" else sha
+        if sha not in trees:
+            return None
+
+        def walk(tree: str, prefix: str) -> list[dict[str, Any]]:
+            items: list[dict[str, Any]] = []
+            for entry in trees[tree]:
+                items.append({**entry, "path": prefix + entry["path"]})
+                if recursive and entry["type"] == "tree":
+                    items += walk(entry["sha"], f"{prefix}{entry['path']}/")
+            return items
+
+        return {"sha": sha, "truncated": False, "tree": walk(sha, "")}
+
+    def commit(self, full_name: str, files: list[dict[str, Any]]) -> str:
+        """Make the files the new state of a repository, as a commit on top of the current one."""
+        self.repos[full_name] = files
+        root, _ = self.git_trees(full_name)
+        parents: list[str] = self.history.setdefault(full_name, [])
+        sha: str = hashlib.sha1(f"{root} {parents[-1:]}".encode(), usedforsecurity=False).hexdigest()
+        parents.append(sha)
+        return sha
+
+    def commit_json(self, full_name: str) -> dict[str, Any]:
+        """Return the HEAD commit of a repository."""
+        root, _ = self.git_trees(full_name)
+        history: list[str] = self.history.get(full_name) or [
+            hashlib.sha1(root.encode(), usedforsecurity=False).hexdigest()
+        ]
+        return {"sha": history[-1], "commit": {"tree": {"sha": root}}}
+
+    def add_blob(self, data: bytes) -> str:
+        """Make a file content available to every repository and return its git blob SHA."""
+        sha: str = hashlib.sha1(b"blob %d\0" % len(data) + data, usedforsecurity=False).hexdigest()
+        self.blobs[sha] = data
+        return sha
+
+    def blob_json(self, sha: str) -> dict[str, Any]:
+        """Return a blob like the Git Blobs API, base64 encoded in lines of 60 characters."""
+        data: bytes = self.blobs[sha]
+        return {"sha": sha, "size": len(data), "encoding": "base64", "content": base64.encodebytes(data).decode()}
@@ -0,0 +1,54 @@
+"""A GitHub listing swapped into a tab as a widget, the baseline the github:// scheme is benchmarked against.
+
+Before the scheme handler, opening a repository replaced the web view of the tab with a widget that streamed
+the tree itself and listed the root directory.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import QListWidget
+
+from browser.github_scheme import format_github_item
+from browser.github_trees import make_tree_request, take_ndjson_lines
+
+if TYPE_CHECKING:
+    from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply
+
+
+class GitHubListWidget(QListWidget):
+    """List the root directory of a repository, streamed from the API with one request per widget."""
+
+    loaded = Signal(int)
+
+    def __init__(self, network_manager: QNetworkAccessManager, api_base_url: str) -> None:
+        """Initialize an empty list."""
+        super().__init__()
+        self.setUniformItemSizes(True)
+        self.network_manager: QNetworkAccessManager = network_manager
+        self.api_base_url: str = api_base_url
+        self.buffer = bytearray()
+        self.entries: list[dict[str, Any]] = []
+
+    def start(self, github_username: str, github_repo: str) -> None:
+        """Fetch the tree of a repository and list its root directory when it has arrived."""
+        reply: QNetworkReply = self.network_manager.get(
+            make_tree_request(self.api_base_url, github_username, github_repo),
+        )
+        reply.setParent(self)
+        reply.readyRead.connect(lambda: self.read(reply))
+        reply.finished.connect(lambda: self.finish(reply))
+
+    def read(self, reply: QNetworkReply) -> None:
+        """Parse the complete lines received so far."""
+        self.buffer += reply.readAll().data()
+        self.entries.extend(entry for entry in take_ndjson_lines(self.buffer) if "/" not in entry["path"])
+
+    def finish(self, reply: QNetworkReply) -> None:
+        """List the root directory."""
+        self.buffer += reply.readAll().data()
+        self.entries.extend(entry for entry in take_ndjson_lines(self.buffer, final=True) if "/" not in entry["path"])
+        self.addItems([format_github_item(entry) for entry in self.entries])
+        self.loaded.emit(len(self.entries))
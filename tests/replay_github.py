@@ -0,0 +1,146 @@
+r"""A GitHub stand-in that replays recorded API responses, so tests and benchmarks run with the network unplugged.
+
+Record a cassette from the real API with:
+
+    GITHUB_ACCESS_TOKEN=... python -m tests.replay_github tests/fixtures/github/thelovinator1_browser.json \
+        /repos/TheLovinator1/browser/contents/ "/repos/TheLovinator1/browser/git/trees/HEAD?recursive=1"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from http import HTTPStatus
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import httpx
+
+from tests.fake_github import FakeGitHub, FakeGitHubHandler
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+FIXTURES: Path = Path(__file__).parent / "fixtures" / "github"
+GITHUB_API_URL = "https://api.github.com"
+
+# Only these response headers are recorded. The rate limit headers are made up by the replaying server.
+RECORDED_HEADERS: tuple[str, ...] = ("content-type", "etag", "link", "last-modified")
+
+
+def request_key(path: str, query: str) -> str:
+    """Return the key a request is recorded under, the path without a trailing slash and the sorted query."""
+    parameters: list[tuple[str, str]] = sorted(parse_qsl(query, keep_blank_values=True))
+    return f"{path.rstrip('/')}?{urlencode(parameters)}" if parameters else path.rstrip("/")
+
+
+class ReplayGitHubHandler(FakeGitHubHandler):
+    """Answer GitHub API requests from the recorded responses, or record them from the upstream API."""
+
+    server: ReplayGitHub
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Send the recorded response of the request."""
+        replay: ReplayGitHub = self.server
+        url = urlparse(self.path)
+        key: str = request_key(url.path, url.query)
+        if not self.begin(key):
+            return
+
+        response: dict[str, Any] | None = replay.responses.get(key)
+        if response is None and replay.upstream is not None:
+            response = replay.record(key)
+        if response is None:
+            with replay.lock:
+                replay.misses.append(key)
+            self.send_json({"message": f"No recorded response for {key}"}, HTTPStatus.NOT_FOUND)
+            return
+
+        headers: dict[str, str] = dict(response["headers"])
+        etag: str | None = headers.get("etag")
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_rate_limit_headers(charge=False)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        headers.pop("content-type", None)
+        self.send_json(response["body"], response["status"], headers)
+
+
+class ReplayGitHub(FakeGitHub):
+    """A GitHub API server on localhost that replays a cassette of recorded responses.
+
+    Latency and rate limits are injected with the attributes of FakeGitHub: delay, remaining and
+    retry_after_responses. Requests that were never recorded get a 404 and are listed in misses.
+    """
+
+    def __init__(self, cassette: Path, upstream: str | None = None, token: str | None = None) -> None:
+        """Load the cassette and start listening on a random port.
+
+        Args:
+            cassette (Path): The JSON file with the recorded responses. It does not have to exist when recording.
+            upstream (str | None): The API to record missing responses from, or None to only replay.
+            token (str | None): The token to send upstream when recording.
+        """
+        super().__init__(handler=ReplayGitHubHandler)
+        self.cassette: Path = cassette
+        self.upstream: str | None = upstream
+        self.token: str | None = token
+        self.responses: dict[str, dict[str, Any]] = (
+            json.loads(cassette.read_text(encoding="utf-8"))["responses"] if cassette.exists() else {}
+        )
+        self.misses: list[str] = []
+
+    def record(self, key: str) -> dict[str, Any]:
+        """Get a response from the upstream API and add it to the cassette.
+
+        Args:
+            key (str): The path and query of the request.
+
+        Returns:
+            dict[str, Any]: The recorded status, headers and body.
+        """
+        headers: dict[str, str] = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        upstream: httpx.Response = httpx.get(f"{self.upstream}{key}", headers=headers, timeout=30)
+        response: dict[str, Any] = {
+            "status": upstream.status_code,
+            "headers": {name: upstream.headers[name] for name in RECORDED_HEADERS if name in upstream.headers},
+            "body": upstream.json(),
+        }
+        with self.lock:
+            self.responses[key] = response
+        return response
+
+    def save(self) -> None:
+        """Write the recorded responses to the cassette, sorted so that re-recording gives small diffs."""
+        self.cassette.parent.mkdir(parents=True, exist_ok=True)
+        data: dict[str, Any] = {"responses": dict(sorted(self.responses.items()))}
+        self.cassette.write_text(json.dumps(data, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Record the responses of the given API paths into a cassette."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cassette", type=Path, help="the JSON file to add the responses to")
+    parser.add_argument("paths", nargs="+", help="API paths with their query, like /repos/owner/name/contents/")
+    parser.add_argument("--upstream", default=GITHUB_API_URL, help="the API to record from")
+    arguments: argparse.Namespace = parser.parse_args(argv)
+
+    server = ReplayGitHub(arguments.cassette, upstream=arguments.upstream, token=os.getenv("GITHUB_ACCESS_TOKEN"))
+    server.start()
+    try:
+        for path in arguments.paths:
+            httpx.get(f"{server.url}{path}", timeout=60)
+    finally:
+        server.stop()
+    server.save()
+
+
+if __name__ == "__main__":
+    main()
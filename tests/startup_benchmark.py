@@ -0,0 +1,88 @@
+"""Measure how long the browser takes to start.
+
+Run it in a fresh process, so nothing is imported yet:
+
+    QT_QPA_PLATFORM=offscreen python -m tests.startup_benchmark
+
+Prints a JSON object with the seconds from the start of the process to:
+
+- import: browser.main is imported.
+- window_shown: the window is painted for the first time.
+- first_tab_loaded: the page in the first tab has finished loading.
+
+It also records whether QtWebEngine was already imported when the window was first painted.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+
+START: float = time.perf_counter()
+
+from PySide6.QtCore import QCoreApplication, QEvent, QObject, Qt, QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from browser.main import Browser, is_web_view  # noqa: E402
+
+IMPORTED: float = time.perf_counter()
+
+# Give up if the first tab has not loaded by then.
+TIMEOUT_MS = 30_000
+
+
+class FirstPaintWatcher(QObject):
+    """Record when the window is painted for the first time."""
+
+    def __init__(self, timings: dict[str, float | bool | None]) -> None:
+        """Initialize the watcher.
+
+        Args:
+            timings (dict[str, float | bool | None]): Where to record the time.
+        """
+        super().__init__()
+        self.timings: dict[str, float | bool | None] = timings
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:  # noqa: N802
+        """Record the first paint event."""
+        if event.type() == QEvent.Type.Paint and self.timings["window_shown"] is None:
+            self.timings["window_shown"] = time.perf_counter() - START
+            self.timings["webengine_imported_before_paint"] = "PySide6.QtWebEngineWidgets" in sys.modules
+        return super().eventFilter(watched, event)
+
+
+def main() -> None:
+    """Start the browser, wait for the first tab to load and print the timings."""
+    timings: dict[str, float | bool | None] = {
+        "import": IMPORTED - START,
+        "window_shown": None,
+        "first_tab_loaded": None,
+        "webengine_imported_before_paint": None,
+    }
+
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication([])
+    window = Browser()
+    watcher = FirstPaintWatcher(timings)
+    window.installEventFilter(watcher)
+
+    def on_load_finished() -> None:
+        if timings["first_tab_loaded"] is None:
+            timings["first_tab_loaded"] = time.perf_counter() - START
+            app.quit()
+
+    def on_current_changed(index: int) -> None:
+        widget = window.tabs.widget(index)
+        if is_web_view(widget):
+            widget.loadFinished.connect(on_load_finished)
+
+    window.tabs.currentChanged.connect(on_current_changed)
+    QTimer.singleShot(TIMEOUT_MS, app.quit)
+    app.exec()
+
+    print(json.dumps(timings))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import random
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+
+from browser.adblock import FilterMatcher, load_filter_lists, parse_filter
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from browser.adblock import FilterRule
+
+BENCHMARK_RULES = 50_000
+BENCHMARK_URLS = 100_000
+MIN_URLS_PER_SECOND = 100_000
+
+FILTERS = """\
+[Adblock Plus 2.0]
+! Title: Test list
+||ads.example.com^
+||tracker.net^$third-party
+/banner/*/ad_$image
+-300x250.
+|https://start.example.org/pixel
+.swf|
+@@||ads.example.com/allowed/$script
+||cdn.example.com/ads.js$script,important
+@@||cdn.example.com^
+||social.com^$domain=news.com|~sport.news.com
+/\\/track\\d+\\.gif/
+example.com##.ad
+||popups.com^$popup
+"""
+
+
+@pytest.fixture
+def matcher() -> FilterMatcher:
+    """Compile the test list."""
+    return FilterMatcher.compile(FILTERS.splitlines())
+
+
+def blocked_by(matcher: FilterMatcher, url: str, source_url: str = "https://page.com/", kind: str = "script") -> str:
+    """Return the text of the rule that blocks a request, or an empty string if it is allowed."""
+    rule: FilterRule | None = matcher.match(url, source_url, kind)
+    return rule.text if rule is not None else ""
+
+
+def test_unsupported_lines_are_skipped(matcher: FilterMatcher) -> None:
+    """Test that comments, element hiding and options a request filter can not honour are left out."""
+    assert len(matcher) == 11
+    assert parse_filter("example.com##.ad") is None
+    assert parse_filter("||popups.com^$popup") is None
+    assert parse_filter("/[unbalanced/") is None
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("https://ads.example.com/banner.js", "||ads.example.com^"),
+        ("https://x.ads.example.com:8080/", "||ads.example.com^"),
+        ("https://badads.example.com/", ""),
+        ("https://ads.example.community/", ""),
+        ("https://ads.example.com/allowed/x.js", ""),
+        ("https://tracker.net/t.js", "||tracker.net^$third-party"),
+        ("https://site.com/img-300x250.png", "-300x250."),
+        ("https://site.com/img-300x2500.png", ""),
+        ("https://start.example.org/pixel?x=1", "|https://start.example.org/pixel"),
+        ("https://other.com/?u=https://start.example.org/pixel", ""),
+        ("https://site.com/movie.swf", ".swf|"),
+        ("https://site.com/movie.swf?x", ""),
+        ("https://cdn.example.com/ads.js", "||cdn.example.com/ads.js$script,important"),
+        ("https://cdn.example.com/app.js", ""),
+        ("https://site.com/TRACK42.gif", "/\\/track\\d+\\.gif/"),
+    ],
+)
+def test_patterns(matcher: FilterMatcher, url: str, expected: str) -> None:
+    """Test anchors, separators, wildcards, exceptions and important rules."""
+    assert blocked_by(matcher, url) == expected
+
+
+def test_options(matcher: FilterMatcher) -> None:
+    """Test that the type, party and domain options limit where a rule applies."""
+    assert blocked_by(matcher, "https://tracker.net/t.js", "https://www.tracker.net/") == ""
+    assert blocked_by(matcher, "https://site.com/banner/1/ad_2.png", kind="image") == "/banner/*/ad_$image"
+    assert blocked_by(matcher, "https://site.com/banner/1/ad_2.png", kind="script") == ""
+    assert blocked_by(matcher, "https://social.com/like.js", "https://www.news.com/") != ""
+    assert blocked_by(matcher, "https://social.com/like.js", "https://sport.news.com/") == ""
+    assert blocked_by(matcher, "https://social.com/like.js", "https://other.com/") == ""
+    assert blocked_by(matcher, "https://ads.example.com/", "", kind="document") == ""
+    assert matcher.stats.blocked == 2
+
+
+def test_compiled_filters_are_cached(tmp_path: Path) -> None:
+    """Test that the second load reads the compiled filters, and that changing a list compiles it again."""
+    filter_list: Path = tmp_path / "easylist.txt"
+    filter_list.write_text(FILTERS, encoding="utf-8")
+    cache_dir: Path = tmp_path / "cache"
+
+    compiled: FilterMatcher = load_filter_lists([filter_list], cache_dir)
+    cached_files: list[Path] = list(cache_dir.iterdir())
+    assert len(cached_files) == 1
+    cached: FilterMatcher = load_filter_lists([filter_list], cache_dir)
+    assert cached.dumps() == compiled.dumps()
+    assert blocked_by(cached, "https://ads.example.com/") == "||ads.example.com^"
+
+    filter_list.write_text(f"{FILTERS}||new.example.com^\n", encoding="utf-8")
+    updated: FilterMatcher = load_filter_lists([filter_list], cache_dir)
+    assert len(updated) == len(compiled) + 1
+    assert list(cache_dir.iterdir()) != cached_files
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def make_filter_list(rng: random.Random, count: int) -> list[str]:
+    """Generate an EasyList-like list: mostly host rules, then path rules, options and exceptions."""
+    words: list[str] = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(20_000)]
+    tlds: list[str] = ["com", "net", "org", "io", "de", "co.uk"]
+    rules: list[str] = []
+    while len(rules) < count:
+        kind: float = rng.random()
+        host: str = f"{rng.choice(words)}.{rng.choice(tlds)}"
+        if kind < 0.55:
+            rules.append(f"||{host}^" + rng.choice(["", "", "$third-party", "$script,image"]))
+        elif kind < 0.80:
+            rules.append(f"/{rng.choice(words)}/{rng.choice(words)}{rng.choice(['_', '-', '.'])}")
+        elif kind < 0.90:
+            rules.append(f"-{rng.choice(words)}-{rng.randint(1, 999)}x{rng.randint(1, 999)}.")
+        elif kind < 0.95:
+            rules.append(f"||{host}/{rng.choice(words)}/*/{rng.choice(words)}$domain={rng.choice(words)}.com")
+        else:
+            rules.append(f"@@||{host}/{rng.choice(words)}^$script")
+    return rules
+
+
+def make_urls(rng: random.Random, count: int) -> list[str]:
+    """Generate request URLs for pages and their subresources."""
+    words: list[str] = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(5000)]
+    return [
+        f"https://{rng.choice(['', 'www.', 'cdn.', 'static.'])}{rng.choice(words)}.com/"
+        f"{'/'.join(rng.choices(words, k=rng.randint(1, 4)))}.{rng.choice(['js', 'css', 'png', 'html'])}"
+        f"{rng.choice(['', '', f'?id={rng.randint(1, 10**6)}&ref={rng.choice(words)}'])}"
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.benchmark
+def test_matching_throughput(tmp_path: Path) -> None:
+    """Test that one core matches at least 100k URLs a second against a 50k-rule list."""
+    rng = random.Random(15)
+    filter_list: Path = tmp_path / "synthetic.txt"
+    filter_list.write_text("\n".join(make_filter_list(rng, BENCHMARK_RULES)), encoding="utf-8")
+    cache_dir: Path = tmp_path / "cache"
+
+    start: float = time.perf_counter()
+    load_filter_lists([filter_list], cache_dir)
+    compile_seconds: float = time.perf_counter() - start
+    start = time.perf_counter()
+    matcher: FilterMatcher = load_filter_lists([filter_list], cache_dir)
+    cached_seconds: float = time.perf_counter() - start
+
+    urls: list[str] = make_urls(rng, BENCHMARK_URLS)
+    sources: list[str] = [f"https://{rng.choice(['news', 'shop', 'blog'])}.com/" for _ in urls]
+    for url, source in zip(urls[:1000], sources, strict=False):
+        matcher.match(url, source, "script")  # Warm up the regex cache
+    start = time.perf_counter()
+    for url, source in zip(urls, sources, strict=True):
+        matcher.match(url, source, "script")
+    elapsed: float = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"{len(matcher)} rules compiled in {compile_seconds * 1000:.0f} ms, loaded from the cache in "
+        f"{cached_seconds * 1000:.0f} ms; {BENCHMARK_URLS / elapsed:,.0f} URLs/s, "
+        f"{matcher.stats.blocked} of {matcher.stats.checked} blocked",
+    )
+    assert len(matcher) >= BENCHMARK_RULES * 0.99
+    assert cached_seconds < compile_seconds
+    assert BENCHMARK_URLS / elapsed >= MIN_URLS_PER_SECOND
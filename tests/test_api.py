@@ -0,0 +1,179 @@
+"""Tests for the API endpoints."""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from django.test import Client
+
+from core import api
+from core.snapshots import save_snapshot
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from django.http import HttpResponse, StreamingHttpResponse
+
+
+def make_tree(count: int) -> dict[str, Any]:
+    """Create a tree like the one returned by get_repo_tree."""
+    entries: list[dict[str, str | int]] = [{"name": "src", "path": "src", "type": "dir", "size": 0, "sha": "0" * 40}]
+    entries += [
+        {"name": f"{i:03}.py", "path": f"src/{i:03}.py", "type": "file", "size": i, "sha": f"{i:040x}"}
+        for i in range(count - 1)
+    ]
+    return {"sha": "f" * 40, "truncated": False, "entries": entries}
+
+
+def make_contents(count: int) -> list[dict[str, str | int]]:
+    """Create a listing like the one returned by get_repo_contents."""
+    return [
+        {
+            "name": f"{i:06}.py",
+            "path": f"{i:06}.py",
+            "type": "file",
+            "download_url": f"https://raw.githubusercontent.com/user/repo/main/{i:06}.py",
+            "html_url": f"https://github.com/user/repo/blob/main/{i:06}.py",
+            "size": i,
+            "sha": f"{i:040x}",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def client() -> Client:
+    """Fixture for the Django test client."""
+    return Client()
+
+
+def test_tree_cursor_pagination(client: Client, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that following next_cursor returns every entry exactly once."""
+    tree: dict[str, Any] = make_tree(25)
+    monkeypatch.setattr(api, "get_repo_tree", lambda username, repo_name: tree)
+
+    paths: list[str] = []
+    cursor: str | None = None
+    pages: int = 0
+    while True:
+        url: str = "/api/github/repos/user/repo/tree/?limit=10" + (f"&cursor={cursor}" if cursor else "")
+        response: HttpResponse = client.get(url)
+        assert response.status_code == 200
+        data: dict[str, Any] = response.json()
+        paths += [entry["path"] for entry in data["entries"]]
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert paths == [entry["path"] for entry in tree["entries"]]
+
+
+def test_tree_invalid_cursor(client: Client, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a broken cursor is a client error."""
+    monkeypatch.setattr(api, "get_repo_tree", lambda username, repo_name: make_tree(5))
+    response: HttpResponse = client.get("/api/github/repos/user/repo/tree/?cursor=%%%")
+    assert response.status_code == 400
+
+
+def test_tree_stream(client: Client, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the streamed tree has the same entries as the pages."""
+    tree: dict[str, Any] = make_tree(1234)
+    monkeypatch.setattr(api, "get_repo_tree", lambda username, repo_name: tree)
+
+    response: StreamingHttpResponse = client.get("/api/github/repos/user/repo/tree/?stream=true")
+    assert response["Content-Type"] == api.NDJSON_CONTENT_TYPE
+    lines: list[str] = b"".join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == tree["entries"]
+
+
+def test_tree_not_modified(client: Client, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the tree ETag follows the tree SHA and that a matching If-None-Match gets an empty 304."""
+    tree: dict[str, Any] = make_tree(25)
+    monkeypatch.setattr(api, "get_repo_tree", lambda username, repo_name: tree)
+
+    for url in ("/api/github/repos/user/repo/tree/?limit=10", "/api/github/repos/user/repo/tree/?stream=true"):
+        response: HttpResponse = client.get(url)
+        etag: str = response["ETag"]
+        assert response["Cache-Control"] == api.LISTING_CACHE_CONTROL
+
+        not_modified: HttpResponse = client.get(url, headers={"If-None-Match": f"W/{etag}"})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified["ETag"] == etag
+
+    first_page: str = client.get("/api/github/repos/user/repo/tree/?limit=10")["ETag"]
+    assert client.get("/api/github/repos/user/repo/tree/?limit=5")["ETag"] != first_page
+    tree["sha"] = "e" * 40
+    response = client.get("/api/github/repos/user/repo/tree/?limit=10", headers={"If-None-Match": first_page})
+    assert response.status_code == 200
+    assert response["ETag"] != first_page
+
+
+@pytest.mark.django_db
+def test_contents_not_modified(client: Client) -> None:
+    """Test that the contents ETag changes with any entry and that a matching If-None-Match gets a 304."""
+    save_snapshot("user", "repo", make_contents(10))
+    etag: str = client.get("/api/github/repos/user/repo/contents/")["ETag"]
+    response: HttpResponse = client.get("/api/github/repos/user/repo/contents/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    save_snapshot("user", "repo", [{**make_contents(10)[0], "size": 1}, *make_contents(10)[1:]])
+    response = client.get("/api/github/repos/user/repo/contents/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_contents_stream_matches_list(client: Client) -> None:
+    """Test that streaming the contents gives the same entries, in the same order, as the JSON list."""
+    save_snapshot("user", "repo", make_contents(1234))
+
+    listing: list[dict[str, Any]] = client.get("/api/github/repos/user/repo/contents/").json()
+    response: StreamingHttpResponse = client.get("/api/github/repos/user/repo/contents/?stream=true")
+    streamed: list[dict[str, Any]] = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    assert streamed == listing == make_contents(1234)
+
+
+def measure_first_chunk(client: Client, url: str) -> tuple[float, int, int]:
+    """Request a URL and return the time to the first chunk, the peak traced memory and the number of lines."""
+    start: float = time.perf_counter()
+    response: HttpResponse | StreamingHttpResponse = client.get(url)
+    chunks: Iterator[bytes] = iter(response.streaming_content if response.streaming else [response.content])
+    first_chunk: bytes = next(chunks)
+    time_to_first_byte: float = time.perf_counter() - start
+    lines: int = first_chunk.count(b"\n") + sum(chunk.count(b"\n") for chunk in chunks)
+    return time_to_first_byte, tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0, lines
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_contents_stream_benchmark(client: Client) -> None:
+    """Compare memory and time to first byte of the JSON list and the NDJSON stream on a 100k-entry listing."""
+    save_snapshot("user", "huge", make_contents(100_000))
+    list_url = "/api/github/repos/user/huge/contents/"
+    stream_url = "/api/github/repos/user/huge/contents/?stream=true"
+
+    list_ttfb, _, _ = measure_first_chunk(client, list_url)
+    stream_ttfb, _, stream_lines = measure_first_chunk(client, stream_url)
+    assert stream_lines == 100_000
+
+    tracemalloc.start()
+    _, list_peak, _ = measure_first_chunk(client, list_url)
+    tracemalloc.stop()
+    tracemalloc.start()
+    _, stream_peak, _ = measure_first_chunk(client, stream_url)
+    tracemalloc.stop()
+
+    print(  # noqa: T201
+        f"JSON list: {list_ttfb * 1000:.0f} ms to first byte, {list_peak / 2**20:.1f} MiB peak; "
+        f"NDJSON stream: {stream_ttfb * 1000:.0f} ms to first byte, {stream_peak / 2**20:.1f} MiB peak",
+    )
+    assert stream_ttfb < list_ttfb
+    assert stream_peak < list_peak
@@ -0,0 +1,185 @@
+"""Tests for the async API endpoints and single-flight request coalescing."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import httpx
+import pytest
+from django.test import AsyncClient, Client
+
+from core import sites_github
+from core.models import Repository
+from core.singleflight import SingleFlight
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    from tests.fake_github import FakeGitHub
+
+
+def test_single_flight_coalesces_concurrent_calls() -> None:
+    """Test that concurrent calls for a key share one call, and that later calls start a new one."""
+    flight = SingleFlight()
+    started: list[int] = []
+
+    async def work() -> int:
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return len(started)
+
+    async def main() -> None:
+        results: list[int] = await asyncio.gather(*(flight.do("key", work) for _ in range(50)))
+        assert results == [1] * 50
+        assert flight.in_flight() == 0
+        assert await flight.do("key", work) == 2
+
+    asyncio.run(main())
+    assert flight.stats() == {"calls": 2, "coalesced": 49, "in_flight": 0}
+
+
+def test_single_flight_errors_and_cancellation() -> None:
+    """Test that errors reach every caller and that a cancelled caller does not cancel the others."""
+    flight = SingleFlight()
+
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        msg = "upstream failed"
+        raise RuntimeError(msg)
+
+    async def work() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main() -> None:
+        results: list[Any] = await asyncio.gather(*(flight.do("a", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        impatient: asyncio.Task[str] = asyncio.create_task(flight.do("b", work))
+        patient: asyncio.Task[str] = asyncio.create_task(flight.do("b", work))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        assert await patient == "done"
+
+    asyncio.run(main())
+
+
+def test_aget_repo_tree_coalesces(fake_github: FakeGitHub) -> None:
+    """Test that concurrent requests for a repository cause one upstream request."""
+    fake_github.repos["user/repo"] = [make_file("a.py"), make_file("src/b.py")]
+    fake_github.delay = 0.1
+
+    async def main() -> list[dict[str, Any]]:
+        try:
+            return await asyncio.gather(*(sites_github.aget_repo_tree("user", "repo") for _ in range(100)))
+        finally:
+            await sites_github.async_github_client.aclose()
+
+    trees: list[dict[str, Any]] = asyncio.run(main())
+
+    assert all(tree == trees[0] for tree in trees)
+    assert [entry["path"] for entry in trees[0]["entries"]] == ["a.py", "src", "src/b.py"]
+    assert fake_github.requests == ["/repos/user/repo/git/trees/HEAD"]
+
+
+def test_async_tree_matches_sync(fake_github: FakeGitHub) -> None:
+    """Test that the async tree endpoint returns the same pages and stream as the sync one."""
+    fake_github.repos["user/repo"] = [make_file(f"src/{i:03}.py") for i in range(25)]
+    sync_client = Client()
+    expected_page: dict[str, Any] = sync_client.get("/api/github/repos/user/repo/tree/?limit=10").json()
+    expected_stream: bytes = b"".join(
+        sync_client.get("/api/github/repos/user/repo/tree/?stream=true").streaming_content
+    )
+    sites_github.repo_tree_cache.clear()
+
+    async def main() -> tuple[dict[str, Any], bytes]:
+        client = AsyncClient()
+        try:
+            page: dict[str, Any] = (await client.get("/api/github/async/repos/user/repo/tree/?limit=10")).json()
+            response = await client.get("/api/github/async/repos/user/repo/tree/?stream=true")
+            stream: bytes = b"".join([chunk async for chunk in response.streaming_content])
+        finally:
+            await sites_github.async_github_client.aclose()
+        return page, stream
+
+    page, stream = asyncio.run(main())
+    assert page == expected_page
+    assert stream == expected_stream
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_contents_saves_one_snapshot(fake_github: FakeGitHub) -> None:
+    """Test that concurrent requests for a new repository fetch and save it once."""
+    fake_github.repos["user/repo"] = [make_file("a.py"), make_file("b.py")]
+    fake_github.delay = 0.1
+
+    async def main() -> list[Any]:
+        client = AsyncClient()
+        try:
+            responses = await asyncio.gather(
+                *(client.get("/api/github/async/repos/user/repo/contents/") for _ in range(20)),
+            )
+        finally:
+            await sites_github.async_github_client.aclose()
+        return [response.json() for response in responses]
+
+    results: list[Any] = asyncio.run(main())
+
+    assert all(result == fake_github.repos["user/repo"] for result in results)
+    assert fake_github.requests == ["/repos/user/repo/contents"]
+    assert Repository.objects.get(owner="user", name="repo").entries.count() == 2
+
+
+@pytest.mark.benchmark
+def test_async_load(fake_github: FakeGitHub, settings: Any) -> None:  # noqa: ANN401
+    """Compare 500 concurrent requests for one repository on the WSGI path and on the ASGI path."""
+    from config.asgi import application as asgi_application  # noqa: PLC0415
+    from config.wsgi import application as wsgi_application  # noqa: PLC0415
+
+    settings.ALLOWED_HOSTS = ["*"]
+    fake_github.repos["user/repo"] = [make_file(f"src/{i:04}.py") for i in range(1000)]
+    fake_github.delay = 0.2  # Roughly the latency of a recursive tree from api.github.com
+    concurrency = 500
+    wsgi_threads = 32
+
+    with httpx.Client(transport=httpx.WSGITransport(app=wsgi_application), base_url="http://testserver") as client:
+        start: float = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=wsgi_threads) as executor:
+            statuses: list[int] = list(
+                executor.map(
+                    lambda _: client.get("/api/github/repos/user/repo/tree/").status_code,
+                    range(concurrency),
+                ),
+            )
+        wsgi_time: float = time.perf_counter() - start
+    wsgi_upstream: int = len(fake_github.requests)
+    assert statuses == [200] * concurrency
+
+    sites_github.repo_tree_cache.clear()
+    fake_github.requests.clear()
+
+    async def main() -> list[int]:
+        transport = httpx.ASGITransport(app=asgi_application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            try:
+                responses = await asyncio.gather(
+                    *(client.get("/api/github/async/repos/user/repo/tree/") for _ in range(concurrency)),
+                )
+            finally:
+                await sites_github.async_github_client.aclose()
+        return [response.status_code for response in responses]
+
+    start = time.perf_counter()
+    statuses = asyncio.run(main())
+    asgi_time: float = time.perf_counter() - start
+    asgi_upstream: int = len(fake_github.requests)
+    assert statuses == [200] * concurrency
+
+    print(  # noqa: T201
+        f"WSGI ({wsgi_threads} threads): {concurrency / wsgi_time:.0f} requests/s, {wsgi_upstream} upstream requests; "
+        f"ASGI: {concurrency / asgi_time:.0f} requests/s, {asgi_upstream} upstream requests",
+    )
+    assert asgi_upstream == 1
+    assert wsgi_upstream > asgi_upstream
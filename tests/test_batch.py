@@ -0,0 +1,146 @@
+"""Tests for fetching the contents of many repositories with one request."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from django.test import AsyncClient, Client
+
+from core import sites_github
+from core.middleware import UPSTREAM_CALLS_HEADER
+from core.models import Repository
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    from django.http import StreamingHttpResponse
+
+    from tests.fake_github import FakeGitHub
+
+BENCHMARK_REPOSITORIES = 100
+BENCHMARK_DELAY = 0.02  # seconds per upstream request
+
+
+def read_lines(response: StreamingHttpResponse) -> list[dict[str, Any]]:
+    """Parse every NDJSON line of a streaming response."""
+    return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+
+def batch_url(repositories: list[str], prefix: str = "/api/github/") -> str:
+    """Return the URL of the batch contents endpoint for the repositories."""
+    return f"{prefix}batch/contents/?" + "&".join(f"repo={full_name}" for full_name in repositories)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_returns_every_repository(fake_github: FakeGitHub) -> None:
+    """Test that each repository gets one line, failures included, and that snapshots are shared."""
+    fake_github.repos["user/a"] = [make_file("a.py")]
+    fake_github.repos["user/b"] = [make_file("b.py"), make_file("c.py")]
+
+    response: StreamingHttpResponse = Client().get(batch_url(["user/a", "user/b", "user/missing", "nope", "user/a"]))
+    assert response["Content-Type"] == "application/x-ndjson"
+    results: dict[str, dict[str, Any]] = {result["repo"]: result for result in read_lines(response)}
+
+    assert sorted(results) == ["nope", "user/a", "user/b", "user/missing"]
+    assert results["user/a"] == {"repo": "user/a", "status": 200, "contents": fake_github.repos["user/a"]}
+    assert results["user/b"]["contents"] == fake_github.repos["user/b"]
+    assert results["user/missing"]["contents"] == []
+    assert results["nope"]["status"] == 400
+    assert "expected format" in results["nope"]["error"]
+    assert fake_github.requests.count("/repos/user/a/contents") == 1
+    assert Repository.objects.filter(owner="user").count() == 2
+
+    fake_github.requests.clear()
+    assert read_lines(Client().get(batch_url(["user/a"])))[0] == results["user/a"]
+    assert fake_github.requests == []
+
+
+def test_batch_size_is_limited() -> None:
+    """Test that empty and too large batches are refused before anything is fetched."""
+    assert Client().get("/api/github/batch/contents/").status_code == 422
+    too_many: list[str] = [f"user/repo{number}" for number in range(101)]
+    response = Client().get(batch_url(too_many))
+    assert response.status_code == 400
+    assert "At most 100" in response.json()["detail"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_batch_matches_sync(fake_github: FakeGitHub) -> None:
+    """Test that the async batch endpoint returns the same lines as the sync one."""
+    repositories: list[str] = [f"user/repo{number}" for number in range(10)]
+    for full_name in repositories:
+        fake_github.repos[full_name] = [make_file(f"{full_name}.py")]
+    expected: list[dict[str, Any]] = read_lines(Client().get(batch_url(repositories)))
+
+    async def main() -> list[dict[str, Any]]:
+        client = AsyncClient()
+        try:
+            response = await client.get(batch_url([*repositories, "nope"], "/api/github/async/"))
+            body: bytes = b"".join([chunk async for chunk in response.streaming_content])
+        finally:
+            await sites_github.async_github_client.aclose()
+        return [json.loads(line) for line in body.splitlines()]
+
+    results: dict[str, dict[str, Any]] = {result["repo"]: result for result in asyncio.run(main())}
+    assert results.pop("nope")["status"] == 400
+    assert sorted(results.values(), key=lambda result: result["repo"]) == sorted(
+        expected, key=lambda result: result["repo"]
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_counts_upstream_calls(fake_github: FakeGitHub) -> None:
+    """Test that the fetches of the batch workers are counted against the request, for sync and async views."""
+    fake_github.repos["user/repo"] = [make_file("a.py")]
+    fake_github.repos["user/other"] = [make_file("b.py")]
+
+    response: StreamingHttpResponse = Client().get(batch_url(["user/repo"]))
+    assert response[UPSTREAM_CALLS_HEADER] == "1"
+    assert read_lines(response)[0]["contents"] == fake_github.repos["user/repo"]
+    assert Client().get(batch_url(["user/repo"]))[UPSTREAM_CALLS_HEADER] == "0"
+
+    async def main() -> str:
+        try:
+            response = await AsyncClient().get(batch_url(["user/other"], "/api/github/async/"))
+            [chunk async for chunk in response.streaming_content]
+            return response[UPSTREAM_CALLS_HEADER]
+        finally:
+            await sites_github.async_github_client.aclose()
+
+    assert asyncio.run(main()) == "1"
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_batch_benchmark(fake_github: FakeGitHub) -> None:
+    """Compare one batch request for 100 repositories with 100 requests one after another."""
+    fake_github.delay = BENCHMARK_DELAY
+    sequential: list[str] = [f"user/sequential{number}" for number in range(BENCHMARK_REPOSITORIES)]
+    batched: list[str] = [f"user/batched{number}" for number in range(BENCHMARK_REPOSITORIES)]
+    for full_name in sequential + batched:
+        fake_github.repos[full_name] = [make_file(f"{number}.py") for number in range(20)]
+    client = Client()
+
+    start: float = time.perf_counter()
+    for full_name in sequential:
+        assert client.get(f"/api/github/repos/{full_name}/contents/").status_code == 200
+    sequential_time: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response: StreamingHttpResponse = client.get(batch_url(batched))
+    first_line: bytes = next(iter(response.streaming_content))
+    first_time: float = time.perf_counter() - start
+    results: list[dict[str, Any]] = [json.loads(first_line), *read_lines(response)]
+    batch_time: float = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"{BENCHMARK_REPOSITORIES} repositories, {BENCHMARK_DELAY * 1000:.0f} ms per upstream request: "
+        f"one at a time {sequential_time * 1000:.0f} ms, batch {batch_time * 1000:.0f} ms "
+        f"(first result after {first_time * 1000:.0f} ms)",
+    )
+    assert all(result["status"] == 200 for result in results)
+    assert len(results) == BENCHMARK_REPOSITORIES
+    assert batch_time * 3 < sequential_time
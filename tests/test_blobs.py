@@ -0,0 +1,163 @@
+"""Tests for the content-addressed blob store and the blob endpoint."""
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from django.test import Client
+
+from core import sites_github
+from core.blobs import RangeNotSatisfiableError, git_blob_sha, parse_range
+
+if TYPE_CHECKING:
+    from django.http.response import HttpResponseBase
+
+    from tests.fake_github import FakeGitHub
+
+BENCHMARK_BLOB_SIZE = 32 * 1024 * 1024
+BENCHMARK_RANGE_SIZE = 64 * 1024
+
+
+@pytest.fixture
+def client() -> Client:
+    """Fixture for the Django test client."""
+    return Client()
+
+
+def body(response: HttpResponseBase) -> bytes:
+    """Read the whole body of a response, streaming or not. The test client closes it at the end of the stream."""
+    return b"".join(response.streaming_content) if response.streaming else response.content
+
+
+def test_git_blob_sha() -> None:
+    """Test that blobs are hashed like git hash-object does."""
+    assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+    assert git_blob_sha(b"") == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-1000", (0, 99)),
+        ("bytes=50-1000", (50, 99)),
+        ("bytes=9-0", None),
+        ("bytes=0-1,5-9", None),
+        ("items=0-9", None),
+    ],
+)
+def test_parse_range(header: str | None, expected: tuple[int, int] | None) -> None:
+    """Test single ranges, open and suffix ranges, and that anything else means the whole blob."""
+    assert parse_range(header, 100) == expected
+
+
+def test_parse_unsatisfiable_range() -> None:
+    """Test that ranges starting after the end can not be satisfied."""
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range("bytes=-0", 100)
+
+
+def test_blob_endpoint_serves_ranges(client: Client, fake_github: FakeGitHub) -> None:
+    """Test whole blobs, partial content, conditional requests and errors."""
+    fake_github.repos["user/repo"] = []
+    data: bytes = bytes(range(256)) * 1000
+    sha: str = fake_github.add_blob(data)
+    url: str = f"/api/github/repos/user/repo/blobs/{sha}/"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert body(response) == data
+    assert response["Content-Length"] == str(len(data))
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["ETag"] == f'"{sha}"'
+    assert "immutable" in response["Cache-Control"]
+
+    response = client.get(url, headers={"Range": "bytes=1000-1999"})
+    assert response.status_code == 206
+    assert body(response) == data[1000:2000]
+    assert response["Content-Range"] == f"bytes 1000-1999/{len(data)}"
+    assert response["Content-Length"] == "1000"
+
+    assert body(client.get(url, headers={"Range": "bytes=-10"})) == data[-10:]
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'}).status_code == 200
+    response = client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(data)}"
+    assert client.get(url, headers={"If-None-Match": f'"{sha}"'}).status_code == 304
+
+    assert client.get("/api/github/repos/user/repo/blobs/not-a-sha/").status_code == 400
+    assert client.get(f"/api/github/repos/user/repo/blobs/{'0' * 40}/").status_code == 404
+    assert fake_github.requests.count(f"/repos/user/repo/git/blobs/{sha}") == 1
+
+
+def test_identical_blobs_are_stored_once(client: Client, fake_github: FakeGitHub) -> None:
+    """Test that a file shared by two repositories is fetched and stored once, and that empty files work."""
+    fake_github.repos["user/repo"] = []
+    fake_github.repos["user/fork"] = []
+    sha: str = fake_github.add_blob(b"print('hello')\n")
+    empty: str = fake_github.add_blob(b"")
+
+    assert body(client.get(f"/api/github/repos/user/repo/blobs/{sha}/")) == b"print('hello')\n"
+    assert body(client.get(f"/api/github/repos/user/fork/blobs/{sha}/")) == b"print('hello')\n"
+    assert body(client.get(f"/api/github/repos/user/fork/blobs/{empty}/")) == b""
+    assert client.get(f"/api/github/repos/user/fork/blobs/{empty}/", headers={"Range": "bytes=0-"}).status_code == 416
+
+    assert [path for path in fake_github.requests if "/git/blobs/" in path] == [
+        f"/repos/user/repo/git/blobs/{sha}",
+        f"/repos/user/fork/git/blobs/{empty}",
+    ]
+    assert sha in sites_github.blob_store
+    assert sites_github.blob_store.stats()["writes"] == 2
+
+
+def test_blob_store_rejects_wrong_content(fake_github: FakeGitHub) -> None:
+    """Test that content that does not hash to the SHA is not stored."""
+    with pytest.raises(ValueError, match="hashes to"):
+        sites_github.blob_store.put(git_blob_sha(b"a"), b"b")
+    assert git_blob_sha(b"a") not in sites_github.blob_store
+
+
+@pytest.mark.benchmark
+def test_blob_read_benchmark(client: Client, fake_github: FakeGitHub) -> None:
+    """Measure the first, repeated and partial reads of a 32 MiB file."""
+    fake_github.repos["user/repo"] = []
+    rng = random.Random(17)
+    data: bytes = rng.randbytes(BENCHMARK_BLOB_SIZE)
+    sha: str = fake_github.add_blob(data)
+    url: str = f"/api/github/repos/user/repo/blobs/{sha}/"
+
+    start: float = time.perf_counter()
+    assert body(client.get(url)) == data
+    first: float = time.perf_counter() - start
+
+    repeated: list[float] = []
+    for _ in range(10):
+        start = time.perf_counter()
+        body(client.get(url))
+        repeated.append(time.perf_counter() - start)
+
+    partial: list[float] = []
+    for _ in range(500):
+        offset: int = rng.randrange(BENCHMARK_BLOB_SIZE - BENCHMARK_RANGE_SIZE)
+        start = time.perf_counter()
+        response = client.get(url, headers={"Range": f"bytes={offset}-{offset + BENCHMARK_RANGE_SIZE - 1}"})
+        assert body(response) == data[offset : offset + BENCHMARK_RANGE_SIZE]
+        partial.append(time.perf_counter() - start)
+
+    print(  # noqa: T201
+        f"32 MiB blob: first read {first * 1000:.0f} ms, repeated read {statistics.median(repeated) * 1000:.1f} ms "
+        f"({BENCHMARK_BLOB_SIZE / statistics.median(repeated) / 2**20:,.0f} MiB/s), 64 KiB range "
+        f"{statistics.median(partial) * 1000:.2f} ms median, {len(partial) / sum(partial):,.0f} ranges/s",
+    )
+    assert fake_github.requests.count(f"/repos/user/repo/git/blobs/{sha}") == 1
+    assert statistics.median(repeated) < first
+    assert statistics.median(partial) * 10 < statistics.median(repeated)
@@ -0,0 +1,104 @@
+"""Tests for the GitHub contents cache."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from core import sites_github
+from core.cache import TTLCache
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    import pytest
+
+    from tests.fake_github import FakeGitHub
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def test_lru_eviction() -> None:
+    """Test that the least recently used entry is evicted first."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry_and_touch() -> None:
+    """Test that entries expire, stay around for revalidation and can be refreshed."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=10, clock=clock)
+    cache.set("a", [1, 2, 3], etag='"abc"')
+
+    clock.now = 11
+    entry = cache.get("a")
+    assert entry is not None
+    assert not entry.is_fresh(clock())
+    assert entry.etag == '"abc"'
+
+    cache.touch("a")
+    entry = cache.get("a")
+    assert entry is not None
+    assert entry.is_fresh(clock())
+
+    stats: dict[str, int | float] = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["revalidations"] == 1
+
+
+def test_get_repo_contents_stores_plain_data(fake_github: FakeGitHub) -> None:
+    """Test that contents are cached as dictionaries and served from the cache."""
+    fake_github.repos["user/repo"] = [make_file("a.py"), make_file("b.py")]
+
+    first = sites_github.get_repo_contents("user", "repo")
+    second = sites_github.get_repo_contents("user", "repo")
+
+    assert first == second == fake_github.repos["user/repo"]
+    assert all(type(entry) is dict for entry in first)
+    assert fake_github.requests == ["/repos/user/repo/contents"]
+
+
+def test_get_repo_contents_revalidates_with_etag(fake_github: FakeGitHub, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that expired entries are revalidated with If-None-Match, and that a 304 is free."""
+    clock = FakeClock()
+    monkeypatch.setattr(sites_github, "repo_contents_cache", TTLCache(maxsize=10, ttl=10, clock=clock))
+    fake_github.repos["user/repo"] = [make_file("a.py"), make_file("b.py")]
+
+    sites_github.get_repo_contents("user", "repo")
+    remaining: int = fake_github.remaining
+    clock.now = 11
+    contents = sites_github.get_repo_contents("user", "repo")
+
+    assert len(contents) == 2
+    assert fake_github.requests == ["/repos/user/repo/contents", "/repos/user/repo/contents"]
+    assert fake_github.remaining == remaining
+    assert sites_github.repo_contents_cache.stats()["revalidations"] == 1
+
+    fake_github.repos["user/repo"].append(make_file("c.py"))
+    clock.now = 22
+    assert len(sites_github.get_repo_contents("user", "repo")) == 3
+
+
+def test_missing_repo_is_not_cached(fake_github: FakeGitHub) -> None:
+    """Test that the empty result for a missing repository is not cached."""
+    assert sites_github.get_repo_contents("user", "missing") == []
+    assert sites_github.get_repo_contents("user", "missing") == []
+    assert len(sites_github.repo_contents_cache) == 0
+    assert fake_github.requests == ["/repos/user/missing/contents", "/repos/user/missing/contents"]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+import pytest
+from PySide6.QtCore import QEventLoop, QTimer
+
+from browser.cache_stats import CacheSizeMonitor, CacheStats, directory_size, render_cache_page
+from browser.profile import ProfileSettings
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from PySide6.QtWidgets import QApplication
+
+
+def test_record_counts_hits_and_misses() -> None:
+    """Test that resources are counted by their Resource Timing sizes."""
+    stats = CacheStats()
+    stats.record({"load_ms": 120.0, "resources": [[5000, 4700], [0, 0], [8300, 8000]]})
+    stats.record({"load_ms": 40.0, "resources": [[300, 4700], [0, 8000], [0, 0]]})
+
+    assert (stats.hits, stats.revalidations, stats.misses, stats.opaque) == (1, 1, 2, 2)
+    assert stats.bytes_from_network == 5000 + 8300 + 300
+    assert stats.bytes_from_cache == 4700 + 8000
+    assert stats.hit_ratio == 0.5
+    assert stats.cold_load_ms == [120.0]
+    assert stats.warm_load_ms == [40.0]
+
+
+def test_record_ignores_failed_scripts() -> None:
+    """Test that a page where the script failed is not counted."""
+    stats = CacheStats()
+    stats.record(None)
+    stats.record({"load_ms": None, "resources": []})
+
+    assert stats.summary()["median_cold_load_ms"] is None
+    assert stats.hit_ratio == 0.0
+
+
+def test_cache_page(tmp_path: Path) -> None:
+    """Test that the cache page shows the size of the cache directory and the counters."""
+    (tmp_path / "Cache_Data").mkdir()
+    (tmp_path / "Cache_Data" / "data_1").write_bytes(b"x" * 1024 * 1024)
+    (tmp_path / "index").write_bytes(b"x" * 512 * 1024)
+    assert directory_size(tmp_path) == 1536 * 1024
+    assert directory_size(tmp_path / "missing") == 0
+
+    stats = CacheStats()
+    stats.record({"load_ms": 80.0, "resources": [[0, 1000]]})
+    page: str = render_cache_page(stats, tmp_path, 64 * 1024 * 1024, directory_size(tmp_path))
+
+    assert "<td>1.5 MiB</td>" in page
+    assert "<td>64 MiB</td>" in page
+    assert "<td>100%</td>" in page
+    assert "<td>80 ms (1 pages)</td>" in page
+    assert "In memory" in render_cache_page(stats, None, 0, 0)
+    assert "<th>Size on disk</th><td>Measuring...</td>" in render_cache_page(stats, tmp_path, 0, None)
+
+
+def test_cache_size_is_measured_off_the_gui_thread(app: QApplication, tmp_path: Path) -> None:
+    """Test that the size is measured on a worker thread, reused until it expires and then measured again."""
+    (tmp_path / "data_1").write_bytes(b"x" * 1024)
+    now: list[float] = [0.0]
+    threads: list[threading.Thread] = []
+    monitor = CacheSizeMonitor(ttl=10, clock=lambda: now[0])
+    monitor.measured.connect(lambda _: threads.append(threading.current_thread()))
+
+    def wait_for_measurement() -> None:
+        loop = QEventLoop()
+        monitor.measured.connect(loop.quit)
+        QTimer.singleShot(5000, loop.quit)
+        loop.exec()
+        monitor.measured.disconnect(loop.quit)
+
+    assert monitor.current_size(tmp_path) is None
+    assert monitor.current_size(tmp_path) is None  # Only one measurement at a time
+    wait_for_measurement()
+    assert monitor.current_size(tmp_path) == 1024
+    assert threads == [threading.main_thread()]  # Delivered to the GUI thread
+
+    (tmp_path / "data_2").write_bytes(b"x" * 1024)
+    now[0] = 5
+    assert monitor.current_size(tmp_path) == 1024
+    assert not monitor.measuring
+
+    now[0] = 11
+    assert monitor.current_size(tmp_path) == 1024  # The old size until the new one is in
+    wait_for_measurement()
+    assert monitor.current_size(tmp_path) == 2048
+
+
+def test_profile_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the profile settings are read from the environment."""
+    monkeypatch.setenv("BROWSER_CACHE_SIZE_MB", "64")
+    monkeypatch.setenv("BROWSER_CACHE_TYPE", "memory")
+    monkeypatch.setenv("BROWSER_COOKIE_POLICY", "force")
+    settings: ProfileSettings = ProfileSettings.from_env()
+
+    assert settings.cache_size == 64 * 1024 * 1024
+    assert settings.cache_type == "memory"
+    assert settings.cookie_policy == "force"
+    assert settings.storage_path.name == settings.cache_path.name == "profile"
+
+    monkeypatch.setenv("BROWSER_CACHE_TYPE", "floppy")
+    with pytest.raises(ValueError, match="Unknown cache type 'floppy'"):
+        ProfileSettings.from_env()
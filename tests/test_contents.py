@@ -0,0 +1,125 @@
+"""Tests for reading repository contents as raw JSON instead of PyGithub objects."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import statistics
+import time
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from django.test import AsyncClient, Client
+from github import Github, GithubException
+
+from core import sites_github
+from core.middleware import UPSTREAM_CALLS_HEADER
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    from github.ContentFile import ContentFile
+
+    from tests.fake_github import FakeGitHub
+
+BENCHMARK_ENTRIES = 1000
+
+
+def make_directory(path: str) -> dict[str, Any]:
+    """Create a directory entry as returned by the contents API, which has no download_url."""
+    return {**make_file(path), "type": "dir", "size": 0, "download_url": None}
+
+
+def get_contents_with_pygithub(github: Github, full_name: str) -> list[dict[str, Any]]:
+    """Get the contents the way get_repo_contents did before, through PyGithub objects."""
+    content_files: list[ContentFile] | ContentFile = github.get_repo(full_name).get_contents("")
+    assert isinstance(content_files, list)
+    return [
+        {
+            "name": content_file.name,
+            "path": content_file.path,
+            "type": content_file.type,
+            "download_url": content_file.download_url,
+            "html_url": content_file.html_url,
+            "size": content_file.size,
+            "sha": content_file.sha,
+        }
+        for content_file in content_files
+    ]
+
+
+def test_contents_match_pygithub(fake_github: FakeGitHub) -> None:
+    """Test that the raw JSON gives the same entries, fields and field order as the PyGithub objects did."""
+    fake_github.repos["user/repo"] = [make_directory("src"), make_file("README.md", 10), make_file("ünïcode.py")]
+    github = Github(base_url=fake_github.url)
+    expected: list[dict[str, Any]] = get_contents_with_pygithub(github, "user/repo")
+    github.close()
+    fake_github.requests.clear()
+
+    contents = sites_github.get_repo_contents("user", "repo")
+    assert json.dumps(contents) == json.dumps(expected)
+    assert fake_github.requests == ["/repos/user/repo/contents"]
+
+
+def test_unexpected_contents_are_not_cached(fake_github: FakeGitHub) -> None:
+    """Test that entries that do not match the schema fail instead of being cached."""
+    fake_github.repos["user/repo"] = [{**make_file("a.py"), "size": "big"}]
+    with pytest.raises(GithubException) as error:
+        sites_github.get_repo_contents("user", "repo")
+    assert error.value.status == 502
+    assert "Invalid size" in str(error.value.data)
+    assert len(sites_github.repo_contents_cache) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_responses_count_upstream_calls(fake_github: FakeGitHub) -> None:
+    """Test that each response says how many GitHub requests it cost, for sync and async views."""
+    fake_github.repos["user/repo"] = [make_file("a.py")]
+    fake_github.repos["user/other"] = [make_file("b.py")]
+    client = Client()
+
+    response = client.get("/api/github/repos/user/repo/contents/")
+    assert response.json() == fake_github.repos["user/repo"]
+    assert response[UPSTREAM_CALLS_HEADER] == "1"
+    assert client.get("/api/github/repos/user/repo/contents/")[UPSTREAM_CALLS_HEADER] == "0"
+
+    async def main() -> str:
+        try:
+            return (await AsyncClient().get("/api/github/async/repos/user/other/contents/"))[UPSTREAM_CALLS_HEADER]
+        finally:
+            await sites_github.async_github_client.aclose()
+
+    assert asyncio.run(main()) == "1"
+
+
+@pytest.mark.benchmark
+def test_contents_benchmark(fake_github: FakeGitHub) -> None:
+    """Compare upstream calls and CPU per entry of the raw JSON path with the PyGithub objects."""
+    fake_github.repos["user/repo"] = [make_file(f"file{number}.py", number) for number in range(BENCHMARK_ENTRIES)]
+    github = Github(base_url=fake_github.url)
+
+    pygithub_cpu: list[float] = []
+    raw_cpu: list[float] = []
+    for _ in range(10):
+        fake_github.requests.clear()
+        start: float = time.thread_time()  # Only this thread, not the fake server
+        expected: list[dict[str, Any]] = get_contents_with_pygithub(github, "user/repo")
+        pygithub_cpu.append(time.thread_time() - start)
+        pygithub_calls: int = len(fake_github.requests)
+
+        sites_github.repo_contents_cache.clear()
+        fake_github.requests.clear()
+        start = time.thread_time()
+        contents = sites_github.get_repo_contents("user", "repo")
+        raw_cpu.append(time.thread_time() - start)
+        raw_calls: int = len(fake_github.requests)
+        assert contents == expected
+    github.close()
+
+    per_entry_pygithub: float = statistics.median(pygithub_cpu) / BENCHMARK_ENTRIES * 1e6
+    per_entry_raw: float = statistics.median(raw_cpu) / BENCHMARK_ENTRIES * 1e6
+    print(  # noqa: T201
+        f"{BENCHMARK_ENTRIES} entries: PyGithub {pygithub_calls} upstream calls, {per_entry_pygithub:.1f} µs CPU per "
+        f"entry; raw JSON {raw_calls} upstream call, {per_entry_raw:.1f} µs CPU per entry",
+    )
+    assert raw_calls < pygithub_calls
+    assert per_entry_raw < per_entry_pygithub
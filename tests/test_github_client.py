@@ -0,0 +1,161 @@
+"""Tests for the pooled, rate limit aware GitHub client."""
+
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import pytest
+from django.test import Client
+
+from core import sites_github
+from core.github_client import GitHubClient, RateLimitExhaustedError, RateLimitScheduler
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    from django.http import HttpResponse
+
+    from tests.fake_github import FakeGitHub
+
+
+class FakeTime:
+    """A clock whose sleep moves time forward instead of blocking."""
+
+    def __init__(self) -> None:
+        """Start at a fixed point in time."""
+        self.now: float = 1_000_000.0
+        self.sleeps: list[float] = []
+
+    def clock(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Record the sleep and move the clock forward."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_scheduler_waits_for_reset_when_reserve_is_reached() -> None:
+    """Test that requests wait for the reset once only the reserve is left."""
+    fake_time = FakeTime()
+    scheduler = RateLimitScheduler(reserve=2, max_wait=60, clock=fake_time.clock, sleep=fake_time.sleep)
+    scheduler.update({"x-ratelimit-limit": "10", "x-ratelimit-remaining": "3", "x-ratelimit-reset": fake_time.now + 30})
+
+    scheduler.acquire()
+    assert fake_time.sleeps == []
+    scheduler.acquire()
+    assert fake_time.sleeps == [30]
+    assert scheduler.budget()["waits"] == 1
+    assert scheduler.budget()["remaining"] == 10
+
+
+def test_scheduler_gives_up_on_long_waits() -> None:
+    """Test that a reset further away than max_wait raises instead of parking the thread."""
+    fake_time = FakeTime()
+    scheduler = RateLimitScheduler(reserve=0, max_wait=5, clock=fake_time.clock, sleep=fake_time.sleep)
+    scheduler.update(
+        {"x-ratelimit-limit": "10", "x-ratelimit-remaining": "0", "x-ratelimit-reset": fake_time.now + 600},
+        status=403,
+    )
+
+    with pytest.raises(RateLimitExhaustedError) as exc_info:
+        scheduler.acquire()
+    assert exc_info.value.retry_after == 600
+    assert fake_time.sleeps == []
+
+
+def test_scheduler_ignores_out_of_order_responses() -> None:
+    """Test that a response that arrives after a newer one does not raise the remaining budget again."""
+    scheduler = RateLimitScheduler(reserve=0, max_wait=5)
+    scheduler.update({"x-ratelimit-limit": "10", "x-ratelimit-remaining": "7", "x-ratelimit-reset": "2000"})
+    scheduler.update({"x-ratelimit-limit": "10", "x-ratelimit-remaining": "8", "x-ratelimit-reset": "2000"})
+    assert scheduler.remaining == 7
+
+    scheduler.update({"x-ratelimit-limit": "10", "x-ratelimit-remaining": "9", "x-ratelimit-reset": "5600"})
+    scheduler.update({"x-ratelimit-limit": "10", "x-ratelimit-remaining": "6", "x-ratelimit-reset": "2000"})
+    assert (scheduler.remaining, scheduler.reset_at) == (9, 5600)
+
+
+def test_connections_are_reused(fake_github: FakeGitHub) -> None:
+    """Test that consecutive requests share one keep-alive connection."""
+    for i in range(20):
+        fake_github.repos[f"user/repo{i}"] = [make_file("README.md")]
+        sites_github.get_repo_tree("user", f"repo{i}")
+
+    assert len(fake_github.requests) == 20
+    assert len(fake_github.connections) == 1
+
+
+def test_threads_share_the_budget(fake_github: FakeGitHub) -> None:
+    """Test that every worker thread reports to the same scheduler, with one connection per thread."""
+    for i in range(40):
+        fake_github.repos[f"user/repo{i}"] = [make_file("README.md")]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: sites_github.get_repo_tree("user", f"repo{i}"), range(40)))
+
+    assert len(fake_github.connections) <= 4
+    assert sites_github.github_client.scheduler.remaining == fake_github.remaining
+
+
+def test_retry_after_is_honoured(fake_github: FakeGitHub) -> None:
+    """Test that a secondary rate limit is waited out and the request sent again."""
+    fake_time = FakeTime()
+    sites_github.github_client.scheduler = RateLimitScheduler(
+        reserve=0,
+        max_wait=5,
+        clock=fake_time.clock,
+        sleep=fake_time.sleep,
+    )
+    fake_github.repos["user/repo"] = [make_file("README.md")]
+    fake_github.retry_after_responses = 1
+
+    tree = sites_github.get_repo_tree("user", "repo")
+
+    assert [entry["path"] for entry in tree["entries"]] == ["README.md"]
+    assert fake_time.sleeps == [1]
+    assert len(fake_github.requests) == 2
+
+
+def test_exhausted_rate_limit_is_not_sent_upstream(fake_github: FakeGitHub) -> None:
+    """Test that once the budget is gone, requests fail fast without reaching GitHub."""
+    fake_github.repos["user/repo"] = [make_file("README.md")]
+    fake_github.remaining = 1
+
+    sites_github.get_repo_tree("user", "repo")
+    sites_github.repo_tree_cache.clear()
+    with pytest.raises(RateLimitExhaustedError):
+        sites_github.get_repo_tree("user", "repo")
+
+    assert len(fake_github.requests) == 1
+
+
+@pytest.mark.django_db
+def test_rate_limit_endpoints(fake_github: FakeGitHub) -> None:
+    """Test that the budget is exposed and that an exhausted limit becomes 503 with Retry-After."""
+    fake_github.repos["user/repo"] = [make_file("README.md")]
+    fake_github.remaining = 1
+    client = Client()
+
+    assert client.get("/api/github/repos/user/repo/tree/").status_code == 200
+    budget: dict[str, int | float | None] = client.get("/api/github/rate-limit/").json()
+    assert budget["limit"] == fake_github.limit
+    assert budget["remaining"] == 0
+
+    sites_github.repo_tree_cache.clear()
+    response: HttpResponse = client.get("/api/github/repos/user/repo/tree/")
+    assert response.status_code == 503
+    assert int(response["Retry-After"]) > 3000
+
+
+def test_client_works_without_auth(fake_github: FakeGitHub) -> None:
+    """Test that a client without credentials can still request the API."""
+    fake_github.repos["user/repo"] = [make_file("a.py")]
+    client = GitHubClient(auth=None, base_url=fake_github.url, pool_size=1, scheduler=RateLimitScheduler(0, 1))
+    status, _, body = client.request_json("/repos/user/repo/contents/")
+    assert status == 200
+    assert [entry["path"] for entry in json.loads(body)] == ["a.py"]
+    assert client.scheduler.limit == fake_github.limit
+    client.close()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from PySide6.QtCore import QEventLoop, QTimer, QUrl
+from PySide6.QtNetwork import QNetworkAccessManager
+
+from browser.github_scheme import (
+    LISTING_PAGE_SIZE,
+    HtmlStream,
+    format_github_item,
+    github_url,
+    github_url_from_text,
+    parse_github_url,
+    parse_listing_start,
+)
+from browser.github_trees import DirectoryListing, GitHubTreeStore, make_tree_request, open_listing
+from tests.conftest import STUB_TREE, TreeStubHandler
+
+if TYPE_CHECKING:
+    from PySide6.QtNetwork import QNetworkReply
+    from PySide6.QtWidgets import QApplication
+
+
+def read_page(page: HtmlStream, timeout: int = 10_000) -> str:
+    """Run the event loop until the page is finished and return all of it."""
+    if not page.finished:
+        loop = QEventLoop()
+        page.readChannelFinished.connect(lambda: QTimer.singleShot(0, loop.quit))  # Let the reply finish too
+        QTimer.singleShot(timeout, loop.quit)
+        loop.exec()
+    assert page.finished
+    return page.readAll().data().decode()
+
+
+def test_github_urls() -> None:
+    """Test that the URL bar text, the github:// URLs and their parts map onto each other."""
+    assert github_url_from_text("GitHub/TheLovinator1/browser") == "github://TheLovinator1/browser/"
+    assert github_url_from_text("GitHub/") == "github:///"
+    assert github_url_from_text("https://github.com/") is None
+    assert github_url("user", "repo", "src/my dir") == "github://user/repo/src/my%20dir/"
+    assert github_url("user", "repo", "src", 1000) == "github://user/repo/src/?start=1000"
+    assert parse_listing_start(QUrl("github://user/repo/src/?start=1000")) == 1000
+    assert parse_listing_start(QUrl("github://user/repo/src/?start=-1")) == 0
+    assert parse_listing_start(QUrl("github://user/repo/src/")) == 0
+
+    assert parse_github_url(QUrl(github_url("user", "repo", "src/my dir"))) == ("user", "repo", "src/my dir")
+    assert parse_github_url(QUrl("github://TheLovinator1/browser/")) == ("thelovinator1", "browser", "")
+    for invalid in ("github://user/", "github:///", "https://user/repo/"):
+        with pytest.raises(ValueError, match="expected format"):
+            parse_github_url(QUrl(invalid))
+
+
+def test_format_github_item() -> None:
+    """Test that directories have no size and files do."""
+    assert format_github_item({"name": "src", "type": "dir", "size": 0, "sha": "abc"}) == "src/ (abc)"
+    assert format_github_item({"name": "a.py", "type": "file", "size": 12, "sha": "def"}) == "a.py (12 bytes) (def)"
+
+
+def test_html_stream_is_read_while_written(app: QApplication) -> None:
+    """Test that the stream can be read before it is finished and only ends once it is."""
+    page = HtmlStream()
+    page.write_text("<p>")
+    assert page.isSequential()
+    assert page.bytesAvailable() == 3
+    assert page.read(2).data() == b"<p"
+    assert page.readAll().data() == b">"
+    assert not page.atEnd()
+
+    page.finish("</p>")
+    page.write_text("ignored")
+    assert page.readAll().data() == b"</p>"
+    assert page.atEnd()
+
+
+def test_listing_streams_directories_from_one_fetch(app: QApplication, tree_backend: str) -> None:
+    """Test that the head is written before the tree arrives and that every directory reuses the tree."""
+    store = GitHubTreeStore(QNetworkAccessManager(), tree_backend)
+    root = DirectoryListing(store, "user", "repo", "")
+    assert not root.finished
+    assert root.bytesAvailable() > 0
+
+    text: str = read_page(root)
+    assert "<h1>GitHub/user/repo</h1>" in text
+    assert "<a href='github://user/repo/src/'>src/ (bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb)</a>" in text
+    assert "README.md (5 bytes)" in text
+    assert "main.py" not in text
+    assert "2 entries" in text
+
+    src: str = read_page(open_listing(store, QUrl("github://USER/repo/src/")))
+    assert "<a href='github://user/repo/'>..</a>" in src
+    assert "main.py (10 bytes)" in src
+    assert "There is no directory docs." in read_page(open_listing(store, QUrl("github://user/repo/docs/")))
+    assert store.requests == 1
+    assert TreeStubHandler.request_count == 1
+
+
+def test_large_directory_is_listed_in_pages(app: QApplication, tree_backend: str) -> None:
+    """Test that a directory larger than a page lists one page of it, with links to the pages around it."""
+    count: int = LISTING_PAGE_SIZE * 2 + 5
+    TreeStubHandler.tree = [
+        {"name": f"file{number}.py", "path": f"file{number}.py", "type": "file", "size": 1, "sha": "a"}
+        for number in range(count)
+    ]
+    store = GitHubTreeStore(QNetworkAccessManager(), tree_backend)
+
+    first: str = read_page(open_listing(store, QUrl("github://user/repo/")))
+    assert first.count("<li>") == LISTING_PAGE_SIZE
+    assert f"Entries 1-{LISTING_PAGE_SIZE} <a href='github://user/repo/?start={LISTING_PAGE_SIZE}'>Next</a>" in first
+    assert f"{count} entries" in first
+
+    last: str = read_page(open_listing(store, QUrl(f"github://user/repo/?start={LISTING_PAGE_SIZE * 2}")))
+    assert last.count("<li>") == 5
+    assert f"<li>file{count - 1}.py (1 bytes) (a)</li>" in last
+    assert f"<a href='github://user/repo/?start={LISTING_PAGE_SIZE}'>Previous</a>" in last
+    assert "Next" not in last
+    assert store.requests == 1
+    store.deleteLater()
+
+
+def test_store_adopts_prefetched_reply(app: QApplication, tree_backend: str) -> None:
+    """Test that a reply sent while typing is used instead of a new request, and that the tree expires."""
+    now: list[float] = [0.0]
+    network_manager = QNetworkAccessManager()
+    store = GitHubTreeStore(network_manager, tree_backend, ttl=60, clock=lambda: now[0])
+    prefetched: QNetworkReply = network_manager.get(make_tree_request(tree_backend, "user", "repo"))
+
+    store.tree("user", "repo", prefetched)
+    assert "src/" in read_page(DirectoryListing(store, "user", "repo", ""))
+    assert store.requests == 0
+
+    now[0] = 61
+    read_page(DirectoryListing(store, "user", "repo", ""))
+    assert store.requests == 1
+
+
+def test_listing_shows_errors(app: QApplication, tree_backend: str) -> None:
+    """Test that a failed fetch and an invalid URL finish the page with an error."""
+    store = GitHubTreeStore(QNetworkAccessManager(), tree_backend)
+    assert "Failed to fetch data from the API" in read_page(DirectoryListing(store, "user", "missing", ""))
+    assert "expected format: GitHub/username/repo" in read_page(open_listing(store, QUrl("github://user/")))
+
+
+def test_expired_tree_is_revalidated(app: QApplication, tree_backend: str) -> None:
+    """Test that an expired tree costs an empty 304 if it did not change, and is replaced if it did."""
+    now: list[float] = [0.0]
+    store = GitHubTreeStore(QNetworkAccessManager(), tree_backend, ttl=60, clock=lambda: now[0])
+    first: str = read_page(DirectoryListing(store, "user", "repo", "src"))
+    received: int = store.bytes_received
+
+    now[0] = 61
+    assert read_page(DirectoryListing(store, "user", "repo", "src")) == first
+    assert store.requests == 2
+    assert store.not_modified == 1
+    assert store.bytes_received == received
+
+    TreeStubHandler.tree = [*STUB_TREE, {"name": "new.py", "path": "src/new.py", "type": "file", "size": 1, "sha": "d"}]
+    now[0] = 122
+    assert "new.py (1 bytes)" in read_page(DirectoryListing(store, "user", "repo", "src"))
+    assert store.not_modified == 1
+    assert store.bytes_received > received * 2
+
+
+@pytest.mark.benchmark
+def test_revalidation_benchmark(app: QApplication, tree_backend: str) -> None:
+    """Compare the bytes and time of opening a 20,000 entry repository again with downloading the tree again."""
+    TreeStubHandler.tree = [
+        {"name": f"file{number}.py", "path": f"pkg{number % 100}/file{number}.py", "type": "file", "size": 1, "sha": ""}
+        for number in range(20_000)
+    ]
+    network_manager = QNetworkAccessManager()
+    results: dict[str, tuple[int, float]] = {}
+    for name, keep_etag in (("download", False), ("revalidate", True)):
+        now: list[float] = [0.0]
+        store = GitHubTreeStore(network_manager, tree_backend, ttl=60, clock=lambda now=now: now[0])
+        read_page(DirectoryListing(store, "user", "repo", "pkg7"))
+        timings: list[float] = []
+        received: int = store.bytes_received
+        for _ in range(5):
+            now[0] += 61
+            if not keep_etag:
+                for tree in store.trees.values():
+                    tree.etag = None
+            start: float = time.perf_counter()
+            page: str = read_page(DirectoryListing(store, "user", "repo", "pkg7"))
+            timings.append(time.perf_counter() - start)
+            assert "200 entries" in page
+        results[name] = (store.bytes_received - received, min(timings))
+        store.deleteLater()  # Leaving it to the garbage collector crashes PySide when the interpreter exits
+
+    download_bytes, download_time = results["download"]
+    revalidate_bytes, revalidate_time = results["revalidate"]
+    print(  # noqa: T201
+        f"5 repeat opens of a 20,000 entry tree: download {download_bytes:,} bytes, {download_time * 1000:.1f} ms "
+        f"each; revalidate {revalidate_bytes:,} bytes, {revalidate_time * 1000:.1f} ms each",
+    )
+    assert revalidate_bytes == 0
+    assert revalidate_time < download_time
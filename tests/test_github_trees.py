@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from PySide6.QtCore import QCoreApplication, QEvent, QEventLoop, QTimer, QUrl
+from PySide6.QtNetwork import QNetworkAccessManager
+
+from browser.github_scheme import LISTING_PAGE_SIZE, render_listing_rows
+from browser.github_trees import DirectoryListing, GitHubTreeStore, open_listing, take_ndjson_lines
+from tests.conftest import TreeStubHandler
+from tests.test_github_scheme import read_page
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from PySide6.QtWidgets import QApplication
+
+    from browser.github_trees import RepoTree
+
+SLOW_BACKEND_DELAY = 0.5  # seconds
+ENTRY_COUNT = 20_000
+LARGE_ENTRY_COUNT = 100_000
+MAX_PAGE_SECONDS = 0.1  # To list a page of a directory whose tree is stored
+
+TREE: list[dict[str, Any]] = sorted(
+    [{"name": "src", "path": "src", "type": "dir", "size": 0, "sha": "0" * 40}]
+    + [
+        {"name": f"file_{i}.py", "path": f"file_{i}.py", "type": "file", "size": i, "sha": f"{i:040x}"}
+        for i in range(ENTRY_COUNT)
+    ]
+    + [{"name": "main.py", "path": "src/main.py", "type": "file", "size": 10, "sha": "1" * 40}],
+    key=lambda entry: entry["path"],
+)
+
+
+class SlowTreeHandler(BaseHTTPRequestHandler):
+    """Stream a large tree as NDJSON after a delay, like a cold API call, pausing halfway through."""
+
+    request_count: int = 0
+
+    def do_GET(self) -> None:
+        """Sleep, then stream the tree in two halves."""
+        type(self).request_count += 1
+        assert parse_qs(urlparse(self.path).query) == {"stream": ["true"]}
+        time.sleep(SLOW_BACKEND_DELAY)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        lines: list[bytes] = [json.dumps(entry).encode() + b"\n" for entry in TREE]
+        half: int = len(lines) // 2
+        self.wfile.write(b"".join(lines[:half]))
+        self.wfile.flush()
+        time.sleep(SLOW_BACKEND_DELAY)
+        self.wfile.write(b"".join(lines[half:]).rstrip(b"\n"))
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the test output quiet."""
+
+
+@pytest.fixture
+def slow_backend() -> Generator[str]:
+    """Run a slow stub of the API and yield its base URL."""
+    SlowTreeHandler.request_count = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowTreeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/github/"
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(store: GitHubTreeStore, tree: RepoTree, timeout: int = 10_000) -> None:
+    """Run the event loop until the tree has loaded or failed."""
+    loop = QEventLoop()
+    store.changed.connect(lambda _: tree.loading or loop.quit())
+    QTimer.singleShot(timeout, loop.quit)
+    if tree.loading:
+        loop.exec()
+
+
+def test_take_ndjson_lines() -> None:
+    """Test that only complete lines are taken from the buffer, unless the stream has ended."""
+    buffer = bytearray(b'{"a": 1}\n\n{"b": 2}\n{"c"')
+    assert take_ndjson_lines(buffer) == [{"a": 1}, {"b": 2}]
+    assert buffer == b'{"c"'
+    buffer += b": 3}"
+    assert take_ndjson_lines(buffer, final=True) == [{"c": 3}]
+    assert buffer == b""
+
+
+def test_store_does_not_stall_event_loop(app: QApplication | QCoreApplication, slow_backend: str) -> None:
+    """Test that the event loop keeps running while a slow backend is serving a large tree."""
+    store = GitHubTreeStore(QNetworkAccessManager(), slow_backend)
+
+    last_tick: float = time.perf_counter()
+    max_stall: float = 0.0
+
+    def tick() -> None:
+        nonlocal last_tick, max_stall
+        now: float = time.perf_counter()
+        max_stall = max(max_stall, now - last_tick)
+        last_tick = now
+
+    heartbeat = QTimer()
+    heartbeat.setInterval(5)
+    heartbeat.timeout.connect(tick)
+
+    heartbeat.start()
+    tree: RepoTree = store.tree("user", "repo")
+    assert tree.loading
+    wait_for(store, tree)
+    heartbeat.stop()
+
+    assert tree.error is None
+    assert len(tree.children[""]) == ENTRY_COUNT + 1
+    assert [entry["path"] for entry in tree.children["src"]] == ["src/main.py"]
+    assert SlowTreeHandler.request_count == 1
+    print(f"Max event-loop stall: {max_stall * 1000:.1f} ms")  # noqa: T201
+    assert max_stall < SLOW_BACKEND_DELAY / 2
+    store.deleteLater()  # Leaving it to the garbage collector crashes PySide
+
+
+def test_entries_arrive_while_streaming(app: QApplication | QCoreApplication, slow_backend: str) -> None:
+    """Test that the first half of the stream is in the tree before the second half has been sent."""
+    store = GitHubTreeStore(QNetworkAccessManager(), slow_backend)
+    tree: RepoTree = store.tree("user", "repo")
+
+    loop = QEventLoop()
+    store.changed.connect(lambda _: tree.children.get("") and loop.quit())
+    QTimer.singleShot(10_000, loop.quit)
+    loop.exec()
+
+    assert 0 < len(tree.children[""]) < ENTRY_COUNT
+    assert tree.loading  # Still streaming
+
+    wait_for(store, tree)
+    assert len(tree.children[""]) == ENTRY_COUNT + 1
+    store.deleteLater()
+
+
+def test_closing_last_listing_cancels_fetch(app: QApplication | QCoreApplication, slow_backend: str) -> None:
+    """Test that closing the last tab listing a repository in the middle of the stream stops the fetch."""
+    store = GitHubTreeStore(QNetworkAccessManager(), slow_backend)
+    first = DirectoryListing(store, "user", "repo", "")
+    second = DirectoryListing(store, "user", "repo", "src")
+    tree: RepoTree = store.trees["user/repo"]
+
+    loop = QEventLoop()
+    store.changed.connect(lambda _: tree.children.get("") and loop.quit())
+    QTimer.singleShot(10_000, loop.quit)
+    loop.exec()
+    assert tree.loading
+
+    first.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+    assert tree.loading
+    assert store.listings == {"user/repo": 1}
+
+    second.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+    received: int = store.bytes_received
+    assert not tree.loading
+    assert "user/repo" not in store.trees
+    assert store.listings == {}
+    assert store.fetch_timings[-1].outcome == "cancelled"
+
+    loop = QEventLoop()
+    QTimer.singleShot(int(SLOW_BACKEND_DELAY * 2000), loop.quit)
+    loop.exec()
+    assert store.bytes_received == received  # The second half was never read
+    assert len(tree.children[""]) < ENTRY_COUNT
+    store.deleteLater()
+
+
+@pytest.mark.benchmark
+def test_large_directory_benchmark(app: QApplication | QCoreApplication, tree_backend: str) -> None:
+    """Test that a directory with 100k entries is written one page at a time, and that paging needs no fetch."""
+    TreeStubHandler.tree = [
+        {"name": f"file_{i}.py", "path": f"file_{i}.py", "type": "file", "size": i, "sha": f"{i:040x}"}
+        for i in range(LARGE_ENTRY_COUNT)
+    ]
+    store = GitHubTreeStore(QNetworkAccessManager(), tree_backend)
+
+    start: float = time.perf_counter()
+    first: str = read_page(DirectoryListing(store, "user", "repo", ""))
+    open_elapsed: float = time.perf_counter() - start
+    assert first.count("<li>") == LISTING_PAGE_SIZE
+    assert f"{LARGE_ENTRY_COUNT} entries" in first
+
+    start = time.perf_counter()
+    middle: str = read_page(open_listing(store, QUrl(f"github://user/repo/?start={LARGE_ENTRY_COUNT // 2}")))
+    page_elapsed: float = time.perf_counter() - start
+    assert middle.count("<li>") == LISTING_PAGE_SIZE
+    assert store.requests == 1
+
+    start = time.perf_counter()
+    everything: str = render_listing_rows("user", "repo", store.trees["user/repo"].children[""])
+    everything_elapsed: float = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"{LARGE_ENTRY_COUNT} entries: fetch and first page {open_elapsed * 1000:.0f} ms, {len(first):,} bytes; "
+        f"another page {page_elapsed * 1000:.1f} ms; every row {everything_elapsed * 1000:.0f} ms, "
+        f"{len(everything):,} bytes",
+    )
+    assert page_elapsed < MAX_PAGE_SECONDS
+    assert len(first) * 50 < len(everything)
+    store.deleteLater()
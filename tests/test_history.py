@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import math
+import random
+import statistics
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from PySide6.QtWidgets import QLineEdit
+
+from browser.history import (
+    FTS_CANDIDATE_LIMIT,
+    HistoryCompleter,
+    HistoryStore,
+    Visit,
+    open_database,
+    visit_score,
+    write_visits,
+)
+
+if TYPE_CHECKING:
+    import sqlite3
+    from collections.abc import Generator
+    from pathlib import Path
+
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtWidgets import QApplication
+
+DAY: float = 24 * 60 * 60
+NOW: float = 1_750_000_000.0
+
+SYNTHETIC_VISITS = 1_000_000
+SYNTHETIC_URLS = 100_000
+MAX_P95_MS = 10.0
+
+
+@pytest.fixture
+def history(tmp_path: Path) -> Generator[HistoryStore]:
+    """Open an empty history that writes without waiting."""
+    store = HistoryStore(tmp_path / "history.sqlite3", write_delay=0)
+    yield store
+    store.close()
+
+
+def urls(store: HistoryStore, text: str) -> list[str]:
+    """Return the suggested URLs for the text."""
+    return [suggestion.url for suggestion in store.suggest(text)]
+
+
+def test_visits_are_written_in_batches(tmp_path: Path) -> None:
+    """Test that queued visits are written together by the writer thread and survive a restart."""
+    store = HistoryStore(tmp_path / "history.sqlite3", write_delay=10)
+    for i in range(100):
+        store.record_visit(f"https://example.com/{i}", f"Page {i}", NOW + i)
+    assert store.flush(timeout=5)
+    assert store.batches == 1
+    store.close()
+
+    store = HistoryStore(tmp_path / "history.sqlite3")
+    count, visits = store.reader.execute("SELECT count(*), sum(visit_count) FROM urls").fetchone()
+    assert (count, visits) == (100, 100)
+    assert urls(store, "page 42") == ["https://example.com/42"]
+    store.close()
+
+
+def test_frecency_favours_frequent_and_recent_visits(history: HistoryStore) -> None:
+    """Test that many old visits lose to a few recent ones, and more visits win at the same age."""
+    for i in range(4):
+        history.record_visit("https://docs.python.org/3/", "Python docs", NOW - 120 * DAY - i)
+    history.record_visit("https://docs.djangoproject.com/", "Django docs", NOW - 30 * DAY)
+    history.record_visit("https://docs.djangoproject.com/", "", NOW)
+    history.record_visit("https://docs.pyside.org/", "PySide docs", NOW)
+    history.flush()
+
+    assert urls(history, "docs") == [
+        "https://docs.djangoproject.com/",
+        "https://docs.pyside.org/",
+        "https://docs.python.org/3/",
+    ]
+    frecency: float = history.reader.execute(
+        "SELECT frecency FROM urls WHERE url = ?",
+        ("https://docs.djangoproject.com/",),
+    ).fetchone()[0]
+    assert frecency == pytest.approx(math.log(math.exp(visit_score(NOW - 30 * DAY)) + math.exp(visit_score(NOW))))
+    assert history.suggest("django")[0].title == "Django docs"
+
+
+def test_every_word_is_a_prefix(history: HistoryStore) -> None:
+    """Test that every typed word has to start a word in the URL or the title."""
+    history.record_visit("https://github.com/TheLovinator1/browser", "A web browser", NOW)
+    history.record_visit("https://github.com/psf/requests", "HTTP for Humans", NOW)
+    history.flush()
+
+    assert urls(history, "git brow") == ["https://github.com/TheLovinator1/browser"]
+    assert urls(history, "github.com/psf") == ["https://github.com/psf/requests"]
+    assert urls(history, "HUMANS") == ["https://github.com/psf/requests"]
+    assert urls(history, "owser") == []
+    assert urls(history, "\"' ") == []
+
+
+def test_common_words_are_ranked_without_sorting_every_match(history: HistoryStore) -> None:
+    """Test that a word with more matches than the full-text candidates still returns the most frecent URLs."""
+    visits: list[Visit] = [
+        Visit(f"https://example.com/{i}", "Example page", NOW - i * DAY / 10) for i in range(FTS_CANDIDATE_LIMIT * 2)
+    ]
+    write_visits(history.reader, visits)
+
+    assert urls(history, "example pa")[:3] == [
+        "https://example.com/0",
+        "https://example.com/1",
+        "https://example.com/2",
+    ]
+
+
+def test_completer_shows_suggestions(app: QApplication | QCoreApplication, history: HistoryStore) -> None:
+    """Test that the completer shows the title and completes to the URL."""
+    history.record_visit("https://example.com/", "Example Domain", NOW)
+    history.flush()
+    completer = HistoryCompleter(history)
+    url_bar = QLineEdit()
+    url_bar.setCompleter(completer)
+
+    completer.update_suggestions("exa")
+    model = completer.completionModel()
+    assert model.rowCount() == 1
+    assert model.index(0, 0).data() == "Example Domain — https://example.com/"
+    assert completer.pathFromIndex(model.index(0, 0)) == "https://example.com/"
+
+    completer.update_suggestions("nothing")
+    assert model.rowCount() == 0
+
+
+def make_synthetic_history(connection: sqlite3.Connection, rng: random.Random) -> list[str]:
+    """Fill the history with a year of visits, Zipf distributed over the URLs, and return the visited URLs."""
+    syllables: list[str] = ["ba", "ko", "ri", "te", "lu", "man", "dor", "sel", "vi", "qua", "zen", "pro", "git", "do"]
+    words: list[str] = ["".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(5000)]
+    hosts: list[str] = [f"{rng.choice(words)}.{rng.choice(['com', 'org', 'io', 'net'])}" for _ in range(2000)]
+    all_urls: list[str] = [
+        f"https://{rng.choice(hosts)}/{'/'.join(rng.choices(words, k=rng.randint(1, 3)))}"
+        for _ in range(SYNTHETIC_URLS)
+    ]
+    titles: dict[str, str] = {url: " ".join(rng.choices(words, k=rng.randint(2, 6))).title() for url in all_urls}
+
+    weights: list[float] = [1 / (rank + 1) for rank in range(len(all_urls))]
+    visited: list[str] = rng.choices(all_urls, weights=weights, k=SYNTHETIC_VISITS)
+    times: list[float] = sorted(NOW - rng.random() * 365 * DAY for _ in range(SYNTHETIC_VISITS))
+    batch_size = 50_000
+    for start in range(0, SYNTHETIC_VISITS, batch_size):
+        write_visits(
+            connection,
+            (
+                Visit(url, titles[url], visited_at)
+                for url, visited_at in zip(
+                    visited[start : start + batch_size],
+                    times[start : start + batch_size],
+                    strict=True,
+                )
+            ),
+        )
+    return list(dict.fromkeys(visited))
+
+
+@pytest.mark.benchmark
+def test_completion_latency(tmp_path: Path) -> None:
+    """Test that suggestions take under 10 ms at the 95th percentile on a history of a million visits."""
+    rng = random.Random(14)
+    path: Path = tmp_path / "history.sqlite3"
+    connection: sqlite3.Connection = open_database(path)
+    start: float = time.perf_counter()
+    visited_urls: list[str] = make_synthetic_history(connection, rng)
+    write_seconds: float = time.perf_counter() - start
+    connection.close()
+
+    # Type out URLs and words from titles one character at a time, like a user would.
+    store = HistoryStore(path)
+    typed: list[str] = []
+    for url in rng.sample(visited_urls, 150):
+        target: str = url.removeprefix("https://")
+        typed += [target[:length] for length in range(1, min(len(target), 20) + 1)]
+        title: str = store.reader.execute("SELECT title FROM urls WHERE url = ?", (url,)).fetchone()[0]
+        typed += [title[:length] for length in range(1, min(len(title), 20) + 1)]
+
+    latencies: list[float] = []
+    suggested: int = 0
+    for text in typed:
+        start = time.perf_counter()
+        suggested += len(store.suggest(text)) > 0
+        latencies.append((time.perf_counter() - start) * 1000)
+    store.close()
+
+    p95: float = statistics.quantiles(latencies, n=100)[94]
+    print(  # noqa: T201
+        f"{SYNTHETIC_VISITS} visits to {len(visited_urls)} URLs written in {write_seconds:.1f} s; "
+        f"{len(typed)} completions: median {statistics.median(latencies):.2f} ms, p95 {p95:.2f} ms, "
+        f"max {max(latencies):.2f} ms",
+    )
+    assert suggested == len(typed)
+    assert p95 < MAX_P95_MS
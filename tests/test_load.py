@@ -0,0 +1,198 @@
+"""Load tests of the API against the replayed GitHub, compared with a stored baseline.
+
+Run them with `pytest -m benchmark tests/test_load.py`. After a change that is meant to make things slower or
+faster, store the new numbers with UPDATE_LOAD_BASELINE=1 and commit tests/benchmarks/load_baseline.json.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import httpx
+import pytest
+
+from core import sites_github
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pytest_django.fixtures import SettingsWrapper
+
+    from tests.replay_github import ReplayGitHub
+
+BASELINE: Path = Path(__file__).parent / "benchmarks" / "load_baseline.json"
+CONCURRENCY_LEVELS: tuple[int, ...] = (1, 8, 32)
+LOAD_REQUESTS = 300
+LOAD_RUNS = 3
+
+# A run fails when it is this many times slower than the baseline, or needs this many times the memory.
+TOLERANCE: float = float(os.getenv("LOAD_BENCHMARK_TOLERANCE", "2.0"))
+
+# Latencies this close to the baseline never fail, a millisecond of scheduling noise is not a regression.
+LATENCY_SLACK_MS = 2.0
+
+# The injected latency of GitHub in the revalidate scenario, about a round trip to a nearby data centre.
+UPSTREAM_DELAY = 0.005
+
+
+def run_load(
+    request: Callable[[], object],
+    concurrency: int,
+    requests: int = LOAD_REQUESTS,
+    runs: int = LOAD_RUNS,
+) -> dict[str, float]:
+    """Send requests from concurrent threads and measure the throughput, the latency and the memory.
+
+    Each number is the median of several runs. With threads fighting over the GIL, a single run can have a
+    p99 several times that of the next. The memory is measured in one more run, tracemalloc would slow down
+    the timed ones.
+
+    Args:
+        request (Callable[[], object]): Sends one request.
+        concurrency (int): How many threads send requests at the same time.
+        requests (int): How many requests to send in each run.
+        runs (int): How many timed runs to take the median of.
+
+    Returns:
+        dict[str, float]: Requests per second, the median and 99th percentile latency in milliseconds, and the
+            peak of the memory allocated while serving them in KiB.
+    """
+
+    def timed_request(_: int) -> float:
+        start: float = time.perf_counter()
+        request()
+        return time.perf_counter() - start
+
+    throughputs: list[float] = []
+    p50s: list[float] = []
+    p99s: list[float] = []
+    for _ in range(runs):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start: float = time.perf_counter()
+            latencies: list[float] = list(executor.map(timed_request, range(requests)))
+            elapsed: float = time.perf_counter() - start
+        percentiles: list[float] = statistics.quantiles(latencies, n=100)
+        throughputs.append(requests / elapsed)
+        p50s.append(percentiles[49])
+        p99s.append(percentiles[98])
+
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed_request, range(requests)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "requests_per_second": round(statistics.median(throughputs), 1),
+        "p50_ms": round(statistics.median(p50s) * 1000, 3),
+        "p99_ms": round(statistics.median(p99s) * 1000, 3),
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+def find_regressions(result: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Compare a result of run_load with its baseline.
+
+    Args:
+        result (dict[str, float]): The measured numbers.
+        baseline (dict[str, float]): The stored numbers.
+        tolerance (float): How many times worse a number may get.
+
+    Returns:
+        list[str]: What got worse than the tolerance allows, empty if nothing did.
+    """
+    regressions: list[str] = []
+    if result["requests_per_second"] < baseline["requests_per_second"] / tolerance:
+        regressions.append(
+            f"{result['requests_per_second']:.0f} requests/s, baseline {baseline['requests_per_second']:.0f}",
+        )
+    regressions.extend(
+        f"{name} {result[name]:.2f}, baseline {baseline[name]:.2f}"
+        for name in ("p50_ms", "p99_ms")
+        if result[name] > max(baseline[name] * tolerance, baseline[name] + LATENCY_SLACK_MS)
+    )
+    if result["peak_memory_kib"] > baseline["peak_memory_kib"] * tolerance:
+        regressions.append(
+            f"peak memory {result['peak_memory_kib']:.0f} KiB, baseline {baseline['peak_memory_kib']:.0f}"
+        )
+    return regressions
+
+
+def test_regressions_are_found() -> None:
+    """Test that only numbers that got worse than the tolerance are reported."""
+    baseline: dict[str, float] = {"requests_per_second": 1000, "p50_ms": 10, "p99_ms": 0.5, "peak_memory_kib": 100}
+    assert find_regressions(baseline, baseline, 2.0) == []
+    assert find_regressions({**baseline, "requests_per_second": 5000, "p99_ms": 2.4}, baseline, 2.0) == []
+    assert find_regressions(
+        {"requests_per_second": 400, "p50_ms": 25, "p99_ms": 3, "peak_memory_kib": 150},
+        baseline,
+        2.0,
+    ) == ["400 requests/s, baseline 1000", "p50_ms 25.00, baseline 10.00", "p99_ms 3.00, baseline 0.50"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("concurrency", CONCURRENCY_LEVELS)
+@pytest.mark.parametrize("scenario", ["contents", "tree", "revalidate"])
+def test_load(scenario: str, concurrency: int, replay_github: ReplayGitHub, settings: SettingsWrapper) -> None:
+    """Load the API with the network unplugged and fail if it got slower or bigger than the baseline.
+
+    contents and tree go through the WSGI application, after a first request has saved the snapshot and filled
+    the cache. revalidate calls get_repo_contents with an expired cache, so that every call asks the replayed
+    GitHub with its ETag and waits for its latency.
+    """
+    from config.wsgi import application as wsgi_application  # noqa: PLC0415
+
+    settings.ALLOWED_HOSTS = ["*"]
+    with httpx.Client(transport=httpx.WSGITransport(app=wsgi_application), base_url="http://testserver") as client:
+        match scenario:
+            case "contents":
+
+                def request() -> object:
+                    return client.get("/api/github/repos/TheLovinator1/browser/contents/").raise_for_status()
+
+            case "tree":
+
+                def request() -> object:
+                    return client.get("/api/github/repos/TheLovinator1/browser/tree/").raise_for_status()
+
+            case _:
+                replay_github.delay = UPSTREAM_DELAY
+                sites_github.repo_contents_cache.ttl = 0
+
+                def request() -> object:
+                    return sites_github.get_repo_contents("TheLovinator1", "browser")
+
+        request()
+        result: dict[str, float] = run_load(request, concurrency)
+    assert replay_github.misses == []
+
+    baselines: dict[str, dict[str, dict[str, float]]] = (
+        json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {}
+    )
+    baseline: dict[str, float] | None = baselines.get(scenario, {}).get(str(concurrency))
+    print(  # noqa: T201
+        f"{scenario} with {concurrency} threads: {result['requests_per_second']:.0f} requests/s, "
+        f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+        f"peak memory {result['peak_memory_kib']:.0f} KiB; baseline {baseline}",
+    )
+    if os.getenv("UPDATE_LOAD_BASELINE") == "1":
+        baselines.setdefault(scenario, {})[str(concurrency)] = result
+        BASELINE.parent.mkdir(exist_ok=True)
+        BASELINE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        return
+
+    assert baseline is not None, (
+        f"No baseline for {scenario} with {concurrency} threads, run with UPDATE_LOAD_BASELINE=1"
+    )
+    regressions: list[str] = find_regressions(result, baseline, TOLERANCE)
+    assert not regressions, f"{scenario} with {concurrency} threads regressed: {'; '.join(regressions)}"
@@ -1,32 +1,34 @@
 from __future__ import annotations
 
+import statistics
+import time
 from typing import TYPE_CHECKING
 
 import pytest
-from PySide6.QtCore import QCoreApplication, QPoint, QSize, Qt, QUrl
+from PySide6.QtCore import QEventLoop, QPoint, Qt, QTimer, QUrl
 from PySide6.QtTest import QTest
 from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWidgets import QApplication
 
+from browser.history import HistoryStore
 from browser.main import Browser
+from browser.session import SessionState, SessionStore, TabPlaceholder, TabState
+from tests.conftest import TreeStubHandler
+from tests.github_widget import GitHubListWidget
 
 if TYPE_CHECKING:
-    from PySide6.QtCore import QCoreApplication, QSize
-
+    from pathlib import Path
 
-@pytest.fixture
-def app() -> QApplication | QCoreApplication:
-    """Fixture for creating the QApplication instance."""
-    app: QCoreApplication | None = QApplication.instance()
-    if app is None:
-        app = QApplication([])
-    return app
+    from PySide6.QtCore import QCoreApplication, QSize
+    from PySide6.QtWebEngineCore import QWebEnginePage
+    from PySide6.QtWidgets import QApplication, QWidget
 
 
 @pytest.fixture
 def browser(app: QApplication | QCoreApplication) -> Browser:
     """Fixture for creating the Browser instance."""
-    return Browser()
+    browser = Browser()
+    browser.finish_startup()
+    return browser
 
 
 def test_browser_initialization(browser: Browser) -> None:
@@ -58,8 +60,27 @@ def test_close_current_tab(browser: Browser) -> None:
     """Test closing the current tab."""
     browser.add_new_tab("https://example.com", "Example")
     initial_tab_count = browser.tabs.count()
+    destroyed: list[bool] = []
+    browser.tabs.currentWidget().destroyed.connect(lambda: destroyed.append(True))
     browser.close_current_tab(browser.tabs.currentIndex())
     assert browser.tabs.count() == initial_tab_count - 1
+    QTest.qWait(0)
+    assert destroyed == [True]
+
+
+def test_preconnect_uses_a_hidden_page(browser: Browser) -> None:
+    """Test that preconnecting loads a hidden page of the shared profile and leaves the open tab alone."""
+    view: QWidget = browser.tabs.currentWidget()
+    assert isinstance(view, QWebEngineView)
+    browser.preconnect("https://example.com")
+    page: QWebEnginePage | None = browser.preconnect_page
+    assert page is not None
+    assert page is not view.page()
+    assert page.profile() is browser.profile
+    assert browser.tabs.count() == 1
+
+    browser.preconnect("https://example.org")
+    assert browser.preconnect_page is page
 
 
 def test_navigate_to_url(browser: Browser) -> None:
@@ -87,3 +108,181 @@ def test_show_context_menu(browser: Browser) -> None:
 
     QTest.mouseClick(browser.tabs.tabBar(), Qt.MouseButton.RightButton, pos=QPoint(10, 10))
     # Since we cannot directly assert the context menu, we assume no exceptions were raised.
+
+
+def wait_for_load(view: QWebEngineView, timeout: int = 10_000) -> bool:
+    """Run the event loop until the view has loaded its page.
+
+    Returns:
+        bool: Whether the page loaded.
+    """
+    result: list[bool] = [False]
+    loop = QEventLoop()
+
+    def on_load_finished(ok: bool) -> None:
+        result[0] = ok
+        loop.quit()
+
+    view.loadFinished.connect(on_load_finished)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+    view.loadFinished.disconnect(on_load_finished)
+    return result[0]
+
+
+def save_session(path: Path, count: int, active_index: int) -> SessionStore:
+    """Save a session of about:blank tabs and return a store for it."""
+    tabs: list[TabState] = [TabState(url=f"about:blank#{i}", title=f"Tab {i}") for i in range(count)]
+    SessionStore(path).save(SessionState(tabs=tabs, active_index=active_index))
+    return SessionStore(path)
+
+
+def test_restore_session_is_lazy(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that only the selected tab is loaded, and that the others load when selected."""
+    browser = Browser(session_store=save_session(tmp_path / "session.json", 5, active_index=3))
+    browser.finish_startup()
+
+    assert browser.tabs.count() == 5
+    assert browser.tabs.currentIndex() == 3
+    assert [browser.tabs.tabText(i) for i in range(5)] == [f"Tab {i}" for i in range(5)]
+    assert [isinstance(browser.tabs.widget(i), QWebEngineView) for i in range(5)] == [False, False, False, True, False]
+    assert isinstance(browser.tabs.widget(0), TabPlaceholder)
+
+    browser.tabs.setCurrentIndex(1)
+    view = browser.tabs.widget(1)
+    assert isinstance(view, QWebEngineView)
+    assert view.url().toString() == "about:blank#1"
+    assert browser.tabs.currentIndex() == 1
+    assert isinstance(browser.tabs.widget(0), TabPlaceholder)
+
+
+def test_session_is_saved_on_change(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that tab changes are written to the session, placeholders included."""
+    store: SessionStore = save_session(tmp_path / "session.json", 3, active_index=0)
+    browser = Browser(session_store=store)
+    browser.finish_startup()
+
+    browser.add_new_tab("about:blank#new", "New Tab")
+    browser.tabs.tabBar().moveTab(3, 0)
+    browser.save_session()
+
+    saved: SessionState | None = SessionStore(store.path).load()
+    assert saved is not None
+    assert [tab.url for tab in saved.tabs] == ["about:blank#new", "about:blank#0", "about:blank#1", "about:blank#2"]
+    assert saved.active_index == 0
+
+
+def test_url_bar_suggests_from_history(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that GitHub pages are recorded in the history and suggested in the URL bar."""
+    history = HistoryStore(tmp_path / "history.sqlite3", write_delay=0)
+    browser = Browser(history=history)
+    browser.finish_startup()
+    browser.url_bar.setText("GitHub/TheLovinator1/browser")
+    browser.navigate_to_url()
+    wait_for_load(browser.tabs.currentWidget())
+    assert history.flush(timeout=5)
+
+    browser.url_bar.setText("thelov")
+    browser.on_url_bar_edited("thelov")
+    assert browser.history_completer is not None
+    assert browser.history_completer.completionModel().index(0, 0).data(Qt.ItemDataRole.EditRole) == (
+        "github://thelovinator1/browser/"
+    )
+    browser.close()
+
+
+def test_github_pages_share_one_view(browser: Browser, tree_backend: str) -> None:
+    """Test that GitHub listings open in the current web view and its history, and link into directories."""
+    assert browser.github_trees is not None
+    browser.github_trees.api_base_url = tree_backend
+    view: QWebEngineView = browser.tabs.currentWidget()
+    history_count: int = view.history().count()
+    browser.url_bar.setText("GitHub/user/repo")
+    browser.navigate_to_url()
+    assert wait_for_load(view)
+    assert view.title() == "GitHub/user/repo"
+
+    view.setUrl(QUrl("github://user/repo/src/"))
+    assert wait_for_load(view)
+    assert browser.tabs.currentWidget() is view
+    assert view.history().count() == history_count + 2
+    view.back()
+    assert wait_for_load(view)
+    assert view.url().toString() == "github://user/repo/"
+    assert TreeStubHandler.request_count == 1
+
+
+@pytest.mark.benchmark
+def test_github_navigation_time(browser: Browser, tree_backend: str) -> None:
+    """Compare the time per navigation of the github:// scheme with swapping a listing widget into the tab."""
+    assert browser.github_trees is not None
+    browser.github_trees.api_base_url = tree_backend
+    view: QWebEngineView = browser.tabs.currentWidget()
+    rounds = 10
+
+    def scheme_navigation(url: str) -> float:
+        start: float = time.perf_counter()
+        view.setUrl(QUrl(url))
+        assert wait_for_load(view)
+        return time.perf_counter() - start
+
+    def widget_swap() -> float:
+        start: float = time.perf_counter()
+        page = GitHubListWidget(browser.network_manager, tree_backend)
+        browser.replace_tab(browser.tabs.currentIndex(), page, "GitHub/user/repo")
+        loop = QEventLoop()
+        page.loaded.connect(loop.quit)
+        page.start("user", "repo")
+        loop.exec()
+        elapsed: float = time.perf_counter() - start
+        browser.replace_tab(browser.tabs.currentIndex(), view, "New Tab")
+        page.deleteLater()
+        return elapsed
+
+    scheme_navigation("github://user/repo/")  # Warm up the renderer
+    cold: list[float] = []
+    for i in range(rounds):
+        browser.github_trees.trees.clear()
+        cold.append(scheme_navigation(f"github://user/repo{i}/"))
+    warm: list[float] = [scheme_navigation(f"github://user/repo{i}/src/") for i in range(rounds)]
+    swapped: list[float] = [widget_swap() for _ in range(rounds)]
+
+    print(  # noqa: T201
+        f"Median time per GitHub navigation: github:// {statistics.median(cold) * 1000:.1f} ms cold, "
+        f"{statistics.median(warm) * 1000:.1f} ms with the tree cached; "
+        f"widget swap {statistics.median(swapped) * 1000:.1f} ms",
+    )
+    assert statistics.median(warm) < statistics.median(cold)
+
+
+@pytest.mark.benchmark
+def test_restore_time_to_interactive(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that restoring 50 tabs takes about as long as starting with one."""
+
+    def time_to_interactive(count: int) -> float:
+        store: SessionStore = save_session(tmp_path / f"session-{count}.json", count, active_index=count - 1)
+        start: float = time.perf_counter()
+        browser = Browser(session_store=store)
+        browser.finish_startup()
+        app.processEvents()
+        elapsed: float = time.perf_counter() - start
+        browser.close()
+        return elapsed
+
+    time_to_interactive(1)  # Warm up QtWebEngine
+    single: float = min(time_to_interactive(1) for _ in range(3))
+    fifty: float = min(time_to_interactive(50) for _ in range(3))
+
+    print(f"Time to interactive: 1 tab {single * 1000:.0f} ms, 50 tabs {fifty * 1000:.0f} ms")  # noqa: T201
+    assert fifty < single * 1.5 + 0.05
+
+
+def test_tabs_are_created_after_the_window(app: QApplication | QCoreApplication) -> None:
+    """Test that the first tab is created by the event loop, after the window is shown."""
+    browser = Browser()
+    assert browser.tabs.count() == 0
+    assert browser.isVisible()
+
+    app.processEvents()
+    assert browser.tabs.count() == 1
+    assert isinstance(browser.tabs.currentWidget(), QWebEngineView)
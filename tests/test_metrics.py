@@ -0,0 +1,144 @@
+"""Tests for the Prometheus metrics endpoint."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import statistics
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from django.test import AsyncClient, Client
+
+from core import sites_github
+from core.metrics import CallbackMetric, Counter, Histogram, MetricsRegistry, db_queries, http_request_duration
+from core.snapshots import save_snapshot
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    from pytest_django.fixtures import SettingsWrapper
+
+    from tests.fake_github import FakeGitHub
+
+CONTENTS_ROUTE = "api/github/repos/<username>/<repo_name>/contents/"
+BENCHMARK_REQUESTS = 2000
+
+
+def sample(text: str, line: str) -> float:
+    """Return the value of the sample whose name and labels are line, or 0 if there is none."""
+    match: re.Match[str] | None = re.search(rf"^{re.escape(line)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_text_format() -> None:
+    """Test that counters, histograms and callbacks render like the Prometheus client libraries."""
+    registry = MetricsRegistry()
+    counter = Counter("test_total", "A counter.", ("path",))
+    histogram = Histogram("test_seconds", "A histogram.", ("route",), buckets=(0.1, 1.0))
+    registry.register(
+        counter,
+        histogram,
+        CallbackMetric("test_entries", "A gauge.", "gauge", lambda: {("a",): 3, ("b",): None}, ("cache",)),
+    )
+    counter.inc('say "hi"\\\n', amount=2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "r")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_total A counter.",
+        "# TYPE test_total counter",
+        'test_total{path="say \\"hi\\"\\\\\\n"} 2',
+        "# HELP test_seconds A histogram.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="r",le="0.1"} 2',
+        'test_seconds_bucket{route="r",le="1"} 3',
+        'test_seconds_bucket{route="r",le="+Inf"} 4',
+        'test_seconds_sum{route="r"} 3.65',
+        'test_seconds_count{route="r"} 4',
+        "# HELP test_entries A gauge.",
+        "# TYPE test_entries gauge",
+        'test_entries{cache="a"} 3',
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_metrics_endpoint(fake_github: FakeGitHub) -> None:
+    """Test that requests, their database time, upstream calls, the caches and the rate limit are reported."""
+    fake_github.repos["user/repo"] = [make_file("a.py")]
+    client = Client()
+    before: str = client.get("/api/metrics/").content.decode()
+
+    client.get("/api/github/repos/user/repo/contents/")
+    client.get("/api/github/repos/user/repo/contents/")
+    response = client.get("/api/metrics/")
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text: str = response.content.decode()
+
+    def increase(line: str) -> float:
+        return sample(text, line) - sample(before, line)
+
+    assert (
+        increase(f'browser_http_request_duration_seconds_count{{route="{CONTENTS_ROUTE}",method="GET",status="200"}}')
+        == 2
+    )
+    assert increase(f'browser_http_request_db_duration_seconds_count{{route="{CONTENTS_ROUTE}"}}') == 2
+    assert increase(f'browser_db_queries_total{{route="{CONTENTS_ROUTE}"}}') >= 2
+    assert increase('browser_github_request_duration_seconds_count{status="200"}') == 1
+    assert sample(text, 'browser_github_cache_misses_total{cache="contents"}') == 1
+    assert sample(text, 'browser_github_cache_entries{cache="contents"}') == 1
+    assert sample(text, "browser_github_rate_limit_remaining") == fake_github.remaining
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_are_measured(fake_github: FakeGitHub) -> None:
+    """Test that async views get the same latency, database and upstream metrics."""
+    fake_github.repos["user/repo"] = [make_file("a.py")]
+    route = "api/github/async/repos/<username>/<repo_name>/contents/"
+    requests: float = http_request_duration.count(route, "GET", "200")
+    queries: float = db_queries.value(route)
+
+    async def main() -> None:
+        try:
+            await AsyncClient().get("/api/github/async/repos/user/repo/contents/")
+        finally:
+            await sites_github.async_github_client.aclose()
+
+    asyncio.run(main())
+    assert http_request_duration.count(route, "GET", "200") == requests + 1
+    assert db_queries.value(route) > queries
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_metrics_overhead_benchmark(settings: SettingsWrapper) -> None:
+    """Measure what the metrics middleware and the query timer add to a request that reads a snapshot."""
+    save_snapshot("user", "repo", [make_file(f"{number}.py") for number in range(20)])
+    with_metrics: list[str] = list(settings.MIDDLEWARE)
+    without_metrics: list[str] = [path for path in with_metrics if path != "core.middleware.metrics_middleware"]
+
+    timings: dict[str, list[float]] = {"with": [], "without": []}
+    for _ in range(5):
+        for name, middleware in (("with", with_metrics), ("without", without_metrics)):
+            settings.MIDDLEWARE = middleware
+            client = Client()
+            client.get("/api/github/repos/user/repo/contents/")  # Load the middleware before timing
+            start: float = time.perf_counter()
+            for _ in range(BENCHMARK_REQUESTS // 5):
+                client.get("/api/github/repos/user/repo/contents/")
+            timings[name].append((time.perf_counter() - start) / (BENCHMARK_REQUESTS // 5))
+
+    histogram = Histogram("benchmark_seconds", "A histogram.", ("route", "method", "status"))
+    start = time.perf_counter()
+    for number in range(100_000):
+        histogram.observe(number / 1e6, CONTENTS_ROUTE, "GET", "200")
+    observe_time: float = (time.perf_counter() - start) / 100_000
+
+    with_time: float = statistics.median(timings["with"])
+    without_time: float = statistics.median(timings["without"])
+    print(  # noqa: T201
+        f"{BENCHMARK_REQUESTS} requests: {without_time * 1e6:.0f} µs per request without metrics, "
+        f"{with_time * 1e6:.0f} µs with metrics ({(with_time - without_time) * 1e6:+.1f} µs); "
+        f"one histogram observation {observe_time * 1e9:.0f} ns",
+    )
+    assert with_time - without_time < 0.05 * without_time + 20e-6
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from PySide6.QtCore import QEventLoop, QTimer, QUrl, Signal
+from PySide6.QtNetwork import QNetworkAccessManager
+from PySide6.QtWidgets import QTabWidget, QWidget
+
+from browser.github_trees import DirectoryListing, GitHubTreeStore
+from browser.performance import FIRST_TAB_TRACK, PerformanceMonitor, can_measure_process_memory, process_memory
+from tests.test_github_scheme import read_page
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from PySide6.QtWidgets import QApplication
+
+
+class FakePage:
+    """The page of a FakeView, rendered by this process."""
+
+    def renderProcessPid(self) -> int:  # noqa: N802
+        """Return the PID of the test."""
+        return os.getpid()
+
+
+class FakeView(QWidget):
+    """A widget with the load signals of a QWebEngineView, without starting QtWebEngine."""
+
+    loadStarted = Signal()  # noqa: N815
+    loadProgress = Signal(int)  # noqa: N815
+    loadFinished = Signal(bool)  # noqa: N815
+
+    def __init__(self, url: str) -> None:
+        """Show the URL."""
+        super().__init__()
+        self._url = QUrl(url)
+        self._page = FakePage()
+
+    def url(self) -> QUrl:
+        """Return the URL of the page."""
+        return self._url
+
+    def title(self) -> str:
+        """Return the title of the page."""
+        return "Example"
+
+    def page(self) -> FakePage:
+        """Return the page."""
+        return self._page
+
+
+def test_tab_loads_are_timed(app: QApplication, tmp_path: Path) -> None:
+    """Test that a load is timed from loadStarted to loadFinished and shown with the renderer of the tab."""
+    now: list[float] = [100.0]
+    tabs = QTabWidget()
+    view = FakeView("https://example.com/")
+    tabs.addTab(view, "Example")
+    monitor = PerformanceMonitor(tabs, trace_dir=tmp_path, clock=lambda: now[0])
+    monitor.track(view)
+
+    view.loadStarted.emit()
+    now[0] += 0.05
+    view.loadProgress.emit(0)
+    view.loadProgress.emit(30)
+    now[0] += 0.2
+    view.loadProgress.emit(100)
+    assert monitor.tab_report()[0]["loading"]
+    view.loadFinished.emit(True)
+
+    report: dict[str, Any] = monitor.tab_report()[0]
+    assert report["load_ms"] == pytest.approx(250)
+    assert report["first_progress_ms"] == pytest.approx(50)
+    assert report["pid"] == os.getpid()
+    assert report["memory_bytes"] > 0
+    page: str = monitor.render_page()
+    assert "<th>Tab 1: Example</th><td>250 ms, first progress after 50 ms; renderer" in page
+
+    monitor.forget(view)
+    assert monitor.tab_report() == []
+    assert len(monitor.loads) == 1
+
+    other = FakeView("https://example.org/")
+    tabs.addTab(other, "Other")
+    monitor.track(other)
+    assert monitor.tracks[other] != monitor.loads[0].track  # A closed tab's track is not reused
+
+
+class FakeLifecycle:
+    """The report of a TabLifecycleManager that discarded one tab."""
+
+    memory_budget: int = 512 * 1024 * 1024
+
+    def memory_report(self) -> list[dict[str, str | int]]:
+        """Return one discarded tab."""
+        return [
+            {
+                "title": "Example",
+                "url": "https://example.com/",
+                "state": "Discarded",
+                "pid": 0,
+                "memory_bytes": 0,
+                "reclaimed_bytes": 300 * 1024 * 1024,
+                "discards": 2,
+                "idle_seconds": 1900,
+            },
+        ]
+
+
+def test_reclaimed_memory_is_shown(app: QApplication, tmp_path: Path) -> None:
+    """Test that the memory budget and what discarding tabs gave back are on the page."""
+    monitor = PerformanceMonitor(QTabWidget(), tab_lifecycle=FakeLifecycle(), trace_dir=tmp_path)
+    page: str = monitor.render_page()
+    assert "<th>Memory budget</th><td>512 MiB</td>" in page
+    assert "<th>Reclaimed by discarding tabs</th><td>300 MiB in 2 discards</td>" in page
+    assert "<th>Example (Discarded)</th><td>idle 1900 s, 300 MiB reclaimed in 2 discards</td>" in page
+
+
+def test_event_loop_stalls_are_found(app: QApplication, tmp_path: Path) -> None:
+    """Test that blocking the event loop is recorded as a stall of about that long."""
+    monitor = PerformanceMonitor(QTabWidget(), trace_dir=tmp_path, check_interval_ms=10, stall_threshold_ms=50)
+    loop = QEventLoop()
+    QTimer.singleShot(50, lambda: time.sleep(0.2))
+    QTimer.singleShot(400, loop.quit)
+    loop.exec()
+
+    assert len(monitor.stalls) == 1
+    assert 0.15 < monitor.stall_seconds < 0.3
+    assert "<th>Event loop stalls</th><td>1</td>" in monitor.render_page()
+
+
+def test_stalls_can_be_left_unchecked(app: QApplication, tmp_path: Path) -> None:
+    """Test that a check interval of 0 runs no timer."""
+    monitor = PerformanceMonitor(QTabWidget(), trace_dir=tmp_path, check_interval_ms=0)
+    assert not monitor.timer.isActive()
+    assert "<th>Event loop stalls</th><td>Not checked</td>" in monitor.render_page()
+
+
+def test_trace_export(app: QApplication, tree_backend: str, tmp_path: Path) -> None:
+    """Test that loads, stalls and GitHub API fetches are exported as a Chrome trace."""
+    tabs = QTabWidget()
+    view = FakeView("github://user/repo/")
+    tabs.addTab(view, "Repo")
+    store = GitHubTreeStore(QNetworkAccessManager(), tree_backend)
+    monitor = PerformanceMonitor(tabs, tree_store=store, trace_dir=tmp_path)
+    monitor.track(view)
+
+    view.loadStarted.emit()
+    read_page(DirectoryListing(store, "user", "repo", ""))
+    view.loadFinished.emit(True)
+    monitor.check_event_loop()
+    monitor.last_check -= 1  # As if the event loop had been stuck for a second
+    monitor.check_event_loop()
+
+    assert "<th>GitHub API fetches</th><td>1</td>" in monitor.render_trace_page()
+    assert list(tmp_path.iterdir()) == []  # Only exported when asked to
+
+    assert "File" in monitor.render_export_page()
+    (trace_file,) = tmp_path.iterdir()
+    trace: dict[str, Any] = json.loads(trace_file.read_text(encoding="utf-8"))
+    events: dict[str, dict[str, Any]] = {event.get("cat", event["name"]): event for event in trace["traceEvents"]}
+
+    assert events["load"]["name"] == "github://user/repo/"
+    assert events["load"]["tid"] == FIRST_TAB_TRACK
+    assert events["load"]["dur"] > 0
+    assert events["event loop"]["dur"] > 900_000
+    assert events["github"]["name"] == "user/repo"
+    assert events["github"]["args"]["outcome"] == "fetched"
+    assert events["github"]["args"]["bytes"] == store.bytes_received
+    assert {"GUI event loop", "GitHub API", "Tab 1"} <= {
+        event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"
+    }
+    assert "user/repo (fetched)" in monitor.render_page()
+
+
+def test_process_memory() -> None:
+    """Test reading the resident memory of a process."""
+    assert can_measure_process_memory()
+    assert process_memory(os.getpid()) > 0
+    assert process_memory(0) == 0
+    assert process_memory(2**22 + 1) == 0
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+import pytest
+from PySide6.QtCore import QEvent, QEventLoop, QTimer
+from PySide6.QtWebEngineCore import QWebEngineProfile
+from PySide6.QtWebEngineWidgets import QWebEngineView
+
+from browser import main
+from browser.adblock import ADBLOCK_PAGE_URL
+from browser.cache_stats import CACHE_PAGE_URL
+from browser.main import Browser
+from browser.performance import PERFORMANCE_PAGE_URL
+from browser.profile import ProfileSettings, create_profile
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtWidgets import QApplication
+
+ASSET_COUNT = 20
+
+
+class CachingHandler(SimpleHTTPRequestHandler):
+    """Serve files with a long max-age, so the second visit can use the cache."""
+
+    def end_headers(self) -> None:
+        """Add Cache-Control to every response."""
+        self.send_header("Cache-Control", "max-age=3600")
+        super().end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the test output quiet."""
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Generator[str]:
+    """Serve a page with some cacheable scripts and return its URL."""
+    root: Path = tmp_path / "site"
+    root.mkdir()
+    scripts: str = "".join(f"<script src='asset-{i}.js'></script>" for i in range(ASSET_COUNT))
+    (root / "index.html").write_text(f"<html><body>{scripts}</body></html>", encoding="utf-8")
+    for i in range(ASSET_COUNT):
+        (root / f"asset-{i}.js").write_text(f"// {'x' * 200_000}\nwindow.a{i} = {i};", encoding="utf-8")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CachingHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/index.html"
+    server.shutdown()
+    server.server_close()
+
+
+def make_browser(tmp_path: Path) -> Browser:
+    """Create a browser with a persistent profile in a temporary directory."""
+    settings = ProfileSettings(storage_path=tmp_path / "storage", cache_path=tmp_path / "cache", cache_size=64 << 20)
+    browser = Browser(profile_settings=settings)
+    browser.finish_startup()
+    return browser
+
+
+def load(browser: Browser, url: str) -> None:
+    """Load a URL in the current tab and wait until the cache statistics of the page are in."""
+    view = browser.tabs.currentWidget()
+    assert isinstance(view, QWebEngineView)
+    pages: int = len(browser.cache_stats.cold_load_ms) + len(browser.cache_stats.warm_load_ms)
+
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(
+        lambda: len(browser.cache_stats.cold_load_ms) + len(browser.cache_stats.warm_load_ms) > pages and loop.quit(),
+    )
+    timer.start(10)
+    QTimer.singleShot(10_000, loop.quit)
+    view.setUrl(url)
+    loop.exec()
+    timer.stop()
+
+
+def test_profile_is_persistent(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that the named profile keeps its cache and cookies on disk."""
+    settings = ProfileSettings(
+        storage_path=tmp_path / "storage",
+        cache_path=tmp_path / "cache",
+        cache_size=64 << 20,
+        cookie_policy="force",
+    )
+    profile: QWebEngineProfile = create_profile(settings)
+
+    assert not profile.isOffTheRecord()
+    assert profile.cachePath() == str(tmp_path / "cache")
+    assert profile.persistentStoragePath() == str(tmp_path / "storage")
+    assert profile.httpCacheType() == QWebEngineProfile.HttpCacheType.DiskHttpCache
+    assert profile.httpCacheMaximumSize() == 64 << 20
+    assert profile.persistentCookiesPolicy() == QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies
+    assert create_profile(None).isOffTheRecord()
+
+
+def test_tabs_share_the_profile(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that every tab uses the profile of the browser instead of the default profile."""
+    browser: Browser = make_browser(tmp_path)
+    browser.add_new_tab("about:blank", "Second")
+
+    views: list[QWebEngineView] = [
+        view for i in range(browser.tabs.count()) if isinstance(view := browser.tabs.widget(i), QWebEngineView)
+    ]
+    assert browser.profile is not None
+    assert [view.page().profile() for view in views] == [browser.profile, browser.profile]
+
+
+def test_cache_page(app: QApplication | QCoreApplication, tmp_path: Path) -> None:
+    """Test that about:cache is rendered by the browser and shows the cache directory."""
+    browser: Browser = make_browser(tmp_path)
+    browser.url_bar.setText(CACHE_PAGE_URL)
+    browser.navigate_to_url()
+
+    assert str(tmp_path / "cache") in browser.render_cache_page()
+    assert isinstance(browser.tabs.currentWidget(), QWebEngineView)
+
+
+def test_performance_page(app: QApplication | QCoreApplication, tmp_path: Path, site: str) -> None:
+    """Test that about:performance shows the load time and the renderer of a real tab."""
+    browser: Browser = make_browser(tmp_path)
+    load(browser, site)
+    assert browser.performance is not None
+    report: dict[str, object] = browser.performance.tab_report()[0]
+    assert report["load_ms"]
+    assert report["pid"]
+
+    browser.url_bar.setText(PERFORMANCE_PAGE_URL)
+    browser.navigate_to_url()
+    assert "renderer " in browser.performance.render_page()
+    browser.close()
+
+
+@pytest.mark.benchmark
+def test_filter_lists_block_requests(
+    app: QApplication | QCoreApplication,
+    tmp_path: Path,
+    site: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the interceptor on the profile blocks the requests the filter lists match."""
+    filter_list: Path = tmp_path / "easylist.txt"
+    filter_list.write_text("||127.0.0.1^*/asset-1.js|\n", encoding="utf-8")
+    monkeypatch.setattr(main, "default_filter_cache_dir", lambda: tmp_path / "filters")
+    browser = Browser(filter_lists=[filter_list])
+    browser.finish_startup()
+
+    load(browser, site)
+
+    assert browser.adblock is not None
+    assert browser.adblock.matcher.stats.blocked == 1
+    assert browser.adblock.matcher.stats.checked == ASSET_COUNT + 1
+    assert ADBLOCK_PAGE_URL in browser.internal_pages
+    browser.close()
+
+
+def test_warm_cache_load_time(app: QApplication | QCoreApplication, tmp_path: Path, site: str) -> None:
+    """Test that a restarted browser serves a repeat visit from the disk cache."""
+    first: Browser = make_browser(tmp_path)
+    load(first, site)
+    assert first.cache_stats.misses >= ASSET_COUNT
+    cold: float = first.cache_stats.cold_load_ms[0]
+    first.close()
+    first.deleteLater()
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete)  # Release the profile before it is opened again
+
+    second: Browser = make_browser(tmp_path)
+    load(second, site)
+    assert second.cache_stats.hits >= ASSET_COUNT
+
+    warm: float = second.cache_stats.warm_load_ms[0]
+    print(f"Page load: cold {cold:.0f} ms, warm after a restart {warm:.0f} ms")  # noqa: T201
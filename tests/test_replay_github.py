@@ -0,0 +1,122 @@
+"""Tests for the record/replay GitHub stand-in, and for the API with the network unplugged."""
+
+from __future__ import annotations
+
+import json
+import socket
+import time
+from typing import TYPE_CHECKING, Any
+
+import httpx
+import pytest
+from django.test import Client
+from github import GithubException
+
+from core import sites_github
+from tests.fake_github import FakeGitHub, make_file
+from tests.replay_github import ReplayGitHub, main, request_key
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from django.http import HttpResponse
+
+CONTENTS_KEY = "/repos/TheLovinator1/browser/contents"
+
+
+def test_request_key() -> None:
+    """Test that requests are recorded independently of trailing slashes and the order of the query."""
+    assert request_key("/repos/a/b/contents/", "") == "/repos/a/b/contents"
+    assert request_key("/repos/a/b/git/trees/HEAD", "recursive=1&b=2") == request_key(
+        "/repos/a/b/git/trees/HEAD/",
+        "b=2&recursive=1",
+    )
+
+
+def test_contents_offline(replay_github: ReplayGitHub) -> None:
+    """Test that get_repo_contents reads the recorded contents, and revalidates them for free, without a network."""
+    with pytest.raises(OSError, match="unplugged"):
+        socket.create_connection(("140.82.112.6", 443), timeout=1)
+
+    sites_github.repo_contents_cache.ttl = 0  # Revalidate on every call
+    contents = sites_github.get_repo_contents("TheLovinator1", "browser")
+    assert isinstance(contents, list)
+    recorded: list[dict[str, Any]] = replay_github.responses[CONTENTS_KEY]["body"]
+    assert [entry["path"] for entry in contents] == [entry["path"] for entry in recorded]
+    assert {entry["path"]: entry["type"] for entry in contents}["core"] == "dir"
+
+    remaining: int = replay_github.remaining
+    assert sites_github.get_repo_contents("TheLovinator1", "browser") == contents
+    assert replay_github.remaining == remaining  # 304 Not Modified does not count against the rate limit
+    assert replay_github.requests == [CONTENTS_KEY, CONTENTS_KEY]
+    assert replay_github.misses == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_offline(replay_github: ReplayGitHub) -> None:
+    """Test the contents and tree endpoints end to end against the recorded responses."""
+    client = Client()
+    response: HttpResponse = client.get("/api/github/repos/TheLovinator1/browser/contents/")
+    assert response.status_code == 200
+    assert "README.md" in [entry["name"] for entry in response.json()]
+    assert (
+        client.get("/api/github/repos/TheLovinator1/browser/contents/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code
+        == 304
+    )
+
+    tree: list[dict[str, Any]] = client.get("/api/github/repos/TheLovinator1/browser/tree/").json()["entries"]
+    assert "core/sites_github.py" in [entry["path"] for entry in tree]
+    assert client.get("/api/github/repos/TheLovinator1/missing/contents/").json() == []
+    assert replay_github.misses == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_injected_latency_and_rate_limit(replay_github: ReplayGitHub) -> None:
+    """Test that the injected latency slows upstream calls, and that an exhausted rate limit becomes a 503."""
+    replay_github.delay = 0.2
+    start: float = time.perf_counter()
+    sites_github.get_repo_contents("TheLovinator1", "browser")
+    assert time.perf_counter() - start >= 0.2
+
+    replay_github.delay = 0
+    replay_github.remaining = 0
+    with pytest.raises(GithubException) as error:
+        sites_github.get_repo_tree("TheLovinator1", "browser")
+    assert error.value.status == 403
+
+    response: HttpResponse = Client().get("/api/github/repos/TheLovinator1/browser/tree/")
+    assert response.status_code == 503
+    assert int(response["Retry-After"]) > 3000
+    assert len(replay_github.requests) == 2  # The 503 was answered without asking GitHub again
+
+
+def test_record_and_replay(tmp_path: Path) -> None:
+    """Test that responses recorded from an upstream API are replayed the same with the upstream gone."""
+    upstream = FakeGitHub()
+    upstream.repos["user/repo"] = [make_file("a.py"), make_file("src/b.py")]
+    upstream.start()
+    cassette: Path = tmp_path / "cassette.json"
+    try:
+        main(
+            [
+                str(cassette),
+                "/repos/user/repo/contents/",
+                "/repos/user/repo/git/trees/HEAD?recursive=1",
+                "--upstream",
+                upstream.url,
+            ]
+        )
+    finally:
+        upstream.stop()
+
+    replay = ReplayGitHub(cassette)
+    replay.start()
+    try:
+        contents: list[dict[str, Any]] = httpx.get(f"{replay.url}/repos/user/repo/contents").json()
+    finally:
+        replay.stop()
+    assert contents == upstream.repos["user/repo"]
+    assert list(json.loads(cassette.read_text(encoding="utf-8"))["responses"]) == [
+        "/repos/user/repo/contents",
+        "/repos/user/repo/git/trees/HEAD?recursive=1",
+    ]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from browser.session import SessionState, SessionStore, TabState
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def make_session(count: int, active_index: int = 0) -> SessionState:
+    """Create a session with the given number of tabs."""
+    return SessionState(
+        tabs=[TabState(url=f"https://example.com/{i}", title=f"Example {i}") for i in range(count)],
+        active_index=active_index,
+    )
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    """Test that a saved session loads back the same."""
+    store = SessionStore(tmp_path / "session.json")
+    assert store.load() is None
+
+    session: SessionState = make_session(3, active_index=2)
+    assert store.save(session)
+    assert SessionStore(store.path).load() == session
+
+
+def test_unchanged_session_is_not_written(tmp_path: Path) -> None:
+    """Test that saving the same session twice only writes once."""
+    store = SessionStore(tmp_path / "session.json")
+    assert store.save(make_session(2))
+    assert not store.save(make_session(2))
+    assert store.save(make_session(2, active_index=1))
+    assert store.writes == 2
+
+
+def test_save_is_atomic(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a failed write leaves the previous session and no temporary files."""
+    store = SessionStore(tmp_path / "session.json")
+    store.save(make_session(2))
+
+    def fail(fd: int) -> None:
+        msg = "disk full"
+        raise OSError(msg)
+
+    monkeypatch.setattr("browser.session.os.fsync", fail)
+    with pytest.raises(OSError, match="disk full"):
+        store.save(make_session(5))
+
+    assert SessionStore(store.path).load() == make_session(2)
+    assert [path.name for path in tmp_path.iterdir()] == ["session.json"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "",
+        "not json",
+        "[]",
+        '{"version": 1, "tabs": [{"url": "about:blank"}], "active_index": 0}',
+        '{"version": 99, "tabs": [], "active_index": 0}',
+    ],
+)
+def test_invalid_session_is_ignored(tmp_path: Path, data: str) -> None:
+    """Test that a broken session file starts a fresh session instead of crashing."""
+    path: Path = tmp_path / "session.json"
+    path.write_text(data, encoding="utf-8")
+    assert SessionStore(path).load() is None
+
+
+def test_active_index_is_clamped() -> None:
+    """Test that an active index past the last tab selects the last tab."""
+    data: str = make_session(3, active_index=2).to_json().replace('"active_index": 2', '"active_index": 7')
+    assert SessionState.from_json(data).active_index == 2
@@ -0,0 +1,126 @@
+"""Tests for the repository snapshot store."""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import snapshots
+from core.models import ContentEntry, Repository
+
+if TYPE_CHECKING:
+    from tests.fake_github import FakeGitHub
+
+UPSTREAM_DELAY = 0.05  # seconds, roughly one GitHub round trip
+
+# More entries than SQLite allows parameters in one query, 32766 on current builds.
+LARGE_ENTRY_COUNT = 40_000
+
+
+def make_contents(count: int, prefix: str = "file") -> list[dict[str, str | int]]:
+    """Create a listing like the one returned by get_repo_contents."""
+    return [
+        {
+            "name": f"{prefix}_{i}.py",
+            "path": f"{prefix}_{i}.py",
+            "type": "file",
+            "download_url": f"https://raw.githubusercontent.com/user/repo/main/{prefix}_{i}.py",
+            "html_url": f"https://github.com/user/repo/blob/main/{prefix}_{i}.py",
+            "size": i,
+            "sha": f"{i:040x}",
+        }
+        for i in range(count)
+    ]
+
+
+def slow_upstream(username: str, repo_name: str) -> list[dict[str, str | int]]:
+    """Pretend to be GitHub."""
+    time.sleep(UPSTREAM_DELAY)
+    return make_contents(200)
+
+
+@pytest.mark.django_db
+def test_save_snapshot_upserts_and_removes_entries() -> None:
+    """Test that saving a snapshot again updates, reorders and removes entries."""
+    snapshots.save_snapshot("user", "repo", make_contents(3))
+    changed: list[dict[str, str | int]] = make_contents(2)
+    changed[0]["sha"] = "f" * 40
+    changed.reverse()
+    snapshots.save_snapshot("user", "repo", changed)
+
+    repository: Repository | None = snapshots.load_snapshot("user", "repo")
+    assert repository is not None
+    assert [entry.as_dict() for entry in repository.entries.all()] == changed
+    assert ContentEntry.objects.count() == 2
+    assert Repository.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_save_large_snapshot() -> None:
+    """Test that removing entries from a directory larger than SQLite's parameter limit works."""
+    snapshots.save_snapshot("user", "repo", make_contents(LARGE_ENTRY_COUNT))
+    with CaptureQueriesContext(connection) as queries:
+        snapshots.save_snapshot("user", "repo", make_contents(LARGE_ENTRY_COUNT - 10))
+    assert ContentEntry.objects.count() == LARGE_ENTRY_COUNT - 10
+    # Only the inserts, in batches, grow with the listing
+    assert max(len(query["sql"]) for query in queries if not query["sql"].startswith("INSERT")) < 1000
+
+
+@pytest.mark.django_db
+def test_stale_snapshot_is_served_and_refreshed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a stale snapshot is served at once while a refresh is queued."""
+    snapshots.save_snapshot("user", "repo", make_contents(5))
+    Repository.objects.update(fetched_at=timezone.now() - timedelta(days=1))
+
+    queued: list[tuple[str, str]] = []
+    monkeypatch.setattr(snapshots, "queue_snapshot_refresh", lambda *args: queued.append(args))
+    monkeypatch.setattr(snapshots, "get_repo_contents", pytest.fail)
+
+    assert snapshots.get_snapshot_contents("user", "repo") == make_contents(5)
+    assert queued == [("user", "repo")]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_refresh_saves_empty_and_deletes_missing_repositories(fake_github: FakeGitHub) -> None:
+    """Test that a refresh saves an empty root directory as fresh, and deletes the snapshot of a missing repository."""
+    stale: datetime = timezone.now() - timedelta(days=1)
+    for name in ("empty", "gone"):
+        snapshots.save_snapshot("user", name, make_contents(3))
+    Repository.objects.update(fetched_at=stale)
+    fake_github.repos["user/empty"] = []
+
+    snapshots.refresh_snapshot("user", "empty")
+    snapshots.refresh_snapshot("user", "gone")
+
+    repository: Repository | None = snapshots.load_snapshot("user", "empty")
+    assert repository is not None
+    assert list(repository.entries.all()) == []
+    assert not repository.is_stale(timezone.now(), settings.GITHUB_SNAPSHOT_MAX_AGE)
+    assert snapshots.load_snapshot("user", "gone") is None
+    assert ContentEntry.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_warm_start_benchmark(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Compare serving a restarted API from the snapshot with paying the upstream round trip."""
+    monkeypatch.setattr(snapshots, "get_repo_contents", slow_upstream)
+    monkeypatch.setattr(snapshots, "queue_snapshot_refresh", lambda *args: None)
+
+    start: float = time.perf_counter()
+    cold = snapshots.get_snapshot_contents("user", "repo")
+    cold_latency: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm = snapshots.get_snapshot_contents("user", "repo")
+    warm_latency: float = time.perf_counter() - start
+
+    print(f"Cold start: {cold_latency * 1000:.1f} ms, warm start from snapshot: {warm_latency * 1000:.1f} ms")  # noqa: T201
+    assert warm == cold
+    assert warm_latency < UPSTREAM_DELAY
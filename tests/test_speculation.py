@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+import pytest
+from PySide6.QtCore import QEventLoop, QTimer
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply
+
+from browser.github_trees import GitHubTreeStore
+from browser.speculation import SpeculativeLoader, preconnect_html, predict_url
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtWidgets import QApplication
+
+    from browser.github_trees import RepoTree
+
+BACKEND_DELAY = 0.3  # seconds
+DELAY_MS = 50
+
+
+class TreeHandler(BaseHTTPRequestHandler):
+    """Serve a small tree after a delay, like a cold API call, and record the paths asked for."""
+
+    paths: list[str] = []  # noqa: RUF012
+
+    def do_GET(self) -> None:
+        """Sleep, then send the tree."""
+        type(self).paths.append(self.path)
+        time.sleep(BACKEND_DELAY)
+        entry: dict[str, str | int] = {"name": "README.md", "path": "README.md", "type": "file", "size": 1, "sha": "a"}
+        body: bytes = json.dumps(entry).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # The prefetch was aborted
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the test output quiet."""
+
+
+@pytest.fixture
+def backend() -> Generator[str]:
+    """Run a slow stub of the API and yield its base URL."""
+    TreeHandler.paths = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TreeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/github/"
+    server.shutdown()
+    server.server_close()
+
+
+def run_event_loop(milliseconds: int) -> None:
+    """Run the event loop for a while."""
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec()
+
+
+def open_page(reply: QNetworkReply | None, backend: str) -> float:
+    """Load the tree of user/repo with an optional prefetched reply and return how long it took."""
+    store = GitHubTreeStore(QNetworkAccessManager(), backend)
+    start: float = time.perf_counter()
+    tree: RepoTree = store.tree("user", "repo", reply)
+    if tree.loading:
+        loop = QEventLoop()
+        store.changed.connect(lambda _: tree.loading or loop.quit())
+        QTimer.singleShot(5000, loop.quit)
+        loop.exec()
+    elapsed: float = time.perf_counter() - start
+    assert [entry["path"] for entry in tree.children[""]] == ["README.md"]
+    store.deleteLater()  # Leaving it to the garbage collector crashes PySide
+    return elapsed
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("GitHub/user/repo", "GitHub/user/repo"),
+        ("GitHub/user/", None),
+        ("GitHub/user", None),
+        ("GitHub/user/repo/extra", None),
+        ("example.com/some/page?q=1", "http://example.com"),
+        ("https://example.com:8443/page", "https://example.com:8443"),
+        ("exam", None),
+        ("two words.com", None),
+        ("ftp://example.com", None),
+        ("", None),
+    ],
+)
+def test_predict_url(text: str, expected: str | None) -> None:
+    """Test that only complete repositories and plausible web URLs are speculated on."""
+    assert predict_url(text) == expected
+
+
+def test_preconnect_html() -> None:
+    """Test that the preconnect page links to the origin and nothing else, with the origin escaped."""
+    assert preconnect_html("https://example.com") == '<!DOCTYPE html><link rel="preconnect" href="https://example.com">'
+    assert '"><script>' not in preconnect_html('https://example.com"><script>')
+
+
+def test_prefetch_is_cancelled_when_the_text_changes(app: QApplication | QCoreApplication, backend: str) -> None:
+    """Test that typing on aborts the prefetch of the previous guess."""
+    loader = SpeculativeLoader(QNetworkAccessManager(), lambda _: None, api_base_url=backend, delay_ms=DELAY_MS)
+
+    loader.text_edited("GitHub/user/re")
+    run_event_loop(DELAY_MS * 2)
+    first: QNetworkReply | None = loader.prefetch
+    assert first is not None
+    errors: list[QNetworkReply.NetworkError] = []
+    first.errorOccurred.connect(errors.append)
+
+    loader.text_edited("GitHub/user/repo")
+    run_event_loop(DELAY_MS * 2)
+    assert errors == [QNetworkReply.NetworkError.OperationCanceledError]
+    assert loader.prefetch is not None
+    assert (loader.stats.prefetches, loader.stats.cancelled) == (2, 1)
+
+    assert loader.take("GitHub/other/repo") is None
+    assert loader.prefetch is None
+    assert (loader.stats.navigations, loader.stats.hits, loader.stats.cancelled) == (1, 0, 2)
+
+
+def test_preconnect_hit(app: QApplication | QCoreApplication) -> None:
+    """Test that a web URL is preconnected once per origin and counted when it is navigated to."""
+    origins: list[str] = []
+    loader = SpeculativeLoader(QNetworkAccessManager(), origins.append, delay_ms=DELAY_MS)
+
+    loader.text_edited("https://example.com/a")
+    run_event_loop(DELAY_MS * 2)
+    loader.text_edited("https://example.com/abc")
+    run_event_loop(DELAY_MS * 2)
+    assert origins == ["https://example.com"]
+
+    assert loader.take("https://example.com/abcdef") is None
+    assert loader.stats.hits == 1
+    assert loader.stats.hit_rate == 1.0
+    assert loader.stats.preconnect_head_start_ms[0] >= DELAY_MS
+    assert "Speculated navigations" in loader.render_page()
+
+
+@pytest.mark.benchmark
+def test_prefetch_saves_latency(app: QApplication | QCoreApplication, backend: str) -> None:
+    """Test that the page loads sooner from a prefetch than from a request sent when Enter is pressed."""
+    cold: float = open_page(None, backend)
+
+    loader = SpeculativeLoader(QNetworkAccessManager(), lambda _: None, api_base_url=backend, delay_ms=DELAY_MS)
+    loader.text_edited("GitHub/user/repo")
+    run_event_loop(int(BACKEND_DELAY * 1000))  # The user stops typing for a moment before pressing Enter
+    reply: QNetworkReply | None = loader.take("GitHub/user/repo")
+    assert reply is not None
+    warm: float = open_page(reply, backend)
+
+    saved_ms: float = loader.stats.prefetch_saved_ms[0]
+    print(  # noqa: T201
+        f"Open GitHub/user/repo: cold {cold * 1000:.0f} ms, after a prefetch {warm * 1000:.0f} ms, "
+        f"{saved_ms:.0f} ms saved",
+    )
+    assert len(TreeHandler.paths) == 2
+    assert warm < cold
+    assert saved_ms > 0
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT: Path = Path(__file__).parent.parent
+
+# Generous limits for a CI machine, meant to catch things like an eager import of QtWebEngine.
+MAX_IMPORT_SECONDS = 1.0
+MAX_WINDOW_SHOWN_SECONDS = 2.0
+MAX_FIRST_TAB_LOADED_SECONDS = 15.0
+
+
+@pytest.mark.benchmark
+def test_startup_benchmark() -> None:
+    """Start the browser in a fresh process and check that the window is painted before QtWebEngine starts."""
+    result: subprocess.CompletedProcess[str] = subprocess.run(
+        [sys.executable, "-m", "tests.startup_benchmark"],
+        cwd=ROOT,
+        env={**os.environ, "QT_QPA_PLATFORM": "offscreen"},
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    timings: dict[str, float | bool | None] = json.loads(result.stdout.strip().splitlines()[-1])
+    print(  # noqa: T201
+        f"Startup: import {timings['import']:.3f} s, window shown {timings['window_shown']:.3f} s, "
+        f"first tab loaded {timings['first_tab_loaded']:.3f} s",
+    )
+
+    assert timings["webengine_imported_before_paint"] is False
+    assert isinstance(timings["import"], float)
+    assert timings["import"] < MAX_IMPORT_SECONDS
+    assert isinstance(timings["window_shown"], float)
+    assert timings["window_shown"] < MAX_WINDOW_SHOWN_SECONDS
+    assert isinstance(timings["first_tab_loaded"], float)
+    assert timings["window_shown"] < timings["first_tab_loaded"] < MAX_FIRST_TAB_LOADED_SECONDS
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from PySide6.QtWebEngineWidgets import QWebEngineView
+from PySide6.QtWidgets import QTabWidget
+
+from browser.tab_lifecycle import FREEZE_AFTER, LifecycleState, TabLifecycleManager
+
+if TYPE_CHECKING:
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtWidgets import QApplication
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Fixture for the clock of the manager."""
+    return FakeClock()
+
+
+@pytest.fixture
+def tabs(app: QApplication | QCoreApplication) -> QTabWidget:
+    """Fixture for a tab widget with three blank tabs, the first one selected."""
+    tabs = QTabWidget()
+    for i in range(3):
+        view = QWebEngineView()
+        view.setUrl("about:blank")
+        tabs.addTab(view, f"Tab {i}")
+    return tabs
+
+
+@pytest.fixture
+def manager(tabs: QTabWidget, clock: FakeClock) -> TabLifecycleManager:
+    """Fixture for a manager of every tab that freezes after 60 seconds and discards after 600."""
+    manager = TabLifecycleManager(tabs, freeze_after=60, discard_after=600, memory_budget=2**40, clock=clock)
+    for index in range(tabs.count()):
+        manager.track(tabs.widget(index))
+    tabs.setCurrentIndex(1)
+    tabs.setCurrentIndex(0)
+    return manager
+
+
+def state(tabs: QTabWidget, index: int) -> LifecycleState:
+    """Return the lifecycle state of a tab."""
+    view = tabs.widget(index)
+    assert isinstance(view, QWebEngineView)
+    return view.page().lifecycleState()
+
+
+def test_background_tabs_freeze_then_discard(tabs: QTabWidget, manager: TabLifecycleManager, clock: FakeClock) -> None:
+    """Test that idle background tabs are frozen, then discarded, and that the selected tab is left alone."""
+    clock.now = 30
+    manager.check_tabs()
+    assert [state(tabs, i) for i in range(3)] == [LifecycleState.Active] * 3
+
+    clock.now = 61
+    manager.check_tabs()
+    assert state(tabs, 0) == LifecycleState.Active
+    assert state(tabs, 1) == LifecycleState.Frozen
+    assert state(tabs, 2) == LifecycleState.Frozen
+
+    clock.now = 601
+    manager.check_tabs()
+    assert state(tabs, 0) == LifecycleState.Active
+    assert state(tabs, 1) == LifecycleState.Discarded
+    assert state(tabs, 2) == LifecycleState.Discarded
+
+
+def test_selecting_a_discarded_tab_wakes_it(tabs: QTabWidget, manager: TabLifecycleManager, clock: FakeClock) -> None:
+    """Test that selecting a discarded tab makes it Active again and restarts its idle time."""
+    clock.now = 601
+    manager.check_tabs()
+    assert state(tabs, 2) == LifecycleState.Discarded
+
+    tabs.setCurrentIndex(2)
+    assert state(tabs, 2) == LifecycleState.Active
+    assert tabs.widget(2).url().toString() == "about:blank"
+
+    clock.now = 630
+    manager.check_tabs()
+    assert state(tabs, 0) == LifecycleState.Active  # Left 29 seconds ago
+    assert state(tabs, 2) == LifecycleState.Active
+
+
+def test_memory_budget_discards_least_recently_used(
+    tabs: QTabWidget,
+    manager: TabLifecycleManager,
+    clock: FakeClock,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that going over the memory budget discards the least recently used tab before it is idle for long."""
+    clock.now = 10
+    tabs.setCurrentIndex(2)
+    tabs.setCurrentIndex(0)
+    manager.memory_budget = 100
+    monkeypatch.setattr(manager, "renderer_memory", lambda: 150)
+    monkeypatch.setattr(manager, "estimate_view_memory", lambda view: 50)
+
+    manager.check_tabs()
+
+    assert state(tabs, 0) == LifecycleState.Active
+    assert state(tabs, 1) == LifecycleState.Discarded
+    assert state(tabs, 2) == LifecycleState.Active
+
+
+def test_settings_from_env(tabs: QTabWidget, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the idle times and the memory budget can be set in the environment."""
+    monkeypatch.setenv("BROWSER_FREEZE_AFTER", "30")
+    monkeypatch.setenv("BROWSER_DISCARD_AFTER", "90.5")
+    monkeypatch.setenv("BROWSER_MEMORY_BUDGET_MB", "512")
+    manager: TabLifecycleManager = TabLifecycleManager.from_env(tabs)
+    assert (manager.freeze_after, manager.discard_after, manager.memory_budget) == (30, 90.5, 512 * 2**20)
+
+    monkeypatch.delenv("BROWSER_FREEZE_AFTER")
+    monkeypatch.setenv("BROWSER_MEMORY_BUDGET_MB", "0")
+    manager = TabLifecycleManager.from_env(tabs)
+    assert (manager.freeze_after, manager.memory_budget) == (FREEZE_AFTER, 0)
+
+
+def test_memory_budget_needs_memory_measurement(
+    tabs: QTabWidget,
+    clock: FakeClock,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the budget is disabled where the memory of the renderers can not be measured."""
+    monkeypatch.setattr("browser.tab_lifecycle.can_measure_process_memory", lambda: False)
+    manager = TabLifecycleManager(tabs, memory_budget=100, clock=clock)
+    assert manager.memory_budget == 0
+    for index in range(tabs.count()):
+        manager.track(tabs.widget(index))
+    monkeypatch.setattr(manager, "renderer_memory", lambda: 150)
+
+    manager.check_tabs()
+
+    assert [state(tabs, index) for index in range(tabs.count())] == [LifecycleState.Active] * 3
+
+
+def test_memory_report(tabs: QTabWidget, manager: TabLifecycleManager, clock: FakeClock) -> None:
+    """Test that the report has every tab in order with its state."""
+    clock.now = 601
+    manager.check_tabs()
+
+    report: list[dict[str, str | int]] = manager.memory_report()
+    assert [row["state"] for row in report] == ["Active", "Discarded", "Discarded"]
+    assert report[0]["idle_seconds"] == 0
+    assert report[1]["discards"] == 1
+
+
+def test_forget_closed_tab(tabs: QTabWidget, manager: TabLifecycleManager) -> None:
+    """Test that closed tabs are no longer managed."""
+    view = tabs.widget(2)
+    assert isinstance(view, QWebEngineView)
+    tabs.removeTab(2)
+    manager.forget(view)
+    assert len(manager.memory_report()) == 2
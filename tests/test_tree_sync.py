@@ -0,0 +1,156 @@
+"""Tests for syncing cached repository trees with new commits."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from core import sites_github
+from core.cache import TTLCache
+from tests.fake_github import make_file
+
+if TYPE_CHECKING:
+    from tests.fake_github import FakeGitHub
+
+FILES: list[str] = ["README.md", "docs/index.md", "src/core/a.py", "src/core/b.py", "src/ui/c.py", "src/ui/d.py"]
+
+
+@pytest.fixture
+def now(monkeypatch: pytest.MonkeyPatch, fake_github: FakeGitHub) -> list[float]:
+    """Give the tree cache a clock the test can move forward."""
+    clock: list[float] = [0.0]
+    monkeypatch.setattr(sites_github, "repo_tree_cache", TTLCache(maxsize=16, ttl=60, clock=lambda: clock[0]))
+    return clock
+
+
+def modified(path: str) -> dict[str, Any]:
+    """Create a file whose content, and so whose SHA, differs from make_file(path)."""
+    return {**make_file(path), "sha": make_file(f"{path}~").get("sha")}
+
+
+def fetch_whole_tree() -> dict[str, Any]:
+    """Fetch the tree without the cache, to compare a synced tree with."""
+    sites_github.repo_tree_cache.clear()
+    return sites_github.get_repo_tree("user", "repo")
+
+
+def sync(fake_github: FakeGitHub, now: list[float]) -> tuple[dict[str, Any], list[str]]:
+    """Expire the cached tree, get it again and return it with the upstream requests that were made."""
+    now[0] += 61
+    fake_github.requests.clear()
+    return sites_github.get_repo_tree("user", "repo"), list(fake_github.requests)
+
+
+def test_sync_fetches_only_changed_directories(fake_github: FakeGitHub, now: list[float]) -> None:
+    """Test that a changed file costs one request per directory on its path and gives the same tree."""
+    fake_github.commit("user/repo", [make_file(path) for path in FILES])
+    sites_github.get_repo_tree("user", "repo")
+    _, trees = fake_github.git_trees("user/repo")
+
+    fake_github.commit("user/repo", [modified(path) if path == "src/core/a.py" else make_file(path) for path in FILES])
+    tree, requests = sync(fake_github, now)
+    root, new_trees = fake_github.git_trees("user/repo")
+
+    assert requests[0] == "/repos/user/repo/commits/HEAD"
+    assert len(requests) == 4  # The commit, then the root, src and src/core trees
+    assert all(path.removeprefix("/repos/user/repo/git/trees/") in new_trees for path in requests[1:])
+    assert not any(path.endswith(tuple(trees)) for path in requests[1:])
+    assert tree["sha"] == root
+    assert tree["commit"] == fake_github.history["user/repo"][-1]
+    assert tree["entries"] == fetch_whole_tree()["entries"]
+
+
+def test_unchanged_commit_is_revalidated(fake_github: FakeGitHub, now: list[float]) -> None:
+    """Test that a tree is synced with the commit once, and after that revalidated with one free 304."""
+    fake_github.commit("user/repo", [make_file(path) for path in FILES])
+    tree: dict[str, Any] = sites_github.get_repo_tree("user", "repo")
+
+    synced, requests = sync(fake_github, now)
+    assert requests == ["/repos/user/repo/commits/HEAD"]
+    assert synced["entries"] is tree["entries"]
+
+    remaining: int = fake_github.remaining
+    revalidated, requests = sync(fake_github, now)
+    assert requests == ["/repos/user/repo/commits/HEAD"]
+    assert revalidated is synced
+    assert fake_github.remaining == remaining
+    assert sites_github.repo_tree_cache.stats()["revalidations"] == 1
+
+
+def test_sync_adds_and_removes_directories(fake_github: FakeGitHub, now: list[float]) -> None:
+    """Test that a new directory is fetched with one recursive request and a removed one disappears."""
+    fake_github.commit("user/repo", [make_file(path) for path in FILES])
+    sites_github.get_repo_tree("user", "repo")
+
+    added: list[str] = ["docs/api/v1/a.md", "docs/api/v1/b.md", "docs/api/c.md"]
+    fake_github.commit("user/repo", [make_file(path) for path in FILES + added if not path.startswith("src/ui/")])
+    tree, requests = sync(fake_github, now)
+
+    assert len(requests) == 5  # The commit, the root, src and docs, and docs/api with everything below it
+    paths: list[str] = [entry["path"] for entry in tree["entries"]]
+    assert "docs/api/v1/b.md" in paths
+    assert not any(path.startswith("src/ui") for path in paths)
+    assert tree["entries"] == fetch_whole_tree()["entries"]
+
+
+def test_sync_falls_back_to_whole_tree(fake_github: FakeGitHub, now: list[float]) -> None:
+    """Test that a commit that changes too many directories is fetched with one recursive request instead."""
+    files: list[str] = [f"package{number}/module.py" for number in range(40)]
+    fake_github.commit("user/repo", [make_file(path) for path in files])
+    sites_github.get_repo_tree("user", "repo")
+
+    fake_github.commit("user/repo", [modified(path) for path in files])
+    tree, requests = sync(fake_github, now)
+
+    assert requests[-1] == "/repos/user/repo/git/trees/HEAD"
+    assert len(requests) == 33  # The commit, the root, 30 directories and then the whole tree
+    assert tree["entries"] == fetch_whole_tree()["entries"]
+
+
+def test_async_sync_matches_sync(fake_github: FakeGitHub, now: list[float]) -> None:
+    """Test that the async client syncs with the same requests and result."""
+    fake_github.commit("user/repo", [make_file(path) for path in FILES])
+    asyncio.run(sites_github.aget_repo_tree("user", "repo"))
+
+    fake_github.commit("user/repo", [modified(path) if path == "src/ui/d.py" else make_file(path) for path in FILES])
+    now[0] += 61
+    fake_github.requests.clear()
+    tree: dict[str, Any] = asyncio.run(sites_github.aget_repo_tree("user", "repo"))
+
+    assert len(fake_github.requests) == 4
+    assert tree["entries"] == fetch_whole_tree()["entries"]
+
+
+@pytest.mark.benchmark
+def test_tree_sync_benchmark(fake_github: FakeGitHub, now: list[float]) -> None:
+    """Compare syncing a one-file commit in a 20,000 file repository with fetching the whole tree again."""
+    files: list[str] = [f"pkg{a}/mod{b}/file{c}.py" for a in range(20) for b in range(50) for c in range(20)]
+    fake_github.commit("user/repo", [make_file(path) for path in files])
+    sites_github.get_repo_tree("user", "repo")
+
+    fake_github.commit("user/repo", [modified(path) if path == files[12345] else make_file(path) for path in files])
+    now[0] += 61
+    fake_github.bytes_sent = 0
+    fake_github.requests.clear()
+    start: float = time.perf_counter()
+    tree: dict[str, Any] = sites_github.get_repo_tree("user", "repo")
+    sync_time: float = time.perf_counter() - start
+    sync_bytes: int = fake_github.bytes_sent
+    sync_requests: int = len(fake_github.requests)
+
+    fake_github.bytes_sent = 0
+    start = time.perf_counter()
+    whole: dict[str, Any] = fetch_whole_tree()
+    whole_time: float = time.perf_counter() - start
+    whole_bytes: int = fake_github.bytes_sent
+
+    print(  # noqa: T201
+        f"20,000 files, one changed: sync {sync_requests} requests, {sync_bytes:,} bytes, {sync_time * 1000:.0f} ms; "
+        f"whole tree 1 request, {whole_bytes:,} bytes, {whole_time * 1000:.0f} ms",
+    )
+    assert tree["entries"] == whole["entries"]
+    assert sync_requests == 4
+    assert sync_bytes * 50 < whole_bytes